@@ -0,0 +1,225 @@
+"""Gravação assíncrona e em lote dos eventos de auditoria.
+
+Tentativas de login (``login_attempts``), eventos de acesso (``access_logs``)
+e o log de apostas (``log_apostas``) eram gravados com uma conexão, um INSERT
+e um commit por evento, no caminho da requisição. Aqui os eventos entram numa
+fila limitada em memória; uma thread daemon a esvazia e grava lotes com um
+INSERT de várias linhas por tabela, numa conexão e num commit.
+
+- Fila cheia: o evento é gravado na hora, na thread de quem chamou — nada é
+  descartado, só se perde a vantagem do lote.
+- Encerramento do processo: ``atexit`` drena o que estiver na fila.
+- Falha de um lote: as linhas são regravadas uma a uma, para um evento
+  inválido não levar os outros junto.
+- ``BF1_AUDIT_MODE=sync`` desliga a fila (cada evento é gravado na hora).
+
+Leitores que precisam dos eventos ainda não gravados (rate limit do login)
+usam ``pendentes``.
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from db.db_schema import db_connect
+
+logger = logging.getLogger(__name__)
+
+AUDIT_MODE = os.environ.get("BF1_AUDIT_MODE", "async").strip().lower()
+AUDIT_QUEUE_SIZE = max(1, int(os.environ.get("BF1_AUDIT_QUEUE_SIZE", "2000")))
+AUDIT_BATCH_SIZE = max(1, int(os.environ.get("BF1_AUDIT_BATCH_SIZE", "200")))
+AUDIT_FLUSH_INTERVAL = max(0.01, float(os.environ.get("BF1_AUDIT_FLUSH_INTERVAL", "0.5")))
+
+Evento = tuple[str, dict[str, Any]]
+
+
+def _inserir(cur, tabela: str, linhas: list[dict[str, Any]]) -> None:
+    colunas = list(linhas[0])
+    marcadores = "(" + ", ".join(["%s"] * len(colunas)) + ")"
+    params: list[Any] = []
+    for linha in linhas:
+        params.extend(linha[c] for c in colunas)
+    cur.execute(
+        f"INSERT INTO {tabela} ({', '.join(colunas)}) VALUES {', '.join([marcadores] * len(linhas))}",
+        params,
+    )
+
+
+def gravar_eventos(eventos: list[Evento]) -> None:
+    """Grava ``eventos`` numa conexão: um INSERT multi-linha por tabela/colunas."""
+    grupos: dict[tuple[str, tuple[str, ...]], list[dict[str, Any]]] = {}
+    for tabela, linha in eventos:
+        grupos.setdefault((tabela, tuple(linha)), []).append(linha)
+    with db_connect() as conn:
+        cur = conn.cursor()
+        try:
+            for (tabela, _), linhas in grupos.items():
+                _inserir(cur, tabela, linhas)
+            conn.commit()
+            return
+        except Exception as exc:
+            conn.rollback()
+            if len(eventos) == 1:
+                logger.warning("Falha ao gravar evento de auditoria em %s: %s", eventos[0][0], exc)
+                return
+            logger.warning("Lote de auditoria recusado (%s eventos); gravando um a um: %s", len(eventos), exc)
+            for tabela, linha in eventos:
+                try:
+                    _inserir(cur, tabela, [linha])
+                    conn.commit()
+                except Exception as exc_linha:
+                    conn.rollback()
+                    logger.warning("Falha ao gravar evento de auditoria em %s: %s", tabela, exc_linha)
+        finally:
+            cur.close()
+
+
+class AuditSink:
+    """Fila limitada de eventos de auditoria drenada por uma thread em lotes."""
+
+    def __init__(
+        self,
+        *,
+        maxsize: int = AUDIT_QUEUE_SIZE,
+        batch_size: int = AUDIT_BATCH_SIZE,
+        flush_interval: float = AUDIT_FLUSH_INTERVAL,
+        gravar: Callable[[list[Evento]], None] = gravar_eventos,
+    ) -> None:
+        self._fila: queue.Queue[Evento] = queue.Queue(maxsize=maxsize)
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._gravar = gravar
+        self._lock = threading.Lock()
+        self._em_gravacao: list[Evento] = []
+        self._thread: Optional[threading.Thread] = None
+        self._parar = threading.Event()
+
+    def registrar(self, tabela: str, linha: dict[str, Any]) -> None:
+        """Enfileira o evento; com a fila cheia (ou parada), grava na hora."""
+        evento = (tabela, dict(linha))
+        if not self._parar.is_set():
+            self._iniciar()
+            try:
+                self._fila.put_nowait(evento)
+                return
+            except queue.Full:
+                logger.warning("Fila de auditoria cheia; gravando evento de %s de forma síncrona", tabela)
+        self._gravar_com_protecao([evento])
+
+    def pendentes(self, tabela: str) -> list[dict[str, Any]]:
+        """Eventos de ``tabela`` enfileirados ou em gravação (ainda não commitados)."""
+        with self._lock:
+            eventos = list(self._em_gravacao)
+        with self._fila.mutex:
+            eventos.extend(self._fila.queue)
+        return [dict(linha) for t, linha in eventos if t == tabela]
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Espera a fila esvaziar; ``False`` se o ``timeout`` acabar antes."""
+        limite = None if timeout is None else time.monotonic() + timeout
+        with self._fila.all_tasks_done:
+            while self._fila.unfinished_tasks:
+                if self._thread is None or not self._thread.is_alive():
+                    break
+                restante = None if limite is None else limite - time.monotonic()
+                if restante is not None and restante <= 0:
+                    return False
+                self._fila.all_tasks_done.wait(restante)
+        self._drenar_na_thread_atual()
+        return True
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        """Para a thread gravando o que restou; eventos seguintes ficam síncronos."""
+        self.flush(timeout)
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._drenar_na_thread_atual()
+
+    def _iniciar(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="bf1-audit", daemon=True)
+                self._thread.start()
+
+    def _proximo_lote(self, espera: Optional[float]) -> list[Evento]:
+        try:
+            lote = [self._fila.get(timeout=espera)]
+        except queue.Empty:
+            return []
+        while len(lote) < self._batch_size:
+            try:
+                lote.append(self._fila.get_nowait())
+            except queue.Empty:
+                break
+        return lote
+
+    def _processar(self, lote: list[Evento]) -> None:
+        with self._lock:
+            self._em_gravacao = lote
+        try:
+            self._gravar_com_protecao(lote)
+        finally:
+            with self._lock:
+                self._em_gravacao = []
+            for _ in lote:
+                self._fila.task_done()
+
+    def _loop(self) -> None:
+        while not self._parar.is_set():
+            lote = self._proximo_lote(self._flush_interval)
+            if lote:
+                self._processar(lote)
+
+    def _drenar_na_thread_atual(self) -> None:
+        # Só quando a thread não está viva (parada ou nunca iniciada).
+        if self._thread is not None and self._thread.is_alive():
+            return
+        while True:
+            lote = self._proximo_lote(0)
+            if not lote:
+                return
+            self._processar(lote)
+
+    def _gravar_com_protecao(self, lote: list[Evento]) -> None:
+        try:
+            self._gravar(lote)
+        except Exception as exc:
+            logger.warning("Falha ao gravar %s evento(s) de auditoria: %s", len(lote), exc)
+
+
+_sink = AuditSink()
+atexit.register(_sink.close)
+
+
+def registrar_evento(tabela: str, linha: dict[str, Any]) -> None:
+    """Registra uma linha de auditoria em ``tabela`` (assíncrono por padrão)."""
+    if AUDIT_MODE == "sync":
+        _sink._gravar_com_protecao([(tabela, dict(linha))])
+        return
+    _sink.registrar(tabela, linha)
+
+
+def eventos_pendentes(tabela: str) -> list[dict[str, Any]]:
+    return _sink.pendentes(tabela)
+
+
+def flush_auditoria(timeout: Optional[float] = None) -> bool:
+    return _sink.flush(timeout)
+
+
+__all__ = [
+    "AuditSink",
+    "eventos_pendentes",
+    "flush_auditoria",
+    "gravar_eventos",
+    "registrar_evento",
+]
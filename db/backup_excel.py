@@ -1,4 +1,7 @@
-"""Operações de backup por tabela em Excel."""
+"""Operações de backup por tabela em Excel.
+
+Exportação e importação usam ``db_connect("job")``, como o backup SQL.
+"""
 
 from __future__ import annotations
 
@@ -162,7 +165,7 @@ def download_tabela(presenter) -> None:
 	if not selected:
 		return
 
-	with db_connect() as conn:
+	with db_connect("job") as conn:
 		col_types = _get_table_column_types(conn, selected)
 		c = conn.cursor()
 		c.execute(f"SELECT * FROM {_quote_identifier(selected)}")
@@ -236,7 +239,7 @@ def upload_tabela(presenter) -> None:
 			presenter.error("No compatible columns were found.")
 			return
 
-		with db_connect() as conn:
+		with db_connect("job") as conn:
 			col_types = _get_table_column_types(conn, selected)
 			required_cols = _get_required_columns_for_insert(conn, selected)
 			missing_required = [c for c in required_cols if c not in use_cols]
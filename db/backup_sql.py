@@ -1,4 +1,8 @@
-"""Operações SQL de backup/restore."""
+"""Operações SQL de backup/restore.
+
+Dump e restauração usam ``db_connect("job")``: o ``statement_timeout`` do
+papel web (15 s) derrubaria um restore ou dump de tabela grande no meio.
+"""
 
 from __future__ import annotations
 
@@ -25,6 +29,7 @@ from db.backup_utils import (
 )
 from db.db_config import DATABASE_URL
 from db.db_schema import db_connect
+from db.repo_seasons import create_next_temporada, list_temporadas
 from utils.backup_security import (
     BackupLimitExceeded,
     get_backup_limits,
@@ -109,7 +114,7 @@ def restore_backup_from_sql(sql_content: str, presenter) -> bool:
 
     statements = [s.strip() for s in sql_content.split(";") if s.strip()]
     try:
-        with db_connect() as conn:
+        with db_connect("job") as conn:
             c = conn.cursor()
             existing_tables = {t.lower() for t in _list_tables()}
             pending_fk_inserts: list[tuple[str, str]] = []
@@ -227,47 +232,6 @@ def upload_db(presenter) -> None:
             presenter.error("Backup restore failed.")
 
 
-def list_temporadas() -> list[str]:
-    with db_connect() as conn:
-        c = conn.cursor()
-        c.execute(
-            """
-            CREATE TABLE IF NOT EXISTS temporadas (
-                temporada TEXT PRIMARY KEY,
-                criado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-            """
-        )
-        c.execute("SELECT temporada FROM temporadas ORDER BY temporada")
-        rows = c.fetchall() or []
-        conn.commit()
-    return [str(r["temporada"]) for r in rows if r and r["temporada"]]
-
-
-def create_next_temporada() -> str:
-    seasons = list_temporadas()
-    if seasons:
-        try:
-            next_year = str(max(int(t) for t in seasons) + 1)
-        except Exception:
-            next_year = str(datetime.now().year + 1)
-    else:
-        next_year = str(datetime.now().year)
-
-    with db_connect() as conn:
-        c = conn.cursor()
-        c.execute(
-            """
-            INSERT INTO temporadas (temporada)
-            VALUES (%s)
-            ON CONFLICT (temporada) DO NOTHING
-            """,
-            (next_year,),
-        )
-        conn.commit()
-
-    return next_year
-
 __all__ = [
     "list_temporadas",
     "create_next_temporada",
@@ -105,15 +105,19 @@ def _build_pg_env_from_database_url(database_url: str) -> tuple[dict[str, str],
 
 
 def _list_tables() -> list[str]:
-    with db_connect() as conn:
+    with db_connect("job") as conn:
         c = conn.cursor()
         c.execute(
             """
-            SELECT table_name
-            FROM information_schema.tables
-            WHERE table_schema = current_schema()
-              AND table_type = 'BASE TABLE'
-            ORDER BY table_name
+            SELECT t.table_name
+            FROM information_schema.tables t
+            JOIN pg_class c ON c.relname = t.table_name
+            JOIN pg_namespace n ON n.oid = c.relnamespace AND n.nspname = t.table_schema
+            WHERE t.table_schema = current_schema()
+              AND t.table_type = 'BASE TABLE'
+              -- Partições mensais (db/partitions.py) entram pela tabela-mãe.
+              AND NOT c.relispartition
+            ORDER BY t.table_name
             """
         )
         return [str(r['table_name']) for r in (c.fetchall() or []) if r and r['table_name']]
@@ -403,7 +407,7 @@ def _build_data_only_sql() -> str:
 
     sequence_reset_lines: list[str] = []
 
-    with db_connect() as conn:
+    with db_connect("job") as conn:
         c = conn.cursor()
         for table in tables:
             c.execute(
@@ -412,6 +416,7 @@ def _build_data_only_sql() -> str:
                 FROM information_schema.columns
                 WHERE table_schema = current_schema()
                   AND table_name = %s
+                  AND is_generated = 'NEVER'
                 ORDER BY ordinal_position
                 """,
                 (table,),
@@ -870,7 +875,7 @@ def restore_backup_from_sql(sql_content: str, presenter=None) -> bool:
 
     statements = [s.strip() for s in sql_content.split(";") if s.strip()]
     try:
-        with db_connect() as conn:
+        with db_connect("job") as conn:
             c = conn.cursor()
             existing_tables = {t.lower() for t in _list_tables()}
             pending_fk_inserts: list[tuple[str, str]] = []
@@ -994,7 +999,7 @@ def upload_db(presenter) -> None:
 
 
 def _table_columns(table_name: str) -> list[str]:
-    with db_connect() as conn:
+    with db_connect("job") as conn:
         c = conn.cursor()
         c.execute(
             """
@@ -1180,7 +1185,7 @@ def download_tabela(presenter) -> None:
     if not selected:
         return
 
-    with db_connect() as conn:
+    with db_connect("job") as conn:
         col_types = _get_table_column_types(conn, selected)
         c = conn.cursor()
         c.execute(f"SELECT * FROM {_quote_identifier(selected)}")
@@ -1259,7 +1264,7 @@ def upload_tabela(presenter) -> None:
             presenter.error("No compatible columns were found.")
             return
 
-        with db_connect() as conn:
+        with db_connect("job") as conn:
             col_types = _get_table_column_types(conn, selected)
             required_cols = _get_required_columns_for_insert(conn, selected)
 
@@ -1412,47 +1417,6 @@ def upload_tabela(presenter) -> None:
         presenter.success(f"Table {selected} imported successfully.")
 
 
-def list_temporadas() -> list[str]:
-    with db_connect() as conn:
-        c = conn.cursor()
-        c.execute(
-            """
-            CREATE TABLE IF NOT EXISTS temporadas (
-                temporada TEXT PRIMARY KEY,
-                criado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-            """
-        )
-        c.execute("SELECT temporada FROM temporadas ORDER BY temporada")
-        rows = c.fetchall() or []
-        conn.commit()
-    return [str(r['temporada']) for r in rows if r and r['temporada']]
-
-
-def create_next_temporada() -> str:
-    seasons = list_temporadas()
-    if seasons:
-        try:
-            next_year = str(max(int(t) for t in seasons) + 1)
-        except Exception:
-            next_year = str(datetime.now().year + 1)
-    else:
-        next_year = str(datetime.now().year)
-
-    with db_connect() as conn:
-        c = conn.cursor()
-        c.execute(
-            """
-            INSERT INTO temporadas (temporada)
-            VALUES (%s)
-            ON CONFLICT (temporada) DO NOTHING
-            """,
-            (next_year,),
-        )
-        conn.commit()
-
-    return next_year
-
 def backup_banco(backup_dir: str = "backups") -> str:
     Path(backup_dir).mkdir(parents=True, exist_ok=True)
     sql_content, _ = _generate_backup_sql_content()
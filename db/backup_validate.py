@@ -20,7 +20,7 @@ def _quote_identifier(identifier: str) -> str:
 
 
 def _table_columns(table_name: str) -> list[str]:
-    with db_connect() as conn:
+    with db_connect("job") as conn:
         c = conn.cursor()
         c.execute(
             """
@@ -1,30 +1,122 @@
-"""Pool de conexões PostgreSQL nativo com dict_row."""
+"""Pool de conexões PostgreSQL nativo com dict_row.
+
+Cada conexão nasce com os parâmetros de sessão do papel padrão
+(``DB_SESSION_PARAMS``) e com prepared statements automáticos do psycopg
+(``prepare_threshold``/``prepared_max``). Consultas registradas com
+``hot_query`` são preparadas já na primeira execução; ``execute_pipeline``
+envia várias leituras em um único round-trip (pipeline mode).
+
+Com ``DATABASE_REPLICA_URL`` configurada, leituras declaradas (``replica_read``
+ou ``db_connect(replica=True)``) usam um segundo pool apontado para a réplica,
+exceto dentro da janela de read-your-writes de quem acabou de escrever.
+
+Dentro de uma ``unit_of_work`` (aberta por ``utils.performance.journey``), as
+leituras declaradas reutilizam uma única conexão em transação
+``REPEATABLE READ, READ ONLY``: uma retirada do pool por jornada e todas as
+leituras vendo o mesmo snapshot. Um commit no primário encerra o snapshot,
+assim como qualquer invalidação de cache no processo (a escrita de outra
+sessão): misses posteriores alimentam caches compartilhados e não podem ler
+um snapshot anterior a ela. Antes de qualquer outra retirada na jornada
+(escrita, papel ``job``, leitura não declarada) a conexão do snapshot ociosa
+volta ao pool: a jornada nunca segura uma conexão enquanto espera outra.
+"""
 
 from __future__ import annotations
 
-from contextlib import contextmanager
+from contextlib import ExitStack, contextmanager, nullcontext
+import contextvars
+from dataclasses import asdict, dataclass, field
+import threading
 import time
-from typing import Any, Iterator, Optional
+from typing import Any, Iterable, Iterator, Optional
 
 import psycopg
 from psycopg.rows import dict_row
 from psycopg_pool import ConnectionPool as PsycopgConnectionPool
+from psycopg_pool import PoolTimeout
 
 from db.db_config import (
+    DATABASE_REPLICA_URL,
     DATABASE_URL,
     DB_CONN_MAX_LIFETIME,
+    DB_DEFAULT_ROLE,
     DB_MAX_CONN,
     DB_MIN_CONN,
+    DB_POOL_STATS_INTERVAL,
+    DB_PREPARE_THRESHOLD,
+    DB_PREPARED_MAX,
+    DB_REPLICA_RYW_SECONDS,
+    DB_REPLICA_TIMEOUT,
+    DB_SESSION_PARAMS,
     DB_TIMEOUT,
 )
-from utils.performance import record_query, record_rows
+from utils.performance import (
+    log_pool_stats,
+    record_pool_checkout,
+    record_pool_release,
+    record_pool_timeout,
+    record_query,
+    record_rows,
+)
+from utils.ttl_cache import invalidation_counter
+
+# Texto SQL exato das consultas quentes (preparadas na primeira execução).
+_HOT_QUERIES: set[str] = set()
+
+# Intenção de leitura declarada: None (sem intenção), "sessao" ou "compartilhada"
+# (resultado vai para um cache visível a todas as sessões).
+_replica_intent: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "bf1_replica_intent", default=None
+)
+_ULTIMA_ESCRITA_KEY = "_db_ultima_escrita"
+# Leitura declarada sem preferência de réplica (miss de cache, regras).
+_leitura_declarada: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "bf1_leitura_declarada", default=False
+)
+_unidade: contextvars.ContextVar[Optional["_UnidadeDeTrabalho"]] = contextvars.ContextVar(
+    "bf1_unidade_de_trabalho", default=None
+)
+_SNAPSHOT_SQL = "SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY"
+_ultima_escrita_processo = 0.0
+
+
+def hot_query(sql: str) -> str:
+    """Marca uma consulta frequente para ser preparada no servidor já na 1ª execução."""
+    _HOT_QUERIES.add(sql)
+    return sql
+
+
+def execute_pipeline(conn: Any, consultas: Iterable[tuple[Any, Any]]) -> list[Any]:
+    """Executa várias leituras em pipeline e devolve os cursores, na ordem.
+
+    As consultas são enviadas juntas e os resultados lidos depois, trocando N
+    round-trips por um. Conexões sem suporte a pipeline executam em sequência.
+    """
+    pipeline = getattr(conn, "pipeline", None)
+    cursores = []
+    with pipeline() if callable(pipeline) else nullcontext():
+        for query, params in consultas:
+            cur = conn.cursor()
+            cur.execute(query, params or ())
+            cursores.append(cur)
+    return cursores
+
+
+def _sql_parametros_sessao(params: dict[str, str]) -> tuple[str, tuple]:
+    chamadas = ", ".join("set_config(%s, %s, false)" for _ in params)
+    valores = tuple(v for item in params.items() for v in item)
+    return f"SELECT {chamadas}", valores
 
 
 class InstrumentedCursor:
     def __init__(self, cursor: Any) -> None:
         self._cursor = cursor
+        self._sql: Optional[str] = None
 
     def execute(self, query: Any, params: Any = None, **kwargs: Any):
+        self._sql = str(query)
+        if "prepare" not in kwargs and isinstance(query, str) and query in _HOT_QUERIES:
+            kwargs["prepare"] = True
         started = time.perf_counter()
         try:
             if params is None:
@@ -33,35 +125,40 @@ class InstrumentedCursor:
                 self._cursor.execute(query, params, **kwargs)
             return self
         finally:
-            record_query(str(query), time.perf_counter() - started)
+            record_query(self._sql, time.perf_counter() - started)
 
     def executemany(self, query: Any, params_seq: Any, **kwargs: Any):
+        self._sql = str(query)
         started = time.perf_counter()
         try:
             self._cursor.executemany(query, params_seq, **kwargs)
             return self
         finally:
-            record_query(str(query), time.perf_counter() - started)
+            record_query(self._sql, time.perf_counter() - started)
 
     def fetchone(self):
         row = self._cursor.fetchone()
-        record_rows(1 if row is not None else 0)
+        record_rows(1 if row is not None else 0, self._sql)
         return row
 
     def fetchmany(self, size: int = 0):
         rows = self._cursor.fetchmany(size) if size else self._cursor.fetchmany()
-        record_rows(len(rows))
+        record_rows(len(rows), self._sql)
         return rows
 
     def fetchall(self):
         rows = self._cursor.fetchall()
-        record_rows(len(rows))
+        record_rows(len(rows), self._sql)
         return rows
 
     def __iter__(self) -> Iterator[Any]:
-        for row in self._cursor:
-            record_rows(1)
-            yield row
+        linhas = 0
+        try:
+            for row in self._cursor:
+                linhas += 1
+                yield row
+        finally:
+            record_rows(linhas, self._sql)
 
     def __enter__(self):
         self._cursor.__enter__()
@@ -74,9 +171,83 @@ class InstrumentedCursor:
         return getattr(self._cursor, name)
 
 
+def _sessao_atual():
+    from app_runtime import get_session
+
+    return get_session()
+
+
+def mark_write() -> None:
+    """Registra um commit no primário para a janela de read-your-writes."""
+    global _ultima_escrita_processo
+    agora = time.monotonic()
+    _ultima_escrita_processo = agora
+    unidade = _unidade.get()
+    if unidade is not None:
+        unidade.desatualizada = True
+    try:
+        _sessao_atual()[_ULTIMA_ESCRITA_KEY] = agora
+    except Exception:
+        pass
+
+
+def _replica_liberada(compartilhada: bool) -> bool:
+    agora = time.monotonic()
+    if compartilhada and agora - _ultima_escrita_processo < DB_REPLICA_RYW_SECONDS:
+        return False
+    try:
+        ultima = float(_sessao_atual().get(_ULTIMA_ESCRITA_KEY, 0.0) or 0.0)
+    except Exception:
+        ultima = 0.0
+    return agora - ultima >= DB_REPLICA_RYW_SECONDS
+
+
+@contextmanager
+def replica_read(shared: bool = False) -> Iterator[None]:
+    """Declara que o bloco só lê e aceita dados da réplica.
+
+    ``shared=True`` indica que o resultado alimenta um cache compartilhado
+    entre sessões; nesse caso a réplica só é usada se nenhuma escrita do
+    processo caiu na janela de read-your-writes.
+    """
+    atual = _replica_intent.get()
+    intencao = "compartilhada" if shared or atual == "compartilhada" else "sessao"
+    token = _replica_intent.set(intencao)
+    try:
+        yield
+    finally:
+        _replica_intent.reset(token)
+
+
+@contextmanager
+def declared_read() -> Iterator[None]:
+    """Declara que o bloco só lê, sem aceitar réplica (ver ``unit_of_work``)."""
+    token = _leitura_declarada.set(True)
+    try:
+        yield
+    finally:
+        _leitura_declarada.reset(token)
+
+
+def replica_pool_for_read(replica: bool = False) -> Optional["ConnectionPool"]:
+    """Pool da réplica quando a leitura pode ir para ela; ``None`` caso contrário."""
+    intencao = _replica_intent.get()
+    if not (replica or intencao) or not DATABASE_REPLICA_URL:
+        return None
+    if not _replica_liberada(intencao == "compartilhada"):
+        return None
+    return get_replica_pool()
+
+
 class InstrumentedConnection:
-    def __init__(self, connection: Any) -> None:
+    def __init__(self, connection: Any, replica: bool = False) -> None:
         self._connection = connection
+        self._replica = replica
+
+    def commit(self) -> None:
+        self._connection.commit()
+        if not self._replica:
+            mark_write()
 
     def cursor(self, *args: Any, **kwargs: Any) -> InstrumentedCursor:
         return InstrumentedCursor(self._connection.cursor(*args, **kwargs))
@@ -89,38 +260,286 @@ class InstrumentedConnection:
         return getattr(self._connection, name)
 
 
+class SnapshotConnection(InstrumentedConnection):
+    """Conexão compartilhada da unidade de trabalho: commit/rollback/close não
+    encerram o snapshot, que pertence à unidade."""
+
+    def commit(self) -> None:
+        return None
+
+    def rollback(self) -> None:
+        return None
+
+    def close(self) -> None:
+        return None
+
+
+class _UnidadeDeTrabalho:
+    def __init__(self) -> None:
+        self.stack = ExitStack()
+        self.conn: Optional[SnapshotConnection] = None
+        self.desatualizada = False
+        self.invalidacao = 0
+        self.em_uso = 0
+
+    def conexao(self, abrir) -> SnapshotConnection:
+        if self.conn is not None and (self.desatualizada or invalidation_counter() != self.invalidacao):
+            self.liberar()
+        if self.conn is None:
+            # Lido antes de abrir: uma invalidação concorrente à abertura
+            # descarta este snapshot na próxima leitura.
+            self.invalidacao = invalidation_counter()
+            bruta = self.stack.enter_context(abrir())
+            # Primeira instrução da transação implícita do psycopg.
+            bruta.execute(_SNAPSHOT_SQL)
+            self.conn = SnapshotConnection(bruta._connection, replica=bruta._replica)
+        self.desatualizada = False
+        return self.conn
+
+    def liberar(self) -> None:
+        conn, self.conn = self.conn, None
+        try:
+            if conn is not None:
+                conn._connection.rollback()
+        except Exception:
+            pass
+        finally:
+            self.stack.close()
+            self.stack = ExitStack()
+
+
+@contextmanager
+def unit_of_work() -> Iterator[None]:
+    """Escopo em que leituras declaradas compartilham uma conexão e um snapshot.
+
+    A conexão só é retirada na primeira leitura; aninhar é inócuo.
+    """
+    if _unidade.get() is not None:
+        yield
+        return
+    unidade = _UnidadeDeTrabalho()
+    token = _unidade.set(unidade)
+    try:
+        yield
+    finally:
+        _unidade.reset(token)
+        unidade.liberar()
+
+
+@contextmanager
+def journey_connection(papel: str, replica: bool, abrir) -> Iterator[Any]:
+    """Conexão da unidade de trabalho para leituras declaradas; senão ``abrir()``.
+
+    Só o papel padrão compartilha: jobs e escritas seguem com conexão própria.
+    Antes dessa outra retirada, o snapshot ocioso é devolvido ao pool (sem
+    isso, jornadas concorrentes segurariam uma conexão esperando a segunda e
+    esgotariam o pool). Um erro no bloco descarta o snapshot (a transação fica
+    abortada).
+    """
+    unidade = _unidade.get()
+    leitura = replica or _replica_intent.get() is not None or _leitura_declarada.get()
+    if unidade is None or papel != DB_DEFAULT_ROLE or not leitura:
+        if unidade is not None and unidade.em_uso == 0:
+            unidade.liberar()
+        with abrir() as conn:
+            yield conn
+        return
+    conn = unidade.conexao(abrir)
+    unidade.em_uso += 1
+    try:
+        yield conn
+    except BaseException:
+        unidade.desatualizada = True
+        raise
+    finally:
+        unidade.em_uso -= 1
+
+
+# Limites (ms) dos baldes do histograma de espera por conexão.
+_WAIT_BUCKETS_MS = (1, 10, 100, 1000)
+
+
+@dataclass
+class PoolCounters:
+    """Contadores acumulados desde a criação do pool."""
+
+    checkouts: int = 0
+    timeouts: int = 0
+    in_use: int = 0
+    max_in_use: int = 0
+    wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+    hold_seconds: float = 0.0
+    max_hold_seconds: float = 0.0
+    # "<=1ms", "<=10ms", ..., ">1000ms" -> quantidade de retiradas
+    wait_histogram: dict[str, int] = field(
+        default_factory=lambda: {
+            **{f"<={limite}ms": 0 for limite in _WAIT_BUCKETS_MS},
+            f">{_WAIT_BUCKETS_MS[-1]}ms": 0,
+        }
+    )
+
+    def bucket(self, wait_seconds: float) -> str:
+        wait_ms = wait_seconds * 1000
+        for limite in _WAIT_BUCKETS_MS:
+            if wait_ms <= limite:
+                return f"<={limite}ms"
+        return f">{_WAIT_BUCKETS_MS[-1]}ms"
+
+
 class ConnectionPool:
     """Pool de conexões thread-safe para PostgreSQL."""
 
-    def __init__(self, pool_size: int = 5, timeout: float = 30.0) -> None:
+    def __init__(
+        self,
+        pool_size: int = 5,
+        timeout: float = 30.0,
+        conninfo: str = "",
+        replica: bool = False,
+    ) -> None:
         self.pool_size = pool_size
         self.timeout = timeout
+        self.conninfo = conninfo or DATABASE_URL
+        self.replica = replica
         self._pg_pool: Optional[PsycopgConnectionPool] = None
+        # Conexões que saíram do papel padrão e precisam ser restauradas no retorno.
+        self._fora_do_padrao: set[int] = set()
+        self._lock = threading.Lock()
+        self._counters = PoolCounters()
+        self._last_stats_log = time.monotonic()
         self._initialize_pool()
 
+    @staticmethod
+    def _aplicar_papel(conn: Any, papel: str) -> None:
+        params = DB_SESSION_PARAMS.get(papel)
+        if not params:
+            raise ValueError(f"Papel de conexão desconhecido: {papel}")
+        query, valores = _sql_parametros_sessao(params)
+        conn.execute(query, valores)
+        conn.commit()
+
+    def _configure(self, conn: Any) -> None:
+        """Configuração de cada conexão nova do pool."""
+        conn.prepare_threshold = DB_PREPARE_THRESHOLD
+        conn.prepared_max = DB_PREPARED_MAX
+        self._aplicar_papel(conn, DB_DEFAULT_ROLE)
+
+    def _reset(self, conn: Any) -> None:
+        """Restaura o papel padrão de uma conexão devolvida por um job."""
+        with self._lock:
+            if id(conn) not in self._fora_do_padrao:
+                return
+            self._fora_do_padrao.discard(id(conn))
+        self._aplicar_papel(conn, DB_DEFAULT_ROLE)
+
     def _initialize_pool(self) -> None:
         """Inicializa recursos do backend PostgreSQL."""
-        if not DATABASE_URL:
+        if not self.conninfo:
             raise ValueError("DATABASE_URL não configurada para backend PostgreSQL")
         self._pg_pool = PsycopgConnectionPool(
-            conninfo=DATABASE_URL,
+            conninfo=self.conninfo,
             min_size=DB_MIN_CONN,
             max_size=DB_MAX_CONN,
             max_lifetime=DB_CONN_MAX_LIFETIME,
             timeout=self.timeout,
             kwargs={"autocommit": False, "row_factory": dict_row},
+            configure=self._configure,
+            reset=self._reset,
             open=True,
         )
 
     @contextmanager
-    def get_connection(self) -> Iterator[Any]:
-        """Retorna conexão do pool como context manager."""
+    def get_connection(self, papel: str = DB_DEFAULT_ROLE) -> Iterator[Any]:
+        """Retorna conexão do pool como context manager.
+
+        ``papel`` escolhe os parâmetros de sessão (``DB_SESSION_PARAMS``);
+        fora do padrão, a conexão é restaurada ao voltar para o pool.
+        """
         if self._pg_pool is None:
             self._initialize_pool()
         if self._pg_pool is None:
             raise RuntimeError("Pool PostgreSQL não inicializado")
-        with self._pg_pool.connection() as conn:
-            yield InstrumentedConnection(conn)
+        with ExitStack() as stack:
+            pedido = time.perf_counter()
+            try:
+                conn = stack.enter_context(self._pg_pool.connection())
+            except PoolTimeout:
+                self._registrar_timeout()
+                raise
+            retirada = time.perf_counter()
+            self._registrar_retirada(retirada - pedido)
+            try:
+                if papel != DB_DEFAULT_ROLE:
+                    with self._lock:
+                        self._fora_do_padrao.add(id(conn))
+                    self._aplicar_papel(conn, papel)
+                yield InstrumentedConnection(conn, replica=self.replica)
+            finally:
+                self._registrar_devolucao(time.perf_counter() - retirada)
+
+    def _registrar_retirada(self, espera: float) -> None:
+        with self._lock:
+            c = self._counters
+            c.checkouts += 1
+            c.in_use += 1
+            c.max_in_use = max(c.max_in_use, c.in_use)
+            c.wait_seconds += espera
+            c.max_wait_seconds = max(c.max_wait_seconds, espera)
+            c.wait_histogram[c.bucket(espera)] += 1
+            em_uso = c.in_use
+        record_pool_checkout(espera, em_uso)
+        self._emitir_estatisticas_periodicas()
+
+    def _registrar_devolucao(self, uso: float) -> None:
+        with self._lock:
+            c = self._counters
+            c.in_use = max(0, c.in_use - 1)
+            c.hold_seconds += uso
+            c.max_hold_seconds = max(c.max_hold_seconds, uso)
+        record_pool_release(uso)
+
+    def _registrar_timeout(self) -> None:
+        with self._lock:
+            self._counters.timeouts += 1
+        record_pool_timeout()
+        self._emitir_estatisticas_periodicas(forcar=True)
+
+    def _emitir_estatisticas_periodicas(self, forcar: bool = False) -> None:
+        agora = time.monotonic()
+        with self._lock:
+            if not forcar and agora - self._last_stats_log < DB_POOL_STATS_INTERVAL:
+                return
+            self._last_stats_log = agora
+        log_pool_stats(self.stats())
+
+    def stats(self) -> dict[str, Any]:
+        """Snapshot do pool: contadores próprios e estatísticas do psycopg_pool."""
+        with self._lock:
+            contadores = asdict(self._counters)
+        pg_stats = self._pg_pool.get_stats() if self._pg_pool is not None else {}
+        tamanho = int(pg_stats.get("pool_size", 0))
+        ociosas = int(pg_stats.get("pool_available", 0))
+        checkouts = contadores["checkouts"] or 1
+        return {
+            "pool": "replica" if self.replica else "primario",
+            "min_size": DB_MIN_CONN,
+            "max_size": DB_MAX_CONN,
+            "size": tamanho,
+            "idle": ociosas,
+            "in_use": contadores["in_use"],
+            "max_in_use": contadores["max_in_use"],
+            "waiting": int(pg_stats.get("requests_waiting", 0)),
+            "checkouts": contadores["checkouts"],
+            "timeouts": contadores["timeouts"],
+            "avg_wait_ms": round(contadores["wait_seconds"] * 1000 / checkouts, 3),
+            "max_wait_ms": round(contadores["max_wait_seconds"] * 1000, 3),
+            "avg_hold_ms": round(contadores["hold_seconds"] * 1000 / checkouts, 3),
+            "max_hold_ms": round(contadores["max_hold_seconds"] * 1000, 3),
+            "wait_histogram": contadores["wait_histogram"],
+            "connections_opened": int(pg_stats.get("connections_num", 0)),
+            "connections_lost": int(pg_stats.get("connections_lost", 0)),
+            "connection_errors": int(pg_stats.get("connections_errors", 0)),
+        }
 
     def close_all(self) -> None:
         """Fecha todas as conexões do pool."""
@@ -131,6 +550,8 @@ class ConnectionPool:
 
 # Instância global do pool
 _pool: Optional[ConnectionPool] = None
+_replica_pool: Optional[ConnectionPool] = None
+_replica_lock = threading.Lock()
 
 def _build_pool(pool_size: int) -> ConnectionPool:
     return ConnectionPool(pool_size, DB_TIMEOUT)
@@ -152,9 +573,28 @@ def get_pool() -> ConnectionPool:
         init_pool(pool_size=5)
     return _pool
 
+def get_replica_pool() -> Optional[ConnectionPool]:
+    """Pool da réplica de leitura, criado sob demanda; ``None`` sem réplica."""
+    global _replica_pool
+    if not DATABASE_REPLICA_URL:
+        return None
+    with _replica_lock:
+        if _replica_pool is None:
+            _replica_pool = ConnectionPool(
+                DB_MAX_CONN, DB_REPLICA_TIMEOUT, conninfo=DATABASE_REPLICA_URL, replica=True
+            )
+    return _replica_pool
+
+def pool_stats() -> list[dict[str, Any]]:
+    """Snapshot dos pools já criados (primário e réplica), sem abrir novos."""
+    return [pool.stats() for pool in (_pool, _replica_pool) if pool is not None]
+
 def close_pool() -> None:
-    """Fecha o pool global."""
-    global _pool
+    """Fecha o pool global (e o da réplica, se houver)."""
+    global _pool, _replica_pool
     if _pool:
         _pool.close_all()
         _pool = None
+    if _replica_pool:
+        _replica_pool.close_all()
+        _replica_pool = None
@@ -18,17 +18,56 @@ if not DATABASE_URL.lower().startswith(("postgres://", "postgresql://")):
         "DATABASE_URL inválida. Use uma URL PostgreSQL (postgresql://...)."
     )
 
+# Réplica de leitura opcional (streaming replica do primário). Sem ela, todas
+# as leituras seguem para DATABASE_URL.
+DATABASE_REPLICA_URL = os.environ.get("DATABASE_REPLICA_URL", "").strip()
+
+if DATABASE_REPLICA_URL and not DATABASE_REPLICA_URL.lower().startswith(("postgres://", "postgresql://")):
+    raise RuntimeError(
+        "DATABASE_REPLICA_URL inválida. Use uma URL PostgreSQL (postgresql://...)."
+    )
+
 # Configurações de Pool
 POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "5"))
 DB_TIMEOUT = float(os.environ.get("DB_TIMEOUT", "30.0"))
 DB_MIN_CONN = int(os.environ.get("DB_MIN_CONN", "1"))
 DB_MAX_CONN = int(os.environ.get("DB_MAX_CONN", str(max(POOL_SIZE, 5))))
 DB_CONN_MAX_LIFETIME = float(os.environ.get("DB_CONN_MAX_LIFETIME", "1800"))
+# Intervalo mínimo entre eventos "pool_stats" no logger bf1.performance.
+DB_POOL_STATS_INTERVAL = float(os.environ.get("DB_POOL_STATS_INTERVAL", "300"))
+# Espera máxima por uma conexão da réplica antes de cair para o primário.
+DB_REPLICA_TIMEOUT = float(os.environ.get("DB_REPLICA_TIMEOUT", "2.0"))
+# Janela de read-your-writes: a sessão que escreveu lê do primário por este
+# tempo; caches compartilhados também, após qualquer escrita do processo.
+DB_REPLICA_RYW_SECONDS = float(os.environ.get("DB_REPLICA_RYW_SECONDS", "10"))
+
+# Prepared statements: consultas comuns são preparadas no servidor após
+# DB_PREPARE_THRESHOLD execuções (consultas marcadas como quentes, na primeira);
+# DB_PREPARED_MAX limita quantas ficam preparadas por conexão (LRU do psycopg).
+DB_PREPARE_THRESHOLD = int(os.environ.get("DB_PREPARE_THRESHOLD", "2"))
+DB_PREPARED_MAX = int(os.environ.get("DB_PREPARED_MAX", "256"))
+
+# Parâmetros de sessão por papel da conexão. "web" é o padrão de toda conexão
+# do pool; "job" vale só enquanto um job (classificação, cargas) usa a conexão.
+DB_DEFAULT_ROLE = "web"
+DB_SESSION_PARAMS = {
+    "web": {
+        "statement_timeout": os.environ.get("DB_STATEMENT_TIMEOUT", "15s"),
+        "work_mem": os.environ.get("DB_WORK_MEM", "4MB"),
+    },
+    "job": {
+        "statement_timeout": os.environ.get("DB_JOB_STATEMENT_TIMEOUT", "5min"),
+        "work_mem": os.environ.get("DB_JOB_WORK_MEM", "64MB"),
+    },
+}
 
 # Configurações de Cache
 CACHE_TTL_CURTO = int(os.environ.get("CACHE_TTL_CURTO", "300"))  # 5 minutos
 CACHE_TTL_MEDIO = int(os.environ.get("CACHE_TTL_MEDIO", "3600"))  # 1 hora
 CACHE_TTL_LONGO = int(os.environ.get("CACHE_TTL_LONGO", "86400"))  # 24 horas
+# Limites LRU dos caches por usuário (uma entrada por participante consultado)
+CACHE_USER_MAXSIZE = int(os.environ.get("CACHE_USER_MAXSIZE", "64"))
+CACHE_USER_MAX_BYTES = int(os.environ.get("CACHE_USER_MAX_BYTES", str(32 * 1024 * 1024)))
 
 # Índices para otimização (criados em migrations.py)
 INDICES = {
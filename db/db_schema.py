@@ -3,16 +3,35 @@
 from __future__ import annotations
 
 import logging
-from contextlib import contextmanager
+from contextlib import ExitStack, contextmanager
 from threading import RLock
 
-from db.connection_pool import get_pool
+from db.connection_pool import (
+    declared_read,
+    execute_pipeline,
+    get_pool,
+    hot_query,
+    journey_connection,
+    replica_pool_for_read,
+    replica_read,
+    unit_of_work,
+)
+from db.db_config import DB_DEFAULT_ROLE
 
 logger = logging.getLogger(__name__)
 _schema_cache_lock = RLock()
 _columns_cache: dict[str, tuple[str, ...]] = {}
 _table_exists_cache: dict[str, bool] = {}
 
+_COLUMNS_SQL = hot_query(
+    """
+    SELECT column_name
+    FROM information_schema.columns
+    WHERE table_name = %s
+    ORDER BY ordinal_position
+    """
+)
+
 
 def run_migrations() -> None:
     """Executa migrations com import tardio para evitar ciclo de imports."""
@@ -23,9 +42,31 @@ def run_migrations() -> None:
 
 
 @contextmanager
-def db_connect():
-    pool = get_pool()
-    with pool.get_connection() as conn:
+def _conectar(papel: str, replica: bool):
+    with ExitStack() as stack:
+        conn = None
+        try:
+            replica_pool = replica_pool_for_read(replica)
+            if replica_pool is not None:
+                conn = stack.enter_context(replica_pool.get_connection(papel))
+        except Exception as exc:
+            logger.warning("Réplica de leitura indisponível; usando o primário: %s", exc)
+        if conn is None:
+            conn = stack.enter_context(get_pool().get_connection(papel))
+        yield conn
+
+
+@contextmanager
+def db_connect(papel: str = DB_DEFAULT_ROLE, replica: bool = False):
+    """Conexão do pool; leituras declaradas podem ser atendidas pela réplica.
+
+    ``replica=True`` (ou um bloco ``replica_read``) roteia para
+    ``DATABASE_REPLICA_URL`` quando configurada e fora da janela de
+    read-your-writes. Se a réplica não responder, a leitura cai no primário.
+    Dentro de uma ``unit_of_work``, leituras declaradas reutilizam a conexão
+    (e o snapshot) da jornada.
+    """
+    with journey_connection(papel, replica, lambda: _conectar(papel, replica)) as conn:
         yield conn
 
 
@@ -36,15 +77,7 @@ def get_table_columns(conn, table_name: str) -> list[str]:
     if cached is not None:
         return list(cached)
     cur = conn.cursor()
-    cur.execute(
-        """
-        SELECT column_name
-        FROM information_schema.columns
-        WHERE table_name = %s
-        ORDER BY ordinal_position
-        """,
-        (table_name,),
-    )
+    cur.execute(_COLUMNS_SQL, (table_name,))
     cols = [row["column_name"] for row in cur.fetchall()]
     cur.close()
     with _schema_cache_lock:
@@ -169,8 +202,13 @@ def init_db() -> None:
 
 __all__ = [
     "db_connect",
+    "declared_read",
+    "execute_pipeline",
     "get_table_columns",
+    "hot_query",
+    "replica_read",
     "table_exists",
+    "unit_of_work",
     "init_db",
     "run_migrations",
 ]
@@ -7,7 +7,11 @@ import os
 from db.circuitos_utils import ensure_circuitos_f1_table, ensure_provas_circuit_id_column
 from db.connection_pool import get_pool
 from db.db_config import INDICES
-from db.db_schema import get_table_columns, init_db, table_exists
+from db.db_schema import clear_schema_cache, get_table_columns, init_db, table_exists
+from db.partitions import particionar_tabelas_de_auditoria
+from db.repo_career import reconstruir_carreira
+from db.repo_hall import reconstruir_hall_da_fama_resumo
+from db.repo_user_seasons import atualizar_usuario_temporadas
 
 logger = logging.getLogger(__name__)
 
@@ -24,7 +28,7 @@ def add_temporada_columns_if_missing() -> None:
     current_year = str(datetime.datetime.now().year)
     tables_to_update = ("provas", "apostas", "resultados", "posicoes_participantes")
 
-    with pool.get_connection() as conn:
+    with pool.get_connection("job") as conn:
         cursor = conn.cursor()
         for table_name in tables_to_update:
             try:
@@ -37,7 +41,7 @@ def add_temporada_columns_if_missing() -> None:
 
 def add_abandono_column_if_missing() -> None:
     pool = get_pool()
-    with pool.get_connection() as conn:
+    with pool.get_connection("job") as conn:
         cursor = conn.cursor()
         try:
             if table_exists(conn, "resultados"):
@@ -50,7 +54,7 @@ def add_abandono_column_if_missing() -> None:
 
 def add_legacy_columns_if_missing() -> None:
     pool = get_pool()
-    with pool.get_connection() as conn:
+    with pool.get_connection("job") as conn:
         cursor = conn.cursor()
         try:
             if table_exists(conn, "pilotos"):
@@ -72,7 +76,7 @@ def add_legacy_columns_if_missing() -> None:
 
 def add_password_reset_flag_if_missing() -> None:
     pool = get_pool()
-    with pool.get_connection() as conn:
+    with pool.get_connection("job") as conn:
         cursor = conn.cursor()
         try:
             if table_exists(conn, "usuarios"):
@@ -84,12 +88,13 @@ def add_password_reset_flag_if_missing() -> None:
 
 
 def create_auth_sessions_and_retention() -> None:
-    """Cria controle de sessao e aplica retencao configurada no bootstrap."""
-    login_days = max(1, int(os.environ.get("LOGIN_ATTEMPTS_RETENTION_DAYS", "30")))
-    access_days = max(1, int(os.environ.get("ACCESS_LOGS_RETENTION_DAYS", "90")))
+    """Cria controle de sessao e aplica retencao dos tokens de redefinicao.
+
+    A retencao de ``login_attempts``, ``access_logs`` e ``auth_sessions`` e
+    feita por particao em ``db/partitions.py``.
+    """
     reset_days = max(1, int(os.environ.get("RESET_TOKENS_RETENTION_DAYS", "7")))
-    session_days = max(1, int(os.environ.get("AUTH_SESSIONS_RETENTION_DAYS", "30")))
-    with get_pool().get_connection() as conn:
+    with get_pool().get_connection("job") as conn:
         cursor = conn.cursor()
         if table_exists(conn, "usuarios"):
             _add_column_if_missing(cursor, conn, "usuarios", "session_version", "session_version INTEGER NOT NULL DEFAULT 0")
@@ -98,19 +103,14 @@ def create_auth_sessions_and_retention() -> None:
             session_version INTEGER NOT NULL, issued_at TIMESTAMPTZ NOT NULL,
             expires_at TIMESTAMPTZ NOT NULL, revoked_at TIMESTAMPTZ)""")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_auth_sessions_user_active ON auth_sessions(user_id, revoked_at, expires_at)")
-        if table_exists(conn, "login_attempts"):
-            cursor.execute("DELETE FROM login_attempts WHERE tentativa_em < CURRENT_TIMESTAMP - (%s * INTERVAL '1 day')", (login_days,))
-        if table_exists(conn, "access_logs"):
-            cursor.execute("DELETE FROM access_logs WHERE created_at < CURRENT_TIMESTAMP - (%s * INTERVAL '1 day')", (access_days,))
         if table_exists(conn, "password_reset_tokens"):
             cursor.execute("DELETE FROM password_reset_tokens WHERE expires_at < CURRENT_TIMESTAMP - (%s * INTERVAL '1 day')", (reset_days,))
-        cursor.execute("DELETE FROM auth_sessions WHERE expires_at < CURRENT_TIMESTAMP - (%s * INTERVAL '1 day') OR revoked_at < CURRENT_TIMESTAMP - (%s * INTERVAL '1 day')", (session_days, session_days))
         conn.commit()
 
 
 def add_login_attempts_action_if_missing() -> None:
     pool = get_pool()
-    with pool.get_connection() as conn:
+    with pool.get_connection("job") as conn:
         cursor = conn.cursor()
         try:
             if table_exists(conn, "login_attempts"):
@@ -123,7 +123,7 @@ def add_login_attempts_action_if_missing() -> None:
 
 def add_login_attempts_ip_if_missing() -> None:
     pool = get_pool()
-    with pool.get_connection() as conn:
+    with pool.get_connection("job") as conn:
         cursor = conn.cursor()
         try:
             if table_exists(conn, "login_attempts"):
@@ -136,7 +136,7 @@ def add_login_attempts_ip_if_missing() -> None:
 
 def add_penalidade_auto_percent_if_missing() -> None:
     pool = get_pool()
-    with pool.get_connection() as conn:
+    with pool.get_connection("job") as conn:
         cursor = conn.cursor()
         try:
             if table_exists(conn, "regras"):
@@ -156,7 +156,7 @@ def add_penalidade_auto_percent_if_missing() -> None:
 def harden_log_apostas_datetime_fields() -> None:
     """Reforça integridade de data/horario sem gerar valores posteriores."""
     pool = get_pool()
-    with pool.get_connection() as conn:
+    with pool.get_connection("job") as conn:
         cursor = conn.cursor()
         try:
             if not table_exists(conn, "log_apostas"):
@@ -196,7 +196,7 @@ def harden_log_apostas_datetime_fields() -> None:
 
 def create_access_logs_table_if_missing() -> None:
     pool = get_pool()
-    with pool.get_connection() as conn:
+    with pool.get_connection("job") as conn:
         cursor = conn.cursor()
         try:
             cursor.execute(
@@ -229,7 +229,7 @@ def create_access_logs_table_if_missing() -> None:
 
 def create_usuarios_status_historico_if_missing() -> None:
     pool = get_pool()
-    with pool.get_connection() as conn:
+    with pool.get_connection("job") as conn:
         cursor = conn.cursor()
         try:
             cursor.execute(
@@ -268,11 +268,285 @@ def create_usuarios_status_historico_if_missing() -> None:
             conn.rollback()
 
 
+def create_classificacao_temporada_table() -> None:
+    """Tabela derivada com a classificação acumulada após cada prova.
+
+    É reconstruída pelo job de classificação; as telas de Classificação e
+    Histórico leem os totais prontos em vez de recalcular descarte e bônus.
+    """
+    pool = get_pool()
+    with pool.get_connection("job") as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS classificacao_temporada (
+                    temporada TEXT NOT NULL,
+                    prova_id INTEGER NOT NULL,
+                    ordem_prova INTEGER NOT NULL,
+                    usuario_id INTEGER NOT NULL,
+                    posicao INTEGER NOT NULL,
+                    posicao_anterior INTEGER,
+                    variacao_posicao INTEGER,
+                    pontos_prova REAL NOT NULL DEFAULT 0,
+                    pontos_acumulados REAL NOT NULL DEFAULT 0,
+                    descarte REAL NOT NULL DEFAULT 0,
+                    pontos_apos_descarte REAL NOT NULL DEFAULT 0,
+                    bonus_campeao REAL NOT NULL DEFAULT 0,
+                    bonus_vice REAL NOT NULL DEFAULT 0,
+                    bonus_equipe REAL NOT NULL DEFAULT 0,
+                    bonus_campeonato REAL NOT NULL DEFAULT 0,
+                    total_valido REAL NOT NULL DEFAULT 0,
+                    diferenca_anterior REAL,
+                    acertos_11 INTEGER NOT NULL DEFAULT 0,
+                    atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (temporada, prova_id, usuario_id),
+                    FOREIGN KEY (prova_id) REFERENCES provas(id) ON DELETE CASCADE,
+                    FOREIGN KEY (usuario_id) REFERENCES usuarios(id)
+                )
+                """
+            )
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_classificacao_temporada_ordem_posicao ON classificacao_temporada(temporada, ordem_prova DESC, posicao)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_classificacao_temporada_usuario ON classificacao_temporada(usuario_id, temporada, ordem_prova DESC)")
+            conn.commit()
+        except Exception as exc:
+            logger.debug("Erro ao criar classificacao_temporada: %s", exc)
+            conn.rollback()
+
+
+def create_hall_da_fama_resumo_table() -> None:
+    """Resumo derivado do Hall da Fama, já com a ordem do ranking.
+
+    Reconstruído na mesma transação de cada escrita no Hall; a página lê as
+    linhas prontas por ``ordem`` em vez de montar a tabela em Python. O nome
+    do participante não é copiado: vem do cadastro atual na leitura.
+    """
+    pool = get_pool()
+    with pool.get_connection("job") as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS hall_da_fama_resumo (
+                    usuario_id INTEGER PRIMARY KEY,
+                    participacoes INTEGER NOT NULL DEFAULT 0,
+                    melhor_posicao INTEGER,
+                    titulos INTEGER NOT NULL DEFAULT 0,
+                    temporadas JSONB NOT NULL DEFAULT '{}'::jsonb,
+                    ordem INTEGER NOT NULL,
+                    fonte TEXT NOT NULL,
+                    atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (usuario_id) REFERENCES usuarios(id) ON DELETE CASCADE
+                )
+                """
+            )
+            cursor.execute("ALTER TABLE hall_da_fama_resumo DROP COLUMN IF EXISTS nome")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_hall_da_fama_resumo_ordem ON hall_da_fama_resumo(ordem)")
+            cursor.execute("SELECT COUNT(*) AS cnt FROM hall_da_fama_resumo")
+            if int(cursor.fetchone()["cnt"] or 0) == 0:
+                reconstruir_hall_da_fama_resumo(conn)
+            conn.commit()
+        except Exception as exc:
+            logger.debug("Erro ao criar hall_da_fama_resumo: %s", exc)
+            conn.rollback()
+
+
+def create_carreira_temporada_table() -> None:
+    """Resumo de carreira por participante e temporada para a aba Histórico.
+
+    Mantido incrementalmente (aposta salva e job de classificação); a carga
+    inicial é feita aqui quando a tabela ainda está vazia.
+    """
+    pool = get_pool()
+    with pool.get_connection("job") as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS carreira_temporada (
+                    usuario_id INTEGER NOT NULL,
+                    temporada TEXT NOT NULL,
+                    posicao_final INTEGER,
+                    pontos_total REAL,
+                    acertos_11 INTEGER NOT NULL DEFAULT 0,
+                    total_apostas INTEGER NOT NULL DEFAULT 0,
+                    fichas_por_piloto JSONB NOT NULL DEFAULT '{}'::jsonb,
+                    atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (usuario_id, temporada),
+                    FOREIGN KEY (usuario_id) REFERENCES usuarios(id) ON DELETE CASCADE
+                )
+                """
+            )
+            cursor.execute("SELECT COUNT(*) AS cnt FROM carreira_temporada")
+            if int(cursor.fetchone()["cnt"] or 0) == 0:
+                reconstruir_carreira(conn)
+            conn.commit()
+        except Exception as exc:
+            logger.debug("Erro ao criar carreira_temporada: %s", exc)
+            conn.rollback()
+
+
+def create_temporadas_table() -> None:
+    """Catálogo de temporadas, criado aqui para que a leitura não faça DDL."""
+    with get_pool().get_connection("job") as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS temporadas (
+                    temporada TEXT PRIMARY KEY,
+                    criado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+                """
+            )
+            conn.commit()
+        except Exception as exc:
+            logger.debug("Erro ao criar temporadas: %s", exc)
+            conn.rollback()
+
+
+def create_usuario_temporadas_table() -> None:
+    """Temporadas liberadas por participante, lidas pela autorização e pelo menu.
+
+    Mantida incrementalmente (aposta, status, provas e job de classificação);
+    a carga inicial é feita aqui quando a tabela ainda está vazia.
+    """
+    with get_pool().get_connection("job") as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS usuario_temporadas (
+                    usuario_id INTEGER NOT NULL,
+                    temporada TEXT NOT NULL,
+                    origem TEXT NOT NULL,
+                    atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (usuario_id, temporada),
+                    FOREIGN KEY (usuario_id) REFERENCES usuarios(id) ON DELETE CASCADE
+                )
+                """
+            )
+            clear_schema_cache()
+            cursor.execute("SELECT COUNT(*) AS cnt FROM usuario_temporadas")
+            if int(cursor.fetchone()["cnt"] or 0) == 0:
+                atualizar_usuario_temporadas(conn)
+            conn.commit()
+        except Exception as exc:
+            logger.debug("Erro ao criar usuario_temporadas: %s", exc)
+            conn.rollback()
+
+
+def create_jobs_table() -> None:
+    """Fila durável de jobs em background (``services/job_runner.py``)."""
+    with get_pool().get_connection("job") as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+                    tipo TEXT NOT NULL,
+                    chave TEXT NOT NULL,
+                    temporada TEXT NOT NULL,
+                    parametros JSONB NOT NULL DEFAULT '{}'::jsonb,
+                    status TEXT NOT NULL DEFAULT 'pendente',
+                    progresso REAL NOT NULL DEFAULT 0,
+                    mensagem TEXT,
+                    resultado JSONB,
+                    erro TEXT,
+                    tentativas INTEGER NOT NULL DEFAULT 0,
+                    solicitado_por INTEGER,
+                    criado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    iniciado_em TIMESTAMP,
+                    finalizado_em TIMESTAMP,
+                    atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+                """
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_jobs_ativos ON jobs(chave) "
+                "WHERE status IN ('pendente', 'executando')"
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_jobs_finalizado_em ON jobs(finalizado_em) "
+                "WHERE status IN ('concluido', 'falhou')"
+            )
+            conn.commit()
+        except Exception as exc:
+            logger.debug("Erro ao criar jobs: %s", exc)
+            conn.rollback()
+
+
+def create_log_search_columns_and_indexes() -> None:
+    """Colunas geradas e índices usados pelos filtros de Log de Apostas e Log de Acessos.
+
+    ``temporada_ref``/``data_ref`` materializam as expressões de temporada e
+    data que os filtros usavam (e que impediam índices). Os índices trigram
+    (``pg_trgm``) atendem as buscas "contém" com ``ILIKE``; sem permissão para
+    a extensão, essa etapa é pulada e as buscas continuam funcionando.
+    """
+    with get_pool().get_connection("job") as conn:
+        cursor = conn.cursor()
+        try:
+            cols = set(get_table_columns(conn, "log_apostas")) if table_exists(conn, "log_apostas") else set()
+            fontes = []
+            if "temporada" in cols:
+                fontes.append("NULLIF(btrim(CAST(temporada AS TEXT)), '')")
+            if "data" in cols:
+                fontes.append("NULLIF(substr(data, 1, 4), '')")
+            if "data_criacao" in cols:
+                fontes.append("(EXTRACT(YEAR FROM data_criacao)::int)::text")
+            if fontes and "temporada_ref" not in cols:
+                cursor.execute(
+                    "ALTER TABLE log_apostas ADD COLUMN IF NOT EXISTS temporada_ref TEXT "
+                    f"GENERATED ALWAYS AS (COALESCE({', '.join(fontes)})) STORED"
+                )
+            if "data" in cols and "data_ref" not in cols:
+                cursor.execute(
+                    "ALTER TABLE log_apostas ADD COLUMN IF NOT EXISTS data_ref TEXT "
+                    "GENERATED ALWAYS AS (NULLIF(substr(data, 1, 10), '')) STORED"
+                )
+            if fontes:
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_log_apostas_temporada_ref_id_desc ON log_apostas(temporada_ref, id DESC)")
+                if "usuario_id" in cols:
+                    cursor.execute(
+                        "CREATE INDEX IF NOT EXISTS idx_log_apostas_temporada_ref_usuario_id_desc "
+                        "ON log_apostas(temporada_ref, usuario_id, id DESC)"
+                    )
+            if "data" in cols:
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_log_apostas_data_ref_id_desc ON log_apostas(data_ref, id DESC)")
+            if table_exists(conn, "access_logs"):
+                cursor.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_access_logs_perfil_norm_created_at_desc "
+                    "ON access_logs((lower(btrim(perfil))), created_at DESC, id DESC)"
+                )
+            conn.commit()
+            clear_schema_cache()
+        except Exception as exc:
+            logger.debug("Erro ao criar colunas de busca dos logs: %s", exc)
+            conn.rollback()
+
+        try:
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            if table_exists(conn, "log_apostas"):
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_log_apostas_apostador_trgm ON log_apostas USING gin (apostador gin_trgm_ops)")
+            if table_exists(conn, "access_logs"):
+                for coluna in ("ip_address", "email", "nome"):
+                    cursor.execute(
+                        f"CREATE INDEX IF NOT EXISTS idx_access_logs_{coluna}_trgm "
+                        f"ON access_logs USING gin ({coluna} gin_trgm_ops)"
+                    )
+            conn.commit()
+        except Exception as exc:
+            logger.warning("Índices trigram dos logs não criados (pg_trgm indisponível?): %s", exc)
+            conn.rollback()
+
+
 def create_missing_tables_if_needed() -> None:
     pool = get_pool()
     current_year = datetime.datetime.now().year
 
-    with pool.get_connection() as conn:
+    with pool.get_connection("job") as conn:
         cursor = conn.cursor()
         try:
             cursor.execute(
@@ -386,7 +660,7 @@ def fix_sequences() -> None:
         "usuarios_status_historico",
     ]
     pool = get_pool()
-    with pool.get_connection() as conn:
+    with pool.get_connection("job") as conn:
         cursor = conn.cursor()
         for table in tables:
             try:
@@ -440,7 +714,7 @@ def run_migrations() -> None:
     init_db()
 
     pool = get_pool()
-    with pool.get_connection() as conn:
+    with pool.get_connection("job") as conn:
         cursor = conn.cursor()
         try:
             create_missing_tables_if_needed()
@@ -455,9 +729,17 @@ def run_migrations() -> None:
             add_penalidade_auto_percent_if_missing()
             harden_log_apostas_datetime_fields()
             create_access_logs_table_if_missing()
+            create_log_search_columns_and_indexes()
             create_usuarios_status_historico_if_missing()
             create_hall_da_fama_table()
+            create_classificacao_temporada_table()
+            create_hall_da_fama_resumo_table()
+            create_carreira_temporada_table()
+            create_temporadas_table()
+            create_usuario_temporadas_table()
+            create_jobs_table()
             create_auth_sessions_and_retention()
+            particionar_tabelas_de_auditoria()
 
             if table_exists(conn, "posicoes_participantes"):
                 cursor.execute("CREATE INDEX IF NOT EXISTS idx_posicoes_participantes_usuario_temporada ON posicoes_participantes(usuario_id, temporada)")
@@ -499,7 +781,7 @@ def run_migrations() -> None:
 
 def create_hall_da_fama_table() -> None:
     try:
-        with get_pool().get_connection() as conn:
+        with get_pool().get_connection("job") as conn:
             cursor = conn.cursor()
             cursor.execute(
                 """
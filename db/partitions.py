@@ -0,0 +1,352 @@
+"""Particionamento mensal das tabelas de auditoria e sua retenção.
+
+``access_logs``, ``login_attempts``, ``log_apostas`` e ``auth_sessions``
+crescem sem parar e eram podadas com ``DELETE`` grandes no bootstrap. Aqui
+elas viram tabelas particionadas por mês (``PARTITION BY RANGE``) na coluna
+de tempo de cada uma; a retenção passa a ser um ``DROP TABLE`` da partição
+inteira — operação de metadados, sem varrer linhas nem inchar a tabela — e as
+consultas de janela recente (rate limit, páginas de log) leem uma partição.
+
+Convenções:
+
+- partições se chamam ``<tabela>_pAAAAMM``; ``<tabela>_default`` recebe o que
+  cair fora das partições existentes, para nenhum INSERT falhar se a
+  manutenção atrasar;
+- ``manter_particoes`` cria o mês corrente e ``BF1_PARTITIONS_MONTHS_AHEAD``
+  meses à frente e remove as partições cujo mês inteiro já passou da
+  retenção (a granularidade é o mês: uma linha pode sobreviver até um mês
+  além do prazo);
+- retenção ``0`` significa manter tudo (padrão de ``log_apostas``).
+
+Enquanto uma tabela não tiver sido convertida (ex.: sem permissão para a
+migração), a manutenção recorre ao ``DELETE`` antigo.
+"""
+
+from __future__ import annotations
+
+import datetime
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from db.connection_pool import get_pool
+from db.db_schema import clear_schema_cache, table_exists
+
+logger = logging.getLogger(__name__)
+
+MESES_A_FRENTE = max(1, int(os.environ.get("BF1_PARTITIONS_MONTHS_AHEAD", "3")))
+
+
+@dataclass(frozen=True)
+class TabelaParticionada:
+    nome: str
+    chave: str
+    env_retencao: str
+    retencao_padrao: int
+    # Valor usado, na conversão, para linhas antigas com a chave nula.
+    chave_legada: tuple[str, ...] = ()
+
+    @property
+    def retencao_dias(self) -> int:
+        return max(0, int(os.environ.get(self.env_retencao, str(self.retencao_padrao))))
+
+
+TABELAS = (
+    TabelaParticionada("access_logs", "created_at", "ACCESS_LOGS_RETENTION_DAYS", 90),
+    TabelaParticionada("login_attempts", "tentativa_em", "LOGIN_ATTEMPTS_RETENTION_DAYS", 30),
+    TabelaParticionada("log_apostas", "data_criacao", "LOG_APOSTAS_RETENTION_DAYS", 0, ("horario",)),
+    TabelaParticionada("auth_sessions", "expires_at", "AUTH_SESSIONS_RETENTION_DAYS", 30),
+)
+_POR_NOME = {t.nome: t for t in TABELAS}
+
+
+def _mes(data: datetime.date) -> datetime.date:
+    return data.replace(day=1)
+
+
+def _somar_meses(mes: datetime.date, n: int) -> datetime.date:
+    total = mes.year * 12 + (mes.month - 1) + n
+    return datetime.date(total // 12, total % 12 + 1, 1)
+
+
+def nome_particao(tabela: str, mes: datetime.date) -> str:
+    return f"{tabela}_p{mes.year:04d}{mes.month:02d}"
+
+
+def meses_a_criar(inicio: datetime.date, hoje: datetime.date, meses_a_frente: int = MESES_A_FRENTE) -> list[datetime.date]:
+    """Meses (dia 1) de ``inicio`` até ``meses_a_frente`` depois do mês de ``hoje``."""
+    atual, fim = _mes(inicio), _somar_meses(_mes(hoje), meses_a_frente)
+    meses = []
+    while atual <= fim:
+        meses.append(atual)
+        atual = _somar_meses(atual, 1)
+    return meses
+
+
+def particoes_expiradas(tabela: str, particoes: Iterable[str], retencao_dias: int, hoje: datetime.date) -> list[str]:
+    """Partições mensais cujo último dia já saiu da janela de retenção."""
+    if retencao_dias <= 0:
+        return []
+    corte = hoje - datetime.timedelta(days=retencao_dias)
+    padrao = re.compile(rf"^{re.escape(tabela)}_p(\d{{4}})(\d{{2}})$")
+    expiradas = []
+    for nome in particoes:
+        m = padrao.match(nome)
+        if m and _somar_meses(datetime.date(int(m.group(1)), int(m.group(2)), 1), 1) <= corte:
+            expiradas.append(nome)
+    return sorted(expiradas)
+
+
+def _relkind(cur, tabela: str) -> Optional[str]:
+    cur.execute(
+        """
+        SELECT c.relkind
+        FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = current_schema() AND c.relname = %s
+        """,
+        (tabela,),
+    )
+    row = cur.fetchone()
+    return str(row["relkind"]) if row else None
+
+
+def _particoes(cur, tabela: str) -> list[str]:
+    cur.execute(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = %s::regclass",
+        (tabela,),
+    )
+    return [str(r["relname"]) for r in cur.fetchall() or []]
+
+
+def _colunas_gravaveis(cur, tabela: str) -> list[dict]:
+    cur.execute(
+        """
+        SELECT column_name, is_identity, is_generated
+        FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = %s
+        ORDER BY ordinal_position
+        """,
+        (tabela,),
+    )
+    return [dict(r) for r in cur.fetchall() or [] if r["is_generated"] == "NEVER"]
+
+
+def _criar_particao(cur, spec: TabelaParticionada, mes: datetime.date, existentes: set[str]) -> bool:
+    nome = nome_particao(spec.nome, mes)
+    if nome in existentes:
+        return False
+    inicio, fim = mes.isoformat(), _somar_meses(mes, 1).isoformat()
+    default = f"{spec.nome}_default"
+    pendentes = False
+    if default in existentes:
+        # Linhas do mês que caíram na partição default precisam sair dela antes
+        # da criação (o Postgres recusa a partição nova se a default as tiver).
+        cur.execute(f"SELECT 1 FROM {default} WHERE {spec.chave} >= %s AND {spec.chave} < %s LIMIT 1", (inicio, fim))
+        pendentes = cur.fetchone() is not None
+    if pendentes:
+        cols = ", ".join(c["column_name"] for c in _colunas_gravaveis(cur, spec.nome))
+        cur.execute(
+            f"CREATE TEMP TABLE _bf1_particao_pendente ON COMMIT DROP AS "
+            f"SELECT {cols} FROM {default} WHERE {spec.chave} >= %s AND {spec.chave} < %s",
+            (inicio, fim),
+        )
+        cur.execute(f"DELETE FROM {default} WHERE {spec.chave} >= %s AND {spec.chave} < %s", (inicio, fim))
+    cur.execute(f"CREATE TABLE {nome} PARTITION OF {spec.nome} FOR VALUES FROM ('{inicio}') TO ('{fim}')")
+    if pendentes:
+        cur.execute(f"INSERT INTO {spec.nome} ({cols}) SELECT {cols} FROM _bf1_particao_pendente")
+        cur.execute("DROP TABLE _bf1_particao_pendente")
+    existentes.add(nome)
+    return True
+
+
+def converter_para_particionada(conn, spec: TabelaParticionada, hoje: Optional[datetime.date] = None) -> bool:
+    """Troca a tabela comum ``spec.nome`` por uma particionada com os mesmos dados.
+
+    Roda numa transação: a tabela antiga é renomeada, a nova é criada com
+    ``LIKE`` (defaults, identity, colunas geradas e checks), as linhas dentro
+    da retenção são copiadas e a antiga é descartada; chave primária (agora
+    incluindo a coluna de partição), FKs e índices são recriados a partir das
+    definições originais. Retorna ``False`` se não havia o que converter.
+    """
+    hoje = hoje or datetime.date.today()
+    tabela, legado = spec.nome, f"{spec.nome}_legado"
+    cur = conn.cursor()
+    if _relkind(cur, tabela) != "r":
+        cur.close()
+        return False
+
+    cur.execute(f"LOCK TABLE {tabela} IN ACCESS EXCLUSIVE MODE")
+    colunas = _colunas_gravaveis(cur, tabela)
+    nomes = [c["column_name"] for c in colunas]
+    cur.execute(
+        """
+        SELECT a.attname
+        FROM pg_index i JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+        WHERE i.indrelid = %s::regclass AND i.indisprimary
+        """,
+        (tabela,),
+    )
+    pk = [str(r["attname"]) for r in cur.fetchall() or []]
+    cur.execute(
+        """
+        SELECT c.relname AS nome, pg_get_indexdef(i.indexrelid) AS ddl, i.indisunique AS unico
+        FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = %s::regclass AND NOT i.indisprimary
+        """,
+        (tabela,),
+    )
+    indices = [dict(r) for r in cur.fetchall() or []]
+    cur.execute(
+        "SELECT conname, pg_get_constraintdef(oid) AS ddl FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f'",
+        (tabela,),
+    )
+    fks = [dict(r) for r in cur.fetchall() or []]
+    sequencias = {}
+    for col in colunas:
+        if col["is_identity"] != "YES":
+            cur.execute("SELECT pg_get_serial_sequence(%s, %s) AS seq", (tabela, col["column_name"]))
+            row = cur.fetchone()
+            if row and row["seq"]:
+                sequencias[col["column_name"]] = row["seq"]
+
+    fontes_chave = [spec.chave] + [c for c in spec.chave_legada if c in nomes]
+    chave_expr = f"COALESCE({', '.join(fontes_chave)}, CURRENT_TIMESTAMP)"
+    retencao = spec.retencao_dias
+    if retencao:
+        inicio = _mes(hoje - datetime.timedelta(days=retencao))
+    else:
+        cur.execute(f"SELECT MIN({chave_expr}) AS inicio FROM {tabela}")
+        row = cur.fetchone()
+        inicio = _mes(row["inicio"].date() if row and row["inicio"] else hoje)
+
+    cur.execute(f"ALTER TABLE {tabela} RENAME TO {legado}")
+    cur.execute(
+        f"CREATE TABLE {tabela} (LIKE {legado} INCLUDING DEFAULTS INCLUDING IDENTITY "
+        f"INCLUDING GENERATED INCLUDING CONSTRAINTS) PARTITION BY RANGE ({spec.chave})"
+    )
+    cur.execute(f"ALTER TABLE {tabela} ALTER COLUMN {spec.chave} SET NOT NULL")
+    # Sequences de SERIAL pertencem à coluna antiga e sumiriam com ela.
+    for coluna, seq in sequencias.items():
+        cur.execute(f"ALTER SEQUENCE {seq} OWNED BY {tabela}.{coluna}")
+    existentes: set[str] = set()
+    for mes in meses_a_criar(inicio, hoje):
+        _criar_particao(cur, spec, mes, existentes)
+    cur.execute(f"CREATE TABLE {tabela}_default PARTITION OF {tabela} DEFAULT")
+
+    selecao = ", ".join(chave_expr if n == spec.chave else n for n in nomes)
+    filtro = f"WHERE {chave_expr} >= %s" if retencao else ""
+    cur.execute(
+        f"INSERT INTO {tabela} ({', '.join(nomes)}) SELECT {selecao} FROM {legado} {filtro}",
+        (inicio.isoformat(),) if retencao else None,
+    )
+    copiadas = int(cur.rowcount or 0)
+    for col in colunas:
+        if col["is_identity"] == "YES":
+            coluna = col["column_name"]
+            cur.execute(
+                f"SELECT setval(pg_get_serial_sequence(%s, %s), COALESCE(MAX({coluna}), 0) + 1, false) FROM {tabela}",
+                (tabela, coluna),
+            )
+    cur.execute(f"DROP TABLE {legado}")
+
+    if pk:
+        colunas_pk = pk + ([spec.chave] if spec.chave not in pk else [])
+        cur.execute(f"ALTER TABLE {tabela} ADD PRIMARY KEY ({', '.join(colunas_pk)})")
+    for fk in fks:
+        cur.execute(f"ALTER TABLE {tabela} ADD CONSTRAINT {fk['conname']} {fk['ddl']}")
+    for indice in indices:
+        if indice["unico"]:
+            # Índice único em tabela particionada precisa conter a chave de partição.
+            logger.warning("Índice único %s não recriado em %s particionada", indice["nome"], tabela)
+            continue
+        cur.execute(indice["ddl"])
+    cur.close()
+    logger.info("✓ %s convertida para particionamento mensal (%s linhas copiadas)", tabela, copiadas)
+    return True
+
+
+def _manter_tabela(conn, spec: TabelaParticionada, hoje: datetime.date) -> int:
+    cur = conn.cursor()
+    tipo = _relkind(cur, spec.nome)
+    removidas = 0
+    if tipo == "p":
+        existentes = set(_particoes(cur, spec.nome))
+        for mes in meses_a_criar(hoje, hoje):
+            _criar_particao(cur, spec, mes, existentes)
+        for nome in particoes_expiradas(spec.nome, existentes, spec.retencao_dias, hoje):
+            cur.execute(f"DROP TABLE {nome}")
+            removidas += 1
+    elif tipo == "r" and spec.retencao_dias:
+        cur.execute(
+            f"DELETE FROM {spec.nome} WHERE {spec.chave} < CURRENT_TIMESTAMP - (%s * INTERVAL '1 day')",
+            (spec.retencao_dias,),
+        )
+    cur.close()
+    return removidas
+
+
+def manter_particoes(tabelas: Optional[Iterable[str]] = None, hoje: Optional[datetime.date] = None) -> dict[str, int]:
+    """Cria as partições futuras e remove as expiradas; retorna partições removidas por tabela."""
+    hoje = hoje or datetime.date.today()
+    specs = [_POR_NOME[t] for t in tabelas] if tabelas is not None else list(TABELAS)
+    removidas: dict[str, int] = {}
+    with get_pool().get_connection("job") as conn:
+        for spec in specs:
+            try:
+                removidas[spec.nome] = _manter_tabela(conn, spec, hoje)
+                conn.commit()
+            except Exception as exc:
+                logger.warning("⚠️  Falha na manutenção de partições de %s: %s", spec.nome, exc)
+                conn.rollback()
+    return removidas
+
+
+_manutencao_lock = threading.Lock()
+_ultima_manutencao: dict[str, float] = {}
+
+
+def manter_particoes_periodicamente(tabelas: Iterable[str], intervalo_segundos: float = 3600) -> bool:
+    """``manter_particoes`` no máximo uma vez por ``intervalo_segundos`` neste processo."""
+    chave = ",".join(sorted(tabelas))
+    agora = time.monotonic()
+    with _manutencao_lock:
+        ultima = _ultima_manutencao.get(chave)
+        if ultima is not None and agora - ultima < intervalo_segundos:
+            return False
+        _ultima_manutencao[chave] = agora
+    manter_particoes(chave.split(","))
+    return True
+
+
+def particionar_tabelas_de_auditoria() -> None:
+    """Migration: converte as tabelas de auditoria e aplica a manutenção inicial."""
+    with get_pool().get_connection("job") as conn:
+        for spec in TABELAS:
+            try:
+                if not table_exists(conn, spec.nome):
+                    continue
+                converter_para_particionada(conn, spec)
+                conn.commit()
+            except Exception as exc:
+                logger.warning("⚠️  %s não foi particionada (segue como tabela comum): %s", spec.nome, exc)
+                conn.rollback()
+    clear_schema_cache()
+    manter_particoes()
+
+
+__all__ = [
+    "MESES_A_FRENTE",
+    "TABELAS",
+    "TabelaParticionada",
+    "converter_para_particionada",
+    "manter_particoes",
+    "manter_particoes_periodicamente",
+    "meses_a_criar",
+    "nome_particao",
+    "particionar_tabelas_de_auditoria",
+    "particoes_expiradas",
+]
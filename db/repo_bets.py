@@ -7,7 +7,7 @@ from typing import Optional
 
 import pandas as pd
 
-from db.db_schema import db_connect, get_table_columns, table_exists
+from db.db_schema import db_connect, get_table_columns, hot_query, table_exists
 
 
 def _query_to_df(query: str, params: tuple | None = None) -> pd.DataFrame:
@@ -23,9 +23,12 @@ def _query_to_df(query: str, params: tuple | None = None) -> pd.DataFrame:
     return pd.DataFrame([dict(r) for r in rows])
 
 
+_APOSTAS_TEMPORADA_SQL = hot_query("SELECT * FROM apostas WHERE temporada = %s")
+
+
 def get_apostas_df(temporada: Optional[str] = None) -> pd.DataFrame:
     if temporada:
-        return _query_to_df("SELECT * FROM apostas WHERE temporada = %s", (temporada,))
+        return _query_to_df(_APOSTAS_TEMPORADA_SQL, (temporada,))
     return _query_to_df("SELECT * FROM apostas")
 
 
@@ -72,6 +75,142 @@ def get_posicoes_usuario_df(usuario_id: int, limit: int = 5000) -> pd.DataFrame:
     )
 
 
+def _fetch_agregado(conn, query: str, params: tuple) -> pd.DataFrame:
+    cur = conn.cursor()
+    cur.execute(query, params)
+    rows = cur.fetchall() or []
+    cur.close()
+    return pd.DataFrame([dict(r) for r in rows]) if rows else pd.DataFrame()
+
+
+def get_distribuicao_pilotos_df(
+    temporada: Optional[str],
+    usuario_ids: list[int],
+    nomes: Optional[list[str]] = None,
+) -> pd.DataFrame:
+    """Apostas e fichas por participante e piloto, agregadas no PostgreSQL.
+
+    Usa os arrays nativos ``pilotos_arr``/``fichas_arr`` quando existem e cai
+    para ``string_to_array`` nas linhas legadas. Sem apostas na temporada,
+    recorre ao ``log_apostas`` (apostas registradas, ``tipo_aposta = 0``).
+    """
+    if not usuario_ids:
+        return pd.DataFrame()
+    with db_connect() as conn:
+        cols = get_table_columns(conn, "apostas")
+        pilotos_expr = "string_to_array(a.pilotos, ',')"
+        fichas_expr = "string_to_array(NULLIF(a.fichas, ''), ',')::int[]"
+        if "pilotos_arr" in cols and "fichas_arr" in cols:
+            pilotos_expr = f"COALESCE(a.pilotos_arr, {pilotos_expr})"
+            fichas_expr = f"COALESCE(a.fichas_arr, {fichas_expr})"
+        filtro_temporada = ""
+        params: tuple = ([int(uid) for uid in usuario_ids],)
+        if temporada and "temporada" in cols:
+            filtro_temporada = "AND a.temporada = %s"
+            params = (*params, temporada)
+        df = _fetch_agregado(
+            conn,
+            f"""
+            SELECT a.usuario_id AS user_id, u.nome AS participante,
+                   btrim(d.piloto) AS piloto,
+                   COUNT(*) AS total_apostas,
+                   COALESCE(SUM(d.fichas), 0) AS total_fichas
+            FROM apostas a
+            JOIN usuarios u ON u.id = a.usuario_id
+            CROSS JOIN LATERAL unnest({pilotos_expr}, {fichas_expr}) AS d(piloto, fichas)
+            WHERE a.usuario_id = ANY(%s) {filtro_temporada}
+              AND btrim(COALESCE(d.piloto, '')) <> ''
+            GROUP BY a.usuario_id, u.nome, btrim(d.piloto)
+            """,
+            params,
+        )
+        if df.empty:
+            df = _get_distribuicao_log_apostas(
+                conn, temporada, usuario_ids, nomes or [],
+                "btrim(p.piloto) AS piloto, COUNT(*) AS total_apostas",
+                "CROSS JOIN LATERAL unnest(string_to_array(l.pilotos, ',')) AS p(piloto)",
+                "btrim(COALESCE(p.piloto, '')) <> ''",
+                "btrim(p.piloto)",
+            )
+    return df
+
+
+def get_distribuicao_piloto_11_df(
+    temporada: Optional[str],
+    usuario_ids: list[int],
+    nomes: Optional[list[str]] = None,
+) -> pd.DataFrame:
+    """Quantidade de apostas em cada piloto como 11º, por participante."""
+    if not usuario_ids:
+        return pd.DataFrame()
+    with db_connect() as conn:
+        cols = get_table_columns(conn, "apostas")
+        filtro_temporada = ""
+        params: tuple = ([int(uid) for uid in usuario_ids],)
+        if temporada and "temporada" in cols:
+            filtro_temporada = "AND a.temporada = %s"
+            params = (*params, temporada)
+        df = _fetch_agregado(
+            conn,
+            f"""
+            SELECT a.usuario_id AS user_id, u.nome AS participante,
+                   btrim(a.piloto_11) AS piloto_11, COUNT(*) AS total
+            FROM apostas a
+            JOIN usuarios u ON u.id = a.usuario_id
+            WHERE a.usuario_id = ANY(%s) {filtro_temporada}
+              AND btrim(COALESCE(a.piloto_11, '')) <> ''
+            GROUP BY a.usuario_id, u.nome, btrim(a.piloto_11)
+            """,
+            params,
+        )
+        if df.empty:
+            df = _get_distribuicao_log_apostas(
+                conn, temporada, usuario_ids, nomes or [],
+                "btrim(l.piloto_11) AS piloto_11, COUNT(*) AS total",
+                "",
+                "btrim(COALESCE(l.piloto_11, '')) <> ''",
+                "btrim(l.piloto_11)",
+            )
+    return df
+
+
+def _get_distribuicao_log_apostas(
+    conn,
+    temporada: Optional[str],
+    usuario_ids: list[int],
+    nomes: list[str],
+    agregados: str,
+    juncao: str,
+    filtro: str,
+    agrupamento: str,
+) -> pd.DataFrame:
+    cols = get_table_columns(conn, "log_apostas")
+    if not cols or "usuario_id" not in cols:
+        return pd.DataFrame()
+    condicoes = ["l.tipo_aposta = 0", filtro]
+    params: list = []
+    if temporada and "temporada" in cols:
+        condicoes.append("l.temporada = %s")
+        params.append(temporada)
+    if nomes and "apostador" in cols:
+        condicoes.append("(l.usuario_id = ANY(%s) OR l.apostador = ANY(%s))")
+        params.extend([[int(uid) for uid in usuario_ids], list(nomes)])
+    else:
+        condicoes.append("l.usuario_id = ANY(%s)")
+        params.append([int(uid) for uid in usuario_ids])
+    participante = "l.apostador" if "apostador" in cols else "NULL"
+    return _fetch_agregado(
+        conn,
+        f"""
+        SELECT l.usuario_id AS user_id, {participante} AS participante, {agregados}
+        FROM log_apostas l {juncao}
+        WHERE {' AND '.join(condicoes)}
+        GROUP BY l.usuario_id, {participante}, {agrupamento}
+        """,
+        tuple(params),
+    )
+
+
 def _usuarios_status_historico_exists(conn) -> bool:
     return table_exists(conn, "usuarios_status_historico")
 
@@ -111,6 +250,8 @@ def get_participantes_temporada_df(temporada: Optional[str] = None) -> pd.DataFr
 __all__ = [
     "get_apostas_df",
     "get_apostas_usuario_df",
+    "get_distribuicao_piloto_11_df",
+    "get_distribuicao_pilotos_df",
     "get_posicoes_participantes_df",
     "get_posicoes_usuario_df",
     "get_participantes_temporada_df",
@@ -0,0 +1,217 @@
+"""Repositório do resumo de carreira por participante e temporada.
+
+``carreira_temporada`` guarda, por (usuario_id, temporada), a posição final,
+os pontos válidos, os acertos do 11º e as fichas apostadas em cada piloto.
+As fichas são recalculadas para o par afetado a cada aposta salva; posição,
+pontos e acertos chegam do job de classificação.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, Optional
+
+import pandas as pd
+
+from db.db_schema import db_connect, table_exists
+from utils.cache_utils import clear_data_cache
+
+# Aceita tanto o repr Python legado ("11: 'Piloto'") quanto JSON ("\"11\": \"Piloto\"").
+_PILOTO_11_REGEX = r"""[{,]\s*['"]?11['"]?\s*:\s*['"]([^'"]*)['"]"""
+
+_FICHAS_SQL = """
+    WITH apostas_filtradas AS (
+        SELECT a.usuario_id, btrim(CAST(a.temporada AS TEXT)) AS temporada,
+               a.pilotos, a.fichas
+        FROM apostas a
+        WHERE a.usuario_id IS NOT NULL
+          AND btrim(COALESCE(CAST(a.temporada AS TEXT), '')) != ''
+          {filtro}
+    ),
+    totais AS (
+        SELECT usuario_id, temporada, COUNT(*) AS total_apostas
+        FROM apostas_filtradas
+        GROUP BY usuario_id, temporada
+    ),
+    por_piloto AS (
+        SELECT f.usuario_id, f.temporada, btrim(i.piloto) AS piloto,
+               SUM(NULLIF(btrim(i.ficha), '')::int) AS fichas
+        FROM apostas_filtradas f
+        CROSS JOIN LATERAL unnest(
+            string_to_array(f.pilotos, ','), string_to_array(f.fichas, ',')
+        ) AS i(piloto, ficha)
+        WHERE btrim(COALESCE(i.piloto, '')) != ''
+        GROUP BY f.usuario_id, f.temporada, btrim(i.piloto)
+    )
+    INSERT INTO carreira_temporada (usuario_id, temporada, total_apostas, fichas_por_piloto, atualizado_em)
+    SELECT t.usuario_id, t.temporada, t.total_apostas,
+           COALESCE(
+               jsonb_object_agg(p.piloto, p.fichas) FILTER (WHERE p.fichas > 0),
+               '{{}}'::jsonb
+           ),
+           CURRENT_TIMESTAMP
+    FROM totais t
+    LEFT JOIN por_piloto p ON p.usuario_id = t.usuario_id AND p.temporada = t.temporada
+    GROUP BY t.usuario_id, t.temporada, t.total_apostas
+    ON CONFLICT (usuario_id, temporada) DO UPDATE SET
+        total_apostas = EXCLUDED.total_apostas,
+        fichas_por_piloto = EXCLUDED.fichas_por_piloto,
+        atualizado_em = CURRENT_TIMESTAMP
+"""
+
+
+def atualizar_fichas_carreira(
+    conn,
+    usuario_id: Optional[int] = None,
+    temporada: Optional[str] = None,
+) -> None:
+    """Recalcula apostas e fichas por piloto na transação corrente (sem commit).
+
+    Com ``usuario_id``/``temporada`` o recálculo fica restrito a esse recorte,
+    que é o caminho usado a cada aposta salva.
+    """
+    if not table_exists(conn, "carreira_temporada"):
+        return
+    filtros = []
+    params: list = []
+    if usuario_id is not None:
+        filtros.append("AND a.usuario_id = %s")
+        params.append(int(usuario_id))
+    if temporada is not None:
+        filtros.append("AND btrim(CAST(a.temporada AS TEXT)) = %s")
+        params.append(str(temporada).strip())
+    conn.cursor().execute(_FICHAS_SQL.format(filtro=" ".join(filtros)), tuple(params))
+
+
+def atualizar_carreira_temporada(
+    temporada: str,
+    finais: Iterable[tuple[int, int, float, int]],
+) -> None:
+    """Grava posição, pontos e acertos do 11º finais de uma temporada.
+
+    ``finais`` contém ``(usuario_id, posicao, total_valido, acertos_11)`` da
+    última prova classificada; as fichas da temporada são atualizadas na mesma
+    transação para incluir participantes que ainda não tinham linha.
+    """
+    temporada = str(temporada).strip()
+    valores = [
+        (int(uid), temporada, int(posicao), float(pontos), int(acertos))
+        for uid, posicao, pontos, acertos in finais
+    ]
+    with db_connect("job") as conn:
+        if not table_exists(conn, "carreira_temporada"):
+            return
+        atualizar_fichas_carreira(conn, temporada=temporada)
+        cur = conn.cursor()
+        cur.execute(
+            """
+            UPDATE carreira_temporada
+            SET posicao_final = NULL, pontos_total = NULL, acertos_11 = 0
+            WHERE temporada = %s AND NOT (usuario_id = ANY(%s))
+            """,
+            (temporada, [v[0] for v in valores]),
+        )
+        if valores:
+            cur.executemany(
+                """
+                INSERT INTO carreira_temporada
+                    (usuario_id, temporada, posicao_final, pontos_total, acertos_11, atualizado_em)
+                VALUES (%s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
+                ON CONFLICT (usuario_id, temporada) DO UPDATE SET
+                    posicao_final = EXCLUDED.posicao_final,
+                    pontos_total = EXCLUDED.pontos_total,
+                    acertos_11 = EXCLUDED.acertos_11,
+                    atualizado_em = CURRENT_TIMESTAMP
+                """,
+                valores,
+            )
+        conn.commit()
+        cur.close()
+    clear_data_cache("historico")
+
+
+def reconstruir_carreira(conn) -> None:
+    """Carga completa a partir das tabelas de origem (sem commit).
+
+    Usada pela migration quando a tabela é criada: fichas vêm de ``apostas``;
+    posição e pontos de ``posicoes_participantes``; acertos do 11º da
+    comparação com ``resultados``. Temporadas já presentes em
+    ``classificacao_temporada`` usam os totais consolidados de lá.
+    """
+    atualizar_fichas_carreira(conn)
+    cur = conn.cursor()
+    if table_exists(conn, "posicoes_participantes"):
+        cur.execute(
+            """
+            UPDATE carreira_temporada c
+            SET posicao_final = x.posicao, pontos_total = x.pontos
+            FROM (
+                SELECT usuario_id, btrim(CAST(temporada AS TEXT)) AS temporada,
+                       (array_agg(posicao ORDER BY prova_id DESC NULLS LAST))[1] AS posicao,
+                       ROUND(CAST(SUM(pontos) AS NUMERIC), 2) AS pontos
+                FROM posicoes_participantes
+                WHERE usuario_id IS NOT NULL AND temporada IS NOT NULL
+                GROUP BY usuario_id, btrim(CAST(temporada AS TEXT))
+            ) x
+            WHERE c.usuario_id = x.usuario_id AND c.temporada = x.temporada
+            """
+        )
+    if table_exists(conn, "resultados"):
+        cur.execute(
+            f"""
+            UPDATE carreira_temporada c
+            SET acertos_11 = x.acertos
+            FROM (
+                SELECT a.usuario_id, btrim(CAST(a.temporada AS TEXT)) AS temporada,
+                       COUNT(*) AS acertos
+                FROM apostas a
+                JOIN resultados r ON r.prova_id = a.prova_id
+                WHERE btrim(COALESCE(a.piloto_11, '')) != ''
+                  AND btrim(a.piloto_11) = btrim(substring(r.posicoes FROM $re${_PILOTO_11_REGEX}$re$))
+                GROUP BY a.usuario_id, btrim(CAST(a.temporada AS TEXT))
+            ) x
+            WHERE c.usuario_id = x.usuario_id AND c.temporada = x.temporada
+            """
+        )
+    if table_exists(conn, "classificacao_temporada"):
+        cur.execute(
+            """
+            UPDATE carreira_temporada c
+            SET posicao_final = x.posicao, pontos_total = x.total_valido, acertos_11 = x.acertos_11
+            FROM (
+                SELECT DISTINCT ON (usuario_id, temporada)
+                       usuario_id, temporada, posicao, total_valido, acertos_11
+                FROM classificacao_temporada
+                ORDER BY usuario_id, temporada, ordem_prova DESC
+            ) x
+            WHERE c.usuario_id = x.usuario_id AND c.temporada = x.temporada
+            """
+        )
+
+
+def get_carreira_usuario_df(usuario_id: int) -> pd.DataFrame:
+    """Uma linha por temporada do participante, em ordem de temporada."""
+    with db_connect() as conn:
+        if not table_exists(conn, "carreira_temporada"):
+            return pd.DataFrame()
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT usuario_id, temporada, posicao_final, pontos_total, acertos_11,
+                   total_apostas, fichas_por_piloto
+            FROM carreira_temporada
+            WHERE usuario_id = %s
+            ORDER BY temporada
+            """,
+            (int(usuario_id),),
+        )
+        rows = cur.fetchall() or []
+        cur.close()
+    return pd.DataFrame([dict(r) for r in rows]) if rows else pd.DataFrame()
+
+
+__all__ = [
+    "atualizar_carreira_temporada",
+    "atualizar_fichas_carreira",
+    "get_carreira_usuario_df",
+    "reconstruir_carreira",
+]
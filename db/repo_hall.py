@@ -0,0 +1,116 @@
+"""Repositório do resumo pré-ordenado do Hall da Fama."""
+
+from __future__ import annotations
+
+import pandas as pd
+
+from db.db_schema import table_exists
+
+# Célula exibida na tabela histórica: "1º (230 pts)" ou "3º (187.5 pts)".
+_CELULA_SQL = (
+    "posicao::text || 'º (' || "
+    "CASE WHEN COALESCE(pontos, 0) = trunc(COALESCE(pontos, 0)) "
+    "THEN trunc(COALESCE(pontos, 0))::bigint::text "
+    "ELSE to_char(pontos, 'FM999999990.0') END || ' pts)'"
+)
+
+_FONTES = {
+    "hall_da_fama": (
+        "SELECT usuario_id, temporada, posicao_final AS posicao, pontos "
+        "FROM hall_da_fama"
+    ),
+    # O legado pode ter mais de uma linha por temporada; vale a mais recente.
+    "posicoes_participantes": (
+        "SELECT DISTINCT ON (usuario_id, temporada) usuario_id, temporada, posicao, pontos "
+        "FROM posicoes_participantes "
+        "WHERE usuario_id IS NOT NULL AND posicao IS NOT NULL "
+        "ORDER BY usuario_id, temporada, id DESC"
+    ),
+}
+
+
+def resolver_fonte_hall(conn) -> tuple[str, str]:
+    """Define a tabela fonte do Hall da Fama com fallback para legado."""
+    c = conn.cursor()
+    if table_exists(conn, "hall_da_fama"):
+        c.execute("SELECT COUNT(*) AS cnt FROM hall_da_fama")
+        if int(c.fetchone()["cnt"] or 0) > 0:
+            return "hall_da_fama", "posicao_final"
+
+    if table_exists(conn, "posicoes_participantes"):
+        c.execute("SELECT COUNT(*) AS cnt FROM posicoes_participantes")
+        if int(c.fetchone()["cnt"] or 0) > 0:
+            return "posicoes_participantes", "posicao"
+
+    return "hall_da_fama", "posicao_final"
+
+
+def reconstruir_hall_da_fama_resumo(conn) -> int:
+    """Regrava ``hall_da_fama_resumo`` na transação corrente (sem commit).
+
+    Uma linha por participante não-master com número de temporadas, melhor
+    posição, títulos, células formatadas por temporada e a ordem do ranking
+    (mais participações, depois melhor posição). O nome não é gravado: a
+    página usa o do cadastro atual.
+    """
+    if not table_exists(conn, "hall_da_fama_resumo"):
+        return 0
+    source_table, _ = resolver_fonte_hall(conn)
+    if not table_exists(conn, source_table):
+        return 0
+    c = conn.cursor()
+    c.execute("DELETE FROM hall_da_fama_resumo")
+    c.execute(
+        f"""
+        WITH fonte AS (
+            SELECT usuario_id, CAST(temporada AS TEXT) AS temporada, posicao,
+                   {_CELULA_SQL} AS celula
+            FROM ({_FONTES[source_table]}) AS bruto
+            WHERE temporada IS NOT NULL AND trim(CAST(temporada AS TEXT)) != ''
+        ),
+        agregado AS (
+            SELECT u.id AS usuario_id, u.nome,
+                   COUNT(f.temporada) AS participacoes,
+                   MIN(f.posicao) AS melhor_posicao,
+                   COUNT(*) FILTER (WHERE f.posicao = 1) AS titulos,
+                   COALESCE(
+                       jsonb_object_agg(f.temporada, f.celula) FILTER (WHERE f.temporada IS NOT NULL),
+                       '{{}}'::jsonb
+                   ) AS temporadas
+            FROM usuarios u
+            LEFT JOIN fonte f ON f.usuario_id = u.id
+            WHERE LOWER(COALESCE(u.perfil, '')) != 'master'
+            GROUP BY u.id, u.nome
+        )
+        INSERT INTO hall_da_fama_resumo
+            (usuario_id, participacoes, melhor_posicao, titulos, temporadas, ordem, fonte)
+        SELECT usuario_id, participacoes, melhor_posicao, titulos, temporadas,
+               ROW_NUMBER() OVER (
+                   ORDER BY participacoes DESC, melhor_posicao ASC NULLS LAST, nome ASC
+               ),
+               %s
+        FROM agregado
+        """,
+        (source_table,),
+    )
+    return int(c.rowcount or 0)
+
+
+def get_hall_da_fama_resumo_df(conn) -> pd.DataFrame:
+    """Resumo já ordenado pelo ranking do Hall da Fama."""
+    if not table_exists(conn, "hall_da_fama_resumo"):
+        return pd.DataFrame()
+    c = conn.cursor()
+    c.execute(
+        "SELECT usuario_id, participacoes, melhor_posicao, titulos, temporadas, fonte "
+        "FROM hall_da_fama_resumo ORDER BY ordem"
+    )
+    rows = c.fetchall() or []
+    return pd.DataFrame([dict(r) for r in rows]) if rows else pd.DataFrame()
+
+
+__all__ = [
+    "get_hall_da_fama_resumo_df",
+    "reconstruir_hall_da_fama_resumo",
+    "resolver_fonte_hall",
+]
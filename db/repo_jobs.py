@@ -0,0 +1,241 @@
+"""Repositório da fila de jobs em background (tabela ``jobs``).
+
+Um job nasce ``pendente``, passa a ``executando`` quando um worker o reserva
+e termina ``concluido`` ou ``falhou``. Dois advisory locks organizam a fila:
+
+- ao enfileirar, um lock de transação por ``chave`` torna atômico o "já existe
+  job pendente igual?" — pedidos repetidos devolvem o job que ainda não
+  começou. Um job já ``executando`` pode ter passado da etapa que o novo
+  pedido precisa refazer (ex.: resultado corrigido durante o envio dos
+  e-mails), então ele ganha um job novo, que espera o lock da temporada;
+- ao executar, o worker segura um lock de sessão por temporada na sua conexão
+  dedicada. Duas recomputações da mesma temporada nunca rodam juntas, e um
+  job ``executando`` cujo lock está livre ficou órfão (o worker morreu e a
+  conexão caiu) e pode ser retomado.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from typing import Any, Optional
+
+from db.db_schema import db_connect, table_exists
+
+logger = logging.getLogger(__name__)
+
+STATUS_ATIVOS = ("pendente", "executando")
+
+_COLUNAS = (
+    "id, tipo, chave, temporada, parametros, status, progresso, mensagem, resultado, erro, "
+    "tentativas, solicitado_por, criado_em, iniciado_em, finalizado_em"
+)
+
+
+def _lock_temporada(temporada: str) -> str:
+    return f"bf1_job_temporada:{str(temporada).strip()}"
+
+
+def enfileirar_job(
+    tipo: str,
+    chave: str,
+    temporada: str,
+    parametros: dict[str, Any],
+    solicitado_por: Optional[int],
+) -> tuple[int, bool]:
+    """Cria o job ou devolve o pendente de mesma ``chave``; retorna ``(id, criado)``."""
+    with db_connect("job") as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (f"bf1_job_fila:{chave}",))
+        cur.execute(
+            "SELECT id FROM jobs WHERE chave = %s AND status = 'pendente' ORDER BY id LIMIT 1",
+            (chave,),
+        )
+        row = cur.fetchone()
+        if row:
+            conn.commit()
+            cur.close()
+            return int(row["id"]), False
+        cur.execute(
+            """
+            INSERT INTO jobs (tipo, chave, temporada, parametros, solicitado_por)
+            VALUES (%s, %s, %s, %s::jsonb, %s)
+            RETURNING id
+            """,
+            (tipo, chave, str(temporada), json.dumps(parametros), solicitado_por),
+        )
+        job_id = int(cur.fetchone()["id"])
+        conn.commit()
+        cur.close()
+    return job_id, True
+
+
+def reservar_job(conn, max_tentativas: int) -> Optional[dict]:
+    """Reserva o próximo job na conexão dedicada do worker.
+
+    O lock de sessão da temporada é obtido antes de o status virar
+    ``executando`` e fica com ``conn`` até ``liberar_temporada``. Jobs que já
+    esgotaram ``max_tentativas`` (o worker caiu durante todas elas) são
+    encerrados como ``falhou``.
+    """
+    cur = conn.cursor()
+    cur.execute(
+        f"""
+        SELECT {_COLUNAS}
+        FROM jobs
+        WHERE status IN ('pendente', 'executando')
+        ORDER BY id
+        LIMIT 50
+        FOR UPDATE SKIP LOCKED
+        """
+    )
+    candidatos = cur.fetchall() or []
+    for row in candidatos:
+        cur.execute("SELECT pg_try_advisory_lock(hashtext(%s)) AS ok", (_lock_temporada(row["temporada"]),))
+        if not cur.fetchone()["ok"]:
+            continue
+        if int(row["tentativas"] or 0) >= max_tentativas:
+            cur.execute(
+                """
+                UPDATE jobs SET status = 'falhou', erro = %s,
+                       finalizado_em = CURRENT_TIMESTAMP, atualizado_em = CURRENT_TIMESTAMP
+                WHERE id = %s
+                """,
+                ("Execução interrompida repetidamente", row["id"]),
+            )
+            cur.execute("SELECT pg_advisory_unlock(hashtext(%s))", (_lock_temporada(row["temporada"]),))
+            continue
+        if row["status"] == "executando":
+            logger.warning("Retomando job órfão %s (%s)", row["id"], row["tipo"])
+        cur.execute(
+            """
+            UPDATE jobs SET status = 'executando', progresso = 0, mensagem = NULL, erro = NULL,
+                   tentativas = tentativas + 1, iniciado_em = CURRENT_TIMESTAMP,
+                   atualizado_em = CURRENT_TIMESTAMP
+            WHERE id = %s
+            """,
+            (row["id"],),
+        )
+        conn.commit()
+        cur.close()
+        return dict(row)
+    conn.commit()
+    cur.close()
+    return None
+
+
+def liberar_temporada(conn, temporada: str) -> None:
+    """Devolve o lock de sessão obtido em ``reservar_job``."""
+    cur = conn.cursor()
+    cur.execute("SELECT pg_advisory_unlock(hashtext(%s))", (_lock_temporada(temporada),))
+    conn.commit()
+    cur.close()
+
+
+def atualizar_progresso(job_id: int, progresso: float, mensagem: Optional[str] = None) -> None:
+    with db_connect("job") as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            UPDATE jobs SET progresso = %s, mensagem = COALESCE(%s, mensagem), atualizado_em = CURRENT_TIMESTAMP
+            WHERE id = %s AND status = 'executando'
+            """,
+            (max(0.0, min(1.0, float(progresso))), mensagem, int(job_id)),
+        )
+        conn.commit()
+        cur.close()
+
+
+def registrar_resultado_parcial(job_id: int, resultado: dict) -> None:
+    """Grava o progresso durável do job em ``resultado`` (mantido ao retomar)."""
+    with db_connect("job") as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            UPDATE jobs SET resultado = %s::jsonb, atualizado_em = CURRENT_TIMESTAMP
+            WHERE id = %s AND status = 'executando'
+            """,
+            (json.dumps(resultado), int(job_id)),
+        )
+        conn.commit()
+        cur.close()
+
+
+def finalizar_job(job_id: int, *, resultado: Optional[dict] = None, erro: Optional[str] = None) -> None:
+    """Marca ``concluido`` (com ``resultado``) ou ``falhou`` (com ``erro``)."""
+    with db_connect("job") as conn:
+        cur = conn.cursor()
+        if erro is None:
+            cur.execute(
+                """
+                UPDATE jobs SET status = 'concluido', progresso = 1, resultado = %s::jsonb,
+                       finalizado_em = CURRENT_TIMESTAMP, atualizado_em = CURRENT_TIMESTAMP
+                WHERE id = %s
+                """,
+                (json.dumps(resultado or {}), int(job_id)),
+            )
+        else:
+            cur.execute(
+                """
+                UPDATE jobs SET status = 'falhou', erro = %s,
+                       finalizado_em = CURRENT_TIMESTAMP, atualizado_em = CURRENT_TIMESTAMP
+                WHERE id = %s
+                """,
+                (str(erro)[:2000], int(job_id)),
+            )
+        conn.commit()
+        cur.close()
+
+
+def get_job(job_id: int) -> Optional[dict]:
+    with db_connect() as conn:
+        if not table_exists(conn, "jobs"):
+            return None
+        cur = conn.cursor()
+        cur.execute(f"SELECT {_COLUNAS} FROM jobs WHERE id = %s", (int(job_id),))
+        row = cur.fetchone()
+        cur.close()
+    return dict(row) if row else None
+
+
+def existe_job_ativo() -> bool:
+    with db_connect() as conn:
+        if not table_exists(conn, "jobs"):
+            return False
+        cur = conn.cursor()
+        cur.execute("SELECT 1 FROM jobs WHERE status IN ('pendente', 'executando') LIMIT 1")
+        row = cur.fetchone()
+        cur.close()
+    return row is not None
+
+
+def limpar_jobs_antigos(dias: int) -> int:
+    """Remove jobs encerrados há mais de ``dias``; retorna quantos saíram."""
+    with db_connect("job") as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            DELETE FROM jobs
+            WHERE status IN ('concluido', 'falhou')
+              AND finalizado_em < CURRENT_TIMESTAMP - make_interval(days => %s)
+            """,
+            (int(dias),),
+        )
+        removidos = int(cur.rowcount or 0)
+        conn.commit()
+        cur.close()
+    return removidos
+
+
+__all__ = [
+    "STATUS_ATIVOS",
+    "atualizar_progresso",
+    "enfileirar_job",
+    "existe_job_ativo",
+    "finalizar_job",
+    "get_job",
+    "liberar_temporada",
+    "limpar_jobs_antigos",
+    "registrar_resultado_parcial",
+    "reservar_job",
+]
@@ -8,7 +8,8 @@ from typing import Optional
 
 import pandas as pd
 
-from db.db_schema import db_connect, get_table_columns
+from db.audit_sink import registrar_evento
+from db.db_schema import db_connect
 
 logger = logging.getLogger(__name__)
 
@@ -45,39 +46,25 @@ def registrar_log_aposta(
 
 		data_txt = horario_dt.strftime("%Y-%m-%d")
 
-		with db_connect() as conn:
-			cur = conn.cursor()
-			cols = get_table_columns(conn, "log_apostas")
-			if not cols:
-				cur.close()
-				return
-			cur.execute(
-				"""
-				INSERT INTO log_apostas
-					(usuario_id, prova_id, apostador, aposta, nome_prova,
-					 pilotos, piloto_11, tipo_aposta, automatica, data, horario,
-					 ip_address, temporada, status)
-				VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-				""",
-				(
-					usuario_id,
-					prova_id,
-					apostador,
-					aposta,
-					nome_prova,
-					pilotos,
-					piloto_11,
-					tipo_aposta,
-					automatica,
-					data_txt,
-					horario_dt,
-					ip_address,
-					temporada,
-					status,
-				),
-			)
-			cur.close()
-			conn.commit()
+		registrar_evento(
+			"log_apostas",
+			{
+				"usuario_id": usuario_id,
+				"prova_id": prova_id,
+				"apostador": apostador,
+				"aposta": aposta,
+				"nome_prova": nome_prova,
+				"pilotos": pilotos,
+				"piloto_11": piloto_11,
+				"tipo_aposta": tipo_aposta,
+				"automatica": automatica,
+				"data": data_txt,
+				"horario": horario_dt,
+				"ip_address": ip_address,
+				"temporada": temporada,
+				"status": status,
+			},
+		)
 	except Exception as exc:
 		logger.debug("registrar_log_aposta falhou: %s", exc)
 
@@ -8,6 +8,7 @@ from typing import Optional
 import pandas as pd
 
 from db.db_schema import db_connect, get_table_columns
+from db.repo_user_seasons import atualizar_usuario_temporadas
 from utils.cache_utils import clear_data_cache
 
 logger = logging.getLogger(__name__)
@@ -162,6 +163,7 @@ def add_prova(
             else:
                 cur.execute("INSERT INTO provas (nome,data,horario_prova,tipo,status,temporada) VALUES (%s,%s,%s,%s,%s,%s)", (nome,data,horario_prova,tipo,status,temporada))
             cur.close()
+            atualizar_usuario_temporadas(conn)
             conn.commit()
         clear_data_cache("provas")
         return True
@@ -184,6 +186,8 @@ def update_prova(prova_id: int, **campos) -> bool:
             cur = conn.cursor()
             cur.execute(f"UPDATE provas SET {set_clause} WHERE id = %s", values)
             cur.close()
+            if {"temporada", "data"} & set(campos):
+                atualizar_usuario_temporadas(conn)
             conn.commit()
         clear_data_cache("provas")
         return True
@@ -198,6 +202,7 @@ def delete_prova(prova_id: int) -> bool:
             cur = conn.cursor()
             cur.execute("DELETE FROM provas WHERE id = %s", (prova_id,))
             cur.close()
+            atualizar_usuario_temporadas(conn)
             conn.commit()
         clear_data_cache("provas")
         return True
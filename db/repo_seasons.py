@@ -0,0 +1,54 @@
+"""Repositório do catálogo de temporadas.
+
+A tabela ``temporadas`` é garantida pela migration
+(``create_temporadas_table``); aqui só há leitura simples e o registro de uma
+nova temporada, que invalida a tag de cache ``temporadas``.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+
+from db.db_schema import db_connect, table_exists
+from utils.cache_utils import clear_data_cache
+
+
+def list_temporadas() -> list[str]:
+    """Temporadas cadastradas, em ordem; vazio se a tabela ainda não existe."""
+    with db_connect() as conn:
+        if not table_exists(conn, "temporadas"):
+            return []
+        c = conn.cursor()
+        c.execute("SELECT temporada FROM temporadas ORDER BY temporada")
+        rows = c.fetchall() or []
+        c.close()
+    return [str(r["temporada"]) for r in rows if r and r["temporada"]]
+
+
+def proxima_temporada(seasons: list[str]) -> str:
+    if seasons:
+        try:
+            return str(max(int(t) for t in seasons) + 1)
+        except Exception:
+            return str(datetime.now().year + 1)
+    return str(datetime.now().year)
+
+
+def create_next_temporada() -> str:
+    next_year = proxima_temporada(list_temporadas())
+    with db_connect() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            INSERT INTO temporadas (temporada)
+            VALUES (%s)
+            ON CONFLICT (temporada) DO NOTHING
+            """,
+            (next_year,),
+        )
+        conn.commit()
+    clear_data_cache("temporadas")
+    return next_year
+
+
+__all__ = ["create_next_temporada", "list_temporadas", "proxima_temporada"]
@@ -0,0 +1,67 @@
+"""Repositório da classificação acumulada por temporada e prova."""
+
+from __future__ import annotations
+
+import pandas as pd
+
+from db.db_schema import db_connect
+from utils.cache_utils import clear_data_cache
+from utils.dataframe_contracts import CLASSIFICACAO_TEMPORADA_COLUMNS
+
+
+def _query_to_df(query: str, params: tuple | None = None) -> pd.DataFrame:
+    with db_connect() as conn:
+        cur = conn.cursor()
+        cur.execute(query, params or ())
+        rows = cur.fetchall() or []
+        if not rows:
+            col_names = [desc[0] for desc in (cur.description or [])]
+            cur.close()
+            return pd.DataFrame(columns=col_names)
+        cur.close()
+    return pd.DataFrame([dict(r) for r in rows])
+
+
+def _valor_sql(valor):
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return None
+    return valor.item() if hasattr(valor, "item") else valor
+
+
+def get_classificacao_temporada_df(temporada: str) -> pd.DataFrame:
+    """Classificação acumulada de todas as provas da temporada, em ordem."""
+    return _query_to_df(
+        "SELECT * FROM classificacao_temporada WHERE temporada = %s ORDER BY ordem_prova, posicao",
+        (str(temporada),),
+    )
+
+
+def substituir_classificacao_temporada(temporada: str, classificacao_df: pd.DataFrame) -> None:
+    """Regrava atomicamente a classificação derivada de uma temporada."""
+    colunas = list(CLASSIFICACAO_TEMPORADA_COLUMNS)
+    registros = []
+    if not classificacao_df.empty:
+        dados = classificacao_df.reindex(columns=colunas)
+        registros = [
+            tuple(_valor_sql(valor) for valor in linha)
+            for linha in dados.itertuples(index=False, name=None)
+        ]
+
+    with db_connect("job") as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM classificacao_temporada WHERE temporada = %s", (str(temporada),))
+        if registros:
+            placeholders = ", ".join(["%s"] * len(colunas))
+            cur.executemany(
+                f"INSERT INTO classificacao_temporada ({', '.join(colunas)}) VALUES ({placeholders})",
+                registros,
+            )
+        conn.commit()
+        cur.close()
+    clear_data_cache("classificacao", "historico")
+
+
+__all__ = [
+    "get_classificacao_temporada_df",
+    "substituir_classificacao_temporada",
+]
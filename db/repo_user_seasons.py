@@ -0,0 +1,175 @@
+"""Repositório das temporadas liberadas para cada participante.
+
+``usuario_temporadas`` guarda, por (usuario_id, temporada), as temporadas que
+o participante pode consultar. A regra é a mesma da inferência antiga:
+
+- temporadas (de ``provas``) que cruzam um período ``ativo`` do histórico de
+  status; sem histórico, todas as temporadas para quem está ``ativo``;
+- para quem nunca esteve ativo, as temporadas em que houve atividade
+  (``apostas``, ``log_apostas`` e ``posicoes_participantes``).
+
+O recálculo é feito por participante a cada aposta salva e mudança de status,
+e para todos quando provas mudam ou o job de classificação termina. A leitura
+usada na autorização e no menu é uma busca pela chave primária.
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+from db.db_schema import db_connect, get_table_columns, table_exists
+
+_TEMPORADA_PROVA = "COALESCE(NULLIF(trim(temporada),''), substr(data,1,4))"
+
+_RECALCULO_SQL = """
+    WITH base AS (
+        SELECT DISTINCT {temporada_prova} AS t
+        FROM provas
+        WHERE {temporada_prova} IS NOT NULL
+    ),
+    por_status AS (
+        {por_status}
+    ),
+    atividade AS (
+        {atividade}
+    ),
+    liberadas AS (
+        SELECT usuario_id, t, 'status' AS origem FROM por_status
+        UNION
+        SELECT a.usuario_id, a.t, 'atividade'
+        FROM atividade a
+        WHERE a.t IS NOT NULL AND a.t <> ''
+          AND EXISTS (SELECT 1 FROM base)
+          AND NOT EXISTS (SELECT 1 FROM por_status s WHERE s.usuario_id = a.usuario_id)
+    )
+    INSERT INTO usuario_temporadas (usuario_id, temporada, origem, atualizado_em)
+    SELECT l.usuario_id, l.t, l.origem, CURRENT_TIMESTAMP
+    FROM liberadas l
+    JOIN usuarios u ON u.id = l.usuario_id
+    ON CONFLICT (usuario_id, temporada) DO UPDATE SET
+        origem = EXCLUDED.origem,
+        atualizado_em = CURRENT_TIMESTAMP
+"""
+
+_POR_HISTORICO_SQL = """
+        SELECT DISTINCT h.usuario_id, b.t
+        FROM base b
+        JOIN usuarios_status_historico h
+          ON lower(trim(coalesce(h.status,''))) = 'ativo'
+         AND h.inicio_em <= (b.t || '-12-31 23:59:59')::timestamp
+         AND (h.fim_em IS NULL OR h.fim_em >= (b.t || '-01-01 00:00:00')::timestamp)
+        WHERE TRUE {filtro_h}
+"""
+
+_POR_STATUS_ATUAL_SQL = """
+        SELECT u.id AS usuario_id, b.t
+        FROM usuarios u
+        CROSS JOIN base b
+        WHERE lower(trim(coalesce(u.status,''))) = 'ativo' {filtro_u}
+"""
+
+
+def _filtro(coluna: str, usuario_id: Optional[int]) -> str:
+    return f"AND {coluna} = %(usuario_id)s" if usuario_id is not None else ""
+
+
+def _atividade_sql(conn, usuario_id: Optional[int]) -> str:
+    partes = [
+        "SELECT usuario_id, trim(coalesce(CAST(temporada AS TEXT),'')) AS t FROM apostas "
+        f"WHERE usuario_id IS NOT NULL {_filtro('usuario_id', usuario_id)}"
+    ]
+    if table_exists(conn, "log_apostas"):
+        log_cols = set(get_table_columns(conn, "log_apostas"))
+        user_col = "usuario_id" if "usuario_id" in log_cols else ("user_id" if "user_id" in log_cols else None)
+        exprs = []
+        if "temporada" in log_cols:
+            exprs.append("NULLIF(trim(coalesce(CAST(temporada AS TEXT),'')),'')")
+        if "data" in log_cols:
+            exprs.append("NULLIF(trim(substr(coalesce(CAST(data AS TEXT),''),1,4)),'')")
+        if user_col and exprs:
+            partes.append(
+                f"SELECT {user_col} AS usuario_id, COALESCE({', '.join(exprs)}) AS t FROM log_apostas "
+                f"WHERE {user_col} IS NOT NULL {_filtro(user_col, usuario_id)}"
+            )
+    if table_exists(conn, "posicoes_participantes"):
+        partes.append(
+            "SELECT usuario_id, trim(coalesce(CAST(temporada AS TEXT),'')) AS t FROM posicoes_participantes "
+            f"WHERE usuario_id IS NOT NULL {_filtro('usuario_id', usuario_id)}"
+        )
+    return "\n        UNION\n        ".join(partes)
+
+
+def atualizar_usuario_temporadas(conn, usuario_id: Optional[int] = None) -> None:
+    """Recalcula as temporadas liberadas na transação corrente (sem commit).
+
+    Com ``usuario_id`` o recálculo fica restrito ao participante, que é o
+    caminho usado a cada aposta salva e mudança de status.
+    """
+    if not table_exists(conn, "usuario_temporadas"):
+        return
+    params = {"usuario_id": int(usuario_id)} if usuario_id is not None else {}
+    if table_exists(conn, "usuarios_status_historico"):
+        por_status = _POR_HISTORICO_SQL.format(filtro_h=_filtro("h.usuario_id", usuario_id))
+    else:
+        por_status = _POR_STATUS_ATUAL_SQL.format(filtro_u=_filtro("u.id", usuario_id))
+    cur = conn.cursor()
+    cur.execute(
+        f"DELETE FROM usuario_temporadas WHERE TRUE {_filtro('usuario_id', usuario_id)}",
+        params,
+    )
+    cur.execute(
+        _RECALCULO_SQL.format(
+            temporada_prova=_TEMPORADA_PROVA,
+            por_status=por_status,
+            atividade=_atividade_sql(conn, usuario_id),
+        ),
+        params,
+    )
+    cur.close()
+
+
+def garantir_usuario_temporada(conn, usuario_id: int, temporada: str) -> None:
+    """Após uma aposta: recalcula o participante só se o par ainda não existe (sem commit)."""
+    if not table_exists(conn, "usuario_temporadas"):
+        return
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT 1 FROM usuario_temporadas WHERE usuario_id = %s AND temporada = %s",
+        (int(usuario_id), str(temporada).strip()),
+    )
+    existe = cur.fetchone() is not None
+    cur.close()
+    if not existe:
+        atualizar_usuario_temporadas(conn, usuario_id)
+
+
+def recalcular_usuario_temporadas() -> None:
+    """Recalcula todos os participantes em transação própria (job de classificação)."""
+    with db_connect("job") as conn:
+        if not table_exists(conn, "usuario_temporadas"):
+            return
+        atualizar_usuario_temporadas(conn)
+        conn.commit()
+
+
+def get_temporadas_liberadas(usuario_id: int) -> Optional[list[str]]:
+    """Temporadas do participante, ou ``None`` se a tabela ainda não existe."""
+    with db_connect() as conn:
+        if not table_exists(conn, "usuario_temporadas"):
+            return None
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT temporada FROM usuario_temporadas WHERE usuario_id = %s ORDER BY temporada",
+            (int(usuario_id),),
+        )
+        rows = cur.fetchall() or []
+        cur.close()
+    return [str(r["temporada"]) for r in rows]
+
+
+__all__ = [
+    "atualizar_usuario_temporadas",
+    "garantir_usuario_temporada",
+    "get_temporadas_liberadas",
+    "recalcular_usuario_temporadas",
+]
@@ -10,6 +10,7 @@ import bcrypt
 import pandas as pd
 
 from db.db_schema import db_connect, get_table_columns, table_exists
+from db.repo_user_seasons import atualizar_usuario_temporadas, get_temporadas_liberadas
 from utils.cache_utils import clear_data_cache
 
 logger = logging.getLogger(__name__)
@@ -174,7 +175,7 @@ def update_user_password(user_id: int, nova_senha: str, must_change_password: bo
                     "UPDATE usuarios SET senha_hash = %s, session_version=COALESCE(session_version,0)+1 WHERE id = %s",
                     (senha_hash, user_id),
                 )
-            cur.execute("UPDATE auth_sessions SET revoked_at=CURRENT_TIMESTAMP WHERE user_id=%s AND revoked_at IS NULL", (user_id,))
+            cur.execute("UPDATE auth_sessions SET revoked_at=CURRENT_TIMESTAMP WHERE user_id=%s AND revoked_at IS NULL AND expires_at>CURRENT_TIMESTAMP", (user_id,))
             cur.close()
             conn.commit()
         clear_data_cache("usuarios", "classificacao")
@@ -199,6 +200,8 @@ def update_usuario(user_id: int, **campos) -> bool:
             cur = conn.cursor()
             cur.execute(f"UPDATE usuarios SET {set_clause} WHERE id = %s", values)
             cur.close()
+            if "status" in campos:
+                atualizar_usuario_temporadas(conn, user_id)
             conn.commit()
         clear_data_cache("usuarios", "classificacao")
         return True
@@ -283,11 +286,21 @@ def registrar_historico_status_usuario(
             (usuario_id, novo_status, data_referencia, alterado_por, motivo),
         )
         cursor.close()
+        atualizar_usuario_temporadas(conn, usuario_id)
         conn.commit()
     clear_data_cache("usuarios", "classificacao")
 
 
 def get_usuario_temporadas_ativas(user_id: int) -> list[str]:
+    """Temporadas liberadas para o participante (busca por chave em ``usuario_temporadas``)."""
+    temporadas = get_temporadas_liberadas(int(user_id))
+    if temporadas is not None:
+        return temporadas
+    return _inferir_usuario_temporadas(int(user_id))
+
+
+def _inferir_usuario_temporadas(user_id: int) -> list[str]:
+    """Inferência direta nas tabelas de origem, para bancos ainda sem a migration."""
     def _infer_por_atividade(user_id: int) -> list[str]:
         temporadas: set[str] = set()
         df = _query_to_df(
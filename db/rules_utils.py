@@ -6,6 +6,7 @@ import logging
 import json
 from typing import Optional
 from db.connection_pool import get_pool
+from db.db_schema import db_connect
 from utils.cache_utils import clear_data_cache
 
 logger = logging.getLogger(__name__)
@@ -214,7 +215,7 @@ def get_regra_by_id(regra_id: int) -> Optional[dict]:
 
 def get_regra_by_nome(nome_regra: str) -> Optional[dict]:
     """Retorna uma regra pelo nome"""
-    with get_pool().get_connection() as conn:
+    with db_connect() as conn:
         c = conn.cursor()
         c.execute('SELECT * FROM regras WHERE nome_regra = %s', (nome_regra,))
         row = c.fetchone()
@@ -305,7 +306,7 @@ def associar_regra_temporada(temporada: str, regra_id: int) -> bool:
 
 def get_regra_temporada(temporada: str) -> Optional[dict]:
     """Retorna a regra associada a uma temporada"""
-    with get_pool().get_connection() as conn:
+    with db_connect() as conn:
         c = conn.cursor()
         c.execute('''
             SELECT r.* FROM regras r
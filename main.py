@@ -268,7 +268,8 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # ============ INICIALIZAÇÃO DO BANCO ============
-from db.repo_users import get_user_by_id, get_usuario_temporadas_ativas
+from db.repo_users import get_user_by_id
+from services.season_catalog import get_usuario_temporadas_ativas
 from db.migrations import run_migrations
 from db.db_schema import clear_schema_cache
 from db.master_user_manager import MasterUserManager
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""Worker da fila de jobs (recálculo de classificação e publicação de resultado).
+
+Uso:
+  BF1_JOBS_MODE=external DATABASE_URL=postgresql://... python scripts/job_worker.py
+  python scripts/job_worker.py --once   # drena a fila e sai (cron, testes manuais)
+
+Com ``BF1_JOBS_MODE=external`` no processo web, os jobs enfileirados pela UI
+só rodam aqui. A imagem da classificação não é pré-renderizada neste processo
+(o processo web não enxergaria os bytes); a tela a prepara sob demanda. O worker usa o mesmo ``DATABASE_URL`` e as migrations já
+aplicadas pelo app; várias instâncias podem rodar juntas, pois cada job
+reserva a sua temporada com advisory lock.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import signal
+import sys
+import threading
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--interval", type=float, default=5.0, help="segundos entre verificações da fila")
+    parser.add_argument("--once", action="store_true", help="executa os jobs pendentes e sai")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    from services.image_render_service import desativar_pre_renderizacao
+    from services.job_runner import executar_pendentes, run_worker
+
+    desativar_pre_renderizacao()
+
+    if args.once:
+        logging.getLogger("bf1.jobs").info("%s job(s) executado(s)", executar_pendentes())
+        return
+
+    parar = threading.Event()
+    for sinal in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sinal, lambda *_: parar.set())
+    run_worker(args.interval, parar)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""Benchmark histórico das funções de serviço reais.
+
+Uso:
+  BENCHMARK_DATABASE_URL=postgresql://.../bf1_bench \\
+      python scripts/service_benchmark.py --seasons 6 --output bench-$(git rev-parse --short HEAD).json
+  python scripts/service_benchmark.py --reuse --compare bench-anterior.json
+
+Diferente de ``performance_benchmark.py`` (SQL escrito à mão sobre um schema
+sintético), este script cria o schema pelas migrations reais, semeia várias
+temporadas e mede os caminhos que a aplicação executa: pontuação em lote,
+job de classificação, envio de aposta, resumo do Histórico, dump data-only e
+as fachadas com cache. SMTP e contexto Ergast são stubs locais e o Gemini fica
+desligado (``GEMINI_API_KEY`` vazia), então nada sai da máquina.
+
+O banco precisa ser dedicado: o app procura tabelas em ``public``, então não
+há schema temporário. Um banco com tabelas é recusado, salvo ``--reuse``
+(reaproveita uma semeadura feita com ``--keep``). Sem ``--keep`` o schema
+``public`` é recriado vazio ao final.
+
+Para cada workload o relatório JSON traz p50/p95 (ms), consultas e linhas por
+chamada (métricas de ``utils.performance.journey``) e o pico de memória
+Python (``tracemalloc``, em uma passada separada para não distorcer o tempo).
+``--compare`` aponta regressões contra um relatório anterior e sai com
+código 1 quando houver alguma.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import secrets
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import ExitStack
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable
+from unittest.mock import patch
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+PILOTOS = [
+    ("Max Verstappen", "Red Bull"), ("Yuki Tsunoda", "Red Bull"),
+    ("Lando Norris", "McLaren"), ("Oscar Piastri", "McLaren"),
+    ("Charles Leclerc", "Ferrari"), ("Lewis Hamilton", "Ferrari"),
+    ("George Russell", "Mercedes"), ("Kimi Antonelli", "Mercedes"),
+    ("Fernando Alonso", "Aston Martin"), ("Lance Stroll", "Aston Martin"),
+    ("Pierre Gasly", "Alpine"), ("Franco Colapinto", "Alpine"),
+    ("Alex Albon", "Williams"), ("Carlos Sainz", "Williams"),
+    ("Esteban Ocon", "Haas"), ("Oliver Bearman", "Haas"),
+    ("Nico Hulkenberg", "Sauber"), ("Gabriel Bortoleto", "Sauber"),
+    ("Isack Hadjar", "Racing Bulls"), ("Liam Lawson", "Racing Bulls"),
+]
+FICHAS_POR_APOSTA = 15
+
+
+def percentile(values: list[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round((len(ordered) - 1) * p)))]
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def _configurar_ambiente(url: str) -> None:
+    # db_config e auth_service leem o ambiente na importação.
+    os.environ["DATABASE_URL"] = url
+    os.environ.pop("DATABASE_REPLICA_URL", None)
+    os.environ.setdefault("JWT_SECRET", secrets.token_hex(32))
+    os.environ["GEMINI_API_KEY"] = ""
+    os.environ["PERFORMANCE_PROFILE_THRESHOLD_MS"] = "0"
+    os.environ["PERFORMANCE_PROFILE_SAMPLE_RATE"] = "0"
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger("bf1.performance").setLevel(logging.WARNING)
+
+
+class _SMTPStub:
+    """Substitui ``smtplib.SMTP_SSL``: guarda as mensagens em memória."""
+
+    enviados: list[tuple[str, list[str]]] = []
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_SMTPStub":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+    def login(self, *args: Any) -> None:
+        return None
+
+    def sendmail(self, remetente: str, destinatarios: list[str], mensagem: str) -> None:
+        self.enviados.append((remetente, list(destinatarios)))
+
+
+def _stubs_externos(stack: ExitStack) -> None:
+    stack.enter_context(patch("smtplib.SMTP_SSL", _SMTPStub))
+    stack.enter_context(patch("services.email_service.EMAIL_REMETENTE", "bench@example.test"))
+    stack.enter_context(patch("services.email_service.SENHA_REMETENTE", "bench"))
+    stack.enter_context(patch("services.bets_write._get_contexto_temporada_atual_ergast", return_value={}))
+
+
+def _banco_vazio(url: str) -> bool:
+    import psycopg
+
+    with psycopg.connect(url, autocommit=True) as conn:
+        row = conn.execute(
+            "SELECT count(*) FROM information_schema.tables WHERE table_schema = 'public'"
+        ).fetchone()
+    return not row or int(row[0]) == 0
+
+
+def _recriar_public(url: str) -> None:
+    import psycopg
+
+    with psycopg.connect(url, autocommit=True) as conn:
+        conn.execute("DROP SCHEMA public CASCADE")
+        conn.execute("CREATE SCHEMA public")
+
+
+def _aposta_aleatoria(rng: random.Random) -> tuple[list[str], list[int], str]:
+    quantidade = rng.randint(3, 5)
+    pilotos = rng.sample([nome for nome, _ in PILOTOS], quantidade + 1)
+    cortes = sorted(rng.sample(range(1, FICHAS_POR_APOSTA), quantidade - 1))
+    fichas = [b - a for a, b in zip([0, *cortes], [*cortes, FICHAS_POR_APOSTA])]
+    return pilotos[:quantidade], fichas, pilotos[quantidade]
+
+
+def semear(args: argparse.Namespace) -> dict[str, Any]:
+    """Schema pelas migrations reais e dados de ``args.seasons`` temporadas."""
+    from db.db_schema import clear_schema_cache, db_connect
+    from db.migrations import run_migrations
+    from db.rules_utils import associar_regra_temporada, criar_regra_padrao, get_regra_by_nome, init_rules_table
+
+    # O app sempre teve a tabela de regras do rules_utils; init_db só cria a legada.
+    init_rules_table()
+    run_migrations()
+    clear_schema_cache()
+    criar_regra_padrao()
+    regra_id = int(get_regra_by_nome("Padrão BF1")["id"])
+
+    rng = random.Random(args.seed)
+    atual = datetime.now().year
+    temporadas = [str(ano) for ano in range(atual - args.seasons + 1, atual + 1)]
+    hoje = datetime.now().date()
+    with db_connect("job") as conn:
+        cur = conn.cursor()
+        cur.executemany(
+            "INSERT INTO usuarios (nome, email, senha_hash, perfil, status) VALUES (%s, %s, %s, %s, 'ativo')",
+            [("Master Bench", "master@bench.test", "x", "master")]
+            + [(f"Participante {i}", f"p{i}@bench.test", "x", "participante") for i in range(1, args.users + 1)],
+        )
+        cur.executemany(
+            "INSERT INTO pilotos (nome, equipe, status, numero) VALUES (%s, %s, 'Ativo', %s)",
+            [(nome, equipe, i + 1) for i, (nome, equipe) in enumerate(PILOTOS)],
+        )
+        cur.execute("SELECT id FROM usuarios WHERE perfil = 'participante' ORDER BY id")
+        participantes = [int(r["id"]) for r in cur.fetchall()]
+        provas_futuras: list[int] = []
+        for temporada in temporadas:
+            inicio = datetime(int(temporada), 3, 1).date()
+            for numero in range(args.races):
+                data = inicio + timedelta(days=7 * numero)
+                if temporada == str(atual):
+                    # Temporada corrente: metade já corrida, o resto aberto para apostas.
+                    data = hoje + timedelta(days=7 * (numero - args.races // 2) + 3)
+                tipo = "Sprint" if numero % 4 == 3 else "Normal"
+                cur.execute(
+                    """
+                    INSERT INTO provas (nome, data, horario_prova, tipo, status, temporada)
+                    VALUES (%s, %s, '15:00', %s, 'Ativo', %s) RETURNING id
+                    """,
+                    (f"GP {numero + 1} {temporada}", data.isoformat(), tipo, temporada),
+                )
+                prova_id = int(cur.fetchone()["id"])
+                if data >= hoje:
+                    provas_futuras.append(prova_id)
+                    continue
+                apostas = []
+                for usuario_id in participantes:
+                    pilotos, fichas, piloto_11 = _aposta_aleatoria(rng)
+                    apostas.append((
+                        usuario_id, prova_id, f"{data.isoformat()}T10:00:00", ",".join(pilotos),
+                        ",".join(map(str, fichas)), piloto_11, f"GP {numero + 1} {temporada}", temporada,
+                    ))
+                cur.executemany(
+                    """
+                    INSERT INTO apostas
+                        (usuario_id, prova_id, data_envio, pilotos, fichas, piloto_11, nome_prova, automatica, temporada)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, 0, %s)
+                    """,
+                    apostas,
+                )
+                grid = [nome for nome, _ in PILOTOS]
+                rng.shuffle(grid)
+                abandonos = grid[-rng.randint(1, 2):] if rng.random() < .5 else []
+                cur.execute(
+                    "INSERT INTO resultados (prova_id, posicoes, abandono_pilotos) VALUES (%s, %s, %s)",
+                    (prova_id, repr({i + 1: nome for i, nome in enumerate(grid)}), ",".join(abandonos)),
+                )
+        conn.commit()
+        cur.close()
+    for temporada in temporadas:
+        associar_regra_temporada(temporada, regra_id)
+    return {"temporadas": temporadas, "participantes": participantes, "provas_futuras": provas_futuras}
+
+
+def _autenticar(perfil: str) -> None:
+    import app_runtime
+    from db.db_schema import db_connect
+    from services.auth_service import generate_token
+
+    with db_connect() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT id, nome, perfil, status FROM usuarios WHERE perfil = %s ORDER BY id LIMIT 1", (perfil,))
+        usuario = cur.fetchone()
+        cur.close()
+    token = generate_token(int(usuario["id"]), usuario["nome"], usuario["perfil"], usuario["status"])
+    app_runtime.bind_runtime({"token": token}, headers={}, direct_ip="127.0.0.1")
+
+
+def _workloads(dados: dict[str, Any]) -> dict[str, tuple[Callable[[int], Any], str]]:
+    """Nome -> (função da iteração, perfil autenticado)."""
+    from db.backup_utils import _build_data_only_sql
+    from services.bets_scoring import atualizar_classificacoes_todas_as_provas, calcular_pontuacao_lote
+    from services.bets_write import salvar_aposta
+    from services.data_access_apostas import get_apostas_df
+    from services.data_access_provas import get_provas_df, get_resultados_df
+    from services.historico_service import calcular_resumo_historico
+    from utils.cache_utils import clear_data_cache
+
+    temporada = dados["temporadas"][-1]
+    participantes = dados["participantes"]
+    prova_aberta = dados["provas_futuras"][0]
+    frames: dict[str, Any] = {}
+
+    def pontuacao_lote(_: int) -> Any:
+        if not frames:
+            frames.update(ap=get_apostas_df(), res=get_resultados_df(), prov=get_provas_df())
+        return calcular_pontuacao_lote(frames["ap"], frames["res"], frames["prov"])
+
+    def aposta(i: int) -> Any:
+        rng = random.Random(i)
+        pilotos, fichas, piloto_11 = _aposta_aleatoria(rng)
+        return salvar_aposta(
+            participantes[0], prova_aberta, pilotos, fichas, piloto_11, "", temporada=temporada, show_errors=False
+        )
+
+    def apostas_frio(_: int) -> Any:
+        clear_data_cache("apostas")
+        return get_apostas_df(temporada)
+
+    return {
+        "calcular_pontuacao_lote": (pontuacao_lote, "master"),
+        "atualizar_classificacoes_todas_as_provas": (
+            lambda _: atualizar_classificacoes_todas_as_provas(temporada), "master"
+        ),
+        "salvar_aposta": (aposta, "participante"),
+        "calcular_resumo_historico": (
+            lambda i: calcular_resumo_historico(participantes[i % len(participantes)]), "participante"
+        ),
+        "build_data_only_sql": (lambda _: _build_data_only_sql(), "master"),
+        "get_apostas_df_frio": (apostas_frio, "participante"),
+        "get_apostas_df_quente": (lambda _: get_apostas_df(temporada), "participante"),
+    }
+
+
+def medir(nome: str, funcao: Callable[[int], Any], iteracoes: int, aquecimento: int) -> dict[str, Any]:
+    from utils.performance import journey
+
+    for i in range(aquecimento):
+        funcao(i)
+    tempos: list[float] = []
+    consultas: list[int] = []
+    linhas: list[int] = []
+    for i in range(iteracoes):
+        with journey(f"benchmark:{nome}") as metricas:
+            inicio = time.perf_counter()
+            funcao(i)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        consultas.append(metricas.queries)
+        linhas.append(metricas.rows)
+    # Passada separada: tracemalloc deixa o código bem mais lento.
+    tracemalloc.start()
+    try:
+        funcao(iteracoes)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "iterations": iteracoes,
+        "p50_ms": round(statistics.median(tempos), 2),
+        "p95_ms": round(percentile(tempos, .95), 2),
+        "mean_ms": round(statistics.fmean(tempos), 2),
+        "queries_per_call": round(statistics.fmean(consultas), 2),
+        "rows_per_call": round(statistics.fmean(linhas), 2),
+        "peak_memory_kb": round(pico / 1024, 1),
+    }
+
+
+def comparar(atual: dict[str, Any], anterior: dict[str, Any], tolerancia: float) -> list[dict[str, Any]]:
+    """Regressões de p95 (acima da tolerância e de 1 ms) e de consultas por chamada."""
+    regressoes = []
+    for nome, medida in atual["workloads"].items():
+        base = anterior.get("workloads", {}).get(nome)
+        if not base:
+            continue
+        if medida["p95_ms"] > base["p95_ms"] * (1 + tolerancia) and medida["p95_ms"] - base["p95_ms"] > 1:
+            regressoes.append({"workload": nome, "metric": "p95_ms", "before": base["p95_ms"], "after": medida["p95_ms"]})
+        if medida["queries_per_call"] > base.get("queries_per_call", medida["queries_per_call"]):
+            regressoes.append({
+                "workload": nome, "metric": "queries_per_call",
+                "before": base["queries_per_call"], "after": medida["queries_per_call"],
+            })
+    return regressoes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seasons", type=int, choices=range(1, 16), default=6)
+    parser.add_argument("--users", type=int, default=60)
+    parser.add_argument("--races", type=int, default=24)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=2026)
+    parser.add_argument("--only", action="append", default=[], help="roda só os workloads informados")
+    parser.add_argument("--output", help="grava o relatório JSON neste caminho")
+    parser.add_argument("--compare", help="relatório JSON anterior para detectar regressões")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--reuse", action="store_true", help="usa dados semeados por uma execução com --keep")
+    parser.add_argument("--keep", action="store_true", help="não limpa o banco ao final")
+    parser.add_argument("--allow-same-database", action="store_true")
+    args = parser.parse_args()
+
+    url = os.environ.get("BENCHMARK_DATABASE_URL", "").strip()
+    if not url:
+        raise SystemExit("BENCHMARK_DATABASE_URL e obrigatoria")
+    if url == os.environ.get("DATABASE_URL", "").strip() and not args.allow_same_database:
+        raise SystemExit("Banco de benchmark coincide com DATABASE_URL; use uma copia segura")
+    try:
+        vazio = _banco_vazio(url)
+    except ImportError as exc:
+        raise SystemExit("psycopg nao instalado; execute pip install -r requirements.txt") from exc
+    if not vazio and not args.reuse:
+        raise SystemExit("O banco de benchmark ja tem tabelas; use um banco vazio ou --reuse")
+
+    _configurar_ambiente(url)
+    from db.connection_pool import close_pool
+
+    semeado = vazio
+    regressoes: list[dict[str, Any]] = []
+    try:
+        with ExitStack() as stack:
+            _stubs_externos(stack)
+            if vazio:
+                dados = semear(args)
+                _autenticar("master")
+                from services.bets_scoring import atualizar_classificacoes_todas_as_provas
+
+                for temporada in dados["temporadas"]:
+                    atualizar_classificacoes_todas_as_provas(temporada)
+            else:
+                dados = _dados_existentes()
+            resultados: dict[str, Any] = {}
+            for nome, (funcao, perfil) in _workloads(dados).items():
+                if args.only and nome not in args.only:
+                    continue
+                _autenticar(perfil)
+                resultados[nome] = medir(nome, funcao, args.iterations, args.warmup)
+        relatorio: dict[str, Any] = {
+            "meta": {
+                "commit": _git_commit(),
+                "generated_at": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "dataset": {k: getattr(args, k) for k in ("seasons", "users", "races", "seed")},
+                "iterations": args.iterations,
+                "emails_stubbed": len(_SMTPStub.enviados),
+            },
+            "workloads": resultados,
+        }
+        if args.compare:
+            anterior = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+            regressoes = comparar(relatorio, anterior, args.tolerance)
+            relatorio["comparison"] = {
+                "baseline_commit": anterior.get("meta", {}).get("commit", ""),
+                "tolerance": args.tolerance,
+                "regressions": regressoes,
+            }
+        texto = json.dumps(relatorio, ensure_ascii=False, indent=2, sort_keys=True)
+        if args.output:
+            Path(args.output).write_text(texto + "\n", encoding="utf-8")
+        print(texto)
+    finally:
+        close_pool()
+        if semeado and not args.keep:
+            _recriar_public(url)
+    if regressoes:
+        raise SystemExit(1)
+
+
+def _dados_existentes() -> dict[str, Any]:
+    from db.db_schema import db_connect
+
+    with db_connect() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT DISTINCT temporada FROM provas ORDER BY temporada")
+        temporadas = [str(r["temporada"]) for r in cur.fetchall()]
+        cur.execute("SELECT id FROM usuarios WHERE perfil = 'participante' ORDER BY id")
+        participantes = [int(r["id"]) for r in cur.fetchall()]
+        cur.execute("SELECT id FROM provas WHERE data >= %s ORDER BY data, id", (datetime.now().date().isoformat(),))
+        provas_futuras = [int(r["id"]) for r in cur.fetchall()]
+        cur.close()
+    if not provas_futuras:
+        raise SystemExit("Dados reaproveitados sem prova aberta para apostas; semeie novamente")
+    return {"temporadas": temporadas, "participantes": participantes, "provas_futuras": provas_futuras}
+
+
+if __name__ == "__main__":
+    main()
@@ -6,9 +6,11 @@ usuario no banco. Campos enviados pela UI nunca constituem autoridade.
 
 from __future__ import annotations
 
+from contextlib import contextmanager
+from contextvars import ContextVar
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Callable, FrozenSet
+from typing import Callable, FrozenSet, Iterator, Optional
 
 
 class AuthenticationRequired(PermissionError):
@@ -68,6 +70,23 @@ OPERATION_ACCESS: dict[str, frozenset[str]] = {
 }
 
 
+_job_user: ContextVar[Optional[int]] = ContextVar("bf1_job_user", default=None)
+
+
+@contextmanager
+def job_identity(user_id: int) -> Iterator[None]:
+    """Executa um job em nome de quem o enfileirou.
+
+    Substitui apenas a origem do user_id (nao ha token fora da sessao web);
+    usuario, perfil e temporadas continuam revalidados no banco.
+    """
+    token = _job_user.set(int(user_id))
+    try:
+        yield
+    finally:
+        _job_user.reset(token)
+
+
 def authorize_context(context: AuthenticatedContext, allowed_roles: frozenset[str], *, season: str | None = None) -> None:
     if not context.ativo:
         raise AuthorizationDenied("Usuario inativo nao pode executar operacoes sensiveis.")
@@ -83,11 +102,14 @@ def resolve_authenticated_context() -> AuthenticatedContext:
     from db.repo_users import get_user_by_id, get_usuario_temporadas_ativas
     from services.auth_service import decode_token
 
-    token = get_session().get("token")
-    payload = decode_token(token) if token else None
-    if not payload or not payload.get("user_id"):
-        raise AuthenticationRequired("Sessao ausente ou invalida.")
-    user = get_user_by_id(int(payload["user_id"]))
+    user_id = _job_user.get()
+    if user_id is None:
+        token = get_session().get("token")
+        payload = decode_token(token) if token else None
+        if not payload or not payload.get("user_id"):
+            raise AuthenticationRequired("Sessao ausente ou invalida.")
+        user_id = int(payload["user_id"])
+    user = get_user_by_id(user_id)
     if not user:
         raise AuthenticationRequired("Usuario autenticado nao existe.")
     perfil = str(user.get("perfil", "participante")).strip().lower()
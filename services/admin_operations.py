@@ -5,6 +5,7 @@ from __future__ import annotations
 from typing import Iterable
 
 from db.db_schema import db_connect, get_table_columns
+from db.repo_hall import reconstruir_hall_da_fama_resumo
 from db.repo_races import add_piloto, add_prova, delete_piloto, delete_prova, update_piloto, update_prova
 from db.repo_users import delete_usuario, update_usuario
 from services.access_control import require_operation
@@ -113,6 +114,7 @@ def master_save_hall(entries: Iterable[tuple[int, int, float, str]]) -> int:
         return 0
     with db_connect() as conn:
         conn.cursor().executemany("""INSERT INTO hall_da_fama (usuario_id,posicao_final,pontos,temporada) VALUES (%s,%s,%s,%s) ON CONFLICT (usuario_id,temporada) DO UPDATE SET posicao_final=EXCLUDED.posicao_final,pontos=EXCLUDED.pontos""", values)
+        reconstruir_hall_da_fama_resumo(conn)
         conn.commit()
     clear_data_cache()
     return len(values)
@@ -122,6 +124,7 @@ def master_delete_hall(record_id: int) -> None:
     require_operation("hall_da_fama.write")
     with db_connect() as conn:
         conn.cursor().execute("DELETE FROM hall_da_fama WHERE id=%s", (int(record_id),))
+        reconstruir_hall_da_fama_resumo(conn)
         conn.commit()
     clear_data_cache()
 
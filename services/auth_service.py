@@ -8,7 +8,7 @@ import hmac
 import uuid
 
 # Funções de auth/usuário importadas dos módulos focados de dados.
-from db.db_schema import db_connect, get_table_columns
+from db.db_schema import db_connect, get_table_columns, hot_query
 from db.repo_users import hash_password, check_password, get_user_by_id
 from utils.cache_utils import clear_data_cache
 from utils.security_utils import normalize_email_identifier
@@ -140,7 +140,7 @@ def generate_token(user_id: int, nome: str, perfil: str, status: str) -> str:
         session_version = int(row["session_version"] or 0)
         # Rotacao: uma nova autenticacao encerra JTIs ativos anteriores.
         cursor.execute(
-            "UPDATE auth_sessions SET revoked_at=CURRENT_TIMESTAMP WHERE user_id=%s AND revoked_at IS NULL",
+            "UPDATE auth_sessions SET revoked_at=CURRENT_TIMESTAMP WHERE user_id=%s AND revoked_at IS NULL AND expires_at>CURRENT_TIMESTAMP",
             (int(user_id),),
         )
         cursor.execute(
@@ -163,6 +163,14 @@ def generate_token(user_id: int, nome: str, perfil: str, status: str) -> str:
         token = token.decode("utf-8")
     return token
 
+_SESSAO_VALIDA_SQL = hot_query(
+    """SELECT 1 FROM auth_sessions s JOIN usuarios u ON u.id=s.user_id
+       WHERE s.jti=%s AND s.user_id=%s AND s.revoked_at IS NULL
+         AND s.expires_at>CURRENT_TIMESTAMP
+         AND s.session_version=u.session_version AND s.session_version=%s LIMIT 1"""
+)
+
+
 def decode_token(token: str):
     """Decodifica e valida um JWT; retorna o payload, ou None se inválido/expirado."""
     try:
@@ -171,10 +179,7 @@ def decode_token(token: str):
         with db_connect() as conn:
             cursor = conn.cursor()
             cursor.execute(
-                """SELECT 1 FROM auth_sessions s JOIN usuarios u ON u.id=s.user_id
-                   WHERE s.jti=%s AND s.user_id=%s AND s.revoked_at IS NULL
-                     AND s.expires_at>CURRENT_TIMESTAMP
-                     AND s.session_version=u.session_version AND s.session_version=%s LIMIT 1""",
+                _SESSAO_VALIDA_SQL,
                 (str(payload["jti"]), int(payload["user_id"]), int(payload["sv"])),
             )
             if cursor.fetchone() is None:
@@ -252,7 +257,7 @@ def revoke_token(token: str | None) -> None:
         jti = payload.get("jti")
         if jti:
             with db_connect() as conn:
-                conn.cursor().execute("UPDATE auth_sessions SET revoked_at=CURRENT_TIMESTAMP WHERE jti=%s AND revoked_at IS NULL", (str(jti),))
+                conn.cursor().execute("UPDATE auth_sessions SET revoked_at=CURRENT_TIMESTAMP WHERE jti=%s AND revoked_at IS NULL AND expires_at>CURRENT_TIMESTAMP", (str(jti),))
                 conn.commit()
     except Exception as exc:
         logger.warning("Falha ao revogar token de sessao: %s", exc)
@@ -371,7 +376,7 @@ def redefinir_senha_com_token(email: str, token: str, nova_senha: str):
         else:
             c.execute(f"UPDATE usuarios SET {pwd_col}=%s, session_version=COALESCE(session_version,0)+1 WHERE email=%s", (senha_hashed, email))
 
-        c.execute("UPDATE auth_sessions SET revoked_at=CURRENT_TIMESTAMP WHERE user_id=(SELECT id FROM usuarios WHERE email=%s) AND revoked_at IS NULL", (email,))
+        c.execute("UPDATE auth_sessions SET revoked_at=CURRENT_TIMESTAMP WHERE user_id=(SELECT id FROM usuarios WHERE email=%s) AND revoked_at IS NULL AND expires_at>CURRENT_TIMESTAMP", (email,))
 
         conn.commit()
     clear_data_cache()
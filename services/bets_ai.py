@@ -483,10 +483,47 @@ def _gerar_aposta_gemini(
         return None
 
 
+def _comentar_aposta_gemini(
+    nome_prova: str,
+    tipo_prova: str,
+    pilotos: list[str],
+    fichas: list[int],
+    piloto_11: str,
+    ultimas_apostas: list[dict],
+    cenario: list[dict],
+) -> Optional[str]:
+    """Comentário curto sobre uma aposta já escolhida; ``None`` sem Gemini ou em falha."""
+    dados = {
+        "alvo": {"nome": nome_prova, "tipo": tipo_prova},
+        "aposta": {"pilotos": pilotos, "fichas": fichas, "piloto_11": piloto_11},
+        "ua": ultimas_apostas,
+        "cz": cenario,
+    }
+    try:
+        content = gerar_conteudo_gemini(
+            system_instruction=(
+                "Você comenta apostas de bolão de F1 em português do Brasil. "
+                "A aposta já está decidida: não sugira outra. "
+                "Responda em no máximo duas frases, sem markdown. "
+                "Legenda: ua=ultimas_apostas_do_usuario, cz=top3_resultados_recentes."
+            ),
+            prompt=_canonical_json(dados),
+            temperature=0.5,
+            max_output_tokens=120,
+            timeout_seconds=6.0,
+        )
+    except Exception as e:
+        logger.warning("Falha ao comentar aposta via Gemini: %s", e)
+        return None
+    texto = str(content or "").strip()
+    return texto or None
+
+
 __all__ = [
     "_extrair_json_texto",
     "_get_resumo_ultimas_apostas",
     "_get_resumo_cenario_campeonato",
     "_get_contexto_temporada_atual_ergast",
+    "_comentar_aposta_gemini",
     "_gerar_aposta_gemini",
 ]
@@ -0,0 +1,171 @@
+"""Distribuição ótima de fichas para as apostas geradas pelo sistema.
+
+Substitui o sorteio (e a espera pelo Gemini) do "Sem ideias" e da aposta
+automática sem aposta anterior por uma otimização local e determinística:
+
+- o valor esperado de cada ficha num piloto vem da matriz piloto x posição da
+  prova (``services.expected_points``): Σ P(posição) x pontos da posição,
+  com o fator de abandono da estimativa; a penalidade por abandono da regra
+  entra como custo fixo de incluir o piloto;
+- a escolha dos pilotos é uma mochila por grupos resolvida por programação
+  dinâmica — um grupo por equipe (no máximo um piloto por equipe quando a
+  regra não permite a mesma equipe), estado = (pilotos, fichas usadas) —,
+  respeitando total de fichas, limite por piloto e mínimo de pilotos;
+- o 11º é escolhido por branch-and-bound: candidatos em ordem de P(11º),
+  cada um excluído da aposta, parando quando nem o melhor cenário sem exclusão
+  supera a melhor combinação já encontrada.
+
+Sem dados suficientes (nenhum piloto ativo, regras impossíveis) devolve
+``None`` e quem chamou segue para o sorteio.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Optional
+
+import pandas as pd
+
+from services.expected_points import matriz_prova
+
+
+@dataclass(frozen=True)
+class SugestaoAposta:
+    pilotos: list[str]
+    fichas: list[int]
+    piloto_11: str
+    pontos_esperados: float
+
+
+@dataclass(frozen=True)
+class _ValorPiloto:
+    nome: str
+    equipe: str
+    por_ficha: float
+    custo: float
+    chance_11: float
+
+
+def _valores_pilotos(
+    pilotos_df: pd.DataFrame, regras: dict, tipo_prova: str, contexto_ergast: dict
+) -> tuple[list[_ValorPiloto], float]:
+    """Valor de cada piloto e o bônus do 11º, a partir da matriz da prova."""
+    nomes = [str(n).strip() for n in pilotos_df["nome"].tolist()]
+    equipes = pilotos_df["equipe"].fillna("").astype(str).tolist() if "equipe" in pilotos_df.columns else [""] * len(nomes)
+    matriz = matriz_prova(nomes, regras, tipo_prova, contexto_ergast)
+    por_ficha = matriz.esperado_por_ficha
+    custo = matriz.custo_abandono
+    chance_11 = matriz.chance_11
+
+    valores = []
+    for nome, equipe in zip(nomes, equipes):
+        linha = matriz.linha(nome)
+        if not nome or linha is None:
+            continue
+        valores.append(
+            _ValorPiloto(
+                nome=nome,
+                equipe=equipe.strip(),
+                por_ficha=float(por_ficha[linha]),
+                custo=float(custo[linha]),
+                chance_11=float(chance_11[linha]),
+            )
+        )
+    return valores, matriz.bonus_11
+
+
+def _melhor_distribuicao(
+    valores: list[_ValorPiloto],
+    *,
+    qtd_fichas: int,
+    fichas_max: int,
+    min_pilotos: int,
+    permite_mesma_equipe: bool,
+    excluir: str = "",
+) -> Optional[tuple[float, list[tuple[str, int]]]]:
+    grupos: dict[str, list[_ValorPiloto]] = {}
+    for v in valores:
+        if v.nome == excluir:
+            continue
+        chave = v.equipe if v.equipe and not permite_mesma_equipe else f"\0{v.nome}"
+        grupos.setdefault(chave, []).append(v)
+
+    # estado (pilotos escolhidos, limitado ao mínimo; fichas usadas) -> (valor, escolhas)
+    dp: dict[tuple[int, int], tuple[float, tuple[tuple[str, int], ...]]] = {(0, 0): (0.0, ())}
+    for chave in sorted(grupos):
+        grupo = sorted(grupos[chave], key=lambda v: v.nome)
+        melhor_por_k: dict[int, tuple[float, str]] = {}
+        for k in range(1, min(fichas_max, qtd_fichas) + 1):
+            melhor = max(grupo, key=lambda v: k * v.por_ficha - v.custo)
+            melhor_por_k[k] = (k * melhor.por_ficha - melhor.custo, melhor.nome)
+        novo = dict(dp)
+        for (qtd, usadas), (valor, escolhas) in dp.items():
+            for k, (ganho, nome) in melhor_por_k.items():
+                if usadas + k > qtd_fichas:
+                    break
+                estado = (min(qtd + 1, min_pilotos), usadas + k)
+                candidato = valor + ganho
+                atual = novo.get(estado)
+                if atual is None or candidato > atual[0] + 1e-12:
+                    novo[estado] = (candidato, escolhas + ((nome, k),))
+        dp = novo
+
+    final = dp.get((min_pilotos, qtd_fichas))
+    if final is None:
+        return None
+    return final[0], list(final[1])
+
+
+def otimizar_aposta(
+    pilotos_df: pd.DataFrame,
+    regras: dict,
+    tipo_prova: str,
+    contexto_ergast: dict,
+) -> Optional[SugestaoAposta]:
+    """Aposta válida de maior pontuação esperada para a prova."""
+    if pilotos_df.empty or "nome" not in pilotos_df.columns:
+        return None
+    min_pilotos = max(1, int(regras.get("qtd_minima_pilotos") or regras.get("min_pilotos", 3)))
+    qtd_fichas = int(regras.get("quantidade_fichas", 15))
+    fichas_max = int(regras.get("fichas_por_piloto", qtd_fichas))
+    permite_mesma_equipe = bool(regras.get("mesma_equipe", False))
+    if qtd_fichas < min_pilotos or fichas_max <= 0:
+        return None
+
+    valores, bonus_11 = _valores_pilotos(pilotos_df, regras, tipo_prova, contexto_ergast)
+    parametros = dict(
+        qtd_fichas=qtd_fichas,
+        fichas_max=fichas_max,
+        min_pilotos=min_pilotos,
+        permite_mesma_equipe=permite_mesma_equipe,
+    )
+    sem_exclusao = _melhor_distribuicao(valores, **parametros)
+    if sem_exclusao is None:
+        return None
+    limite = sem_exclusao[0]
+
+    melhor: Optional[tuple[float, list[tuple[str, int]], str]] = None
+    for candidato in sorted(valores, key=lambda v: (-v.chance_11, v.nome)):
+        ganho_11 = bonus_11 * candidato.chance_11
+        if melhor is not None and limite + ganho_11 <= melhor[0]:
+            break
+        resultado = _melhor_distribuicao(valores, excluir=candidato.nome, **parametros)
+        if resultado is None:
+            continue
+        total = resultado[0] + ganho_11
+        if melhor is None or total > melhor[0] + 1e-12:
+            melhor = (total, resultado[1], candidato.nome)
+
+    if melhor is None:
+        return None
+    total, escolhas, piloto_11 = melhor
+    escolhas = sorted(escolhas, key=lambda e: (-e[1], e[0]))
+    return SugestaoAposta(
+        pilotos=[nome for nome, _ in escolhas],
+        fichas=[k for _, k in escolhas],
+        piloto_11=piloto_11,
+        pontos_esperados=round(total, 2),
+    )
+
+
+__all__ = ["SugestaoAposta", "otimizar_aposta"]
@@ -2,15 +2,17 @@
 
 from __future__ import annotations
 
-import ast
 from datetime import datetime
 from typing import Optional, cast
 from collections import defaultdict
 
 import pandas as pd
 
-from db.db_schema import db_connect, get_table_columns
+from db.db_schema import db_connect, execute_pipeline, get_table_columns
+from db.repo_hall import reconstruir_hall_da_fama_resumo, resolver_fonte_hall
+from db.repo_user_seasons import recalcular_usuario_temporadas
 from services.rules_service import get_regras_aplicaveis
+from services.scoring_kernel import detalhar_apostas_lote
 from services.access_control import require_operation
 from utils.datetime_utils import parse_datetime_sao_paulo
 from utils.cache_utils import clear_data_cache
@@ -19,6 +21,10 @@ from utils.cache_utils import clear_data_cache
 def _fetch_df(conn, query: str, params: tuple | None = None) -> pd.DataFrame:
     cur = conn.cursor()
     cur.execute(query, params or ())
+    return _cursor_to_df(cur)
+
+
+def _cursor_to_df(cur) -> pd.DataFrame:
     rows = cur.fetchall() or []
     if not rows:
         col_names = [desc[0] for desc in (cur.description or [])]
@@ -41,130 +47,11 @@ def calcular_pontuacao_lote(ap_df, res_df, prov_df, temporada_descarte=None):
     - Penalidades DINAMICAS das regras
 
     Formula: Pontos = (Pontos_Regra x Fichas) + Bonus_11o - Penalidades
-    """
-    PONTOS_F1_NORMAL = [25, 18, 15, 12, 10, 8, 6, 4, 2, 1]
-    PONTOS_SPRINT = [8, 7, 6, 5, 4, 3, 2, 1]
-
-    ress_map = {}
-    abandonos_map = {}
-    for _, r in res_df.iterrows():
-        try:
-            ress_map[r["prova_id"]] = ast.literal_eval(r["posicoes"])
-        except Exception:
-            continue
-        try:
-            if "abandono_pilotos" in res_df.columns:
-                raw = r.get("abandono_pilotos", "")
-                if raw is None:
-                    raw = ""
-                aband_list = [p.strip() for p in str(raw).split(",") if p and p.strip()]
-                abandonos_map[r["prova_id"]] = set(aband_list)
-            else:
-                abandonos_map[r["prova_id"]] = set()
-        except Exception:
-            abandonos_map[r["prova_id"]] = set()
-
-    if "tipo" in prov_df.columns:
-        tipos = prov_df["tipo"].fillna("").astype(str).tolist()
-    else:
-        tipos = [""] * len(prov_df)
-    nomes = prov_df["nome"].fillna("").astype(str).tolist() if "nome" in prov_df.columns else [""] * len(prov_df)
-    tipos_resolvidos = []
-    for i in range(len(prov_df)):
-        t = tipos[i].strip().lower()
-        n = nomes[i].strip().lower()
-        if t == "sprint" or ("sprint" in n):
-            tipos_resolvidos.append("Sprint")
-        else:
-            tipos_resolvidos.append("Normal")
-    tipos_prova = dict(zip(prov_df["id"], tipos_resolvidos))
-    temporadas_prova = dict(
-        zip(
-            prov_df["id"],
-            prov_df["temporada"] if "temporada" in prov_df.columns else [str(datetime.now().year)] * len(prov_df),
-        )
-    )
-    has_temp_aposta = "temporada" in ap_df.columns
-    regras_cache = {}
-
-    pontos = []
-    for _, aposta in ap_df.iterrows():
-        prova_id = aposta["prova_id"]
-
-        if prova_id not in ress_map:
-            pontos.append(None)
-            continue
-
-        res = ress_map[prova_id]
-        tipo = tipos_prova.get(prova_id, "Normal")
-        temporada_aposta = None
-        if has_temp_aposta:
-            try:
-                temporada_aposta = aposta.get("temporada", None)
-            except Exception:
-                temporada_aposta = None
-        if temporada_aposta is not None and str(temporada_aposta).strip() != "" and not pd.isna(temporada_aposta):
-            temporada_prova = str(temporada_aposta)
-        else:
-            temporada_prova = temporadas_prova.get(prova_id, str(datetime.now().year))
-
-        regra_key = (str(temporada_prova), tipo)
-        if regra_key not in regras_cache:
-            regras_cache[regra_key] = get_regras_aplicaveis(temporada_prova, tipo)
-        regras = regras_cache[regra_key]
-
-        if tipo == "Sprint":
-            pontos_tabela = regras.get("pontos_sprint_posicoes") or regras.get("pontos_posicoes") or ([])
-            if not pontos_tabela:
-                pontos_tabela = PONTOS_SPRINT
-        else:
-            pontos_tabela = regras.get("pontos_posicoes") or ([])
-            if not pontos_tabela:
-                pontos_tabela = PONTOS_F1_NORMAL
-        n_posicoes = len(pontos_tabela)
-
-        bonus_11 = regras.get("pontos_11_colocado", 25)
 
-        pilotos = [p.strip() for p in aposta["pilotos"].split(",")]
-        fichas = list(map(int, aposta["fichas"].split(",")))
-        piloto_11 = aposta["piloto_11"]
-        automatica = int(aposta.get("automatica", 0))
-
-        piloto_para_pos = {str(v).strip(): int(k) for k, v in res.items()}
-
-        pt = 0
-        for i in range(len(pilotos)):
-            piloto = pilotos[i]
-            ficha = fichas[i] if i < len(fichas) else 0
-            pos_real = piloto_para_pos.get(piloto, None)
-
-            if pos_real is not None and 1 <= pos_real <= n_posicoes:
-                base = pontos_tabela[pos_real - 1]
-                pt += ficha * base
-
-        piloto_11_real = res.get(11, "")
-        if piloto_11 == piloto_11_real:
-            pt += bonus_11
-
-        if regras.get("penalidade_abandono"):
-            aband_prova = abandonos_map.get(prova_id, set())
-            if aband_prova:
-                num_aband_apostados = sum(1 for p in pilotos if p in aband_prova)
-                deduz = regras.get("pontos_penalidade", 0) * num_aband_apostados
-                if deduz:
-                    pt -= deduz
-
-        if tipo == "Sprint" and regras.get("pontos_dobrada"):
-            pt = pt * 2
-
-        if automatica >= 2:
-            penalidade_auto_percent = regras.get("penalidade_auto_percent", 20)
-            fator = max(0, 1 - (float(penalidade_auto_percent) / 100))
-            pt = round(pt * fator, 2)
-
-        pontos.append(pt)
-
-    return pontos
+    O cálculo é o de ``services.scoring_kernel``; aqui só se extrai o total.
+    """
+    detalhes = detalhar_apostas_lote(ap_df, res_df, prov_df, regras_loader=get_regras_aplicaveis)
+    return [None if detalhe is None else detalhe.total for detalhe in detalhes]
 
 
 def _salvar_classificacoes_provas_lote(classificacoes: list[tuple[int, pd.DataFrame, str]]) -> None:
@@ -202,6 +89,10 @@ def _salvar_classificacoes_provas_lote(classificacoes: list[tuple[int, pd.DataFr
                     "INSERT INTO posicoes_participantes (prova_id, usuario_id, posicao, pontos) VALUES (%s,%s,%s,%s)",
                     rows_to_insert,
                 )
+        # Sem hall_da_fama cadastrado, o Hall da Fama lê posicoes_participantes:
+        # o resumo pré-calculado precisa acompanhar a reclassificação.
+        if resolver_fonte_hall(conn)[0] == "posicoes_participantes":
+            reconstruir_hall_da_fama_resumo(conn)
         conn.commit()
     clear_data_cache("posicoes", "historico", "classificacao")
 
@@ -213,28 +104,57 @@ def salvar_classificacao_prova(p_id, df_c, temp=None):
     _salvar_classificacoes_provas_lote([(int(p_id), df_c, str(temp))])
 
 
+def _atualizar_classificacoes_acumuladas(
+    temporadas: set[str],
+    apts_calc: pd.DataFrame,
+    provs: pd.DataFrame,
+    ress: pd.DataFrame,
+) -> None:
+    """Materializa a classificação acumulada reaproveitando a pontuação do lote."""
+    from services.standings_service import atualizar_classificacao_temporada
+
+    for temporada_key in sorted(temporadas):
+        provas_temp = provs
+        if "temporada" in provs.columns:
+            provas_temp = provs[provs["temporada"].astype(str) == temporada_key]
+        apostas_temp = apts_calc[apts_calc["prova_id"].isin(provas_temp["id"])]
+        atualizar_classificacao_temporada(
+            temporada_key,
+            apostas_pontos_df=apostas_temp,
+            provas_df=provas_temp,
+            resultados_df=ress,
+        )
+
+
 def atualizar_classificacoes_todas_as_provas(temporada: Optional[str] = None):
     require_operation("resultado.write", season=str(temporada) if temporada is not None else None)
     import traceback
     try:
-        with db_connect() as conn:
-            usrs = cast(
-                pd.DataFrame,
-                _fetch_df(
+        # Leituras independentes do job: um único round-trip em pipeline, com
+        # os limites de sessão do papel "job".
+        with db_connect("job") as conn:
+            usrs, provs, apts, ress = (
+                _cursor_to_df(cur)
+                for cur in execute_pipeline(
                     conn,
-                    """
-                    SELECT id
-                    FROM usuarios
-                    WHERE lower(trim(coalesce(status, ''))) = 'ativo'
-                    """,
-                ),
-            )
-            provs = cast(pd.DataFrame, _fetch_df(conn, "SELECT id, nome, data, tipo, temporada FROM provas"))
-            apts = cast(
-                pd.DataFrame,
-                _fetch_df(conn, "SELECT usuario_id, prova_id, data_envio, pilotos, fichas, piloto_11, automatica, temporada FROM apostas"),
+                    [
+                        (
+                            """
+                            SELECT id
+                            FROM usuarios
+                            WHERE lower(trim(coalesce(status, ''))) = 'ativo'
+                            """,
+                            None,
+                        ),
+                        ("SELECT id, nome, data, horario_prova, tipo, temporada FROM provas", None),
+                        (
+                            "SELECT usuario_id, prova_id, data_envio, pilotos, fichas, piloto_11, automatica, temporada FROM apostas",
+                            None,
+                        ),
+                        ("SELECT prova_id, posicoes, abandono_pilotos FROM resultados", None),
+                    ],
+                )
             )
-            ress = cast(pd.DataFrame, _fetch_df(conn, "SELECT prova_id, posicoes, abandono_pilotos FROM resultados"))
 
         if temporada and "temporada" in provs.columns:
             provs = provs[provs["temporada"] == temporada]
@@ -287,15 +207,18 @@ def atualizar_classificacoes_todas_as_provas(temporada: Optional[str] = None):
         if apts.empty or "prova_id" not in apts.columns:
             apts_calc = apts.copy()
             apts_calc["__pontos_calculados"] = []
+            apts_calc["__acertou_11"] = []
         else:
             apts_calc = apts[apts["prova_id"].isin(provas_ids)].copy()
             if not apts_calc.empty:
-                pontos_calculados = calcular_pontuacao_lote(apts_calc, ress, provs)
+                detalhes = detalhar_apostas_lote(apts_calc, ress, provs, regras_loader=get_regras_aplicaveis)
                 apts_calc["__pontos_calculados"] = [
-                    0 if p is None else float(p) for p in pontos_calculados
+                    0 if d is None else float(d.total) for d in detalhes
                 ]
+                apts_calc["__acertou_11"] = [d is not None and d.acertou_11 for d in detalhes]
             else:
                 apts_calc["__pontos_calculados"] = []
+                apts_calc["__acertou_11"] = []
 
         resultados_ids = set(ress["prova_id"].tolist())
         usuarios_ids = [int(uid) for uid in usrs["id"].tolist()] if "id" in usrs.columns else []
@@ -319,10 +242,6 @@ def atualizar_classificacoes_todas_as_provas(temporada: Optional[str] = None):
             if aps.empty:
                 continue
 
-            res_row = ress[ress["prova_id"] == pid].iloc[0]
-            res_p = ast.literal_eval(res_row["posicoes"])
-            piloto_11_real = res_p.get(11, "")
-
             tab = []
             first_no_base_flags = {}
             apostas_por_usuario = dict(tuple(aps.groupby("usuario_id", sort=False)))
@@ -338,7 +257,7 @@ def atualizar_classificacoes_todas_as_provas(temporada: Optional[str] = None):
                 else:
                     pontos_val = float(ap["__pontos_calculados"].sum())
                     data_envio = ap.iloc[0].get("data_envio", None)
-                    acerto_11 = 1 if ap.iloc[0]["piloto_11"] == piloto_11_real else 0
+                    acerto_11 = 1 if ap.iloc[0]["__acertou_11"] else 0
                     if str(pid) == str(primeira_prova_por_temp.get(str(temporada_prova), None)):
                         try:
                             if int(ap.iloc[0].get("automatica", 0)) > 0:
@@ -422,6 +341,11 @@ def atualizar_classificacoes_todas_as_provas(temporada: Optional[str] = None):
                 except Exception:
                     continue
         _salvar_classificacoes_provas_lote(classificacoes_para_salvar)
+        temporadas_afetadas = {temp for _, _, temp in classificacoes_para_salvar}
+        if temporada:
+            temporadas_afetadas.add(str(temporada))
+        _atualizar_classificacoes_acumuladas(temporadas_afetadas, apts_calc, provs, ress)
+        recalcular_usuario_temporadas()
     except Exception:
         try:
             with open('/tmp/bets_scoring_trace.log', 'w') as _f:
@@ -15,16 +15,27 @@ import pandas as pd
 
 from db.db_schema import db_connect, get_table_columns
 from db.repo_bets import get_aposta, get_apostas_df
+from db.repo_career import atualizar_fichas_carreira
+from db.repo_user_seasons import garantir_usuario_temporada
 from db.repo_races import get_horario_prova, get_pilotos_df, get_provas_df, get_resultados_df
 from db.repo_users import get_user_by_id
 from db.repo_logs import registrar_log_aposta
 from services.bets_ai import (
-    _gerar_aposta_gemini,
+    _comentar_aposta_gemini,
     _get_contexto_temporada_atual_ergast,
     _get_resumo_cenario_campeonato,
     _get_resumo_ultimas_apostas,
 )
+from services.bets_optimizer import otimizar_aposta
 from services.bets_rules import ajustar_aposta_para_regras
+from services.driver_model import (
+    clamp as _clamp,
+    dnf_mu_penalty,
+    norm_nome_piloto as _norm_nome_piloto,
+    pesos_mu,
+    sinais_ergast,
+)
+from services.expected_points import matriz_prova
 from services.bets_rules import _aposta_valida_regras, pode_fazer_aposta
 from services.email_service import enviar_email, gerar_analise_aposta_com_probabilidade
 from utils.performance import measured
@@ -57,6 +68,10 @@ def _telemetria_estimativa_ativa(regras: dict) -> bool:
     return _flag_true(regras.get("telemetria_estimativa")) or _flag_true(regras.get("modo_telemetria"))
 
 
+def _comentario_ia_ativo() -> bool:
+    return _flag_true(os.getenv("BF1_SEM_IDEIAS_COMENTARIO_IA"))
+
+
 def _assinatura_aposta_telemetria(
     pilotos_validos: list[tuple[str, int]],
     piloto_11: str,
@@ -97,28 +112,6 @@ def gerar_aposta_aleatoria(pilotos_df):
     return pilotos_sel, fichas, piloto_11
 
 
-def _norm_nome_piloto(nome: str) -> str:
-    return str(nome or "").strip().lower()
-
-
-def _media_lista(nums: list[int]) -> Optional[float]:
-    if not nums:
-        return None
-    return float(sum(nums)) / float(len(nums))
-
-
-def _desvio_padrao_populacao(nums: list[int]) -> Optional[float]:
-    if len(nums) < 2:
-        return None
-    m = float(sum(nums)) / float(len(nums))
-    var = sum((float(x) - m) ** 2 for x in nums) / float(len(nums))
-    return math.sqrt(var)
-
-
-def _clamp(v: float, lo: float, hi: float) -> float:
-    return max(lo, min(hi, v))
-
-
 def _estimar_pontos_aposta_ergast(
     pilotos: list[str],
     fichas: list[int],
@@ -136,56 +129,15 @@ def _estimar_pontos_aposta_ergast(
     else:
         pontos_lista = regras.get("pontos_posicoes") or pontos_f1
 
-    tp = contexto_ergast.get("tp", []) if isinstance(contexto_ergast, dict) else []
-    du = contexto_ergast.get("du", {}) if isinstance(contexto_ergast, dict) else {}
-    vr = contexto_ergast.get("vr", []) if isinstance(contexto_ergast, dict) else []
-
-    qg = contexto_ergast.get("qg", {}) if isinstance(contexto_ergast, dict) else {}
-    rp5 = contexto_ergast.get("rp5", {}) if isinstance(contexto_ergast, dict) else {}
-    rp8 = contexto_ergast.get("rp8", {}) if isinstance(contexto_ergast, dict) else {}
-    hc = contexto_ergast.get("hc", {}) if isinstance(contexto_ergast, dict) else {}
-    fr11 = contexto_ergast.get("fr11", {}) if isinstance(contexto_ergast, dict) else {}
-    dnf = contexto_ergast.get("dnf", {}) if isinstance(contexto_ergast, dict) else {}
+    sinais = sinais_ergast(contexto_ergast)
+    pos_por_nome = sinais.pos_por_nome
+    qg, rp5, hc, fr11 = sinais.qg, sinais.rp5, sinais.hc, sinais.fr11
 
     # Parametros ajustaveis por regra para calibracao da estimativa
-    default_mu_weights = (0.45, 0.35, 0.20) if is_sprint else (0.40, 0.35, 0.25)
-    mu_weights_raw = regras.get("pesos_mu_sprint" if is_sprint else "pesos_mu_normal")
-    if isinstance(mu_weights_raw, dict):
-        w_qg = float(mu_weights_raw.get("qg", default_mu_weights[0]))
-        w_rp5 = float(mu_weights_raw.get("rp5", default_mu_weights[1]))
-        w_hc = float(mu_weights_raw.get("hc", default_mu_weights[2]))
-    elif isinstance(mu_weights_raw, (list, tuple)) and len(mu_weights_raw) == 3:
-        w_qg, w_rp5, w_hc = (float(mu_weights_raw[0]), float(mu_weights_raw[1]), float(mu_weights_raw[2]))
-    else:
-        w_qg, w_rp5, w_hc = default_mu_weights
-
-    soma_w = w_qg + w_rp5 + w_hc
-    if soma_w <= 0:
-        w_qg, w_rp5, w_hc = default_mu_weights
-        soma_w = w_qg + w_rp5 + w_hc
-    w_qg, w_rp5, w_hc = (w_qg / soma_w, w_rp5 / soma_w, w_hc / soma_w)
-
-    dnf_mu_penalty = float(regras.get("dnf_mu_penalty", 1.8 if is_sprint else 2.5))
+    w_qg, w_rp5, w_hc = pesos_mu(regras, is_sprint)
+    penalidade_dnf_mu = dnf_mu_penalty(regras, is_sprint)
     dnf_points_penalty_scale = float(regras.get("dnf_points_penalty_scale", 0.75))
 
-    pos_por_nome: dict[str, int] = {}
-    for row in tp if isinstance(tp, list) else []:
-        nome = _norm_nome_piloto(row.get("n"))
-        pos = int(row.get("p", 0) or 0)
-        if nome and pos > 0:
-            pos_por_nome[nome] = pos
-
-    delta_por_nome: dict[str, int] = {}
-    if isinstance(du, dict):
-        for row in du.get("top", []) if isinstance(du.get("top", []), list) else []:
-            nome = _norm_nome_piloto(row.get("n"))
-            delta_por_nome[nome] = int(row.get("d", 0) or 0)
-        for row in du.get("bot", []) if isinstance(du.get("bot", []), list) else []:
-            nome = _norm_nome_piloto(row.get("n"))
-            delta_por_nome[nome] = int(row.get("d", 0) or 0)
-
-    vr_set = {_norm_nome_piloto(row.get("n")) for row in vr if isinstance(vr, list) if _norm_nome_piloto(row.get("n"))}
-
     pilotos_validos: list[tuple[str, int]] = []
     for piloto, ficha in zip(pilotos, fichas):
         try:
@@ -206,105 +158,20 @@ def _estimar_pontos_aposta_ergast(
             "detalhes": "Sem dados suficientes para estimativa.",
         }
 
+    # Linhas da matriz piloto x posição da prova (em cache entre envios).
+    matriz = matriz_prova([p for p, _ in pilotos_validos], regras, tipo_prova, contexto_ergast, n_posicoes=n_pos)
     prob_por_piloto: list[list[float]] = []
     dnf_rate_por_piloto: list[float] = []
     telemetria_componentes_por_piloto: list[dict] = []
     for piloto, ficha_i_int in pilotos_validos:
-        nome_key = _norm_nome_piloto(piloto)
-        base_rank = pos_por_nome.get(nome_key)
-        delta = int(delta_por_nome.get(nome_key, 0))
-        ajuste_vr = -0.6 if nome_key in vr_set else 0.0
-
-        qg_pos = None
-        if isinstance(qg, dict):
-            try:
-                qg_pos = int(qg.get(nome_key)) if qg.get(nome_key) is not None else None
-            except Exception:
-                qg_pos = None
-
-        rec5 = None
-        if isinstance(rp5, dict) and isinstance(rp5.get(nome_key), list):
-            lista5 = [int(x) for x in rp5.get(nome_key, []) if int(x) > 0]
-            rec5 = _media_lista(lista5)
-
-        hist = None
-        if isinstance(hc, dict):
-            try:
-                hist_val = hc.get(nome_key)
-                hist = float(hist_val) if hist_val is not None else None
-            except Exception:
-                hist = None
-
-        componentes: list[tuple[float, float]] = []
-        if qg_pos is not None and qg_pos > 0:
-            componentes.append((w_qg, float(qg_pos)))
-        if rec5 is not None and rec5 > 0:
-            componentes.append((w_rp5, rec5))
-        if hist is not None and hist > 0:
-            componentes.append((w_hc, hist))
-
-        componentes_map: dict[str, Optional[float]] = {
-            "qg": float(qg_pos) if qg_pos is not None else None,
-            "rp5": float(rec5) if rec5 is not None else None,
-            "hc": float(hist) if hist is not None else None,
-            "base_rank": float(base_rank) if base_rank is not None else None,
-            "delta": float(delta),
-            "ajuste_vr": float(ajuste_vr),
-        }
-
-        if componentes:
-            soma_pesos = sum(w for w, _ in componentes)
-            mu = sum(w * v for w, v in componentes) / soma_pesos
-        elif base_rank is not None:
-            mu = float(base_rank)
-        else:
-            mu = float(n_pos) * 0.72
-
-        mu = mu - (0.20 * float(delta)) + ajuste_vr
-
-        dnf_rate = 0.0
-        if isinstance(dnf, dict):
-            try:
-                dnf_rate = float(dnf.get(nome_key, 0.0) or 0.0)
-            except Exception:
-                dnf_rate = 0.0
-        dnf_rate = _clamp(dnf_rate, 0.0, 0.8)
-        dnf_rate_por_piloto.append(dnf_rate)
-        mu += dnf_rate * dnf_mu_penalty
-        mu = _clamp(mu, 1.0, float(n_pos))
-
-        sigma = 1.9 if not is_sprint else 1.5
-        if isinstance(rp8, dict) and isinstance(rp8.get(nome_key), list):
-            lista8_raw = [int(x) for x in rp8.get(nome_key, []) if int(x) > 0]
-            if lista8_raw:
-                lista8 = [int(_clamp(float(x), 1.0, float(max(n_pos, 20)))) for x in lista8_raw]
-                std8 = _desvio_padrao_populacao(lista8)
-                if std8 is not None:
-                    if is_sprint:
-                        sigma = _clamp(float(std8), 0.9, 3.2)
-                    else:
-                        sigma = _clamp(float(std8), 1.1, 4.0)
-
-        row = []
-        for pos_idx in range(1, n_pos + 1):
-            z = (float(pos_idx) - mu) / sigma
-            row.append(math.exp(-0.5 * z * z))
-        s = sum(row)
-        if s <= 0:
-            row = [1.0 / n_pos] * n_pos
-        else:
-            row = [v / s for v in row]
-        prob_por_piloto.append(row)
-
-        componentes_map["mu_final"] = float(mu)
-        componentes_map["sigma"] = float(sigma)
-        componentes_map["dnf_rate"] = float(dnf_rate)
-        componentes_map["dnf_penalidade_mu"] = float(dnf_rate * dnf_mu_penalty)
+        linha = matriz.linha(piloto)
+        dnf_rate_por_piloto.append(float(matriz.dnf[linha]))
+        prob_por_piloto.append(matriz.probs[linha].tolist())
         telemetria_componentes_por_piloto.append(
             {
                 "piloto": redact_identifier(piloto),
                 "fichas": int(ficha_i_int),
-                "componentes": componentes_map,
+                "componentes": matriz.componentes[linha],
             }
         )
 
@@ -505,7 +372,7 @@ def _estimar_pontos_aposta_ergast(
                 "hc": round(float(w_hc), 4),
             },
             "penalidades": {
-                "dnf_mu_penalty": round(float(dnf_mu_penalty), 4),
+                "dnf_mu_penalty": round(float(penalidade_dnf_mu), 4),
                 "dnf_points_penalty_scale": round(float(dnf_points_penalty_scale), 4),
             },
             "componentes_pilotos": telemetria_componentes_por_piloto,
@@ -649,6 +516,27 @@ def gerar_aposta_aleatoria_com_regras(pilotos_df, regras: dict):
     return pilotos_sel, fichas, piloto_11
 
 
+def _gerar_aposta_otimizada(
+    pilotos_df,
+    regras: dict,
+    tipo_prova: str,
+    contexto_ergast: dict,
+) -> tuple[list[str], list[int], Optional[str], bool]:
+    """Aposta de maior pontuação esperada; sorteio se o otimizador não achar solução.
+
+    O último item indica se a aposta veio do otimizador.
+    """
+    try:
+        sugestao = otimizar_aposta(pilotos_df, regras, tipo_prova, contexto_ergast)
+    except Exception as e:
+        logger.warning("Falha no otimizador de apostas: %s", e)
+        sugestao = None
+    if sugestao and _aposta_valida_regras(sugestao.pilotos, sugestao.fichas, sugestao.piloto_11, pilotos_df, regras):
+        return sugestao.pilotos, sugestao.fichas, sugestao.piloto_11, True
+    pilotos_sel, fichas_sel, piloto_11_sel = gerar_aposta_aleatoria_com_regras(pilotos_df, regras)
+    return pilotos_sel, fichas_sel, piloto_11_sel, False
+
+
 def _determinar_tipo_prova(prova_row: Union[pd.Series, dict], nome_prova: Optional[str]) -> str:
     try:
         if isinstance(prova_row, dict):
@@ -812,6 +700,9 @@ def salvar_aposta(
                 _report_error("Aposta fora do horário limite.")
                 return False
 
+            if "temporada" in aposta_cols:
+                atualizar_fichas_carreira(conn, usuario_id=usuario_id, temporada=temporada)
+                garantir_usuario_temporada(conn, usuario_id, temporada)
             conn.commit()
             clear_data_cache("apostas", "historico", "classificacao")
 
@@ -1315,13 +1206,23 @@ def gerar_aposta_automatica(usuario_id, prova_id, nome_prova, apostas_df, provas
         piloto_11_ant = ap_ant["piloto_11"].strip()
         pilotos_aj, fichas_aj = ajustar_aposta_para_regras(pilotos_ant, fichas_ant, regras, pilotos_df)
         if not pilotos_aj:
-            pilotos_ant, fichas_ant, piloto_11_ant = gerar_aposta_aleatoria_com_regras(pilotos_df, regras)
+            pilotos_ant, fichas_ant, piloto_11_ant, _ = _gerar_aposta_otimizada(
+                pilotos_df,
+                regras,
+                tipo_prova,
+                _get_contexto_temporada_atual_ergast(temporada=str(temporada or datetime.now().year), nome_prova=nome_prova),
+            )
         else:
             pilotos_ant, fichas_ant = pilotos_aj, fichas_aj
     else:
         if prova_id_min is not None and prova_id != prova_id_min:
             return False, "Sem aposta anterior para copiar. Gere apenas na primeira prova."
-        pilotos_ant, fichas_ant, piloto_11_ant = gerar_aposta_aleatoria_com_regras(pilotos_df, regras)
+        pilotos_ant, fichas_ant, piloto_11_ant, _ = _gerar_aposta_otimizada(
+            pilotos_df,
+            regras,
+            tipo_prova,
+            _get_contexto_temporada_atual_ergast(temporada=str(temporada or datetime.now().year), nome_prova=nome_prova),
+        )
 
     if not pilotos_ant:
         return False, "Não há dados válidos para gerar aposta automática."
@@ -1389,33 +1290,13 @@ def gerar_aposta_sem_ideias(usuario_id, prova_id, nome_prova, temporada=None):
     if pilotos_df.empty:
         return False, "Não há pilotos ativos para gerar aposta.", None
 
-    apostas_df = get_apostas_df(temporada)
-    resultados_df = get_resultados_df(temporada)
-    ultimas_apostas = _get_resumo_ultimas_apostas(usuario_id, apostas_df, limite=2)
-    cenario = _get_resumo_cenario_campeonato(resultados_df, provas_df, limite=2)
     contexto_ergast = _get_contexto_temporada_atual_ergast(temporada=str(temporada or datetime.now().year), nome_prova=nome_prova)
-
-    origem = "aleatória"
-    sugestao = _gerar_aposta_gemini(
-        pilotos_df,
-        regras,
-        nome_prova,
-        tipo_prova,
-        ultimas_apostas,
-        cenario,
-        contexto_ergast,
+    pilotos_sel, fichas_sel, piloto_11_sel, otimizada = _gerar_aposta_otimizada(
+        pilotos_df, regras, tipo_prova, contexto_ergast
     )
-    if sugestao:
-        pilotos_sel, fichas_sel, piloto_11_sel = sugestao
-        if _aposta_valida_regras(pilotos_sel, fichas_sel, piloto_11_sel, pilotos_df, regras):
-            origem = "estratégica"
-        else:
-            sugestao = None
-
-    if not sugestao:
-        pilotos_sel, fichas_sel, piloto_11_sel = gerar_aposta_aleatoria_com_regras(pilotos_df, regras)
-        if not pilotos_sel:
-            return False, "Não foi possível gerar aposta viável com as regras atuais.", None
+    if not pilotos_sel:
+        return False, "Não foi possível gerar aposta viável com as regras atuais.", None
+    origem = "estratégica" if otimizada else "aleatória"
 
     ok = salvar_aposta(
         usuario_id=usuario_id,
@@ -1452,7 +1333,23 @@ def gerar_aposta_sem_ideias(usuario_id, prova_id, nome_prova, temporada=None):
     }
 
     if origem == "estratégica":
-        return True, "Aposta 'Sem ideias' gerada com estratégia assistida e registrada!", detalhes
+        mensagem = "Aposta 'Sem ideias' gerada com estratégia assistida e registrada!"
+        if _comentario_ia_ativo():
+            apostas_df = get_apostas_df(temporada)
+            resultados_df = get_resultados_df(temporada)
+            comentario = _comentar_aposta_gemini(
+                nome_prova,
+                tipo_prova,
+                list(pilotos_sel),
+                [int(ficha) for ficha in fichas_sel],
+                str(piloto_11_sel),
+                _get_resumo_ultimas_apostas(usuario_id, apostas_df, limite=2),
+                _get_resumo_cenario_campeonato(resultados_df, provas_df, limite=2),
+            )
+            if comentario:
+                detalhes["comentario"] = comentario
+                mensagem = f"{mensagem} {comentario}"
+        return True, mensagem, detalhes
     return True, "Aposta 'Sem ideias' aleatória (fallback) registrada com sucesso!", detalhes
 
 __all__ = [
@@ -0,0 +1,393 @@
+"""Chances de título e pódio por simulação de Monte Carlo do restante da temporada.
+
+Cada simulação sorteia o resultado de todas as provas sem resultado: a
+posição de cada piloto vem do mesmo modelo da estimativa do e-mail de aposta
+(``services.driver_model``: ``mu``/``sigma`` por piloto e taxa de abandono),
+com ruído gaussiano e abandono sorteado à parte. A pontuação de todos os
+participantes é aplicada em lote com NumPy — uma multiplicação de matrizes
+(simulações x pilotos) @ (pilotos x participantes) por prova — seguindo o
+kernel de pontuação: fichas x pontos da posição, bônus do 11º, penalidade por
+abandono, sprint dobrada e desconto a partir da 2ª aposta automática. O
+descarte (pior prova) é acompanhado simulação a simulação.
+
+Premissas da projeção:
+
+- a aposta futura de cada participante repete a última aposta enviada (é o
+  que a aposta automática faz quando ele não aposta);
+- a chance de o participante não apostar numa prova é a proporção de apostas
+  automáticas dele nas provas já realizadas;
+- o bônus de campeonato (campeão, vice, equipe) fica fora: só é conhecido no
+  fim da temporada.
+
+O resultado fica em cache pelo cenário (classificação persistida, apostas
+vigentes e calendário restante): qualquer novo resultado ou aposta gera outro
+cenário e, portanto, outra simulação.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from db.repo_bets import get_apostas_df, get_participantes_temporada_df
+from db.repo_races import get_pilotos_df, get_provas_df, get_resultados_df
+from db.repo_standings import get_classificacao_temporada_df
+from services.bets_ai import _get_contexto_temporada_atual_ergast
+from services.driver_model import dnf_mu_penalty, parametros_piloto, pesos_mu, sinais_ergast
+from services.rules_service import get_regras_aplicaveis
+from services.scoring_kernel import tabela_pontos, tipo_prova, versao_regras
+from utils.ttl_cache import ttl_cache
+
+logger = logging.getLogger(__name__)
+
+CHANCES_COLUMNS = ("usuario_id", "chance_titulo", "chance_podio", "pontos_esperados", "posicao_media")
+
+
+@dataclass(frozen=True)
+class ProvaSimulada:
+    """Parâmetros de uma prova futura já resolvidos por piloto (arrays de tamanho D)."""
+
+    mu: np.ndarray
+    sigma: np.ndarray
+    dnf: np.ndarray
+    pontos: tuple[float, ...]
+    pontos_11: float = 25.0
+    pontos_penalidade: float = 0.0
+    multiplicador: float = 1.0
+    fator_auto: float = 0.8
+
+
+@dataclass(frozen=True)
+class ParticipanteSimulado:
+    """Situação atual e aposta projetada de um participante.
+
+    ``fichas`` tem uma entrada por piloto (na ordem de ``pilotos`` da
+    simulação); ``indice_11`` é o índice do palpite de 11º (-1 sem palpite).
+    ``menor_prova`` é a pior pontuação já feita (``None`` sem apostas).
+    """
+
+    usuario_id: int
+    pontos: float
+    fichas: tuple[int, ...]
+    indice_11: int = -1
+    menor_prova: Optional[float] = None
+    faltas: int = 0
+    taxa_ausencia: float = 0.0
+
+
+def simular_chances(
+    provas: Sequence[ProvaSimulada],
+    participantes: Sequence[ParticipanteSimulado],
+    *,
+    n_simulacoes: int = 10_000,
+    seed: int = 0,
+    descarte: bool = False,
+) -> pd.DataFrame:
+    """Simula as provas restantes e devolve as chances de cada participante.
+
+    ``participantes`` deve vir na ordem da classificação atual: empates no
+    total final ficam com quem está à frente hoje. Retorna
+    ``CHANCES_COLUMNS``, na ordem de ``participantes``.
+    """
+    n_part = len(participantes)
+    if n_part == 0:
+        return pd.DataFrame(columns=list(CHANCES_COLUMNS))
+    n_sim = max(1, int(n_simulacoes))
+    rng = np.random.default_rng(seed)
+    n_pilotos = len(participantes[0].fichas)
+
+    fichas = np.array([p.fichas for p in participantes], dtype=np.float64).T.reshape(n_pilotos, n_part)
+    apostados = (fichas > 0).astype(np.float64)
+    indice_11 = np.array([p.indice_11 for p in participantes], dtype=np.int64)
+    tem_11 = indice_11 >= 0
+    indice_11 = np.where(tem_11, indice_11, 0)
+    apostador = (fichas.sum(axis=0) > 0) | tem_11
+    taxa_ausencia = np.array([p.taxa_ausencia for p in participantes], dtype=np.float64)
+
+    total = np.tile(np.array([p.pontos for p in participantes], dtype=np.float64), (n_sim, 1))
+    menor = np.tile(
+        np.array([np.nan if p.menor_prova is None else p.menor_prova for p in participantes], dtype=np.float64),
+        (n_sim, 1),
+    )
+    faltas = np.tile(np.array([p.faltas for p in participantes], dtype=np.int64), (n_sim, 1))
+    ordem_grid = np.broadcast_to(np.arange(n_pilotos), (n_sim, n_pilotos))
+
+    for prova in provas:
+        desempenho = prova.mu + prova.sigma * rng.standard_normal((n_sim, n_pilotos))
+        abandono = rng.random((n_sim, n_pilotos)) < prova.dnf
+        # Quem abandona vai para o fim do grid, na ordem do sorteio.
+        desempenho = np.where(abandono, desempenho + 1_000.0, desempenho)
+        posicao = np.empty((n_sim, n_pilotos), dtype=np.int64)
+        np.put_along_axis(posicao, np.argsort(desempenho, axis=1), ordem_grid, axis=1)
+
+        tabela = np.zeros(n_pilotos, dtype=np.float64)
+        k = min(len(prova.pontos), n_pilotos)
+        tabela[:k] = prova.pontos[:k]
+        pontos_piloto = np.where(abandono, 0.0, tabela[posicao])
+
+        pontos = pontos_piloto @ fichas
+        acertou_11 = (posicao[:, indice_11] == 10) & tem_11
+        pontos += prova.pontos_11 * acertou_11
+        if prova.pontos_penalidade:
+            pontos -= prova.pontos_penalidade * (abandono.astype(np.float64) @ apostados)
+        pontos *= prova.multiplicador
+
+        ausente = rng.random((n_sim, n_part)) < taxa_ausencia
+        faltas += ausente
+        pontos = np.where(ausente & (faltas >= 2), pontos * prova.fator_auto, pontos)
+        pontos[:, ~apostador] = 0.0
+
+        total += pontos
+        menor[:, apostador] = np.fmin(menor[:, apostador], pontos[:, apostador])
+
+    valido = total - np.nan_to_num(menor) if descarte else total
+    ordem = np.argsort(-valido, axis=1, kind="stable")
+    posicao_final = np.empty_like(ordem)
+    np.put_along_axis(posicao_final, ordem, np.broadcast_to(np.arange(1, n_part + 1), ordem.shape), axis=1)
+
+    return pd.DataFrame(
+        {
+            "usuario_id": [p.usuario_id for p in participantes],
+            "chance_titulo": np.bincount(ordem[:, 0], minlength=n_part) / n_sim,
+            "chance_podio": np.bincount(ordem[:, :3].ravel(), minlength=n_part) / n_sim,
+            "pontos_esperados": valido.mean(axis=0),
+            "posicao_media": posicao_final.mean(axis=0),
+        },
+        columns=list(CHANCES_COLUMNS),
+    )
+
+
+@dataclass(frozen=True)
+class _ProvaCenario:
+    prova_id: int
+    nome: str
+    tipo: str
+    regras_versao: str
+
+
+@dataclass(frozen=True)
+class _ParticipanteCenario:
+    usuario_id: int
+    pontos: float
+    menor_prova: Optional[float]
+    faltas: int
+    taxa_ausencia: float
+    pilotos: tuple[str, ...]
+    fichas: tuple[int, ...]
+    piloto_11: str
+
+
+@dataclass(frozen=True)
+class Cenario:
+    """Tudo o que a simulação usa do banco; é a chave do cache."""
+
+    temporada: str
+    pilotos: tuple[str, ...]
+    provas: tuple[_ProvaCenario, ...]
+    participantes: tuple[_ParticipanteCenario, ...]
+    descarte: bool
+
+
+def _fichas(raw) -> list[int]:
+    fichas = []
+    for parte in str(raw or "").split(","):
+        try:
+            fichas.append(int(parte))
+        except ValueError:
+            fichas.append(0)
+    return fichas
+
+
+def montar_cenario(temporada: str) -> Cenario:
+    """Lê classificação, apostas e calendário restante da temporada."""
+    temporada = str(temporada)
+    provas_df = get_provas_df(temporada)
+    resultados_df = get_resultados_df(temporada)
+    apostas_df = get_apostas_df(temporada)
+    classificacao_df = get_classificacao_temporada_df(temporada)
+    participantes_df = get_participantes_temporada_df(temporada)
+    regras_normal = get_regras_aplicaveis(temporada, "Normal")
+
+    com_resultado: set[int] = set()
+    if not resultados_df.empty:
+        com_resultado = set(pd.to_numeric(resultados_df["prova_id"], errors="coerce").dropna().astype(int))
+
+    provas: list[_ProvaCenario] = []
+    if not provas_df.empty:
+        futuras = provas_df.assign(__data_dt=pd.to_datetime(provas_df["data"], errors="coerce"))
+        futuras = futuras[~futuras["id"].astype(int).isin(com_resultado)].sort_values(["__data_dt", "id"])
+        for _, prova in futuras.drop_duplicates("id").iterrows():
+            tipo = tipo_prova(prova.get("nome"), prova.get("tipo"))
+            provas.append(
+                _ProvaCenario(
+                    prova_id=int(prova["id"]),
+                    nome=str(prova.get("nome") or ""),
+                    tipo=tipo,
+                    regras_versao=versao_regras(get_regras_aplicaveis(temporada, tipo)),
+                )
+            )
+
+    atuais: dict[int, tuple[float, float]] = {}
+    posicao_atual: dict[int, int] = {}
+    if not classificacao_df.empty:
+        ultima = classificacao_df[classificacao_df["ordem_prova"] == classificacao_df["ordem_prova"].max()]
+        for uid, acumulado, descarte, posicao in zip(
+            ultima["usuario_id"], ultima["pontos_acumulados"], ultima["descarte"], ultima["posicao"]
+        ):
+            atuais[int(uid)] = (float(acumulado or 0.0), float(descarte or 0.0))
+            posicao_atual[int(uid)] = int(posicao)
+
+    recentes = pd.DataFrame()
+    if not apostas_df.empty:
+        recentes = apostas_df.assign(__envio_dt=pd.to_datetime(apostas_df["data_envio"], errors="coerce"))
+        recentes = recentes.sort_values("__envio_dt", kind="mergesort")
+        recentes = recentes.drop_duplicates(subset=["usuario_id", "prova_id"], keep="last")
+
+    participantes: list[_ParticipanteCenario] = []
+    pilotos: dict[str, None] = {}
+    if not participantes_df.empty:
+        validos = participantes_df[
+            participantes_df["nome"].notna() & (participantes_df["nome"].astype(str) != "Master")
+        ]
+        for _, usuario in validos.iterrows():
+            uid = int(usuario["id"])
+            apostas_usuario = recentes[recentes["usuario_id"] == uid] if not recentes.empty else recentes
+            ultima_aposta = apostas_usuario.iloc[-1] if not apostas_usuario.empty else None
+            realizadas = (
+                apostas_usuario[apostas_usuario["prova_id"].astype(int).isin(com_resultado)]
+                if not apostas_usuario.empty
+                else apostas_usuario
+            )
+            automaticas = 0
+            if not realizadas.empty and "automatica" in realizadas.columns:
+                automaticas = int((pd.to_numeric(realizadas["automatica"], errors="coerce").fillna(0) > 0).sum())
+            pontos, descarte = atuais.get(uid, (0.0, 0.0))
+            nomes = ()
+            fichas: tuple[int, ...] = ()
+            piloto_11 = ""
+            if ultima_aposta is not None:
+                nomes = tuple(p.strip() for p in str(ultima_aposta.get("pilotos") or "").split(","))
+                fichas = tuple(_fichas(ultima_aposta.get("fichas")))
+                piloto_11 = str(ultima_aposta.get("piloto_11") or "").strip()
+                pilotos.update(dict.fromkeys(p for p in (*nomes, piloto_11) if p))
+            faltas_raw = pd.to_numeric(pd.Series([usuario.get("faltas")]), errors="coerce").iloc[0]
+            participantes.append(
+                _ParticipanteCenario(
+                    usuario_id=uid,
+                    pontos=pontos,
+                    menor_prova=descarte if not realizadas.empty else None,
+                    faltas=automaticas if pd.isna(faltas_raw) else int(faltas_raw),
+                    taxa_ausencia=automaticas / len(com_resultado) if com_resultado else 0.0,
+                    pilotos=nomes,
+                    fichas=fichas,
+                    piloto_11=piloto_11,
+                )
+            )
+    participantes.sort(key=lambda p: (posicao_atual.get(p.usuario_id, len(posicao_atual) + 1), -p.pontos))
+
+    pilotos_df = get_pilotos_df()
+    if not pilotos_df.empty:
+        ativos = pilotos_df
+        if "status" in pilotos_df.columns:
+            ativos = pilotos_df[pilotos_df["status"].astype(str).str.strip().str.lower() == "ativo"]
+        pilotos = {**dict.fromkeys(str(n).strip() for n in ativos["nome"] if str(n).strip()), **pilotos}
+
+    return Cenario(
+        temporada=temporada,
+        pilotos=tuple(pilotos),
+        provas=tuple(provas),
+        participantes=tuple(participantes),
+        descarte=bool(regras_normal.get("descarte", False)),
+    )
+
+
+def _prova_simulada(prova: _ProvaCenario, cenario: Cenario) -> ProvaSimulada:
+    regras = json.loads(prova.regras_versao)
+    is_sprint = prova.tipo == "Sprint"
+    n_pilotos = len(cenario.pilotos)
+    sinais = sinais_ergast(_get_contexto_temporada_atual_ergast(temporada=cenario.temporada, nome_prova=prova.nome))
+    pesos = pesos_mu(regras, is_sprint)
+    penalidade_dnf_mu = dnf_mu_penalty(regras, is_sprint)
+    # O grid inteiro é sorteado (o 11º fica fora da zona de pontos), então a
+    # posição esperada vai até o último lugar em vez de parar na tabela.
+    modelos = [
+        parametros_piloto(
+            piloto,
+            sinais,
+            n_pos=n_pilotos,
+            is_sprint=is_sprint,
+            pesos=pesos,
+            penalidade_dnf_mu=penalidade_dnf_mu,
+        )
+        for piloto in cenario.pilotos
+    ]
+    fator_auto = max(0.0, 1 - float(regras.get("penalidade_auto_percent", 20)) / 100)
+    return ProvaSimulada(
+        mu=np.array([m.mu for m in modelos], dtype=np.float64),
+        sigma=np.array([m.sigma for m in modelos], dtype=np.float64),
+        dnf=np.array([m.dnf_rate for m in modelos], dtype=np.float64),
+        pontos=tuple(float(p) for p in tabela_pontos(regras, prova.tipo)),
+        pontos_11=float(regras.get("pontos_11_colocado", 25)),
+        pontos_penalidade=float(regras.get("pontos_penalidade", 0) or 0) if regras.get("penalidade_abandono") else 0.0,
+        multiplicador=2.0 if is_sprint and bool(regras.get("pontos_dobrada")) else 1.0,
+        fator_auto=fator_auto,
+    )
+
+
+def _participante_simulado(participante: _ParticipanteCenario, indice: dict[str, int]) -> ParticipanteSimulado:
+    fichas = [0] * len(indice)
+    for nome, ficha in zip(participante.pilotos, participante.fichas):
+        if nome in indice and ficha > 0:
+            fichas[indice[nome]] += int(ficha)
+    return ParticipanteSimulado(
+        usuario_id=participante.usuario_id,
+        pontos=participante.pontos,
+        fichas=tuple(fichas),
+        indice_11=indice.get(participante.piloto_11, -1),
+        menor_prova=participante.menor_prova,
+        faltas=participante.faltas,
+        taxa_ausencia=participante.taxa_ausencia,
+    )
+
+
+@ttl_cache(ttl=3600, tags=("classificacao", "apostas", "resultados", "regras"), maxsize=32)
+def _chances_do_cenario(cenario: Cenario, n_simulacoes: int, seed: int) -> pd.DataFrame:
+    indice = {nome: i for i, nome in enumerate(cenario.pilotos)}
+    provas = [_prova_simulada(prova, cenario) for prova in cenario.provas]
+    participantes = [_participante_simulado(p, indice) for p in cenario.participantes]
+    chances = simular_chances(
+        provas, participantes, n_simulacoes=n_simulacoes, seed=seed, descarte=cenario.descarte
+    )
+    logger.info(
+        "Chances de campeonato %s: %s simulações, %s provas, %s participantes",
+        cenario.temporada,
+        n_simulacoes,
+        len(provas),
+        len(participantes),
+    )
+    return chances
+
+
+def calcular_chances_campeonato(temporada: str, n_simulacoes: int = 10_000, seed: int = 0) -> pd.DataFrame:
+    """Chances de título e pódio de cada participante na temporada.
+
+    As leituras do banco são baratas; contexto Ergast e simulação só rodam
+    quando o cenário muda.
+    """
+    return _chances_do_cenario(montar_cenario(temporada), int(n_simulacoes), int(seed)).copy()
+
+
+__all__ = [
+    "CHANCES_COLUMNS",
+    "Cenario",
+    "ParticipanteSimulado",
+    "ProvaSimulada",
+    "calcular_chances_campeonato",
+    "montar_cenario",
+    "simular_chances",
+]
@@ -394,6 +394,16 @@ def get_championship_bet_log(user_id: int, season: Optional[int] = None):
         result = cursor.fetchall()
     return result
 
+def _atualizar_bonus_classificacao(season: int) -> None:
+    """Reflete o bônus de campeonato na classificação acumulada persistida."""
+    from services.standings_service import atualizar_classificacao_temporada
+
+    try:
+        atualizar_classificacao_temporada(str(season))
+    except Exception as exc:
+        logger.warning("Falha ao atualizar classificação acumulada (season=%s): %s", season, exc)
+
+
 def save_final_results(champion: str, vice: str, team: str, season: Optional[int] = None) -> bool:
     """Salva ou atualiza o resultado oficial do campeonato por temporada."""
     try:
@@ -429,7 +439,8 @@ def save_final_results(champion: str, vice: str, team: str, season: Optional[int
             )
             conn.commit()
             clear_data_cache("championship", "classificacao")
-            return True
+        _atualizar_bonus_classificacao(season_val)
+        return True
     except Exception as e:
         logger.exception(f"Erro ao salvar resultado final do campeonato (season={season_val}): {e}")
         return False
@@ -3,47 +3,102 @@
 from utils.performance import instrumented_cache_data
 from utils.dataframe_contracts import (
     APOSTAS_COLUMNS,
+    CARREIRA_TEMPORADA_COLUMNS,
+    CLASSIFICACAO_TEMPORADA_COLUMNS,
     POSICOES_COLUMNS,
     USUARIOS_COLUMNS,
     with_required_columns,
 )
 
+from db.db_config import CACHE_USER_MAX_BYTES, CACHE_USER_MAXSIZE
 from db.repo_bets import (
     get_apostas_df as _repo_get_apostas_df,
     get_apostas_usuario_df as _repo_get_apostas_usuario_df,
+    get_distribuicao_piloto_11_df as _repo_get_distribuicao_piloto_11_df,
+    get_distribuicao_pilotos_df as _repo_get_distribuicao_pilotos_df,
     get_participantes_temporada_df as _repo_get_participantes_temporada_df,
     get_posicoes_participantes_df as _repo_get_posicoes_participantes_df,
     get_posicoes_usuario_df as _repo_get_posicoes_usuario_df,
 )
+from db.repo_career import get_carreira_usuario_df as _repo_get_carreira_usuario_df
+from db.repo_standings import (
+    get_classificacao_temporada_df as _repo_get_classificacao_temporada_df,
+)
 
-@instrumented_cache_data(ttl=60, tags=("apostas",))
+@instrumented_cache_data(ttl=60, tags=("apostas",), stale_while_revalidate=30, replica=True)
 def get_apostas_df(temporada=None):
     return with_required_columns(_repo_get_apostas_df(temporada), APOSTAS_COLUMNS)
 
 
-@instrumented_cache_data(ttl=60, tags=("apostas", "historico"))
+@instrumented_cache_data(
+    ttl=60,
+    tags=("apostas", "historico"),
+    maxsize=CACHE_USER_MAXSIZE,
+    max_bytes=CACHE_USER_MAX_BYTES,
+    replica=True,
+)
 def get_apostas_usuario_df(usuario_id: int, limit: int = 5000):
     return with_required_columns(_repo_get_apostas_usuario_df(usuario_id, limit), APOSTAS_COLUMNS)
 
 
-@instrumented_cache_data(ttl=60, tags=("posicoes", "classificacao"))
+@instrumented_cache_data(ttl=60, tags=("posicoes", "classificacao"), stale_while_revalidate=30, replica=True)
 def get_posicoes_participantes_df(temporada=None):
     return with_required_columns(_repo_get_posicoes_participantes_df(temporada), POSICOES_COLUMNS)
 
 
-@instrumented_cache_data(ttl=60, tags=("posicoes", "historico"))
+@instrumented_cache_data(
+    ttl=60,
+    tags=("posicoes", "historico"),
+    maxsize=CACHE_USER_MAXSIZE,
+    max_bytes=CACHE_USER_MAX_BYTES,
+    replica=True,
+)
 def get_posicoes_usuario_df(usuario_id: int, limit: int = 5000):
     return with_required_columns(_repo_get_posicoes_usuario_df(usuario_id, limit), POSICOES_COLUMNS)
 
 
-@instrumented_cache_data(ttl=60, tags=("usuarios", "classificacao"))
+@instrumented_cache_data(ttl=60, tags=("usuarios", "classificacao"), replica=True)
 def get_participantes_temporada_df(temporada=None):
     return with_required_columns(_repo_get_participantes_temporada_df(temporada), USUARIOS_COLUMNS)
 
 
+@instrumented_cache_data(ttl=60, tags=("apostas",), replica=True)
+def get_distribuicao_pilotos_df(temporada, usuario_ids: tuple[int, ...], nomes: tuple[str, ...] = ()):
+    return _repo_get_distribuicao_pilotos_df(temporada, list(usuario_ids), list(nomes))
+
+
+@instrumented_cache_data(ttl=60, tags=("apostas",), replica=True)
+def get_distribuicao_piloto_11_df(temporada, usuario_ids: tuple[int, ...], nomes: tuple[str, ...] = ()):
+    return _repo_get_distribuicao_piloto_11_df(temporada, list(usuario_ids), list(nomes))
+
+
+@instrumented_cache_data(ttl=60, tags=("posicoes", "classificacao"), stale_while_revalidate=30, replica=True)
+def get_classificacao_temporada_df(temporada):
+    return with_required_columns(
+        _repo_get_classificacao_temporada_df(temporada), CLASSIFICACAO_TEMPORADA_COLUMNS
+    )
+
+
+@instrumented_cache_data(
+    ttl=300,
+    tags=("historico",),
+    maxsize=CACHE_USER_MAXSIZE,
+    max_bytes=CACHE_USER_MAX_BYTES,
+    replica=True,
+)
+def get_carreira_usuario_df(usuario_id: int):
+    return with_required_columns(
+        _repo_get_carreira_usuario_df(usuario_id), CARREIRA_TEMPORADA_COLUMNS
+    )
+
+
 __all__ = [
     "get_apostas_df",
+    "get_carreira_usuario_df",
+    "get_distribuicao_piloto_11_df",
+    "get_distribuicao_pilotos_df",
     "get_apostas_usuario_df",
+    "get_classificacao_temporada_df",
     "get_participantes_temporada_df",
     "get_posicoes_participantes_df",
     "get_posicoes_usuario_df",
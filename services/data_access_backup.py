@@ -1,9 +1,10 @@
 """Fachada de dados de backup/importacao para a camada de UI e utils."""
 
 from db.backup_excel import download_tabela, upload_tabela as _upload_tabela
-from db.backup_sql import create_next_temporada as _create_next_temporada, download_db, get_postgres_backup_mode, list_temporadas, upload_db as _upload_db
+from db.backup_sql import download_db, get_postgres_backup_mode, upload_db as _upload_db
 from services.access_control import require_operation
 from services.backup_restore_authorization import reauthorize_restore
+from services.season_catalog import create_next_temporada as _create_next_temporada, list_temporadas
 from utils.backup_security import require_restore_authorized
 
 
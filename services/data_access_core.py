@@ -1,8 +1,28 @@
 """Fachada de utilitarios de infraestrutura de dados para UI."""
 
+from db.audit_sink import eventos_pendentes, registrar_evento
+from db.connection_pool import pool_stats
 from db.db_schema import db_connect, get_table_columns
+from db.partitions import manter_particoes_periodicamente
+from utils.performance import query_stats
+
+
+def get_pool_stats() -> list[dict]:
+    """Snapshot de saturação dos pools de conexão (primário e réplica)."""
+    return pool_stats()
+
+
+def get_query_stats(top: int = 20) -> list[dict]:
+    """Consultas de maior tempo total no processo, com percentis de latência."""
+    return query_stats(top)
+
 
 __all__ = [
     "db_connect",
+    "eventos_pendentes",
+    "get_pool_stats",
+    "get_query_stats",
     "get_table_columns",
+    "manter_particoes_periodicamente",
+    "registrar_evento",
 ]
@@ -13,6 +13,7 @@ from db.circuitos_utils import (
     get_circuitos_df as _repo_get_circuitos_df,
     get_temporadas_existentes_provas as _repo_get_temporadas_existentes_provas,
 )
+from db.db_config import CACHE_USER_MAX_BYTES, CACHE_USER_MAXSIZE
 from db.repo_races import (
     get_pilotos_df as _repo_get_pilotos_df,
     get_provas_df as _repo_get_provas_df,
@@ -21,22 +22,28 @@ from db.repo_races import (
 )
 
 
-@instrumented_cache_data(ttl=60, tags=("pilotos",))
+@instrumented_cache_data(ttl=60, tags=("pilotos",), replica=True)
 def get_pilotos_df():
     return with_required_columns(_repo_get_pilotos_df(), PILOTOS_COLUMNS)
 
 
-@instrumented_cache_data(ttl=60, tags=("provas",))
+@instrumented_cache_data(ttl=60, tags=("provas",), replica=True)
 def get_provas_df(temporada=None):
     return with_required_columns(_repo_get_provas_df(temporada), PROVAS_COLUMNS)
 
 
-@instrumented_cache_data(ttl=60, tags=("resultados", "classificacao"))
+@instrumented_cache_data(ttl=60, tags=("resultados", "classificacao"), stale_while_revalidate=30, replica=True)
 def get_resultados_df(temporada=None):
     return with_required_columns(_repo_get_resultados_df(temporada), RESULTADOS_COLUMNS)
 
 
-@instrumented_cache_data(ttl=60, tags=("resultados", "historico"))
+@instrumented_cache_data(
+    ttl=60,
+    tags=("resultados", "historico"),
+    maxsize=CACHE_USER_MAXSIZE,
+    max_bytes=CACHE_USER_MAX_BYTES,
+    replica=True,
+)
 def get_resultados_usuario_df(usuario_id: int, limit: int = 5000):
     return with_required_columns(_repo_get_resultados_usuario_df(usuario_id, limit), RESULTADOS_COLUMNS)
 
@@ -0,0 +1,239 @@
+"""Modelo de posição de chegada por piloto a partir do contexto Ergast.
+
+É o mesmo modelo da estimativa de pontos do e-mail de aposta: a posição
+esperada ``mu`` combina grid da última classificação (``qg``), média recente
+(``rp5``) e histórico no circuito (``hc``), ajustada por ganho de posições
+(``du``), volta rápida (``vr``) e taxa de abandono (``dnf``); a dispersão
+``sigma`` vem das últimas oito chegadas (``rp8``). A distribuição de posições
+é uma gaussiana discreta normalizada sobre as posições que pontuam.
+
+Os sinais do contexto são interpretados uma vez (``sinais_ergast``) e
+reaproveitados para todos os pilotos de uma estimativa ou simulação.
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field
+from typing import Any, Mapping, Optional
+
+
+def norm_nome_piloto(nome: Any) -> str:
+    return str(nome or "").strip().lower()
+
+
+def _media_lista(nums: list[int]) -> Optional[float]:
+    if not nums:
+        return None
+    return float(sum(nums)) / float(len(nums))
+
+
+def _desvio_padrao_populacao(nums: list[int]) -> Optional[float]:
+    if len(nums) < 2:
+        return None
+    m = float(sum(nums)) / float(len(nums))
+    var = sum((float(x) - m) ** 2 for x in nums) / float(len(nums))
+    return math.sqrt(var)
+
+
+def clamp(v: float, lo: float, hi: float) -> float:
+    return max(lo, min(hi, v))
+
+
+def _dict(contexto: Mapping[str, Any], chave: str) -> dict:
+    valor = contexto.get(chave, {})
+    return valor if isinstance(valor, dict) else {}
+
+
+@dataclass(frozen=True)
+class SinaisErgast:
+    """Contexto Ergast já indexado pelo nome normalizado do piloto."""
+
+    pos_por_nome: Mapping[str, int] = field(default_factory=dict)
+    delta_por_nome: Mapping[str, int] = field(default_factory=dict)
+    vr: frozenset[str] = frozenset()
+    qg: Mapping[str, Any] = field(default_factory=dict)
+    rp5: Mapping[str, Any] = field(default_factory=dict)
+    rp8: Mapping[str, Any] = field(default_factory=dict)
+    hc: Mapping[str, Any] = field(default_factory=dict)
+    fr11: Mapping[str, Any] = field(default_factory=dict)
+    dnf: Mapping[str, Any] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class ParametrosPiloto:
+    mu: float
+    sigma: float
+    dnf_rate: float
+    componentes: dict
+
+
+def sinais_ergast(contexto_ergast: Any) -> SinaisErgast:
+    contexto = contexto_ergast if isinstance(contexto_ergast, dict) else {}
+    tp = contexto.get("tp", [])
+    du = _dict(contexto, "du")
+    vr = contexto.get("vr", [])
+
+    pos_por_nome: dict[str, int] = {}
+    for row in tp if isinstance(tp, list) else []:
+        nome = norm_nome_piloto(row.get("n"))
+        pos = int(row.get("p", 0) or 0)
+        if nome and pos > 0:
+            pos_por_nome[nome] = pos
+
+    delta_por_nome: dict[str, int] = {}
+    for grupo in ("top", "bot"):
+        for row in du.get(grupo, []) if isinstance(du.get(grupo, []), list) else []:
+            delta_por_nome[norm_nome_piloto(row.get("n"))] = int(row.get("d", 0) or 0)
+
+    vr_set = frozenset(
+        norm_nome_piloto(row.get("n")) for row in (vr if isinstance(vr, list) else []) if norm_nome_piloto(row.get("n"))
+    )
+    return SinaisErgast(
+        pos_por_nome=pos_por_nome,
+        delta_por_nome=delta_por_nome,
+        vr=vr_set,
+        qg=_dict(contexto, "qg"),
+        rp5=_dict(contexto, "rp5"),
+        rp8=_dict(contexto, "rp8"),
+        hc=_dict(contexto, "hc"),
+        fr11=_dict(contexto, "fr11"),
+        dnf=_dict(contexto, "dnf"),
+    )
+
+
+def pesos_mu(regras: Mapping[str, Any], is_sprint: bool) -> tuple[float, float, float]:
+    """Pesos (qg, rp5, hc) de ``mu`` ajustáveis por regra, normalizados para somar 1."""
+    default_mu_weights = (0.45, 0.35, 0.20) if is_sprint else (0.40, 0.35, 0.25)
+    mu_weights_raw = regras.get("pesos_mu_sprint" if is_sprint else "pesos_mu_normal")
+    if isinstance(mu_weights_raw, dict):
+        w_qg = float(mu_weights_raw.get("qg", default_mu_weights[0]))
+        w_rp5 = float(mu_weights_raw.get("rp5", default_mu_weights[1]))
+        w_hc = float(mu_weights_raw.get("hc", default_mu_weights[2]))
+    elif isinstance(mu_weights_raw, (list, tuple)) and len(mu_weights_raw) == 3:
+        w_qg, w_rp5, w_hc = (float(mu_weights_raw[0]), float(mu_weights_raw[1]), float(mu_weights_raw[2]))
+    else:
+        w_qg, w_rp5, w_hc = default_mu_weights
+
+    soma_w = w_qg + w_rp5 + w_hc
+    if soma_w <= 0:
+        w_qg, w_rp5, w_hc = default_mu_weights
+        soma_w = w_qg + w_rp5 + w_hc
+    return (w_qg / soma_w, w_rp5 / soma_w, w_hc / soma_w)
+
+
+def dnf_mu_penalty(regras: Mapping[str, Any], is_sprint: bool) -> float:
+    return float(regras.get("dnf_mu_penalty", 1.8 if is_sprint else 2.5))
+
+
+def parametros_piloto(
+    piloto: str,
+    sinais: SinaisErgast,
+    *,
+    n_pos: int,
+    is_sprint: bool,
+    pesos: tuple[float, float, float],
+    penalidade_dnf_mu: float,
+) -> ParametrosPiloto:
+    """Posição esperada, dispersão e taxa de abandono de um piloto."""
+    w_qg, w_rp5, w_hc = pesos
+    nome_key = norm_nome_piloto(piloto)
+    base_rank = sinais.pos_por_nome.get(nome_key)
+    delta = int(sinais.delta_por_nome.get(nome_key, 0))
+    ajuste_vr = -0.6 if nome_key in sinais.vr else 0.0
+
+    qg_pos = None
+    try:
+        qg_pos = int(sinais.qg.get(nome_key)) if sinais.qg.get(nome_key) is not None else None
+    except Exception:
+        qg_pos = None
+
+    rec5 = None
+    if isinstance(sinais.rp5.get(nome_key), list):
+        lista5 = [int(x) for x in sinais.rp5.get(nome_key, []) if int(x) > 0]
+        rec5 = _media_lista(lista5)
+
+    hist = None
+    try:
+        hist_val = sinais.hc.get(nome_key)
+        hist = float(hist_val) if hist_val is not None else None
+    except Exception:
+        hist = None
+
+    componentes: list[tuple[float, float]] = []
+    if qg_pos is not None and qg_pos > 0:
+        componentes.append((w_qg, float(qg_pos)))
+    if rec5 is not None and rec5 > 0:
+        componentes.append((w_rp5, rec5))
+    if hist is not None and hist > 0:
+        componentes.append((w_hc, hist))
+
+    componentes_map: dict[str, Optional[float]] = {
+        "qg": float(qg_pos) if qg_pos is not None else None,
+        "rp5": float(rec5) if rec5 is not None else None,
+        "hc": float(hist) if hist is not None else None,
+        "base_rank": float(base_rank) if base_rank is not None else None,
+        "delta": float(delta),
+        "ajuste_vr": float(ajuste_vr),
+    }
+
+    if componentes:
+        soma_pesos = sum(w for w, _ in componentes)
+        mu = sum(w * v for w, v in componentes) / soma_pesos
+    elif base_rank is not None:
+        mu = float(base_rank)
+    else:
+        mu = float(n_pos) * 0.72
+
+    mu = mu - (0.20 * float(delta)) + ajuste_vr
+
+    try:
+        dnf_rate = float(sinais.dnf.get(nome_key, 0.0) or 0.0)
+    except Exception:
+        dnf_rate = 0.0
+    dnf_rate = clamp(dnf_rate, 0.0, 0.8)
+    mu += dnf_rate * penalidade_dnf_mu
+    mu = clamp(mu, 1.0, float(n_pos))
+
+    sigma = 1.9 if not is_sprint else 1.5
+    if isinstance(sinais.rp8.get(nome_key), list):
+        lista8_raw = [int(x) for x in sinais.rp8.get(nome_key, []) if int(x) > 0]
+        if lista8_raw:
+            lista8 = [int(clamp(float(x), 1.0, float(max(n_pos, 20)))) for x in lista8_raw]
+            std8 = _desvio_padrao_populacao(lista8)
+            if std8 is not None:
+                if is_sprint:
+                    sigma = clamp(float(std8), 0.9, 3.2)
+                else:
+                    sigma = clamp(float(std8), 1.1, 4.0)
+
+    componentes_map["mu_final"] = float(mu)
+    componentes_map["sigma"] = float(sigma)
+    componentes_map["dnf_rate"] = float(dnf_rate)
+    componentes_map["dnf_penalidade_mu"] = float(dnf_rate * penalidade_dnf_mu)
+    return ParametrosPiloto(mu=float(mu), sigma=float(sigma), dnf_rate=float(dnf_rate), componentes=componentes_map)
+
+
+def distribuicao_posicoes(mu: float, sigma: float, n_pos: int) -> list[float]:
+    """Probabilidade de cada posição 1..``n_pos`` (gaussiana discreta normalizada)."""
+    row = []
+    for pos_idx in range(1, n_pos + 1):
+        z = (float(pos_idx) - mu) / sigma
+        row.append(math.exp(-0.5 * z * z))
+    s = sum(row)
+    if s <= 0:
+        return [1.0 / n_pos] * n_pos
+    return [v / s for v in row]
+
+
+__all__ = [
+    "ParametrosPiloto",
+    "SinaisErgast",
+    "clamp",
+    "distribuicao_posicoes",
+    "dnf_mu_penalty",
+    "norm_nome_piloto",
+    "parametros_piloto",
+    "pesos_mu",
+    "sinais_ergast",
+]
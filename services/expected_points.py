@@ -0,0 +1,252 @@
+"""Pontuação esperada de muitas apostas de uma prova de uma vez.
+
+A matriz piloto x posição (``MatrizProva``) é montada uma vez por prova a
+partir do contexto Ergast e das regras — o mesmo modelo por piloto da
+estimativa do e-mail (``services.driver_model``) — e fica em cache pela
+combinação (pilotos, regras, tipo, contexto). Avaliar N apostas vira álgebra
+de matrizes: fichas (N x D) contra o valor esperado e a variância de cada
+piloto (D), mais o 11º e a penalidade por abandono.
+
+A variância trata os pilotos como independentes, como o próprio modelo (cada
+piloto tem sua distribuição de posições). Pilotos fora da matriz não
+contribuem.
+
+Usos: estimativa do e-mail de aposta, otimizador de fichas
+(``services.bets_optimizer``) e a comparação de apostas da Gestão de Apostas.
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from typing import Any, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from db.repo_races import get_pilotos_df
+from services.bets_ai import _get_contexto_temporada_atual_ergast
+from services.driver_model import (
+    distribuicao_posicoes,
+    dnf_mu_penalty,
+    norm_nome_piloto,
+    parametros_piloto,
+    pesos_mu,
+    sinais_ergast,
+)
+from services.rules_service import get_regras_aplicaveis
+from services.scoring_kernel import tabela_pontos, versao_regras
+from utils.ttl_cache import ttl_cache
+
+AVALIACAO_COLUMNS = ("pontos_esperados", "variancia", "desvio_padrao", "chance_11")
+
+Aposta = tuple[Sequence[str], Sequence[int], str]
+
+
+@dataclass(frozen=True)
+class MatrizProva:
+    """Distribuição de posições de cada piloto numa prova e as regras de pontuação.
+
+    ``probs`` tem uma linha por piloto (ordem de ``pilotos``) e uma coluna por
+    posição; ``pontos`` tem o mesmo número de posições, com zero fora da
+    tabela.
+    """
+
+    pilotos: tuple[str, ...]
+    indice: Mapping[str, int]
+    probs: np.ndarray
+    dnf: np.ndarray
+    fator_dnf: np.ndarray
+    pontos: np.ndarray
+    componentes: tuple[dict, ...]
+    pontos_11: float
+    penalidade_abandono: float
+    multiplicador: float
+
+    def linha(self, piloto: str) -> Optional[int]:
+        return self.indice.get(norm_nome_piloto(piloto))
+
+    @property
+    def esperado_por_ficha(self) -> np.ndarray:
+        return self.multiplicador * (self.probs @ self.pontos) * self.fator_dnf
+
+    @property
+    def variancia_por_ficha(self) -> np.ndarray:
+        media = self.probs @ self.pontos
+        return (self.multiplicador * self.fator_dnf) ** 2 * np.maximum(self.probs @ self.pontos**2 - media**2, 0.0)
+
+    @property
+    def custo_abandono(self) -> np.ndarray:
+        return self.multiplicador * self.penalidade_abandono * self.dnf
+
+    @property
+    def chance_11(self) -> np.ndarray:
+        if self.probs.shape[1] < 11:
+            return np.zeros(len(self.pilotos))
+        return self.probs[:, 10]
+
+    @property
+    def bonus_11(self) -> float:
+        return self.multiplicador * self.pontos_11
+
+
+@ttl_cache(ttl=3600, tags=("regras",), maxsize=256)
+def _matriz_cacheada(
+    pilotos: tuple[str, ...],
+    regras_versao: str,
+    tipo: str,
+    contexto_json: str,
+    n_posicoes: Optional[int],
+) -> MatrizProva:
+    regras = json.loads(regras_versao)
+    is_sprint = tipo == "Sprint"
+    pontos = [float(p) for p in tabela_pontos(regras, tipo)]
+    n_grid = int(n_posicoes) if n_posicoes else max(len(pilotos), len(pontos), 11)
+    sinais = sinais_ergast(json.loads(contexto_json))
+    pesos = pesos_mu(regras, is_sprint)
+    penalidade_dnf_mu = dnf_mu_penalty(regras, is_sprint)
+    escala_dnf = float(regras.get("dnf_points_penalty_scale", 0.75))
+
+    probs = np.zeros((len(pilotos), n_grid), dtype=np.float64)
+    dnf = np.zeros(len(pilotos), dtype=np.float64)
+    componentes = []
+    for i, piloto in enumerate(pilotos):
+        modelo = parametros_piloto(
+            piloto, sinais, n_pos=n_grid, is_sprint=is_sprint, pesos=pesos, penalidade_dnf_mu=penalidade_dnf_mu
+        )
+        probs[i] = distribuicao_posicoes(modelo.mu, modelo.sigma, n_grid)
+        dnf[i] = modelo.dnf_rate
+        componentes.append(modelo.componentes)
+
+    tabela = np.zeros(n_grid, dtype=np.float64)
+    tabela[: min(n_grid, len(pontos))] = pontos[:n_grid]
+    fator_dnf = 1.0 - np.clip(dnf * escala_dnf, 0.0, 0.90)
+    for arr in (probs, dnf, fator_dnf, tabela):
+        arr.setflags(write=False)
+    return MatrizProva(
+        pilotos=pilotos,
+        indice={norm_nome_piloto(p): i for i, p in enumerate(pilotos)},
+        probs=probs,
+        dnf=dnf,
+        fator_dnf=fator_dnf,
+        pontos=tabela,
+        componentes=tuple(componentes),
+        pontos_11=float(regras.get("pontos_11_colocado", 25) or 0),
+        penalidade_abandono=float(regras.get("pontos_penalidade", 0) or 0) if regras.get("penalidade_abandono") else 0.0,
+        multiplicador=2.0 if is_sprint and bool(regras.get("pontos_dobrada")) else 1.0,
+    )
+
+
+def matriz_prova(
+    pilotos: Sequence[str],
+    regras: dict,
+    tipo_prova: str,
+    contexto_ergast: Any,
+    n_posicoes: Optional[int] = None,
+) -> MatrizProva:
+    """Matriz piloto x posição da prova (em cache).
+
+    Sem ``n_posicoes`` a distribuição cobre o grid inteiro (necessário para o
+    11º); a estimativa do e-mail usa só as posições que pontuam.
+    """
+    nomes = tuple(dict.fromkeys(str(p).strip() for p in pilotos if str(p or "").strip()))
+    tipo = "Sprint" if str(tipo_prova).strip().lower() == "sprint" else "Normal"
+    contexto = contexto_ergast if isinstance(contexto_ergast, dict) else {}
+    return _matriz_cacheada(
+        nomes,
+        versao_regras(regras),
+        tipo,
+        json.dumps(contexto, sort_keys=True, default=str),
+        n_posicoes,
+    )
+
+
+def avaliar_apostas(matriz: MatrizProva, apostas: Sequence[Aposta]) -> pd.DataFrame:
+    """Pontos esperados, variância e chance do 11º de cada aposta, na ordem recebida."""
+    n_pilotos = len(matriz.pilotos)
+    fichas = np.zeros((len(apostas), n_pilotos), dtype=np.float64)
+    indice_11 = np.full(len(apostas), -1, dtype=np.int64)
+    for n, (pilotos, fichas_aposta, piloto_11) in enumerate(apostas):
+        for piloto, ficha in zip(pilotos, fichas_aposta):
+            linha = matriz.linha(piloto)
+            if linha is not None and int(ficha) > 0:
+                fichas[n, linha] += int(ficha)
+        linha_11 = matriz.linha(piloto_11)
+        if linha_11 is not None:
+            indice_11[n] = linha_11
+
+    apostados = (fichas > 0).astype(np.float64)
+    tem_11 = indice_11 >= 0
+    p11 = np.zeros(len(apostas), dtype=np.float64)
+    p11[tem_11] = matriz.chance_11[indice_11[tem_11]]
+    penalidade = matriz.multiplicador * matriz.penalidade_abandono
+    esperado = fichas @ matriz.esperado_por_ficha + matriz.bonus_11 * p11 - apostados @ matriz.custo_abandono
+    variancia = (
+        fichas**2 @ matriz.variancia_por_ficha
+        + matriz.bonus_11**2 * p11 * (1 - p11)
+        + apostados @ (penalidade**2 * matriz.dnf * (1 - matriz.dnf))
+    )
+    return pd.DataFrame(
+        {
+            "pontos_esperados": esperado,
+            "variancia": variancia,
+            "desvio_padrao": np.sqrt(variancia),
+            "chance_11": p11,
+        },
+        columns=list(AVALIACAO_COLUMNS),
+    )
+
+
+def avaliar_apostas_da_prova(
+    apostas_df: pd.DataFrame,
+    pilotos_df: pd.DataFrame,
+    regras: dict,
+    tipo_prova: str,
+    contexto_ergast: Any,
+) -> pd.DataFrame:
+    """``apostas_df`` (pilotos, fichas, piloto_11) com as colunas de avaliação."""
+    if apostas_df.empty:
+        return apostas_df.assign(**{c: pd.Series(dtype=float) for c in AVALIACAO_COLUMNS})
+    apostas: list[Aposta] = []
+    for pilotos_raw, fichas_raw, piloto_11 in zip(apostas_df["pilotos"], apostas_df["fichas"], apostas_df["piloto_11"]):
+        pilotos = [p.strip() for p in str(pilotos_raw or "").split(",")]
+        fichas = []
+        for parte in str(fichas_raw or "").split(","):
+            try:
+                fichas.append(int(parte))
+            except ValueError:
+                fichas.append(0)
+        apostas.append((pilotos, fichas, str(piloto_11 or "").strip()))
+
+    nomes = [str(n) for n in pilotos_df["nome"].tolist()] if "nome" in pilotos_df.columns else []
+    for pilotos, _, piloto_11 in apostas:
+        nomes.extend([*pilotos, piloto_11])
+    matriz = matriz_prova(nomes, regras, tipo_prova, contexto_ergast)
+    avaliacao = avaliar_apostas(matriz, apostas)
+    return pd.concat([apostas_df.reset_index(drop=True), avaliacao], axis=1)
+
+
+def comparar_apostas_prova(apostas_df: pd.DataFrame, nome_prova: str, tipo_prova: str, temporada: str) -> pd.DataFrame:
+    """Avaliação de todas as apostas de uma prova, da maior pontuação esperada para a menor."""
+    pilotos_df = get_pilotos_df()
+    if not pilotos_df.empty and "status" in pilotos_df.columns:
+        pilotos_df = pilotos_df[pilotos_df["status"] == "Ativo"]
+    tipo = "Sprint" if str(tipo_prova).strip().lower() == "sprint" else "Normal"
+    avaliacao = avaliar_apostas_da_prova(
+        apostas_df,
+        pilotos_df,
+        get_regras_aplicaveis(str(temporada), tipo),
+        tipo,
+        _get_contexto_temporada_atual_ergast(temporada=str(temporada), nome_prova=nome_prova),
+    )
+    return avaliacao.sort_values("pontos_esperados", ascending=False, kind="mergesort").reset_index(drop=True)
+
+
+__all__ = [
+    "AVALIACAO_COLUMNS",
+    "MatrizProva",
+    "avaliar_apostas",
+    "avaliar_apostas_da_prova",
+    "comparar_apostas_prova",
+    "matriz_prova",
+]
@@ -3,7 +3,13 @@
 Contém helpers de fonte de dados e consultas para manter a UI enxuta.
 """
 
-from db.db_schema import table_exists
+import pandas as pd
+
+from db.repo_hall import (
+    get_hall_da_fama_resumo_df,
+    reconstruir_hall_da_fama_resumo,
+    resolver_fonte_hall,
+)
 
 
 def table_height(total_rows: int, row_height: int = 36, max_height: int = 620) -> int:
@@ -12,22 +18,16 @@ def table_height(total_rows: int, row_height: int = 36, max_height: int = 620) -
 
 def resolve_hall_source(conn) -> tuple[str, str]:
     """Define a tabela fonte do Hall da Fama com fallback para legado."""
-    c = conn.cursor()
-    has_hall = table_exists(conn, "hall_da_fama")
-    if has_hall:
-        c.execute("SELECT COUNT(*) AS cnt FROM hall_da_fama")
-        hall_count = int(c.fetchone()["cnt"] or 0)
-        if hall_count > 0:
-            return "hall_da_fama", "posicao_final"
+    return resolver_fonte_hall(conn)
 
-    has_legacy = table_exists(conn, "posicoes_participantes")
-    if has_legacy:
-        c.execute("SELECT COUNT(*) AS cnt FROM posicoes_participantes")
-        legacy_count = int(c.fetchone()["cnt"] or 0)
-        if legacy_count > 0:
-            return "posicoes_participantes", "posicao"
 
-    return "hall_da_fama", "posicao_final"
+def load_hall_summary(conn) -> pd.DataFrame:
+    """Lê o resumo pré-ordenado, reconstruindo-o se ainda não foi populado."""
+    resumo = get_hall_da_fama_resumo_df(conn)
+    if resumo.empty and reconstruir_hall_da_fama_resumo(conn):
+        conn.commit()
+        resumo = get_hall_da_fama_resumo_df(conn)
+    return resumo
 
 
 def hall_queries(source_table: str) -> dict[str, str]:
@@ -115,4 +115,4 @@ def hall_queries(source_table: str) -> dict[str, str]:
     }
 
 
-__all__ = ["table_height", "resolve_hall_source", "hall_queries"]
+__all__ = ["table_height", "resolve_hall_source", "load_hall_summary", "hall_queries"]
@@ -8,6 +8,7 @@ from services.access_control import require_operation
 from datetime import datetime
 from typing import Optional
 from db.db_schema import db_connect
+from db.repo_hall import reconstruir_hall_da_fama_resumo
 
 logger = logging.getLogger("services.hall_da_fama")
 
@@ -67,6 +68,7 @@ def adicionar_resultado_historico(usuario_id: int, posicao: int, temporada: str)
 
             inserted = c.fetchone()
             new_id = inserted['id'] if inserted else None
+            reconstruir_hall_da_fama_resumo(conn)
             conn.commit()
 
             logger.info(f"✅ Resultado adicionado: usuario_id={usuario_id}, posicao={posicao}, temporada={temporada}")
@@ -140,6 +142,7 @@ def editar_resultado_historico(registro_id: int, posicao: Optional[int] = None,
                    WHERE id = %s""",
                 (new_posicao, new_temporada, datetime.now().isoformat(), registro_id)
             )
+            reconstruir_hall_da_fama_resumo(conn)
             conn.commit()
             
             logger.info(f"✅ Resultado editado: id={registro_id}, posicao={new_posicao}, temporada={new_temporada}")
@@ -182,6 +185,7 @@ def deletar_resultado_historico(registro_id: int) -> dict:
             
             # Delete record
             c.execute("DELETE FROM posicoes_participantes WHERE id = %s", (registro_id,))
+            reconstruir_hall_da_fama_resumo(conn)
             conn.commit()
             
             logger.info(f"✅ Resultado deletado: id={registro_id}, usuario_id={usuario_id}, temporada={temporada}")
@@ -265,6 +269,7 @@ def importar_resultados_em_lote(dados: list) -> dict:
                 )
                 imported += len(batch_values)
             
+            reconstruir_hall_da_fama_resumo(conn)
             conn.commit()
             
             logger.info(f"✅ Importação em lote: {imported} importados, {skipped} ignorados")
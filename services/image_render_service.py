@@ -0,0 +1,278 @@
+"""Renderização das imagens de compartilhamento da Classificação.
+
+As tabelas em PNG (classificação geral e classificação de uma prova) são
+desenhadas com matplotlib em um pool de processos, fora da thread da sessão
+Streamlit, e os bytes ficam em memória pela chave (temporada, alvo, versão).
+A versão é o hash do conteúdo exibido: qualquer mudança na classificação gera
+outra chave, então não há invalidação a fazer — entradas antigas saem pelo LRU.
+
+O job de classificação agenda a imagem geral logo após persistir a temporada;
+o botão de download da tela apenas lê os bytes já prontos. Quando a imagem
+ainda não existe, a tela só agenda a renderização e acompanha o ``Future``,
+sem prender a sessão esperando o pool. Isso só vale no
+processo web: o worker externo de jobs (``scripts/job_worker.py``) desliga a
+pré-renderização, pois os bytes ficariam na memória dele — ali a imagem é
+preparada sob demanda pelo botão da tela.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+_MAX_IMAGENS = 32
+_WORKERS = max(1, int(os.environ.get("BF1_IMAGE_WORKERS", "2")))
+
+_lock = threading.Lock()
+_pre_renderizacao = True
+_executor: Optional[Executor] = None
+_imagens: "OrderedDict[tuple[str, str, str], Future]" = OrderedDict()
+
+Celulas = tuple[tuple[str, ...], ...]
+
+
+def _estilizar_celulas(tabela, destacar_rotulos: bool = False) -> None:
+    for (row, col), cell in tabela.get_celld().items():
+        if row == 0:
+            cell.set_text_props(weight='bold', color='white')
+            cell.set_facecolor('#1f4e79')
+        elif destacar_rotulos and col == -1:
+            cell.set_text_props(weight='bold')
+            cell.set_facecolor('#eef3f8')
+        else:
+            cell.set_facecolor('#f6f9fc' if row % 2 == 0 else 'white')
+        cell.set_edgecolor('#b8c4d0')
+        cell.set_linewidth(0.7)
+
+
+def _adicionar_logo(ax, zoom: float) -> None:
+    import matplotlib.image as mpimg
+    from matplotlib.offsetbox import AnnotationBbox, OffsetImage
+
+    try:
+        logo = mpimg.imread("BF1.jpg")
+        ab = AnnotationBbox(
+            OffsetImage(logo, zoom=zoom), (0, 1), xycoords='axes fraction',
+            frameon=False, box_alignment=(0, 1), pad=0.03,
+        )
+        ax.add_artist(ab)
+    except Exception:
+        pass
+
+
+def _salvar_png(fig) -> bytes:
+    from io import BytesIO
+
+    import matplotlib.pyplot as plt
+
+    buffer = BytesIO()
+    plt.savefig(buffer, format='png', bbox_inches='tight', dpi=320)
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+def _renderizar_tabela_png(celulas: Celulas, colunas: tuple[str, ...]) -> bytes:
+    """Desenha a classificação geral (executa no processo de renderização)."""
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    # Largura de cada coluna proporcional ao maior texto, uma passada por coluna.
+    max_larguras = [
+        max([len(col), *(len(valor) for valor in valores)])
+        for col, valores in zip(colunas, zip(*celulas) if celulas else [()] * len(colunas))
+    ]
+    total_chars = sum(max_larguras) or 1
+    col_widths = [largura / total_chars for largura in max_larguras]
+
+    largura_figura = max(16.0, total_chars * 0.14)
+    altura_figura = max(4.8, len(celulas) * 0.62 + 2.2)
+    fig, ax = plt.subplots(figsize=(largura_figura, altura_figura), dpi=200)
+    ax.axis('off')
+    _adicionar_logo(ax, 0.18)
+
+    tabela = ax.table(
+        cellText=[list(linha) for linha in celulas],
+        colLabels=list(colunas),
+        cellLoc='center',
+        loc='center',
+        colWidths=col_widths,
+    )
+    tabela.auto_set_font_size(False)
+    tabela.set_fontsize(13 if len(celulas) <= 20 else 11)
+    tabela.scale(1.15, 1.55)
+    _estilizar_celulas(tabela)
+    return _salvar_png(fig)
+
+
+def _renderizar_prova_png(prova: str, participantes: tuple[str, ...], valores: tuple[str, ...]) -> bytes:
+    """Desenha a classificação de uma prova (executa no processo de renderização)."""
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    linhas = len(participantes)
+    max_nome = max([len("Participante"), *(len(nome) for nome in participantes)])
+    max_valor = max([len(prova), *(len(valor) for valor in valores)])
+    largura_figura = max(8.8, (max_nome + max_valor) * 0.2)
+    altura_figura = max(4.6, linhas * 0.62 + 2.2)
+    fig, ax = plt.subplots(figsize=(largura_figura, altura_figura), dpi=200)
+    ax.axis('off')
+    _adicionar_logo(ax, 0.16)
+
+    tabela = ax.table(
+        cellText=[[valor] for valor in valores],
+        rowLabels=list(participantes),
+        colLabels=[prova],
+        cellLoc='center',
+        loc='center',
+        colWidths=[0.54],
+    )
+    tabela.auto_set_font_size(False)
+    tabela.set_fontsize(13 if linhas <= 20 else 11)
+    tabela.scale(1.2, 1.55)
+    _estilizar_celulas(tabela, destacar_rotulos=True)
+    return _salvar_png(fig)
+
+
+def _get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        try:
+            _executor = ProcessPoolExecutor(
+                max_workers=_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        except (OSError, NotImplementedError, ValueError):
+            logger.warning("Pool de processos indisponível; imagens serão renderizadas em thread", exc_info=True)
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bf1-imagens")
+    return _executor
+
+
+def _versao(*partes) -> str:
+    return hashlib.sha1(repr(partes).encode("utf-8")).hexdigest()
+
+
+def _descartar_se_falhou(chave: tuple[str, str, str], future: Future) -> None:
+    if future.cancelled() or future.exception() is not None:
+        with _lock:
+            if _imagens.get(chave) is future:
+                del _imagens[chave]
+        if not future.cancelled():
+            logger.error("Falha ao renderizar imagem %s", chave[:2], exc_info=future.exception())
+
+
+def _agendar(chave: tuple[str, str, str], funcao, *args) -> Future:
+    global _executor
+    with _lock:
+        future = _imagens.get(chave)
+        if future is not None:
+            _imagens.move_to_end(chave)
+            return future
+        try:
+            future = _get_executor().submit(funcao, *args)
+        except (BrokenProcessPool, RuntimeError):
+            # Um worker morreu (ou o pool foi encerrado): encerra o pool antigo,
+            # liberando os processos que sobraram, e recria uma vez.
+            quebrado, _executor = _executor, None
+            if quebrado is not None:
+                quebrado.shutdown(wait=False, cancel_futures=True)
+            future = _get_executor().submit(funcao, *args)
+        _imagens[chave] = future
+        while len(_imagens) > _MAX_IMAGENS:
+            _imagens.popitem(last=False)
+    future.add_done_callback(lambda f: _descartar_se_falhou(chave, f))
+    return future
+
+
+def _pronta(chave: tuple[str, str, str]) -> Optional[bytes]:
+    with _lock:
+        future = _imagens.get(chave)
+    if future is None or not future.done() or future.cancelled() or future.exception() is not None:
+        return None
+    return future.result()
+
+
+def _celulas_classificacao(tabela, colunas: Sequence[str]) -> tuple[Celulas, tuple[str, ...]]:
+    colunas = tuple(str(col) for col in colunas)
+    celulas = tuple(tuple(linha) for linha in tabela[list(colunas)].astype(str).values.tolist())
+    return celulas, colunas
+
+
+def _chave_classificacao(temporada, celulas: Celulas, colunas: tuple[str, ...]) -> tuple[str, str, str]:
+    return (str(temporada), "geral", _versao(colunas, celulas))
+
+
+def agendar_imagem_classificacao(temporada, tabela, colunas: Sequence[str]) -> Future:
+    """Agenda (sem bloquear) a imagem da classificação geral já formatada."""
+    celulas, colunas = _celulas_classificacao(tabela, colunas)
+    chave = _chave_classificacao(temporada, celulas, colunas)
+    return _agendar(chave, _renderizar_tabela_png, celulas, colunas)
+
+
+def imagem_classificacao(temporada, tabela, colunas: Sequence[str], timeout: Optional[float] = 120) -> bytes:
+    """PNG da classificação geral; aguarda a renderização se ainda não estiver pronta."""
+    return agendar_imagem_classificacao(temporada, tabela, colunas).result(timeout=timeout)
+
+
+def imagem_classificacao_pronta(temporada, tabela, colunas: Sequence[str]) -> Optional[bytes]:
+    """Bytes já renderizados da classificação geral, ou ``None`` sem agendar nada."""
+    celulas, colunas = _celulas_classificacao(tabela, colunas)
+    return _pronta(_chave_classificacao(temporada, celulas, colunas))
+
+
+def agendar_imagem_prova(temporada, prova: str, participantes: Sequence[str], valores: Sequence[str]) -> Future:
+    """Agenda (sem bloquear) a imagem da classificação de uma prova."""
+    participantes = tuple(str(nome) for nome in participantes)
+    valores = tuple(str(valor) for valor in valores)
+    chave = (str(temporada), str(prova), _versao(participantes, valores))
+    return _agendar(chave, _renderizar_prova_png, str(prova), participantes, valores)
+
+
+def imagem_prova(
+    temporada,
+    prova: str,
+    participantes: Sequence[str],
+    valores: Sequence[str],
+    timeout: Optional[float] = 120,
+) -> bytes:
+    """PNG da classificação de uma prova, com cache pela versão do conteúdo."""
+    return agendar_imagem_prova(temporada, prova, participantes, valores).result(timeout=timeout)
+
+
+def desativar_pre_renderizacao() -> None:
+    """Para processos sem tela (worker externo): o job não agenda imagens."""
+    global _pre_renderizacao
+    _pre_renderizacao = False
+
+
+def pre_renderizacao_ativa() -> bool:
+    return _pre_renderizacao
+
+
+def limpar_imagens() -> None:
+    """Descarta os bytes em memória (testes e manutenção)."""
+    with _lock:
+        _imagens.clear()
+
+
+__all__ = [
+    "agendar_imagem_classificacao",
+    "agendar_imagem_prova",
+    "desativar_pre_renderizacao",
+    "imagem_classificacao",
+    "imagem_classificacao_pronta",
+    "imagem_prova",
+    "limpar_imagens",
+    "pre_renderizacao_ativa",
+]
@@ -0,0 +1,253 @@
+"""Jobs duráveis para recálculos longos (classificação e publicação de resultado).
+
+A tela apenas enfileira (``solicitar_*``) e acompanha o progresso
+(``consultar_job``); o trabalho roda fora da requisição Streamlit, na tabela
+``jobs`` de ``db/repo_jobs.py``, e sobrevive a reruns e reinícios da sessão.
+
+Onde o job roda (``BF1_JOBS_MODE``):
+
+- ``thread`` (padrão): uma thread daemon do próprio processo web drena a fila
+  quando há trabalho — acordada ao enfileirar e ao consultar um job pendente;
+- ``external``: o processo web só enfileira; ``python -m scripts.job_worker``
+  executa a fila em processo separado.
+
+Em ambos os modos, o lock por temporada de ``reservar_job`` impede duas
+recomputações simultâneas da mesma temporada, mesmo entre processos.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Optional
+
+from db.connection_pool import get_pool
+from db.repo_jobs import (
+    atualizar_progresso,
+    enfileirar_job,
+    finalizar_job,
+    get_job,
+    liberar_temporada,
+    limpar_jobs_antigos,
+    registrar_resultado_parcial,
+    reservar_job,
+)
+from services.access_control import job_identity, require_operation
+
+logger = logging.getLogger(__name__)
+
+JOB_RECLASSIFICAR = "reclassificar"
+JOB_PUBLICAR_RESULTADO = "publicar_resultado"
+
+JOBS_MODE = os.environ.get("BF1_JOBS_MODE", "thread").strip().lower()
+JOBS_MAX_TENTATIVAS = max(1, int(os.environ.get("BF1_JOBS_MAX_TENTATIVAS", "3")))
+JOBS_RETENCAO_DIAS = max(1, int(os.environ.get("BF1_JOBS_RETENTION_DAYS", "30")))
+
+Progresso = Callable[[float, Optional[str]], None]
+
+
+@dataclass(frozen=True)
+class JobStatus:
+    id: int
+    tipo: str
+    temporada: str
+    status: str
+    progresso: float
+    mensagem: Optional[str]
+    resultado: Optional[dict]
+    erro: Optional[str]
+    criado_em: Optional[datetime]
+    finalizado_em: Optional[datetime]
+
+    @property
+    def encerrado(self) -> bool:
+        return self.status in ("concluido", "falhou")
+
+
+def _reclassificar(job: dict, progresso: Progresso) -> dict:
+    from services.bets_scoring import atualizar_classificacoes_todas_as_provas
+
+    progresso(0.05, "Recalculando classificações")
+    atualizar_classificacoes_todas_as_provas(job["temporada"])
+    return {}
+
+
+def _publicar_resultado(job: dict, progresso: Progresso) -> dict:
+    from services.bets_scoring import atualizar_classificacoes_todas_as_provas
+    from services.result_notification_service import enviar_emails_resultado_prova
+
+    progresso(0.05, "Recalculando classificações")
+    atualizar_classificacoes_todas_as_provas(job["temporada"])
+    progresso(0.6, "Enviando e-mails de resultado")
+    # Uma retomada (worker caiu no meio do envio) não reenvia a quem já
+    # recebeu: cada envio fica registrado em ``resultado`` do próprio job.
+    anteriores = (job.get("resultado") or {}).get("notificados") or []
+    notificados = [int(u) for u in anteriores]
+
+    def registrar(usuario_id: int) -> None:
+        notificados.append(usuario_id)
+        registrar_resultado_parcial(job["id"], {"notificados": notificados})
+
+    stats = enviar_emails_resultado_prova(
+        int(job["parametros"]["prova_id"]),
+        str(job["temporada"]),
+        ja_notificados=frozenset(notificados),
+        ao_notificar=registrar,
+    )
+    return {
+        "enviados": len(notificados),
+        "falhas": stats.falhas,
+        "sem_aposta": stats.sem_aposta,
+        "ja_notificados": stats.ja_notificados,
+        "notificados": notificados,
+    }
+
+
+_HANDLERS: dict[str, Callable[[dict, Progresso], dict]] = {
+    JOB_RECLASSIFICAR: _reclassificar,
+    JOB_PUBLICAR_RESULTADO: _publicar_resultado,
+}
+
+
+def _enfileirar(tipo: str, chave: str, temporada: str, parametros: dict[str, Any], user_id: int) -> int:
+    job_id, criado = enfileirar_job(tipo, chave, str(temporada), parametros, user_id)
+    if not criado:
+        logger.info("Job %s ainda pendente para %s; pedido reaproveitado", job_id, chave)
+    _acordar_worker_local()
+    return job_id
+
+
+def solicitar_reclassificacao(temporada: str) -> int:
+    """Enfileira o recálculo de todas as provas da temporada; retorna o id do job."""
+    context = require_operation("resultado.write", season=str(temporada))
+    return _enfileirar(JOB_RECLASSIFICAR, f"{JOB_RECLASSIFICAR}:{temporada}", str(temporada), {}, context.user_id)
+
+
+def solicitar_publicacao_resultado(prova_id: int, temporada: str) -> int:
+    """Enfileira recálculo e e-mails após salvar o resultado de uma prova."""
+    context = require_operation("resultado.write", season=str(temporada))
+    return _enfileirar(
+        JOB_PUBLICAR_RESULTADO,
+        f"{JOB_PUBLICAR_RESULTADO}:{temporada}:{int(prova_id)}",
+        str(temporada),
+        {"prova_id": int(prova_id)},
+        context.user_id,
+    )
+
+
+def consultar_job(job_id: int) -> Optional[JobStatus]:
+    """Estado atual do job (uma leitura pela chave primária)."""
+    row = get_job(int(job_id))
+    if not row:
+        return None
+    if row["status"] == "pendente":
+        _acordar_worker_local()
+    return JobStatus(
+        id=int(row["id"]),
+        tipo=str(row["tipo"]),
+        temporada=str(row["temporada"]),
+        status=str(row["status"]),
+        progresso=float(row["progresso"] or 0),
+        mensagem=row.get("mensagem"),
+        resultado=row.get("resultado"),
+        erro=row.get("erro"),
+        criado_em=row.get("criado_em"),
+        finalizado_em=row.get("finalizado_em"),
+    )
+
+
+def _executar(job: dict) -> None:
+    handler = _HANDLERS.get(str(job["tipo"]))
+    if handler is None:
+        finalizar_job(job["id"], erro=f"Tipo de job desconhecido: {job['tipo']}")
+        return
+
+    def progresso(fracao: float, mensagem: Optional[str] = None) -> None:
+        atualizar_progresso(job["id"], fracao, mensagem)
+
+    logger.info("Job %s (%s, temporada %s) iniciado", job["id"], job["tipo"], job["temporada"])
+    try:
+        with job_identity(int(job["solicitado_por"])):
+            resultado = handler(job, progresso)
+    except Exception as exc:
+        logger.exception("Job %s falhou", job["id"])
+        finalizar_job(job["id"], erro=str(exc) or type(exc).__name__)
+        return
+    finalizar_job(job["id"], resultado=resultado)
+    logger.info("Job %s concluído", job["id"])
+
+
+def executar_pendentes(limite: Optional[int] = None) -> int:
+    """Executa jobs até esvaziar a fila (ou ``limite``); retorna quantos rodaram.
+
+    Uma conexão dedicada segura o lock da temporada durante cada job; ao
+    devolvê-la ao pool o lock é liberado explicitamente.
+    """
+    executados = 0
+    with get_pool().get_connection("job") as conn:
+        while limite is None or executados < limite:
+            job = reservar_job(conn, JOBS_MAX_TENTATIVAS)
+            if job is None:
+                break
+            try:
+                _executar(job)
+            finally:
+                liberar_temporada(conn, job["temporada"])
+            executados += 1
+    return executados
+
+
+_worker_lock = threading.Lock()
+_worker_thread: Optional[threading.Thread] = None
+
+
+def _drenar_fila() -> None:
+    global _worker_thread
+    try:
+        limpar_jobs_antigos(JOBS_RETENCAO_DIAS)
+        while executar_pendentes():
+            pass
+    except Exception:
+        logger.exception("Worker local de jobs interrompido")
+    finally:
+        with _worker_lock:
+            _worker_thread = None
+
+
+def _acordar_worker_local() -> None:
+    """No modo ``thread``, garante uma thread drenando a fila."""
+    global _worker_thread
+    if JOBS_MODE != "thread":
+        return
+    with _worker_lock:
+        if _worker_thread is not None and _worker_thread.is_alive():
+            return
+        _worker_thread = threading.Thread(target=_drenar_fila, name="bf1-jobs", daemon=True)
+        _worker_thread.start()
+
+
+def run_worker(intervalo: float = 5.0, parar: Optional[threading.Event] = None) -> None:
+    """Laço do worker externo: drena a fila e espera ``intervalo`` segundos."""
+    parar = parar or threading.Event()
+    limpar_jobs_antigos(JOBS_RETENCAO_DIAS)
+    while not parar.is_set():
+        try:
+            executar_pendentes()
+        except Exception:
+            logger.exception("Falha ao processar a fila de jobs")
+        parar.wait(intervalo)
+
+
+__all__ = [
+    "JOB_PUBLICAR_RESULTADO",
+    "JOB_RECLASSIFICAR",
+    "JobStatus",
+    "consultar_job",
+    "executar_pendentes",
+    "run_worker",
+    "solicitar_publicacao_resultado",
+    "solicitar_reclassificacao",
+]
@@ -2,10 +2,9 @@
 
 from __future__ import annotations
 
-import ast
 import logging
 from dataclasses import dataclass
-from typing import Any
+from typing import Callable, Collection, Optional
 
 import pandas as pd
 
@@ -15,6 +14,7 @@ from services.data_access_provas import get_provas_df, get_resultados_df
 from services.email_service import enviar_email
 from utils.html_utils import escape_html_attr, escape_html_text
 from services.rules_service import get_regras_aplicaveis
+from services.scoring_kernel import detalhar_aposta, tipo_prova
 from utils.helpers import get_bf1_logo_data_uri
 from utils.logging_utils import redact_identifier
 
@@ -26,40 +26,7 @@ class ResultadoEmailStats:
     enviados: int = 0
     falhas: int = 0
     sem_aposta: int = 0
-
-
-def _parse_dict(raw: Any) -> dict:
-    if isinstance(raw, dict):
-        parsed = raw
-    else:
-        try:
-            parsed = ast.literal_eval(str(raw or "{}"))
-        except Exception:
-            return {}
-    if not isinstance(parsed, dict):
-        return {}
-    normalizado = {}
-    for chave, valor in parsed.items():
-        try:
-            normalizado[int(chave)] = valor
-        except Exception:
-            normalizado[chave] = valor
-    return normalizado
-
-
-def _tipo_prova(prova_nome: str, tipo_raw: Any) -> str:
-    tipo = str(tipo_raw or "").strip()
-    if tipo.lower() == "sprint" or "sprint" in str(prova_nome or "").lower():
-        return "Sprint"
-    return "Normal"
-
-
-def _pontos_lista(temporada: str, tipo_prova: str, regras: dict) -> list[float]:
-    pontos_f1 = [25, 18, 15, 12, 10, 8, 6, 4, 2, 1]
-    pontos_sprint = [8, 7, 6, 5, 4, 3, 2, 1]
-    if tipo_prova == "Sprint":
-        return list(regras.get("pontos_sprint_posicoes") or regras.get("pontos_posicoes") or pontos_sprint)
-    return list(regras.get("pontos_posicoes") or pontos_f1)
+    ja_notificados: int = 0
 
 
 def _detalhar_aposta_resultado(
@@ -69,82 +36,43 @@ def _detalhar_aposta_resultado(
     temporada: str,
 ) -> dict:
     prova_nome = str(aposta.get("nome_prova") or prova.get("nome") or "Prova")
-    tipo_prova = _tipo_prova(prova_nome, prova.get("tipo", "Normal"))
-    regras = get_regras_aplicaveis(temporada, tipo_prova)
-    pontos_por_posicao = _pontos_lista(temporada, tipo_prova, regras)
-    posicoes_dict = _parse_dict(resultado.get("posicoes"))
-    piloto_para_pos = {str(v).strip(): int(k) for k, v in posicoes_dict.items() if str(v).strip()}
-
-    pilotos_apostados = [p.strip() for p in str(aposta.get("pilotos", "")).split(",") if p.strip()]
-    fichas = []
-    for raw in str(aposta.get("fichas", "")).split(","):
-        try:
-            fichas.append(int(raw))
-        except Exception:
-            fichas.append(0)
-
-    abandonos: set[str] = set()
-    if regras.get("penalidade_abandono") and "abandono_pilotos" in resultado.index:
-        raw_aband = resultado.get("abandono_pilotos", "") or ""
-        abandonos = {p.strip() for p in str(raw_aband).split(",") if p and p.strip()}
-
-    linhas = []
-    total_pontos = 0.0
-    for idx, piloto in enumerate(pilotos_apostados):
-        ficha = fichas[idx] if idx < len(fichas) else 0
-        pos_real = piloto_para_pos.get(str(piloto).strip())
-        pontos = 0.0
-        if pos_real is not None and 1 <= pos_real <= len(pontos_por_posicao):
-            pontos = float(ficha) * float(pontos_por_posicao[pos_real - 1])
-            total_pontos += pontos
-        linhas.append(
-            {
-                "piloto": piloto,
-                "fichas": ficha,
-                "posicao_real": str(pos_real) if pos_real is not None else "-",
-                "dnf": "DNF" if str(piloto).strip() in abandonos else "-",
-                "pontos": pontos,
-            }
-        )
-
-    piloto_11_apostado = str(aposta.get("piloto_11", "") or "").strip()
-    piloto_11_real = str(posicoes_dict.get(11, "") or "").strip()
-    bonus_11 = float(regras.get("pontos_11_colocado", 25) or 0)
-    pontos_11 = bonus_11 if piloto_11_apostado == piloto_11_real else 0.0
-    total_pontos += pontos_11
-
-    penalidade_abandono = 0.0
-    pilotos_abandonados = []
-    if abandonos:
-        pilotos_abandonados = [p for p in pilotos_apostados if p.strip() in abandonos]
-        penalidade_abandono = float(regras.get("pontos_penalidade", 0) or 0) * len(pilotos_abandonados)
-        total_pontos -= penalidade_abandono
-
-    if tipo_prova == "Sprint" and regras.get("pontos_dobrada"):
-        total_pontos *= 2
-
-    penalidade_auto = 0.0
-    try:
-        automatica = int(aposta.get("automatica", 0) or 0)
-    except Exception:
-        automatica = 0
-    if automatica >= 2:
-        fator = max(0, 1 - (float(regras.get("penalidade_auto_percent", 20) or 20) / 100))
-        total_com_desconto = round(total_pontos * fator, 2)
-        penalidade_auto = round(total_pontos - total_com_desconto, 2)
-        total_pontos = total_com_desconto
-
+    detalhe = detalhar_aposta(aposta, prova, resultado, temporada)
+    if detalhe is None:
+        return {
+            "prova_nome": prova_nome,
+            "tipo_prova": tipo_prova(prova_nome, prova.get("tipo", "Normal")),
+            "linhas": [],
+            "piloto_11_apostado": str(aposta.get("piloto_11", "") or "").strip(),
+            "piloto_11_real": "",
+            "pontos_11": 0.0,
+            "penalidade_abandono": 0.0,
+            "pilotos_abandonados": [],
+            "penalidade_auto": 0.0,
+            "total_pontos": 0.0,
+        }
+
+    linhas = [
+        {
+            "piloto": linha.piloto,
+            "fichas": linha.fichas,
+            "posicao_real": str(linha.posicao_real) if linha.posicao_real is not None else "-",
+            "dnf": "DNF" if linha.dnf else "-",
+            "pontos": linha.pontos,
+        }
+        for linha in detalhe.pilotos
+        if linha.piloto
+    ]
     return {
         "prova_nome": prova_nome,
-        "tipo_prova": tipo_prova,
+        "tipo_prova": detalhe.tipo_prova,
         "linhas": linhas,
-        "piloto_11_apostado": piloto_11_apostado,
-        "piloto_11_real": piloto_11_real,
-        "pontos_11": pontos_11,
-        "penalidade_abandono": penalidade_abandono,
-        "pilotos_abandonados": pilotos_abandonados,
-        "penalidade_auto": penalidade_auto,
-        "total_pontos": round(float(total_pontos), 2),
+        "piloto_11_apostado": detalhe.piloto_11_apostado,
+        "piloto_11_real": detalhe.piloto_11_real,
+        "pontos_11": detalhe.pontos_11,
+        "penalidade_abandono": detalhe.penalidade_abandono,
+        "pilotos_abandonados": list(detalhe.pilotos_abandonados),
+        "penalidade_auto": detalhe.penalidade_auto,
+        "total_pontos": round(float(detalhe.total), 2),
     }
 
 
@@ -274,8 +202,18 @@ def _montar_corpo_email(nome_usuario: str, detalhes: dict, descarte: dict | None
 """
 
 
-def enviar_emails_resultado_prova(prova_id: int, temporada: str) -> ResultadoEmailStats:
-    """Envia o resumo de resultado da prova para participantes com aposta cadastrada."""
+def enviar_emails_resultado_prova(
+    prova_id: int,
+    temporada: str,
+    *,
+    ja_notificados: Collection[int] = (),
+    ao_notificar: Optional[Callable[[int], None]] = None,
+) -> ResultadoEmailStats:
+    """Envia o resumo de resultado da prova para participantes com aposta cadastrada.
+
+    Participantes em ``ja_notificados`` são pulados (envio retomado após
+    queda do worker); ``ao_notificar`` recebe o id de cada envio bem-sucedido.
+    """
     stats = ResultadoEmailStats()
     provas_df = get_provas_df(temporada)
     resultados_df = get_resultados_df(temporada)
@@ -294,6 +232,9 @@ def enviar_emails_resultado_prova(prova_id: int, temporada: str) -> ResultadoEma
 
     for _, participante in participantes_df.iterrows():
         usuario_id = int(participante.get("id"))
+        if usuario_id in ja_notificados:
+            stats.ja_notificados += 1
+            continue
         email_destino = str(participante.get("email", "") or "").strip()
         aposta_usuario = apostas_prova[apostas_prova["usuario_id"] == usuario_id]
         if aposta_usuario.empty:
@@ -315,6 +256,8 @@ def enviar_emails_resultado_prova(prova_id: int, temporada: str) -> ResultadoEma
         assunto = f"Resultado da prova - {detalhes['prova_nome']}"
         if enviar_email(email_destino, assunto, corpo):
             stats.enviados += 1
+            if ao_notificar is not None:
+                ao_notificar(usuario_id)
         else:
             stats.falhas += 1
             logger.warning(
@@ -3,6 +3,7 @@ Serviço de Gestão de Regras
 """
 import logging
 from utils.ttl_cache import ttl_cache
+from db.db_schema import declared_read
 from db.rules_utils import (
     get_regra_temporada,
     get_regra_by_nome
@@ -30,11 +31,12 @@ def get_regras_aplicaveis(temporada: str, tipo_prova: str = "Normal") -> dict:
     - pontos_posicoes: Lista de pontos P1-P20 (ou P1-P8 se sprint)
     - pontos_campeao, pontos_vice, pontos_equipe: Bônus finais
     """
-    regra = get_regra_temporada(temporada)
-    
-    # Fallback para regra padrão
-    if not regra:
-        regra = get_regra_by_nome("Padrão BF1")
+    with declared_read():
+        regra = get_regra_temporada(temporada)
+
+        # Fallback para regra padrão
+        if not regra:
+            regra = get_regra_by_nome("Padrão BF1")
     
     if not regra:
         # Fallback definitivo caso nem o padrão exista
@@ -0,0 +1,320 @@
+"""Kernel único de pontuação de apostas.
+
+Toda pontuação de prova passa por aqui: o job de classificação
+(`calcular_pontuacao_lote`), o detalhamento do Painel, o e-mail de resultado e
+a imagem da prova leem o mesmo `DetalhePontuacao`, com a contribuição de cada
+piloto, bônus do 11º, penalidade por abandono, multiplicador de sprint e
+penalidade de aposta automática.
+
+Fórmula: ((Σ fichas x pontos da posição) + bônus 11º - penalidade DNF)
+x 2 em sprint dobrada, com desconto percentual a partir da 2ª automática.
+
+O resultado de cada prova é interpretado uma vez e o detalhamento fica em
+cache pela chave (prova, versão das regras, resultado, aposta): mudar regra,
+resultado ou aposta gera outra chave, então não há invalidação a fazer.
+"""
+
+from __future__ import annotations
+
+import ast
+import functools
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Mapping, Optional
+
+import pandas as pd
+
+from services.rules_service import get_regras_aplicaveis
+from utils.ttl_cache import ttl_cache
+
+PONTOS_F1_NORMAL = (25, 18, 15, 12, 10, 8, 6, 4, 2, 1)
+PONTOS_SPRINT = (8, 7, 6, 5, 4, 3, 2, 1)
+
+RegrasLoader = Callable[[str, str], dict]
+
+
+@dataclass(frozen=True)
+class PontuacaoPiloto:
+    """Contribuição de um piloto apostado."""
+
+    piloto: str
+    fichas: int
+    posicao_real: Optional[int]
+    pontos_por_ficha: float
+    pontos: float
+    dnf: bool
+
+
+@dataclass(frozen=True)
+class DetalhePontuacao:
+    """Detalhamento completo da pontuação de uma aposta em uma prova."""
+
+    prova_id: Any
+    tipo_prova: str
+    pilotos: tuple[PontuacaoPiloto, ...]
+    piloto_11_apostado: str
+    piloto_11_real: str
+    pontos_11: float
+    pilotos_abandonados: tuple[str, ...]
+    penalidade_abandono: float
+    pontos_dobrados: bool
+    penalidade_auto: float
+    total: float
+
+    @property
+    def acertou_11(self) -> bool:
+        return bool(self.piloto_11_apostado) and self.piloto_11_apostado == self.piloto_11_real
+
+
+@dataclass(frozen=True)
+class _ResultadoProva:
+    piloto_para_pos: Mapping[str, int]
+    piloto_11: str
+    abandonos: frozenset[str]
+
+
+def _texto(valor: Any) -> str:
+    if valor is None:
+        return ""
+    try:
+        if pd.isna(valor):
+            return ""
+    except (TypeError, ValueError):
+        pass
+    return str(valor).strip()
+
+
+def tipo_prova(nome: Any, tipo_raw: Any) -> str:
+    """Resolve 'Sprint' pelo tipo cadastrado ou pelo nome da prova."""
+    if _texto(tipo_raw).lower() == "sprint" or "sprint" in _texto(nome).lower():
+        return "Sprint"
+    return "Normal"
+
+
+def tabela_pontos(regras: Mapping[str, Any], tipo: str) -> list:
+    """Pontos por posição da regra, com fallback para a tabela FIA."""
+    if tipo == "Sprint":
+        return list(regras.get("pontos_sprint_posicoes") or regras.get("pontos_posicoes") or PONTOS_SPRINT)
+    return list(regras.get("pontos_posicoes") or PONTOS_F1_NORMAL)
+
+
+def versao_regras(regras: Mapping[str, Any]) -> str:
+    """Representação canônica usada como versão das regras na chave do cache."""
+    return json.dumps(regras, sort_keys=True, default=str)
+
+
+@functools.lru_cache(maxsize=64)
+def _regras_da_versao(regras_versao: str) -> dict:
+    """Regras decodificadas de uma versão; somente leitura (objeto compartilhado)."""
+    return json.loads(regras_versao)
+
+
+@ttl_cache(ttl=3600, tags=("resultados",), maxsize=512)
+def _interpretar_resultado(posicoes_raw: str, abandono_raw: str) -> Optional[_ResultadoProva]:
+    try:
+        parsed = ast.literal_eval(posicoes_raw)
+    except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+        return None
+    if not isinstance(parsed, dict):
+        return None
+    por_posicao: dict[int, str] = {}
+    for chave, piloto in parsed.items():
+        try:
+            por_posicao[int(chave)] = _texto(piloto)
+        except (TypeError, ValueError):
+            continue
+    return _ResultadoProva(
+        piloto_para_pos={piloto: pos for pos, piloto in por_posicao.items() if piloto},
+        piloto_11=por_posicao.get(11, ""),
+        abandonos=frozenset(p.strip() for p in abandono_raw.split(",") if p.strip()),
+    )
+
+
+def _parse_fichas(raw: str) -> list[int]:
+    fichas = []
+    for parte in raw.split(","):
+        try:
+            fichas.append(int(parte))
+        except ValueError:
+            fichas.append(0)
+    return fichas
+
+
+@ttl_cache(ttl=3600, tags=("resultados", "regras", "apostas"), maxsize=8192)
+def _detalhar(
+    prova_id: Any,
+    tipo: str,
+    regras_versao: str,
+    posicoes_raw: str,
+    abandono_raw: str,
+    pilotos_raw: str,
+    fichas_raw: str,
+    piloto_11: str,
+    automatica: int,
+) -> Optional[DetalhePontuacao]:
+    resultado = _interpretar_resultado(posicoes_raw, abandono_raw)
+    if resultado is None:
+        return None
+    regras = _regras_da_versao(regras_versao)
+    pontos_tabela = tabela_pontos(regras, tipo)
+    n_posicoes = len(pontos_tabela)
+    abandonos = resultado.abandonos if regras.get("penalidade_abandono") else frozenset()
+
+    pilotos = [p.strip() for p in pilotos_raw.split(",")] if pilotos_raw else []
+    fichas = _parse_fichas(fichas_raw) if fichas_raw else []
+    linhas = []
+    pt: float = 0
+    for i, piloto in enumerate(pilotos):
+        ficha = fichas[i] if i < len(fichas) else 0
+        pos_real = resultado.piloto_para_pos.get(piloto)
+        base = pontos_tabela[pos_real - 1] if pos_real is not None and 1 <= pos_real <= n_posicoes else 0
+        pt += ficha * base
+        linhas.append(PontuacaoPiloto(piloto, ficha, pos_real, float(base), float(ficha * base), piloto in abandonos))
+
+    pontos_11 = regras.get("pontos_11_colocado", 25) if piloto_11 and piloto_11 == resultado.piloto_11 else 0
+    pt += pontos_11
+
+    abandonados = tuple(p for p in pilotos if p in abandonos)
+    penalidade_abandono = (regras.get("pontos_penalidade", 0) or 0) * len(abandonados)
+    pt -= penalidade_abandono
+
+    dobrada = tipo == "Sprint" and bool(regras.get("pontos_dobrada"))
+    if dobrada:
+        pt = pt * 2
+
+    penalidade_auto = 0.0
+    if automatica >= 2:
+        fator = max(0, 1 - (float(regras.get("penalidade_auto_percent", 20)) / 100))
+        com_desconto = round(pt * fator, 2)
+        penalidade_auto = round(pt - com_desconto, 2)
+        pt = com_desconto
+
+    return DetalhePontuacao(
+        prova_id=prova_id,
+        tipo_prova=tipo,
+        pilotos=tuple(linhas),
+        piloto_11_apostado=piloto_11,
+        piloto_11_real=resultado.piloto_11,
+        pontos_11=float(pontos_11),
+        pilotos_abandonados=abandonados,
+        penalidade_abandono=float(penalidade_abandono),
+        pontos_dobrados=dobrada,
+        penalidade_auto=penalidade_auto,
+        total=pt,
+    )
+
+
+def _automatica(valor: Any) -> int:
+    try:
+        return int(valor or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def detalhar_apostas_lote(
+    ap_df: pd.DataFrame,
+    res_df: pd.DataFrame,
+    prov_df: pd.DataFrame,
+    regras_loader: Optional[RegrasLoader] = None,
+) -> list[Optional[DetalhePontuacao]]:
+    """Detalha todas as apostas de uma vez, na ordem de ``ap_df``.
+
+    Resultados, tipo e temporada de cada prova são resolvidos uma única vez;
+    as regras são carregadas uma vez por (temporada, tipo). Apostas sem
+    resultado (ou com resultado ilegível) recebem ``None``.
+    """
+    carregar_regras = regras_loader or get_regras_aplicaveis
+    if ap_df.empty:
+        return []
+
+    resultados: dict[Any, tuple[str, str]] = {}
+    if not res_df.empty and "prova_id" in res_df.columns:
+        abandonos = res_df["abandono_pilotos"] if "abandono_pilotos" in res_df.columns else [None] * len(res_df)
+        for prova_id, posicoes, abandono in zip(res_df["prova_id"], res_df["posicoes"], abandonos):
+            resultados[prova_id] = (repr(posicoes) if isinstance(posicoes, dict) else _texto(posicoes), _texto(abandono))
+
+    ano_atual = str(datetime.now().year)
+    nomes = prov_df["nome"] if "nome" in prov_df.columns else [""] * len(prov_df)
+    tipos_raw = prov_df["tipo"] if "tipo" in prov_df.columns else [""] * len(prov_df)
+    temporadas_raw = prov_df["temporada"] if "temporada" in prov_df.columns else [ano_atual] * len(prov_df)
+    ids = prov_df["id"] if "id" in prov_df.columns else []
+    tipos_prova = {pid: tipo_prova(nome, tipo) for pid, nome, tipo in zip(ids, nomes, tipos_raw)}
+    temporadas_prova = dict(zip(ids, temporadas_raw))
+
+    def coluna(nome: str, padrao: Any = None) -> list:
+        return ap_df[nome].tolist() if nome in ap_df.columns else [padrao] * len(ap_df)
+
+    regras_cache: dict[tuple[str, str], str] = {}
+    detalhes: list[Optional[DetalhePontuacao]] = []
+    for prova_id, pilotos, fichas, piloto_11, automatica, temporada in zip(
+        coluna("prova_id"),
+        coluna("pilotos", ""),
+        coluna("fichas", ""),
+        coluna("piloto_11", ""),
+        coluna("automatica", 0),
+        coluna("temporada"),
+    ):
+        resultado = resultados.get(prova_id)
+        if resultado is None:
+            detalhes.append(None)
+            continue
+        tipo = tipos_prova.get(prova_id, "Normal")
+        temporada_aposta = _texto(temporada)
+        temporada_prova = temporada_aposta or str(temporadas_prova.get(prova_id, ano_atual))
+        regra_key = (temporada_prova, tipo)
+        if regra_key not in regras_cache:
+            regras_cache[regra_key] = versao_regras(carregar_regras(temporada_prova, tipo))
+        detalhes.append(
+            _detalhar(
+                prova_id,
+                tipo,
+                regras_cache[regra_key],
+                resultado[0],
+                resultado[1],
+                _texto(pilotos),
+                _texto(fichas),
+                _texto(piloto_11),
+                _automatica(automatica),
+            )
+        )
+    return detalhes
+
+
+def detalhar_aposta(
+    aposta: Mapping[str, Any],
+    prova: Optional[Mapping[str, Any]],
+    resultado: Mapping[str, Any],
+    temporada: Optional[str] = None,
+    regras_loader: Optional[RegrasLoader] = None,
+) -> Optional[DetalhePontuacao]:
+    """Atalho para uma única aposta (Painel, e-mail de resultado)."""
+    prova = prova if prova is not None else {}
+    aposta_dict = dict(aposta)
+    if temporada is not None:
+        aposta_dict["temporada"] = temporada
+    prova_id = aposta_dict.get("prova_id", resultado.get("prova_id"))
+    aposta_dict["prova_id"] = prova_id
+    prova_df = pd.DataFrame([{
+        "id": prova_id,
+        "nome": aposta_dict.get("nome_prova") or prova.get("nome") or "",
+        "tipo": prova.get("tipo", ""),
+        "temporada": prova.get("temporada", temporada),
+    }])
+    resultado_df = pd.DataFrame([{
+        "prova_id": prova_id,
+        "posicoes": resultado.get("posicoes"),
+        "abandono_pilotos": resultado.get("abandono_pilotos"),
+    }])
+    return detalhar_apostas_lote(pd.DataFrame([aposta_dict]), resultado_df, prova_df, regras_loader)[0]
+
+
+__all__ = [
+    "DetalhePontuacao",
+    "PontuacaoPiloto",
+    "detalhar_aposta",
+    "detalhar_apostas_lote",
+    "tabela_pontos",
+    "tipo_prova",
+    "versao_regras",
+]
@@ -0,0 +1,48 @@
+"""Catálogo de temporadas com cache para seletores e guarda de rotas.
+
+``get_season_options`` roda em quase toda página e a guarda de rotas consulta
+as temporadas de usuários inativos a cada navegação; ambos leem daqui. As
+listas ficam em cache por tag: ``create_next_temporada`` limpa
+``temporadas``; apostas, classificação, provas e mudanças de status de
+usuário limpam as temporadas por usuário.
+"""
+
+from __future__ import annotations
+
+from db.repo_seasons import (
+    create_next_temporada as _repo_create_next_temporada,
+    list_temporadas as _repo_list_temporadas,
+)
+from db.repo_users import get_usuario_temporadas_ativas as _repo_get_usuario_temporadas_ativas
+from utils.performance import instrumented_cache_data
+
+
+@instrumented_cache_data(ttl=3600, tags=("temporadas",))
+def _temporadas() -> tuple[str, ...]:
+    return tuple(_repo_list_temporadas())
+
+
+@instrumented_cache_data(
+    ttl=300,
+    tags=("temporadas", "usuarios", "apostas", "classificacao", "provas"),
+    maxsize=1024,
+)
+def _temporadas_usuario(user_id: int) -> tuple[str, ...]:
+    return tuple(_repo_get_usuario_temporadas_ativas(user_id))
+
+
+def list_temporadas() -> list[str]:
+    """Temporadas cadastradas, em ordem (sem escrita no banco)."""
+    return list(_temporadas())
+
+
+def get_usuario_temporadas_ativas(user_id: int) -> list[str]:
+    """Temporadas em que o usuário esteve ativo, em cache por usuário."""
+    return list(_temporadas_usuario(int(user_id)))
+
+
+def create_next_temporada() -> str:
+    return _repo_create_next_temporada()
+
+
+__all__ = ["create_next_temporada", "get_usuario_temporadas_ativas", "list_temporadas"]
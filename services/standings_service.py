@@ -0,0 +1,404 @@
+"""Classificação acumulada da temporada, pré-calculada pelo job de classificação.
+
+Para cada prova com resultado, em ordem cronológica, calcula a posição de cada
+participante no campeonato, os pontos acumulados, o descarte vigente, o bônus
+de campeonato e a movimentação em relação à prova anterior. O resultado é
+persistido em ``classificacao_temporada`` para que Classificação e Histórico
+leiam os números finais com uma única consulta indexada.
+"""
+
+from __future__ import annotations
+
+import ast
+import logging
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+
+from db.repo_bets import get_apostas_df, get_participantes_temporada_df
+from db.repo_career import atualizar_carreira_temporada
+from db.repo_races import get_provas_df, get_resultados_df
+from db.repo_standings import substituir_classificacao_temporada
+from services.rules_service import get_regras_aplicaveis
+from utils.dataframe_contracts import CLASSIFICACAO_TEMPORADA_COLUMNS
+from utils.datetime_utils import parse_datetime_sao_paulo
+
+logger = logging.getLogger(__name__)
+
+_UTC = ZoneInfo("UTC")
+_SAO_PAULO = ZoneInfo("America/Sao_Paulo")
+
+
+def _piloto_11_por_prova(resultados_df: pd.DataFrame) -> dict[int, str]:
+    piloto_11: dict[int, str] = {}
+    for prova_id, posicoes in zip(resultados_df["prova_id"], resultados_df["posicoes"]):
+        try:
+            parsed = ast.literal_eval(posicoes)
+            piloto_11[int(prova_id)] = str(parsed.get(11, parsed.get("11", ""))).strip()
+        except (TypeError, ValueError, SyntaxError, AttributeError):
+            continue
+    return piloto_11
+
+
+def _aposta_no_prazo(data_envio, data_prova, horario_prova) -> bool:
+    if data_envio is None or not data_prova:
+        return False
+    try:
+        cutoff = parse_datetime_sao_paulo(str(data_prova), str(horario_prova or "00:00"))
+        envio = pd.to_datetime(str(data_envio), errors="coerce")
+        if pd.isna(envio) or not isinstance(envio, pd.Timestamp):
+            return False
+        envio_dt = envio.to_pydatetime()
+        if envio_dt.tzinfo is None:
+            envio_dt = envio_dt.replace(tzinfo=_SAO_PAULO)
+        return envio_dt.astimezone(_UTC) <= cutoff.astimezone(_UTC)
+    except (TypeError, ValueError):
+        return False
+
+
+def _bonus_campeonato(
+    participantes: list[int],
+    regras: dict,
+    resultado_campeonato: Optional[dict],
+    apostas_campeonato: dict[int, dict],
+) -> pd.DataFrame:
+    bonus = pd.DataFrame(
+        0.0,
+        index=participantes,
+        columns=["bonus_campeao", "bonus_vice", "bonus_equipe", "acertou_campeao", "acertou_vice", "acertou_equipe"],
+    )
+    if not resultado_campeonato:
+        return bonus
+    pontos = {
+        "campeao": float(regras.get("pontos_campeao", 150)),
+        "vice": float(regras.get("pontos_vice", 100)),
+        "equipe": float(regras.get("pontos_equipe", 80)),
+    }
+    chaves = {"campeao": "champion", "vice": "vice", "equipe": "team"}
+    for uid in participantes:
+        aposta = apostas_campeonato.get(uid)
+        if not aposta:
+            continue
+        for nome, chave in chaves.items():
+            if resultado_campeonato.get(chave) == aposta.get(chave):
+                bonus.loc[uid, f"bonus_{nome}"] = pontos[nome]
+                bonus.loc[uid, f"acertou_{nome}"] = 1
+    return bonus
+
+
+def calcular_classificacao_temporada(
+    temporada: str,
+    participantes: list[int],
+    provas_df: pd.DataFrame,
+    apostas_pontos_df: pd.DataFrame,
+    resultados_df: pd.DataFrame,
+    regras: dict,
+    resultado_campeonato: Optional[dict] = None,
+    apostas_campeonato: Optional[dict[int, dict]] = None,
+) -> pd.DataFrame:
+    """Calcula a classificação acumulada da temporada após cada prova realizada.
+
+    ``apostas_pontos_df`` deve conter ``usuario_id``, ``prova_id``,
+    ``data_envio``, ``piloto_11`` e ``__pontos_calculados``. Os critérios
+    seguem a tela de Classificação: total válido (provas − descarte + bônus),
+    acertos do 11º, acertos de campeão/equipe/vice e apostas no prazo. O bônus
+    de campeonato entra somente na última prova classificada.
+    """
+    colunas = list(CLASSIFICACAO_TEMPORADA_COLUMNS)
+    participantes = list(dict.fromkeys(int(uid) for uid in participantes))
+    resultados_ids = set(pd.to_numeric(resultados_df["prova_id"], errors="coerce").dropna().astype(int))
+    provas = provas_df[provas_df["id"].isin(resultados_ids)].copy()
+    if provas.empty or not participantes:
+        return pd.DataFrame(columns=colunas)
+
+    provas["__data_dt"] = pd.to_datetime(provas["data"], errors="coerce")
+    provas = provas.sort_values(["__data_dt", "id"]).drop_duplicates("id")
+    ordem_provas = [int(pid) for pid in provas["id"].tolist()]
+
+    apostas = apostas_pontos_df[
+        apostas_pontos_df["prova_id"].isin(ordem_provas)
+        & apostas_pontos_df["usuario_id"].isin(participantes)
+    ].copy()
+    apostas["__pontos_calculados"] = pd.to_numeric(apostas["__pontos_calculados"], errors="coerce").fillna(0.0)
+    for coluna in ("data_envio", "piloto_11"):
+        if coluna not in apostas.columns:
+            apostas[coluna] = None
+
+    # Pontos da prova somam todas as linhas; descarte, 11º e prazo usam a
+    # versão mais recente de cada aposta, como na tela de Classificação.
+    pontos = apostas.pivot_table(
+        index="usuario_id", columns="prova_id", values="__pontos_calculados", aggfunc="sum"
+    ) if not apostas.empty else pd.DataFrame()
+    pontos = pontos.reindex(index=participantes, columns=ordem_provas)
+
+    recentes = apostas.assign(__envio_dt=pd.to_datetime(apostas["data_envio"], errors="coerce"))
+    recentes = recentes.sort_values("__envio_dt", kind="mergesort")
+    recentes = recentes.drop_duplicates(subset=["usuario_id", "prova_id"], keep="last")
+
+    piloto_11 = _piloto_11_por_prova(resultados_df)
+    provas_por_id = provas.set_index("id")
+    acertos = np.zeros(len(recentes))
+    no_prazo = np.zeros(len(recentes))
+    for i, (pid, palpite, envio) in enumerate(
+        zip(recentes["prova_id"], recentes["piloto_11"], recentes["data_envio"])
+    ):
+        real = piloto_11.get(int(pid), "")
+        acertos[i] = 1 if real and str(palpite or "").strip() == real else 0
+        prova = provas_por_id.loc[int(pid)]
+        no_prazo[i] = 1 if _aposta_no_prazo(envio, prova.get("data"), prova.get("horario_prova")) else 0
+    recentes = recentes.assign(__acerto_11=acertos, __no_prazo=no_prazo)
+
+    def _matriz(valores: str) -> pd.DataFrame:
+        if recentes.empty:
+            return pd.DataFrame(np.nan, index=participantes, columns=ordem_provas)
+        return recentes.pivot_table(
+            index="usuario_id", columns="prova_id", values=valores, aggfunc="last"
+        ).reindex(index=participantes, columns=ordem_provas)
+
+    acumulado = pontos.fillna(0.0).cumsum(axis=1)
+    if bool(regras.get("descarte", False)):
+        # Prova sem aposta fica NaN no cummin: a pior prova até ali continua valendo.
+        descarte = _matriz("__pontos_calculados").cummin(axis=1).ffill(axis=1).fillna(0.0)
+    else:
+        descarte = pd.DataFrame(0.0, index=participantes, columns=ordem_provas)
+    acertos_11 = _matriz("__acerto_11").fillna(0).cumsum(axis=1)
+    apostas_no_prazo = _matriz("__no_prazo").fillna(0).cumsum(axis=1)
+    bonus = _bonus_campeonato(participantes, regras, resultado_campeonato, apostas_campeonato or {})
+
+    linhas = []
+    posicao_anterior: dict[int, int] = {}
+    ultima = ordem_provas[-1]
+    for ordem, pid in enumerate(ordem_provas, start=1):
+        etapa = pd.DataFrame(
+            {
+                "usuario_id": participantes,
+                "pontos_prova": pontos[pid].fillna(0.0).to_numpy(),
+                "pontos_acumulados": acumulado[pid].to_numpy(),
+                "descarte": descarte[pid].to_numpy(),
+                "acertos_11": acertos_11[pid].astype(int).to_numpy(),
+                "__no_prazo": apostas_no_prazo[pid].to_numpy(),
+            }
+        )
+        etapa["pontos_apos_descarte"] = etapa["pontos_acumulados"] - etapa["descarte"]
+        bonus_etapa = bonus if pid == ultima else bonus * 0
+        for coluna in bonus_etapa.columns:
+            etapa[coluna] = bonus_etapa[coluna].to_numpy()
+        etapa["bonus_campeonato"] = etapa["bonus_campeao"] + etapa["bonus_vice"] + etapa["bonus_equipe"]
+        etapa["total_valido"] = etapa["pontos_apos_descarte"] + etapa["bonus_campeonato"]
+        etapa = etapa.sort_values(
+            ["total_valido", "acertos_11", "acertou_campeao", "acertou_equipe", "acertou_vice", "__no_prazo"],
+            ascending=False,
+            kind="mergesort",
+        ).reset_index(drop=True)
+        etapa["posicao"] = etapa.index + 1
+        etapa["diferenca_anterior"] = (etapa["total_valido"].shift(1) - etapa["total_valido"]).round(2)
+        etapa["posicao_anterior"] = etapa["usuario_id"].map(posicao_anterior).astype("Int64")
+        etapa["variacao_posicao"] = (etapa["posicao_anterior"] - etapa["posicao"]).astype("Int64")
+        etapa["temporada"] = str(temporada)
+        etapa["prova_id"] = pid
+        etapa["ordem_prova"] = ordem
+        posicao_anterior = dict(zip(etapa["usuario_id"], etapa["posicao"]))
+        linhas.append(etapa[colunas])
+
+    return pd.concat(linhas, ignore_index=True)
+
+
+def _finais_por_participante(classificacao: pd.DataFrame) -> list[tuple[int, int, float, int]]:
+    """(usuario_id, posicao, total_valido, acertos_11) da última prova classificada."""
+    if classificacao.empty:
+        return []
+    ultima = classificacao[classificacao["ordem_prova"] == classificacao["ordem_prova"].max()]
+    return [
+        (int(uid), int(posicao), float(total), int(acertos))
+        for uid, posicao, total, acertos in zip(
+            ultima["usuario_id"], ultima["posicao"], ultima["total_valido"], ultima["acertos_11"]
+        )
+    ]
+
+
+def formatar_brasileiro(valor):
+    try:
+        return f"{valor:,.2f}".replace(",", "v").replace(".", ",").replace("v", ".")
+    except (TypeError, ValueError):
+        return valor
+
+
+def colunas_classificacao(descarte_ativo: bool) -> list[str]:
+    colunas = [
+        "Posição",
+        "Participante",
+        "Total Geral",
+        "Bônus Campeão",
+        "Bônus Vice",
+        "Bônus Equipe",
+    ]
+    if descarte_ativo:
+        colunas.append("Descarte")
+    return [*colunas, "Total Válido", "Diferença", "Movimentação"]
+
+
+def descrever_movimentacao(posicao_anterior, posicao) -> str:
+    if pd.isnull(posicao_anterior):
+        return "Novo"
+    diff = int(posicao_anterior) - int(posicao)
+    if diff > 0:
+        return f"Subiu {diff}"
+    elif diff < 0:
+        return f"Caiu {abs(diff)}"
+    return "Permaneceu"
+
+
+def classificacao_exibicao(
+    classificacao_df: pd.DataFrame,
+    participantes: pd.DataFrame,
+) -> pd.DataFrame:
+    """Converte a última etapa de ``classificacao_temporada`` no formato da tela."""
+    atual = classificacao_df[classificacao_df["ordem_prova"] == classificacao_df["ordem_prova"].max()]
+    nomes = participantes.set_index("id")["nome"]
+    atual = atual[atual["usuario_id"].isin(nomes.index)].sort_values("posicao")
+    df_class = pd.DataFrame(
+        {
+            "Posição": atual["posicao"].astype(int).to_numpy(),
+            "Participante": atual["usuario_id"].map(nomes).to_numpy(),
+            "usuario_id": atual["usuario_id"].astype(int).to_numpy(),
+            "Total Geral": atual["pontos_acumulados"].astype(float).to_numpy(),
+            "Descarte": atual["descarte"].astype(float).to_numpy(),
+            "Bônus Campeão": atual["bonus_campeao"].astype(float).to_numpy(),
+            "Bônus Vice": atual["bonus_vice"].astype(float).to_numpy(),
+            "Bônus Equipe": atual["bonus_equipe"].astype(float).to_numpy(),
+            "Total Válido": atual["total_valido"].astype(float).to_numpy(),
+        }
+    )
+    # Recalcula a posição sobre os participantes visíveis (ex.: sem o Master).
+    df_class["Posição"] = range(1, len(df_class) + 1)
+    df_class["Movimentação"] = [
+        descrever_movimentacao(anterior, atual_pos)
+        for anterior, atual_pos in zip(atual["posicao_anterior"], atual["posicao"])
+    ]
+    return df_class
+
+
+def tabela_exibicao(df_class: pd.DataFrame) -> pd.DataFrame:
+    """Tabela formatada da tela (e da imagem) com a diferença para o anterior."""
+    df_display = df_class.copy()
+    totais = df_display["Total Válido"].astype(float).tolist()
+    df_display["Diferença"] = ["-"] + [
+        formatar_brasileiro(anterior - atual) for anterior, atual in zip(totais, totais[1:])
+    ]
+    for col in ("Total Geral", "Bônus Campeão", "Bônus Vice", "Bônus Equipe", "Descarte", "Total Válido"):
+        df_display[col] = df_display[col].apply(lambda x: formatar_brasileiro(float(x)))
+    return df_display
+
+
+def _pre_renderizar_imagem(
+    temporada: str,
+    classificacao: pd.DataFrame,
+    participantes_df: pd.DataFrame,
+    descarte_ativo: bool,
+) -> None:
+    """Agenda em segundo plano a imagem da classificação recém-persistida.
+
+    Fora do processo web (worker externo) não faz nada: a imagem ficaria na
+    memória do worker; a tela a prepara sob demanda.
+    """
+    from services.image_render_service import agendar_imagem_classificacao, pre_renderizacao_ativa
+
+    if not pre_renderizacao_ativa() or classificacao.empty or participantes_df.empty:
+        return
+    validos = participantes_df[
+        participantes_df["nome"].notna() & (participantes_df["nome"].astype(str) != "Master")
+    ].copy()
+    validos["id"] = pd.to_numeric(validos["id"], errors="coerce")
+    validos = validos.dropna(subset=["id"]).astype({"id": int})
+    df_class = classificacao_exibicao(classificacao, validos)
+    if df_class.empty:
+        return
+    try:
+        agendar_imagem_classificacao(temporada, tabela_exibicao(df_class), colunas_classificacao(descarte_ativo))
+    except Exception:
+        logger.exception("Falha ao agendar a imagem da classificação da temporada %s", temporada)
+
+
+def atualizar_classificacao_temporada(
+    temporada: str,
+    apostas_pontos_df: Optional[pd.DataFrame] = None,
+    provas_df: Optional[pd.DataFrame] = None,
+    resultados_df: Optional[pd.DataFrame] = None,
+) -> pd.DataFrame:
+    """Recalcula e persiste a classificação acumulada de uma temporada.
+
+    O job de classificação repassa as apostas já pontuadas para evitar um
+    segundo cálculo; chamadas avulsas (ex.: resultado do campeonato) carregam
+    os dados diretamente dos repositórios.
+    """
+    from services.bets_scoring import calcular_pontuacao_lote
+    from services.championship_service import get_championship_bets_df, get_final_results
+
+    temporada = str(temporada)
+    if provas_df is None:
+        provas_df = get_provas_df(temporada)
+    if resultados_df is None:
+        resultados_df = get_resultados_df(temporada)
+    if apostas_pontos_df is None:
+        apostas_pontos_df = get_apostas_df(temporada)
+        if not apostas_pontos_df.empty:
+            pontos = calcular_pontuacao_lote(apostas_pontos_df, resultados_df, provas_df)
+            apostas_pontos_df = apostas_pontos_df.assign(
+                __pontos_calculados=[0.0 if p is None else float(p) for p in pontos]
+            )
+
+    participantes_df = get_participantes_temporada_df(temporada)
+    participantes: list[int] = []
+    if not participantes_df.empty:
+        validos = participantes_df[
+            participantes_df["nome"].notna() & (participantes_df["nome"].astype(str) != "Master")
+        ]
+        participantes = pd.to_numeric(validos["id"], errors="coerce").dropna().astype(int).tolist()
+
+    try:
+        season_int = int(temporada)
+    except ValueError:
+        season_int = None
+    resultado_campeonato = get_final_results(season_int) if season_int is not None else None
+    apostas_campeonato: dict[int, dict] = {}
+    if resultado_campeonato:
+        bets = get_championship_bets_df(season_int)
+        for _, row in bets.dropna(subset=["user_id"]).iterrows():
+            apostas_campeonato[int(row["user_id"])] = {
+                "champion": row.get("champion"),
+                "vice": row.get("vice"),
+                "team": row.get("team"),
+            }
+
+    regras = get_regras_aplicaveis(temporada, "Normal")
+    if apostas_pontos_df is None or apostas_pontos_df.empty or provas_df.empty:
+        classificacao = pd.DataFrame(columns=list(CLASSIFICACAO_TEMPORADA_COLUMNS))
+    else:
+        classificacao = calcular_classificacao_temporada(
+            temporada,
+            participantes,
+            provas_df,
+            apostas_pontos_df,
+            resultados_df,
+            regras,
+            resultado_campeonato,
+            apostas_campeonato,
+        )
+    substituir_classificacao_temporada(temporada, classificacao)
+    atualizar_carreira_temporada(temporada, _finais_por_participante(classificacao))
+    _pre_renderizar_imagem(temporada, classificacao, participantes_df, bool(regras.get("descarte", False)))
+    logger.info("Classificação acumulada da temporada %s atualizada (%s linhas)", temporada, len(classificacao))
+    return classificacao
+
+
+__all__ = [
+    "atualizar_classificacao_temporada",
+    "calcular_classificacao_temporada",
+    "classificacao_exibicao",
+    "colunas_classificacao",
+    "descrever_movimentacao",
+    "formatar_brasileiro",
+    "tabela_exibicao",
+]
@@ -22,6 +22,7 @@ def install_if_needed() -> None:
             raise RuntimeError("psycopg não está instalado neste ambiente de testes.")
 
     pool.ConnectionPool = UnavailableConnectionPool
+    pool.PoolTimeout = type("PoolTimeout", (Exception,), {})
     psycopg.rows = rows
     sys.modules.setdefault("psycopg", psycopg)
     sys.modules.setdefault("psycopg.rows", rows)
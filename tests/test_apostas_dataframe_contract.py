@@ -107,8 +107,8 @@ class ApostasDataFrameContractTests(unittest.TestCase):
         self.assertIn("def destacar_heatmap", classificacao_source)
         self.assertIn("df_styled = destacar_heatmap", classificacao_source)
 
-        button_pos = classificacao_source.index('st.button("Preparar imagem da tabela"')
-        generation_pos = classificacao_source.index(
-            "gerar_imagem_tabela_ajustada(df_display, colunas_ordem).getvalue()"
-        )
-        self.assertLess(button_pos, generation_pos)
+        ready_pos = classificacao_source.index("imagem_classificacao_pronta(season, df_display, colunas_ordem)")
+        button_pos = classificacao_source.index('"Preparar imagem da tabela"')
+        self.assertLess(ready_pos, button_pos)
+        self.assertIn("lambda: agendar_imagem_classificacao(season, df_display, colunas_ordem)", classificacao_source)
+        self.assertNotIn(" imagem_classificacao(", classificacao_source)
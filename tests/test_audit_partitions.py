@@ -0,0 +1,145 @@
+import datetime
+import unittest
+from unittest.mock import patch
+
+from tests._db_driver_stub import install_if_needed
+
+install_if_needed()
+
+from db import partitions
+from db.partitions import TabelaParticionada, meses_a_criar, particoes_expiradas
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self._ultimo = ""
+        self.rowcount = 0
+
+    def execute(self, query, params=None):
+        sql = " ".join(query.split())
+        self.conn.sql.append((sql, params))
+        self._ultimo = sql
+
+    def fetchone(self):
+        if "c.relkind" in self._ultimo:
+            return {"relkind": self.conn.relkind}
+        if "pg_get_serial_sequence" in self._ultimo:
+            return {"seq": None}
+        return None
+
+    def fetchall(self):
+        if "information_schema.columns" in self._ultimo:
+            return [
+                {"column_name": "id", "is_identity": "YES", "is_generated": "NEVER"},
+                {"column_name": "evento", "is_identity": "NO", "is_generated": "NEVER"},
+                {"column_name": "created_at", "is_identity": "NO", "is_generated": "NEVER"},
+                {"column_name": "evento_norm", "is_identity": "NO", "is_generated": "ALWAYS"},
+            ]
+        if "i.indisprimary" in self._ultimo and "a.attname" in self._ultimo:
+            return [{"attname": "id"}]
+        if "pg_get_indexdef" in self._ultimo:
+            return [
+                {"nome": "idx_access_logs_created_at", "ddl": "CREATE INDEX idx_access_logs_created_at ON public.access_logs USING btree (created_at)", "unico": False},
+                {"nome": "uq_access_logs_evento", "ddl": "CREATE UNIQUE INDEX uq_access_logs_evento ON public.access_logs USING btree (evento)", "unico": True},
+            ]
+        if "pg_constraint" in self._ultimo:
+            return [{"conname": "access_logs_user_id_fkey", "ddl": "FOREIGN KEY (user_id) REFERENCES usuarios(id)"}]
+        if "pg_inherits" in self._ultimo:
+            return [{"relname": nome} for nome in self.conn.particoes]
+        return []
+
+    def close(self):
+        pass
+
+
+class _Connection:
+    def __init__(self, relkind="r", particoes=()):
+        self.relkind = relkind
+        self.particoes = list(particoes)
+        self.sql = []
+
+    def cursor(self):
+        return _Cursor(self)
+
+
+class CalendarioDeParticoesTests(unittest.TestCase):
+    def test_meses_a_criar_atravessa_a_virada_do_ano(self):
+        meses = meses_a_criar(datetime.date(2026, 11, 20), datetime.date(2026, 12, 5), meses_a_frente=2)
+        self.assertEqual(meses, [datetime.date(2026, 11, 1), datetime.date(2026, 12, 1), datetime.date(2027, 1, 1), datetime.date(2027, 2, 1)])
+
+    def test_so_expira_mes_inteiro_fora_da_retencao(self):
+        nomes = ["access_logs_p202606", "access_logs_p202607", "access_logs_p202608", "access_logs_default", "outra_p202601"]
+        # Corte em 2026-07-21: julho ainda tem linhas dentro da janela.
+        expiradas = particoes_expiradas("access_logs", nomes, 90, datetime.date(2026, 10, 19))
+        self.assertEqual(expiradas, ["access_logs_p202606"])
+
+    def test_retencao_zero_mantem_tudo(self):
+        self.assertEqual(particoes_expiradas("log_apostas", ["log_apostas_p200001"], 0, datetime.date(2026, 10, 19)), [])
+
+
+class ConversaoTests(unittest.TestCase):
+    spec = TabelaParticionada("access_logs", "created_at", "ACCESS_LOGS_RETENTION_DAYS", 90)
+
+    def test_converte_tabela_comum_preservando_indices_e_chaves(self):
+        conn = _Connection()
+        with patch.dict("os.environ", {"ACCESS_LOGS_RETENTION_DAYS": "30"}):
+            self.assertTrue(partitions.converter_para_particionada(conn, self.spec, hoje=datetime.date(2026, 10, 19)))
+
+        sql = [s for s, _ in conn.sql]
+        ordem = [
+            next(i for i, s in enumerate(sql) if s.startswith("ALTER TABLE access_logs RENAME TO access_logs_legado")),
+            next(i for i, s in enumerate(sql) if "PARTITION BY RANGE (created_at)" in s),
+            next(i for i, s in enumerate(sql) if s.startswith("INSERT INTO access_logs")),
+            sql.index("DROP TABLE access_logs_legado"),
+            sql.index("ALTER TABLE access_logs ADD PRIMARY KEY (id, created_at)"),
+        ]
+        self.assertEqual(ordem, sorted(ordem))
+        criadas = [s.split()[2] for s in sql if " PARTITION OF access_logs FOR VALUES" in s]
+        self.assertEqual(criadas, [f"access_logs_p2026{m:02d}" for m in range(9, 13)] + ["access_logs_p202701"])
+        self.assertIn("CREATE TABLE access_logs_default PARTITION OF access_logs DEFAULT", sql)
+
+        insert, params = next((s, p) for s, p in conn.sql if s.startswith("INSERT INTO access_logs"))
+        self.assertIn("(id, evento, created_at)", insert)
+        self.assertIn("COALESCE(created_at, CURRENT_TIMESTAMP) >= %s", insert)
+        self.assertEqual(params, ("2026-09-01",))
+        self.assertIn("CREATE INDEX idx_access_logs_created_at ON public.access_logs USING btree (created_at)", sql)
+        self.assertFalse(any("uq_access_logs_evento" in s for s in sql))
+        self.assertIn("ALTER TABLE access_logs ADD CONSTRAINT access_logs_user_id_fkey FOREIGN KEY (user_id) REFERENCES usuarios(id)", sql)
+
+    def test_tabela_ja_particionada_nao_e_convertida(self):
+        conn = _Connection(relkind="p")
+        self.assertFalse(partitions.converter_para_particionada(conn, self.spec))
+        self.assertEqual(len(conn.sql), 1)
+
+
+class ManutencaoTests(unittest.TestCase):
+    spec = TabelaParticionada("access_logs", "created_at", "ACCESS_LOGS_RETENTION_DAYS", 90)
+
+    def test_manutencao_descarta_particoes_em_vez_de_deletar(self):
+        existentes = [f"access_logs_p2026{m:02d}" for m in range(5, 13)] + ["access_logs_default"]
+        conn = _Connection(relkind="p", particoes=existentes)
+        removidas = partitions._manter_tabela(conn, self.spec, datetime.date(2026, 10, 19))
+
+        sql = [s for s, _ in conn.sql]
+        self.assertEqual(removidas, 2)
+        self.assertIn("DROP TABLE access_logs_p202605", sql)
+        self.assertIn("DROP TABLE access_logs_p202606", sql)
+        self.assertFalse(any(s.startswith("DELETE") for s in sql))
+        criadas = [s.split()[2] for s in sql if " PARTITION OF " in s]
+        self.assertEqual(criadas, ["access_logs_p202701"])
+
+    def test_tabela_comum_mantem_delete_como_fallback(self):
+        conn = _Connection(relkind="r")
+        partitions._manter_tabela(conn, self.spec, datetime.date(2026, 10, 19))
+        self.assertTrue(conn.sql[-1][0].startswith("DELETE FROM access_logs WHERE created_at <"))
+
+    def test_manutencao_periodica_roda_uma_vez_por_intervalo(self):
+        with patch.object(partitions, "manter_particoes") as manter, patch.dict(partitions._ultima_manutencao, clear=True):
+            self.assertTrue(partitions.manter_particoes_periodicamente(("login_attempts",)))
+            self.assertFalse(partitions.manter_particoes_periodicamente(("login_attempts",)))
+        manter.assert_called_once_with(["login_attempts"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import threading
+import unittest
+from contextlib import contextmanager
+from unittest.mock import patch
+
+from tests._db_driver_stub import install_if_needed
+
+install_if_needed()
+
+from db import audit_sink
+from db.audit_sink import AuditSink
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, query, params=None):
+        if self.conn.falhar_lote and query.count("), (") > 0:
+            raise RuntimeError("lote recusado")
+        if params and "invalido" in params:
+            raise RuntimeError("linha recusada")
+        self.conn.sql.append((query, list(params or [])))
+
+    def close(self):
+        pass
+
+
+class _Connection:
+    def __init__(self, falhar_lote=False):
+        self.falhar_lote = falhar_lote
+        self.sql = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return _Cursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class AuditSinkTests(unittest.TestCase):
+    def test_eventos_enfileirados_saem_em_lote(self):
+        lotes = []
+        bloqueio = threading.Lock()
+
+        def gravar(lote):
+            with bloqueio:
+                lotes.append(lote)
+
+        sink = AuditSink(maxsize=10, batch_size=10, flush_interval=0.01, gravar=gravar)
+        with bloqueio:
+            for i in range(3):
+                sink.registrar("access_logs", {"evento": f"e{i}"})
+            self.assertEqual([l["evento"] for l in sink.pendentes("access_logs")], ["e0", "e1", "e2"])
+        self.assertTrue(sink.flush(timeout=2))
+        sink.close()
+
+        self.assertEqual([e[1]["evento"] for lote in lotes for e in lote], ["e0", "e1", "e2"])
+        self.assertLessEqual(len(lotes), 2)
+        self.assertEqual(sink.pendentes("access_logs"), [])
+
+    def test_fila_cheia_grava_na_thread_de_quem_chamou(self):
+        liberar = threading.Event()
+        gravados = []
+
+        def gravar(lote):
+            if threading.current_thread().name == "bf1-audit":
+                liberar.wait(2)
+            gravados.append((threading.current_thread().name, [l["evento"] for _, l in lote]))
+
+        sink = AuditSink(maxsize=1, batch_size=1, flush_interval=0.01, gravar=gravar)
+        sink.registrar("login_attempts", {"evento": "a"})
+        for _ in range(200):
+            if sink.pendentes("login_attempts") and sink._fila.empty():
+                break
+            threading.Event().wait(0.005)
+        sink.registrar("login_attempts", {"evento": "b"})
+        sink.registrar("login_attempts", {"evento": "c"})
+
+        self.assertEqual(gravados, [(threading.current_thread().name, ["c"])])
+        liberar.set()
+        sink.close()
+        self.assertEqual(sorted(e for _, lote in gravados for e in lote), ["a", "b", "c"])
+
+    def test_depois_de_fechado_grava_sincrono(self):
+        gravados = []
+        sink = AuditSink(gravar=gravados.append)
+        sink.close()
+        sink.registrar("log_apostas", {"usuario_id": 1})
+        self.assertEqual(gravados, [[("log_apostas", {"usuario_id": 1})]])
+
+
+class GravarEventosTests(unittest.TestCase):
+    def _connect(self, conn):
+        @contextmanager
+        def fake_connect(*args, **kwargs):
+            yield conn
+
+        return patch.object(audit_sink, "db_connect", fake_connect)
+
+    def test_um_insert_multilinha_por_tabela_e_um_commit(self):
+        conn = _Connection()
+        eventos = [
+            ("access_logs", {"evento": "login", "sucesso": True}),
+            ("login_attempts", {"email": "a@x", "sucesso": False}),
+            ("access_logs", {"evento": "logout", "sucesso": True}),
+        ]
+        with self._connect(conn):
+            audit_sink.gravar_eventos(eventos)
+
+        self.assertEqual(conn.commits, 1)
+        self.assertEqual(len(conn.sql), 2)
+        query, params = conn.sql[0]
+        self.assertIn("INSERT INTO access_logs (evento, sucesso) VALUES (%s, %s), (%s, %s)", query)
+        self.assertEqual(params, ["login", True, "logout", True])
+
+    def test_lote_recusado_e_regravado_linha_a_linha(self):
+        conn = _Connection(falhar_lote=True)
+        eventos = [("access_logs", {"evento": "ok1"}), ("access_logs", {"evento": "invalido"}), ("access_logs", {"evento": "ok2"})]
+        with self._connect(conn), self.assertLogs("db.audit_sink", level="WARNING"):
+            audit_sink.gravar_eventos(eventos)
+
+        self.assertEqual([p for _, p in conn.sql], [["ok1"], ["ok2"]])
+        self.assertEqual(conn.commits, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -187,6 +187,14 @@ class BackupSecurityTests(unittest.TestCase):
         self.assertIn("nrows=limits.excel_rows + 1", excel)
         self.assertGreaterEqual(legacy.count("require_restore_authorized()"), 4)
 
+    def test_backup_e_restore_usam_o_papel_job(self):
+        # O statement_timeout do papel web derrubaria dumps e restores longos.
+        for nome in ("backup_sql.py", "backup_excel.py", "backup_utils.py", "backup_validate.py"):
+            with self.subTest(modulo=nome):
+                source = (ROOT / "db" / nome).read_text(encoding="utf-8")
+                self.assertIn('db_connect("job")', source)
+                self.assertNotIn("db_connect()", source)
+
 
 if __name__ == "__main__":
     unittest.main()
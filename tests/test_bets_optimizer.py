@@ -0,0 +1,130 @@
+import itertools
+import time
+import unittest
+from unittest.mock import patch
+
+import pandas as pd
+
+from tests._db_driver_stub import install_if_needed
+
+install_if_needed()
+
+from services import bets_write
+from services.bets_optimizer import _valores_pilotos, otimizar_aposta
+from services.bets_rules import _aposta_valida_regras
+
+
+def _grid(n_equipes: int = 10) -> pd.DataFrame:
+    linhas = []
+    for e in range(n_equipes):
+        for j in range(2):
+            linhas.append({"nome": f"Piloto {2 * e + j + 1}", "equipe": f"Equipe {e + 1}", "status": "Ativo"})
+    return pd.DataFrame(linhas)
+
+
+def _contexto(pilotos: pd.DataFrame) -> dict:
+    nomes = pilotos["nome"].tolist()
+    return {
+        "tp": [{"p": i + 1, "n": n} for i, n in enumerate(nomes)],
+        "qg": {n.lower(): i + 1 for i, n in enumerate(nomes)},
+        "rp8": {n.lower(): [i + 1, i + 2, max(1, i), i + 3] for i, n in enumerate(nomes)},
+        "dnf": {nomes[0].lower(): 0.5},
+    }
+
+
+def _forca_bruta(pilotos: pd.DataFrame, regras: dict, contexto: dict) -> float:
+    lista, bonus = _valores_pilotos(pilotos, regras, "Normal", contexto)
+    valores = {v.nome: v for v in lista}
+    nomes = sorted(valores)
+    total, cap, minimo = regras["quantidade_fichas"], regras["fichas_por_piloto"], regras["qtd_minima_pilotos"]
+    melhor = float("-inf")
+    for n in range(minimo, total + 1):
+        for sel in itertools.combinations(nomes, n):
+            for fichas in itertools.product(range(1, cap + 1), repeat=n):
+                if sum(fichas) != total:
+                    continue
+                for p11 in nomes:
+                    if not _aposta_valida_regras(list(sel), list(fichas), p11, pilotos, regras):
+                        continue
+                    valor = sum(f * valores[p].por_ficha - valores[p].custo for p, f in zip(sel, fichas))
+                    melhor = max(melhor, valor + bonus * valores[p11].chance_11)
+    return melhor
+
+
+class OtimizarApostaTests(unittest.TestCase):
+    regras = {
+        "qtd_minima_pilotos": 3,
+        "quantidade_fichas": 15,
+        "fichas_por_piloto": 8,
+        "mesma_equipe": False,
+        "pontos_11_colocado": 25,
+        "penalidade_abandono": True,
+        "pontos_penalidade": 10,
+    }
+
+    def test_aposta_otima_e_valida(self):
+        pilotos = _grid()
+        sugestao = otimizar_aposta(pilotos, self.regras, "Normal", _contexto(pilotos))
+        self.assertIsNotNone(sugestao)
+        self.assertTrue(_aposta_valida_regras(sugestao.pilotos, sugestao.fichas, sugestao.piloto_11, pilotos, self.regras))
+        # Piloto 1 tem 50% de abandono: a Equipe 1 entra com o companheiro.
+        self.assertEqual(sugestao.pilotos[0], "Piloto 2")
+        self.assertNotIn("Piloto 1", sugestao.pilotos)
+
+    def test_igual_a_forca_bruta_em_grid_pequeno(self):
+        pilotos = _grid(4)
+        regras = dict(self.regras, quantidade_fichas=6, fichas_por_piloto=3)
+        contexto = _contexto(pilotos)
+        sugestao = otimizar_aposta(pilotos, regras, "Normal", contexto)
+        self.assertAlmostEqual(sugestao.pontos_esperados, round(_forca_bruta(pilotos, regras, contexto), 2), places=2)
+
+        permite = dict(regras, mesma_equipe=True)
+        sugestao = otimizar_aposta(pilotos, permite, "Normal", contexto)
+        self.assertAlmostEqual(sugestao.pontos_esperados, round(_forca_bruta(pilotos, permite, contexto), 2), places=2)
+
+    def test_deterministico_e_em_milissegundos(self):
+        pilotos = _grid()
+        contexto = _contexto(pilotos)
+        inicio = time.perf_counter()
+        a = otimizar_aposta(pilotos, self.regras, "Sprint", contexto)
+        self.assertLess(time.perf_counter() - inicio, 0.5)
+        self.assertEqual(a, otimizar_aposta(pilotos, self.regras, "Sprint", contexto))
+
+    def test_regras_impossiveis_devolvem_none(self):
+        pilotos = _grid(2)
+        self.assertIsNone(otimizar_aposta(pilotos, dict(self.regras, qtd_minima_pilotos=3), "Normal", {}))
+        self.assertIsNone(otimizar_aposta(pilotos.iloc[0:0], self.regras, "Normal", {}))
+
+
+class GerarApostaOtimizadaTests(unittest.TestCase):
+    def test_usa_sorteio_quando_otimizador_nao_tem_solucao(self):
+        pilotos = _grid()
+        with patch.object(bets_write, "otimizar_aposta", return_value=None):
+            pilotos_sel, fichas, piloto_11, otimizada = bets_write._gerar_aposta_otimizada(
+                pilotos, OtimizarApostaTests.regras, "Normal", {}
+            )
+        self.assertFalse(otimizada)
+        self.assertTrue(_aposta_valida_regras(pilotos_sel, fichas, piloto_11, pilotos, OtimizarApostaTests.regras))
+
+    def test_sem_ideias_nao_chama_gemini_por_padrao(self):
+        pilotos = _grid()
+        provas = pd.DataFrame([{"id": 7, "nome": "GP X", "data": "2099-01-01", "horario_prova": "10:00", "tipo": "Normal"}])
+        with (
+            patch.object(bets_write, "get_provas_df", return_value=provas),
+            patch.object(bets_write, "get_pilotos_df", return_value=pilotos),
+            patch.object(bets_write, "get_regras_aplicaveis", return_value=OtimizarApostaTests.regras),
+            patch.object(bets_write, "_get_contexto_temporada_atual_ergast", return_value=_contexto(pilotos)),
+            patch.object(bets_write, "salvar_aposta", return_value=True) as salvar,
+            patch.object(bets_write, "get_aposta", return_value={"id": 1}),
+            patch.object(bets_write, "_comentar_aposta_gemini") as comentar,
+            patch.dict("os.environ", {"BF1_SEM_IDEIAS_COMENTARIO_IA": ""}),
+        ):
+            ok, _, detalhes = bets_write.gerar_aposta_sem_ideias(1, 7, "GP X", "2099")
+        self.assertTrue(ok)
+        self.assertEqual(detalhes["origem"], "estratégica")
+        self.assertEqual(salvar.call_args.kwargs["pilotos"], detalhes["pilotos"])
+        comentar.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
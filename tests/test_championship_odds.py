@@ -0,0 +1,191 @@
+import time
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from tests._db_driver_stub import install_if_needed
+
+install_if_needed()
+
+from services import championship_odds
+from services.championship_odds import ParticipanteSimulado, ProvaSimulada, simular_chances
+from utils.ttl_cache import clear_all_caches
+
+PILOTOS = [f"P{i}" for i in range(20)]
+
+
+def _prova_fixa(**kwargs) -> ProvaSimulada:
+    """Prova praticamente determinística: P0 vence, P1 em 2º, ... (sem abandono)."""
+    n = len(PILOTOS)
+    params = {
+        "mu": np.arange(1, n + 1, dtype=float),
+        "sigma": np.full(n, 1e-6),
+        "dnf": np.zeros(n),
+        "pontos": (25, 18, 15, 12, 10, 8, 6, 4, 2, 1),
+    }
+    params.update(kwargs)
+    return ProvaSimulada(**params)
+
+
+def _fichas(**por_piloto) -> tuple[int, ...]:
+    return tuple(por_piloto.get(p, 0) for p in PILOTOS)
+
+
+class SimularChancesTests(unittest.TestCase):
+    def test_sem_provas_restantes_lider_e_campeao(self):
+        participantes = [
+            ParticipanteSimulado(1, 300.0, _fichas(P0=5)),
+            ParticipanteSimulado(2, 250.0, _fichas(P1=5)),
+        ]
+        chances = simular_chances([], participantes, n_simulacoes=50)
+        self.assertEqual(chances["chance_titulo"].tolist(), [1.0, 0.0])
+        self.assertEqual(chances["chance_podio"].tolist(), [1.0, 1.0])
+
+    def test_pontuacao_em_lote_segue_o_kernel(self):
+        prova = _prova_fixa(pontos_11=25.0, multiplicador=2.0, fator_auto=0.8)
+        participantes = [
+            # (3x25 + 2x18 + acerto do 11º) x 2 na sprint dobrada = 272
+            ParticipanteSimulado(1, 0.0, _fichas(P0=3, P1=2), indice_11=10),
+            # 2ª automática: (5x15) x 2 com 20% de desconto = 120
+            ParticipanteSimulado(2, 0.0, _fichas(P2=5), faltas=1, taxa_ausencia=1.0),
+            # 1ª automática ainda sem desconto
+            ParticipanteSimulado(3, 0.0, _fichas(P2=5), faltas=0, taxa_ausencia=1.0),
+        ]
+        chances = simular_chances([prova], participantes, n_simulacoes=20)
+        self.assertEqual(chances["pontos_esperados"].round(6).tolist(), [272.0, 120.0, 150.0])
+
+    def test_abandono_penaliza_e_nao_pontua(self):
+        prova = _prova_fixa(dnf=np.array([1.0] + [0.0] * 19), pontos_penalidade=10.0)
+        participantes = [ParticipanteSimulado(1, 0.0, _fichas(P0=4, P1=1))]
+        chances = simular_chances([prova], participantes, n_simulacoes=20)
+        # P0 abandona (-10, sem pontos); P1 herda a vitória: 1x25 - 10.
+        self.assertEqual(chances["pontos_esperados"].tolist(), [15.0])
+
+    def test_descarte_remove_a_pior_prova_inclusive_futura(self):
+        participantes = [
+            ParticipanteSimulado(1, 100.0, _fichas(P19=1), menor_prova=40.0),
+            ParticipanteSimulado(2, 90.0, _fichas(P0=1), menor_prova=20.0),
+        ]
+        chances = simular_chances([_prova_fixa()], participantes, n_simulacoes=20, descarte=True)
+        # 1: 100 + 0, descarte 0 -> 100; 2: 90 + 25, descarte 20 -> 95.
+        self.assertEqual(chances["pontos_esperados"].tolist(), [100.0, 95.0])
+        self.assertEqual(chances["chance_titulo"].tolist(), [1.0, 0.0])
+
+    def test_empate_fica_com_quem_esta_a_frente(self):
+        participantes = [
+            ParticipanteSimulado(7, 50.0, _fichas()),
+            ParticipanteSimulado(3, 50.0, _fichas()),
+        ]
+        chances = simular_chances([_prova_fixa()], participantes, n_simulacoes=10)
+        self.assertEqual(chances["chance_titulo"].tolist(), [1.0, 0.0])
+
+    def test_dez_mil_simulacoes_cem_participantes_em_segundos(self):
+        rng = np.random.default_rng(1)
+        provas = [
+            _prova_fixa(sigma=np.full(20, 2.5), dnf=np.full(20, 0.08), pontos_penalidade=5.0)
+            for _ in range(10)
+        ]
+        participantes = []
+        for uid in range(100):
+            escolhidos = rng.choice(20, size=3, replace=False)
+            fichas = [0] * 20
+            for piloto, ficha in zip(escolhidos, (8, 4, 3)):
+                fichas[piloto] = ficha
+            participantes.append(
+                ParticipanteSimulado(uid, float(rng.integers(0, 500)), tuple(fichas), int(rng.integers(0, 20)), 10.0, 0, 0.1)
+            )
+        inicio = time.perf_counter()
+        chances = simular_chances(provas, participantes, n_simulacoes=10_000, descarte=True)
+        self.assertLess(time.perf_counter() - inicio, 10.0)
+        self.assertAlmostEqual(chances["chance_titulo"].sum(), 1.0)
+        self.assertAlmostEqual(chances["chance_podio"].sum(), 3.0)
+
+    def test_mesma_semente_mesmo_resultado(self):
+        provas = [_prova_fixa(sigma=np.full(20, 3.0))]
+        participantes = [ParticipanteSimulado(1, 10.0, _fichas(P0=5)), ParticipanteSimulado(2, 10.0, _fichas(P5=5))]
+        a = simular_chances(provas, participantes, n_simulacoes=500, seed=3)
+        b = simular_chances(provas, participantes, n_simulacoes=500, seed=3)
+        pd.testing.assert_frame_equal(a, b)
+
+
+class CenarioTests(unittest.TestCase):
+    def setUp(self):
+        clear_all_caches()
+
+    def _patches(self, apostas):
+        provas = pd.DataFrame(
+            [
+                {"id": 1, "nome": "GP A", "data": "2026-03-01", "tipo": "Normal"},
+                {"id": 2, "nome": "GP B", "data": "2026-03-15", "tipo": "Normal"},
+                {"id": 3, "nome": "GP C", "data": "2026-04-01", "tipo": "Normal"},
+            ]
+        )
+        resultados = pd.DataFrame([{"prova_id": 1, "posicoes": "{}"}, {"prova_id": 2, "posicoes": "{}"}])
+        classificacao = pd.DataFrame(
+            [
+                {"usuario_id": 10, "ordem_prova": 2, "posicao": 2, "pontos_acumulados": 80.0, "descarte": 30.0},
+                {"usuario_id": 20, "ordem_prova": 2, "posicao": 1, "pontos_acumulados": 90.0, "descarte": 0.0},
+            ]
+        )
+        participantes = pd.DataFrame(
+            [{"id": 10, "nome": "Ana", "faltas": 1}, {"id": 20, "nome": "Bia", "faltas": None}, {"id": 1, "nome": "Master", "faltas": 0}]
+        )
+        pilotos = pd.DataFrame([{"nome": "Max", "status": "Ativo"}, {"nome": "Lando", "status": "Ativo"}])
+        alvo = "services.championship_odds."
+        return [
+            patch(alvo + "get_provas_df", return_value=provas),
+            patch(alvo + "get_resultados_df", return_value=resultados),
+            patch(alvo + "get_apostas_df", return_value=apostas),
+            patch(alvo + "get_classificacao_temporada_df", return_value=classificacao),
+            patch(alvo + "get_participantes_temporada_df", return_value=participantes),
+            patch(alvo + "get_pilotos_df", return_value=pilotos),
+            patch(alvo + "get_regras_aplicaveis", return_value={"descarte": True}),
+        ]
+
+    def _apostas(self):
+        return pd.DataFrame(
+            [
+                {"usuario_id": 10, "prova_id": 1, "data_envio": "2026-02-28 10:00", "pilotos": "Max,Lando", "fichas": "10,5", "piloto_11": "Oscar", "automatica": 0},
+                {"usuario_id": 10, "prova_id": 2, "data_envio": "2026-03-14 10:00", "pilotos": "Lando,Max", "fichas": "9,6", "piloto_11": "Yuki", "automatica": 1},
+            ]
+        )
+
+    def test_cenario_usa_ultima_aposta_e_taxa_de_automaticas(self):
+        patches = self._patches(self._apostas())
+        for p in patches:
+            p.start()
+        self.addCleanup(lambda: [p.stop() for p in patches])
+
+        cenario = championship_odds.montar_cenario("2026")
+
+        self.assertEqual([p.prova_id for p in cenario.provas], [3])
+        self.assertTrue(cenario.descarte)
+        self.assertEqual(cenario.pilotos, ("Max", "Lando", "Yuki"))
+        bia, ana = cenario.participantes
+        self.assertEqual(bia.usuario_id, 20)
+        self.assertIsNone(bia.menor_prova)
+        self.assertEqual((ana.pilotos, ana.fichas, ana.piloto_11), (("Lando", "Max"), (9, 6), "Yuki"))
+        self.assertEqual((ana.pontos, ana.menor_prova, ana.faltas, ana.taxa_ausencia), (80.0, 30.0, 1, 0.5))
+
+    def test_simulacao_em_cache_por_cenario(self):
+        patches = self._patches(self._apostas())
+        for p in patches:
+            p.start()
+        self.addCleanup(lambda: [p.stop() for p in patches])
+        contexto = {"tp": [{"n": "Max", "p": 1}, {"n": "Lando", "p": 2}], "dnf": {}}
+        with patch.object(championship_odds, "_get_contexto_temporada_atual_ergast", return_value=contexto) as ergast:
+            primeira = championship_odds.calcular_chances_campeonato("2026", n_simulacoes=200)
+            segunda = championship_odds.calcular_chances_campeonato("2026", n_simulacoes=200)
+            self.assertEqual(ergast.call_count, 1)
+            pd.testing.assert_frame_equal(primeira, segunda)
+
+            with patch.object(championship_odds, "get_apostas_df", return_value=self._apostas().iloc[:1]):
+                championship_odds.calcular_chances_campeonato("2026", n_simulacoes=200)
+            self.assertEqual(ergast.call_count, 2)
+        self.assertEqual(primeira["usuario_id"].tolist(), [20, 10])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,6 +5,13 @@ from pathlib import Path
 import numpy as np
 import pandas as pd
 
+from tests._db_driver_stub import install_if_needed
+
+install_if_needed()
+
+from services.standings_service import colunas_classificacao as _colunas_classificacao
+from services.standings_service import formatar_brasileiro
+
 
 def _carregar_funcoes_classificacao():
     source = (Path(__file__).resolve().parents[1] / "ui" / "classificacao.py").read_text(encoding="utf-8")
@@ -13,9 +20,7 @@ def _carregar_funcoes_classificacao():
         "_calcular_descartes_atuais",
         "_montar_pontos_por_prova",
         "destacar_heatmap",
-        "formatar_brasileiro",
         "_calcular_totais_classificacao",
-        "_colunas_classificacao",
     }
     funcoes = [node for node in tree.body if isinstance(node, ast.FunctionDef) and node.name in nomes]
     namespace = {"pd": pd, "np": np}
@@ -26,10 +31,8 @@ def _carregar_funcoes_classificacao():
 (
     _calcular_descartes_atuais,
     _calcular_totais_classificacao,
-    _colunas_classificacao,
     _montar_pontos_por_prova,
     destacar_heatmap,
-    formatar_brasileiro,
 ) = _carregar_funcoes_classificacao()
 
 
@@ -7,7 +7,7 @@ from tests._db_driver_stub import install_if_needed
 
 install_if_needed()
 
-from services.bets_scoring import atualizar_classificacoes_todas_as_provas
+from services.bets_scoring import _salvar_classificacoes_provas_lote, atualizar_classificacoes_todas_as_provas
 
 
 class ClassificationWorkflowTests(unittest.TestCase):
@@ -17,13 +17,17 @@ class ClassificationWorkflowTests(unittest.TestCase):
         with patch("services.bets_scoring.require_operation") as authorize, patch(
             "services.bets_scoring.db_connect"
         ), patch(
-            "services.bets_scoring._fetch_df", side_effect=lambda *args, **kwargs: next(frames)
+            "services.bets_scoring.execute_pipeline", return_value=[object()] * 4
+        ), patch(
+            "services.bets_scoring._cursor_to_df", side_effect=lambda *args, **kwargs: next(frames)
         ), patch(
             "services.bets_scoring.get_regras_aplicaveis",
             return_value={"pontos_posicoes": [10], "pontos_11_colocado": 0},
         ), patch(
             "services.bets_scoring._salvar_classificacoes_provas_lote",
             side_effect=lambda value: captured.extend(value),
+        ), patch("services.bets_scoring._atualizar_classificacoes_acumuladas"), patch(
+            "services.bets_scoring.recalcular_usuario_temporadas"
         ):
             atualizar_classificacoes_todas_as_provas("2026")
         authorize.assert_called_once_with("resultado.write", season="2026")
@@ -84,5 +88,30 @@ class ClassificationWorkflowTests(unittest.TestCase):
         self.assertEqual(captured, [])
 
 
+class SalvarClassificacoesTests(unittest.TestCase):
+    def _salvar(self, fonte):
+        conn = Mock()
+        ranking = pd.DataFrame([{"usuario_id": 1, "posicao": 1, "pontos": 20.0}])
+        with patch("services.bets_scoring.db_connect") as connect, patch(
+            "services.bets_scoring.get_table_columns", return_value={"temporada"}
+        ), patch(
+            "services.bets_scoring.resolver_fonte_hall", return_value=(fonte, "posicao")
+        ), patch(
+            "services.bets_scoring.reconstruir_hall_da_fama_resumo"
+        ) as reconstruir, patch("services.bets_scoring.clear_data_cache"):
+            connect.return_value.__enter__.return_value = conn
+            _salvar_classificacoes_provas_lote([(10, ranking, "2026")])
+        conn.commit.assert_called_once()
+        return reconstruir, conn
+
+    def test_fonte_legada_reconstroi_resumo_do_hall(self):
+        reconstruir, conn = self._salvar("posicoes_participantes")
+        reconstruir.assert_called_once_with(conn)
+
+    def test_hall_cadastrado_mantem_resumo(self):
+        reconstruir, _ = self._salvar("hall_da_fama")
+        reconstruir.assert_not_called()
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,238 @@
+import unittest
+from contextlib import contextmanager
+
+from tests._db_driver_stub import install_if_needed
+
+install_if_needed()
+
+from unittest.mock import patch
+
+from db import connection_pool, db_schema
+from db.connection_pool import ConnectionPool, InstrumentedCursor, PoolTimeout, execute_pipeline, hot_query
+from utils import performance
+
+
+class _Cursor:
+    def __init__(self, log):
+        self.log = log
+
+    def execute(self, query, params=None, **kwargs):
+        self.log.append((query, params, kwargs))
+
+
+class _Connection:
+    def __init__(self):
+        self.log = []
+        self.commits = 0
+        self.pipelines = 0
+
+    def cursor(self):
+        return _Cursor(self.log)
+
+    def execute(self, query, params=None):
+        self.log.append((query, params, {}))
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks = getattr(self, "rollbacks", 0) + 1
+
+    @contextmanager
+    def pipeline(self):
+        self.pipelines += 1
+        yield
+
+
+class _PgPool:
+    def __init__(self, falhar=False):
+        self.falhar = falhar
+        self.entregues = []
+
+    @contextmanager
+    def connection(self):
+        if self.falhar:
+            raise PoolTimeout("sem conexão")
+        conn = _Connection()
+        self.entregues.append(conn)
+        yield conn
+
+    def get_stats(self):
+        return {"pool_size": 3, "pool_available": 2, "requests_waiting": 0, "connections_num": 4}
+
+
+def _pool_com(pg_pool):
+    pool = ConnectionPool.__new__(ConnectionPool)
+    pool.replica = False
+    pool._pg_pool = pg_pool
+    pool._fora_do_padrao = set()
+    pool._lock = connection_pool.threading.Lock()
+    pool._counters = connection_pool.PoolCounters()
+    pool._last_stats_log = connection_pool.time.monotonic()
+    return pool
+
+
+class ConnectionPoolTests(unittest.TestCase):
+    def test_consulta_quente_e_preparada_na_primeira_execucao(self):
+        sql = hot_query("SELECT * FROM tabela_quente WHERE id = %s")
+        log = []
+        InstrumentedCursor(_Cursor(log)).execute(sql, (1,))
+        InstrumentedCursor(_Cursor(log)).execute("SELECT 1", ())
+        InstrumentedCursor(_Cursor(log)).execute(sql, (2,), prepare=False)
+
+        self.assertEqual([kwargs for _, _, kwargs in log], [{"prepare": True}, {}, {"prepare": False}])
+
+    def test_pipeline_executa_leituras_em_ordem_em_um_bloco(self):
+        conn = _Connection()
+        cursores = execute_pipeline(conn, [("SELECT 1", None), ("SELECT %s", (2,))])
+
+        self.assertEqual(len(cursores), 2)
+        self.assertEqual(conn.pipelines, 1)
+        self.assertEqual([(q, p) for q, p, _ in conn.log], [("SELECT 1", ()), ("SELECT %s", (2,))])
+
+    def test_papel_de_job_e_restaurado_ao_devolver_a_conexao(self):
+        pool = ConnectionPool.__new__(ConnectionPool)
+        pool._fora_do_padrao = set()
+        pool._lock = connection_pool.threading.Lock()
+        conn = _Connection()
+
+        pool._configure(conn)
+        self.assertEqual(conn.prepare_threshold, connection_pool.DB_PREPARE_THRESHOLD)
+        query, params, _ = conn.log[-1]
+        self.assertEqual(query, "SELECT set_config(%s, %s, false), set_config(%s, %s, false)")
+        self.assertEqual(params[0::2], ("statement_timeout", "work_mem"))
+
+        pool._reset(conn)
+        self.assertEqual(len(conn.log), 1)
+
+        pool._fora_do_padrao.add(id(conn))
+        pool._reset(conn)
+        self.assertEqual(len(conn.log), 2)
+        self.assertEqual(conn.log[-1][1], conn.log[0][1])
+        self.assertEqual(conn.commits, 2)
+        self.assertEqual(pool._fora_do_padrao, set())
+
+    def test_espera_e_uso_do_pool_sao_registrados_na_jornada_e_no_snapshot(self):
+        pool = _pool_com(_PgPool())
+        with performance.journey("teste_pool") as metricas:
+            with pool.get_connection():
+                self.assertEqual(pool.stats()["in_use"], 1)
+            with pool.get_connection():
+                pass
+
+        self.assertEqual(metricas.pool_checkouts, 2)
+        self.assertEqual(metricas.pool_max_in_use, 1)
+        self.assertGreaterEqual(metricas.pool_hold_seconds, 0.0)
+        snapshot = pool.stats()
+        self.assertEqual((snapshot["checkouts"], snapshot["in_use"], snapshot["max_in_use"]), (2, 0, 1))
+        self.assertEqual((snapshot["size"], snapshot["idle"], snapshot["connections_opened"]), (3, 2, 4))
+        self.assertEqual(sum(snapshot["wait_histogram"].values()), 2)
+
+    def test_timeout_do_pool_e_contado_e_emite_snapshot(self):
+        pool = _pool_com(_PgPool(falhar=True))
+        with self.assertLogs("bf1.performance", level="INFO") as logs:
+            with performance.journey("teste_timeout") as metricas:
+                with self.assertRaises(PoolTimeout):
+                    with pool.get_connection():
+                        pass
+
+        self.assertEqual(metricas.pool_timeouts, 1)
+        self.assertEqual(pool.stats()["timeouts"], 1)
+        self.assertTrue(any('"event": "pool_stats"' in linha for linha in logs.output))
+
+    def test_leituras_da_jornada_compartilham_conexao_em_snapshot(self):
+        pg_pool = _PgPool()
+        pool = _pool_com(pg_pool)
+        with patch.object(db_schema, "get_pool", return_value=pool), \
+                patch.object(connection_pool, "DATABASE_REPLICA_URL", ""):
+            with performance.journey("teste_unidade") as metricas:
+                with db_schema.declared_read():
+                    with db_schema.db_connect() as a:
+                        a.commit()
+                    with db_schema.db_connect() as b:
+                        pass
+                with db_schema.db_connect() as escrita:
+                    escrita.commit()
+                with db_schema.declared_read(), db_schema.db_connect() as c:
+                    pass
+
+        self.assertIs(a, b)
+        self.assertIsNot(c, a)
+        self.assertEqual(metricas.pool_checkouts, 3)
+        leitura, _, nova_leitura = pg_pool.entregues
+        self.assertEqual(leitura.log[0][0], connection_pool._SNAPSHOT_SQL)
+        self.assertEqual((leitura.commits, leitura.rollbacks), (0, 1))
+        self.assertEqual(nova_leitura.log[0][0], connection_pool._SNAPSHOT_SQL)
+        self.assertEqual(pool.stats()["in_use"], 0)
+
+    def test_invalidacao_de_cache_de_outra_sessao_encerra_snapshot(self):
+        from utils.ttl_cache import clear_all_caches
+
+        pg_pool = _PgPool()
+        pool = _pool_com(pg_pool)
+        with patch.object(db_schema, "get_pool", return_value=pool), \
+                patch.object(connection_pool, "DATABASE_REPLICA_URL", ""):
+            with performance.journey("teste_invalidacao"):
+                with db_schema.declared_read(), db_schema.db_connect() as antes:
+                    pass
+                # Outra sessão gravou e limpou os caches: o snapshot da jornada
+                # é anterior à escrita e não pode abastecer o próximo miss.
+                clear_all_caches("apostas")
+                with db_schema.declared_read(), db_schema.db_connect() as depois:
+                    pass
+                with db_schema.declared_read(), db_schema.db_connect() as mesma:
+                    pass
+
+        self.assertIsNot(antes, depois)
+        self.assertIs(depois, mesma)
+        self.assertEqual(len(pg_pool.entregues), 2)
+
+    def test_jornadas_concorrentes_nao_esgotam_o_pool(self):
+        import threading
+
+        limite = connection_pool.DB_MAX_CONN
+
+        class _PgPoolLimitado(_PgPool):
+            def __init__(self):
+                super().__init__()
+                self.vagas = threading.BoundedSemaphore(limite)
+
+            @contextmanager
+            def connection(self):
+                if not self.vagas.acquire(timeout=1.0):
+                    raise PoolTimeout("pool esgotado")
+                try:
+                    yield _Connection()
+                finally:
+                    self.vagas.release()
+
+        pool = _pool_com(_PgPoolLimitado())
+        todas_com_snapshot = threading.Barrier(limite)
+        erros = []
+
+        def pagina(indice):
+            try:
+                with performance.journey(f"pagina_{indice}"):
+                    with db_schema.declared_read(), db_schema.db_connect():
+                        pass
+                    # Todas as jornadas já abriram o snapshot antes da 2ª retirada.
+                    todas_com_snapshot.wait(5)
+                    with db_schema.db_connect() as escrita:
+                        escrita.commit()
+            except Exception as exc:
+                erros.append(exc)
+
+        with patch.object(db_schema, "get_pool", return_value=pool), \
+                patch.object(connection_pool, "DATABASE_REPLICA_URL", ""):
+            threads = [threading.Thread(target=pagina, args=(i,)) for i in range(limite)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join(10)
+
+        self.assertEqual(erros, [])
+        self.assertEqual(pool.stats()["in_use"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
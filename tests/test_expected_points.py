@@ -0,0 +1,118 @@
+import time
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from tests._db_driver_stub import install_if_needed
+
+install_if_needed()
+
+from services import expected_points
+from services.expected_points import MatrizProva, avaliar_apostas, avaliar_apostas_da_prova, matriz_prova
+from utils.ttl_cache import clear_all_caches
+
+
+def _matriz(multiplicador: float = 1.0) -> MatrizProva:
+    """Três pilotos, três posições: A sempre 1º, B meio a meio em 2º/3º, C meio a meio em 2º/3º."""
+    probs = np.array([[1.0, 0.0, 0.0], [0.0, 0.5, 0.5], [0.0, 0.5, 0.5]])
+    probs = np.pad(probs, ((0, 0), (0, 8)))
+    probs[2] = 0.0
+    probs[2, 1] = 0.5
+    probs[2, 10] = 0.5
+    pontos = np.zeros(11)
+    pontos[:3] = (25.0, 18.0, 15.0)
+    return MatrizProva(
+        pilotos=("A", "B", "C"),
+        indice={"a": 0, "b": 1, "c": 2},
+        probs=probs,
+        dnf=np.array([0.0, 0.2, 0.0]),
+        fator_dnf=np.array([1.0, 0.8, 1.0]),
+        pontos=pontos,
+        componentes=({}, {}, {}),
+        pontos_11=25.0,
+        penalidade_abandono=10.0,
+        multiplicador=multiplicador,
+    )
+
+
+def _contexto(nomes: list[str]) -> dict:
+    return {
+        "tp": [{"p": i + 1, "n": n} for i, n in enumerate(nomes)],
+        "qg": {n.lower(): i + 1 for i, n in enumerate(nomes)},
+        "dnf": {},
+    }
+
+
+class AvaliarApostasTests(unittest.TestCase):
+    def test_esperanca_variancia_e_11_conferem_com_conta_manual(self):
+        matriz = _matriz()
+        avaliacao = avaliar_apostas(matriz, [(["A", "B"], [3, 2], "C"), (["c"], [4], "Fora")])
+
+        # A: 3 x 25; B: 2 x 16.5 x 0.8 - 10 x 0.2; 11º: C em 11º com 50% -> 12.5
+        self.assertAlmostEqual(avaliacao.loc[0, "pontos_esperados"], 75 + 26.4 - 2 + 12.5)
+        # B: Var(pontos) = 2.25, fichas² x fator² = 4 x 0.64; abandono 10² x 0.16; 11º 25² x 0.25
+        self.assertAlmostEqual(avaliacao.loc[0, "variancia"], 4 * 0.64 * 2.25 + 16 + 156.25)
+        self.assertAlmostEqual(avaliacao.loc[0, "chance_11"], 0.5)
+        # C: 4 x (0.5 x 18); 11º fora da matriz não conta
+        self.assertAlmostEqual(avaliacao.loc[1, "pontos_esperados"], 36.0)
+        self.assertAlmostEqual(avaliacao.loc[1, "variancia"], 16 * 81.0)
+        self.assertAlmostEqual(avaliacao.loc[1, "desvio_padrao"], 36.0)
+        self.assertEqual(avaliacao.loc[1, "chance_11"], 0.0)
+
+    def test_sprint_dobrada_multiplica_tudo(self):
+        simples = avaliar_apostas(_matriz(), [(["A", "B"], [3, 2], "C")])
+        dobrada = avaliar_apostas(_matriz(2.0), [(["A", "B"], [3, 2], "C")])
+        self.assertAlmostEqual(dobrada.loc[0, "pontos_esperados"], 2 * simples.loc[0, "pontos_esperados"])
+        self.assertAlmostEqual(dobrada.loc[0, "desvio_padrao"], 2 * simples.loc[0, "desvio_padrao"])
+
+    def test_mil_apostas_de_uma_vez(self):
+        nomes = [f"Piloto {i}" for i in range(20)]
+        matriz = matriz_prova(nomes, {"pontos_11_colocado": 25}, "Normal", _contexto(nomes))
+        rng = np.random.default_rng(0)
+        apostas = [
+            ([nomes[i] for i in rng.choice(20, 3, replace=False)], [8, 4, 3], nomes[int(rng.integers(20))])
+            for _ in range(1000)
+        ]
+        inicio = time.perf_counter()
+        avaliacao = avaliar_apostas(matriz, apostas)
+        self.assertLess(time.perf_counter() - inicio, 1.0)
+        self.assertEqual(len(avaliacao), 1000)
+        self.assertTrue((avaliacao["variancia"] >= 0).all())
+
+
+class MatrizProvaTests(unittest.TestCase):
+    def setUp(self):
+        clear_all_caches()
+
+    def test_matriz_em_cache_por_prova(self):
+        nomes = ["Max", "Lando", "Oscar"]
+        regras = {"pontos_11_colocado": 25}
+        with patch.object(expected_points, "parametros_piloto", wraps=expected_points.parametros_piloto) as modelo:
+            a = matriz_prova(nomes, regras, "Normal", _contexto(nomes))
+            b = matriz_prova(nomes, dict(regras), "normal", _contexto(nomes))
+            self.assertIs(a, b)
+            self.assertEqual(modelo.call_count, 3)
+            matriz_prova(nomes, regras, "Sprint", _contexto(nomes))
+            self.assertEqual(modelo.call_count, 6)
+        np.testing.assert_allclose(a.probs.sum(axis=1), 1.0)
+
+    def test_avaliar_apostas_da_prova_inclui_pilotos_so_das_apostas(self):
+        pilotos_df = pd.DataFrame([{"nome": "Max"}, {"nome": "Lando"}])
+        apostas_df = pd.DataFrame(
+            [
+                {"usuario_id": 1, "pilotos": "Max,Lando", "fichas": "10,5", "piloto_11": "Yuki"},
+                {"usuario_id": 2, "pilotos": "Lando, Max", "fichas": "8,x", "piloto_11": ""},
+            ],
+            index=[7, 9],
+        )
+        avaliacao = avaliar_apostas_da_prova(apostas_df, pilotos_df, {}, "Normal", _contexto(["Max", "Lando"]))
+        self.assertEqual(avaliacao["usuario_id"].tolist(), [1, 2])
+        self.assertGreater(avaliacao.loc[0, "chance_11"], 0.0)
+        self.assertEqual(avaliacao.loc[1, "chance_11"], 0.0)
+        self.assertTrue(avaliacao["pontos_esperados"].notna().all())
+
+
+if __name__ == "__main__":
+    unittest.main()
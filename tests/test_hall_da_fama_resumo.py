@@ -0,0 +1,79 @@
+import unittest
+from unittest.mock import patch
+
+import pandas as pd
+
+from tests._db_driver_stub import install_if_needed
+
+install_if_needed()
+
+from db.repo_hall import reconstruir_hall_da_fama_resumo
+
+
+class _Cursor:
+    def __init__(self, counts):
+        self.counts = list(counts)
+        self.queries = []
+        self.rowcount = 0
+
+    def execute(self, query, params=()):
+        self.queries.append((query, params))
+        if query.lstrip().startswith("WITH"):
+            self.rowcount = 3
+
+    def fetchone(self):
+        return {"cnt": self.counts.pop(0)}
+
+
+class _Connection:
+    def __init__(self, cursor):
+        self.value = cursor
+
+    def cursor(self):
+        return self.value
+
+
+class HallDaFamaResumoTests(unittest.TestCase):
+    def test_reconstrucao_usa_hall_da_fama_e_ordena_no_banco(self):
+        cursor = _Cursor([5])
+        with patch("db.repo_hall.table_exists", return_value=True):
+            total = reconstruir_hall_da_fama_resumo(_Connection(cursor))
+
+        self.assertEqual(total, 3)
+        self.assertEqual(cursor.queries[1][0], "DELETE FROM hall_da_fama_resumo")
+        insert_sql, params = cursor.queries[2]
+        self.assertIn("FROM hall_da_fama", insert_sql)
+        self.assertIn("ORDER BY participacoes DESC, melhor_posicao ASC NULLS LAST", insert_sql)
+        self.assertEqual(params, ("hall_da_fama",))
+
+    def test_sem_tabela_de_resumo_nao_altera_nada(self):
+        cursor = _Cursor([])
+        with patch("db.repo_hall.table_exists", return_value=False):
+            self.assertEqual(reconstruir_hall_da_fama_resumo(_Connection(cursor)), 0)
+        self.assertEqual(cursor.queries, [])
+
+    def test_tabela_historica_respeita_ordem_do_resumo(self):
+        from ui.hall_da_fama import _montar_tabela_historica
+
+        resumo = pd.DataFrame(
+            [
+                {"usuario_id": 2, "temporadas": {"2025": "1º (300 pts)", "2024": "2º (250 pts)"}},
+                {"usuario_id": 1, "temporadas": {"2024": "1º (280.5 pts)"}},
+                # Removido do cadastro (ou virou master) depois da reconstrução.
+                {"usuario_id": 9, "temporadas": {"2024": "3º (100 pts)"}},
+            ]
+        )
+        # Bia foi renomeada depois da última reconstrução do resumo.
+        usuarios = pd.DataFrame([{"id": 1, "nome": "Ana"}, {"id": 2, "nome": "Beatriz"}, {"id": 3, "nome": "Caio"}])
+
+        tabela = _montar_tabela_historica(resumo, usuarios, ["2025", "2024"])
+
+        self.assertEqual(tabela.columns.tolist(), ["Participante", "2025", "2024"])
+        self.assertEqual(tabela["Participante"].tolist(), ["Beatriz", "Ana", "Caio"])
+        self.assertEqual(tabela.loc[1, "2025"], "-")
+        self.assertEqual(tabela.loc[1, "2024"], "1º (280.5 pts)")
+        self.assertEqual(tabela.loc[2].tolist(), ["Caio", "-", "-"])
+
+
+if __name__ == "__main__":
+    unittest.main()
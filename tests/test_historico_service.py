@@ -0,0 +1,56 @@
+import unittest
+from unittest.mock import patch
+
+import pandas as pd
+
+from tests._db_driver_stub import install_if_needed
+
+install_if_needed()
+
+from services.historico_service import calcular_dados_grafico, calcular_resumo_historico
+
+
+def _carreira():
+    return pd.DataFrame(
+        [
+            {"usuario_id": 7, "temporada": "2025", "posicao_final": 1, "pontos_total": 410.0,
+             "acertos_11": 3, "total_apostas": 24, "fichas_por_piloto": {"Max": 40, "Lando": 20}},
+            {"usuario_id": 7, "temporada": "2024", "posicao_final": 4, "pontos_total": 455.5,
+             "acertos_11": 1, "total_apostas": 22, "fichas_por_piloto": {"Max": 10, "Charles": 30}},
+            {"usuario_id": 7, "temporada": "2026", "posicao_final": None, "pontos_total": None,
+             "acertos_11": 0, "total_apostas": 2, "fichas_por_piloto": {}},
+            {"usuario_id": 7, "temporada": "2023", "posicao_final": 9, "pontos_total": 100.0,
+             "acertos_11": 5, "total_apostas": 0, "fichas_por_piloto": {}},
+        ]
+    )
+
+
+class HistoricoServiceTests(unittest.TestCase):
+    def test_resumo_usa_linhas_da_carreira_por_temporada(self):
+        with patch("services.historico_service.get_carreira_usuario_df", return_value=_carreira()):
+            resumo = calcular_resumo_historico(7)
+
+        self.assertEqual(resumo.temporadas_com_dados, ["2024", "2025", "2026"])
+        self.assertEqual((resumo.melhor_colocacao, resumo.melhor_colocacao_ano), (1, "2025"))
+        self.assertEqual((resumo.melhor_pontuacao, resumo.melhor_pontuacao_ano), (455.5, "2024"))
+        self.assertEqual(resumo.media_posicoes, 2.5)
+        self.assertEqual(resumo.media_pontuacoes, 432.75)
+        self.assertEqual(resumo.total_acertos_11, 4)
+
+    def test_grafico_soma_fichas_por_piloto_entre_temporadas(self):
+        with patch("services.historico_service.get_carreira_usuario_df", return_value=_carreira()):
+            dados = calcular_dados_grafico(7)
+
+        self.assertEqual(list(dados.fichas_por_temporada_piloto), ["2024", "2025", "2026"])
+        self.assertEqual(dados.fichas_por_temporada_piloto["2026"], {})
+        self.assertEqual(dados.piloto_mais_apostado, "Max")
+        self.assertEqual(dados.total_fichas_piloto_mais_apostado, 50)
+
+    def test_sem_carreira_retorna_vazio(self):
+        with patch("services.historico_service.get_carreira_usuario_df", return_value=pd.DataFrame()):
+            self.assertEqual(calcular_resumo_historico(7).temporadas_com_dados, [])
+            self.assertIsNone(calcular_dados_grafico(7).piloto_mais_apostado)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,177 @@
+import ast
+import types
+import unittest
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import pandas as pd
+
+from tests._db_driver_stub import install_if_needed
+
+install_if_needed()
+
+from services import image_render_service
+from services.image_render_service import (
+    agendar_imagem_classificacao,
+    imagem_classificacao,
+    imagem_classificacao_pronta,
+    limpar_imagens,
+)
+from services.standings_service import classificacao_exibicao, colunas_classificacao, tabela_exibicao
+
+COLUNAS = ["Posição", "Participante", "Total Válido"]
+
+
+class ImageRenderServiceTests(unittest.TestCase):
+    def setUp(self):
+        limpar_imagens()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(self.executor.shutdown)
+        patcher = patch.object(image_render_service, "_get_executor", return_value=self.executor)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(limpar_imagens)
+        self.tabela = pd.DataFrame(
+            [{"Posição": 1, "Participante": "Ana", "Total Válido": "10,00"},
+             {"Posição": 2, "Participante": "Bia", "Total Válido": "5,00"}]
+        )
+
+    def test_mesma_versao_renderiza_uma_vez_e_serve_bytes_prontos(self):
+        with patch.object(image_render_service, "_renderizar_tabela_png", return_value=b"png") as render:
+            self.assertIsNone(imagem_classificacao_pronta("2026", self.tabela, COLUNAS))
+            agendar_imagem_classificacao("2026", self.tabela, COLUNAS).result()
+
+            self.assertEqual(imagem_classificacao_pronta("2026", self.tabela, COLUNAS), b"png")
+            self.assertEqual(imagem_classificacao("2026", self.tabela, COLUNAS), b"png")
+            self.assertEqual(render.call_count, 1)
+
+            alterada = self.tabela.assign(**{"Total Válido": ["12,00", "5,00"]})
+            self.assertIsNone(imagem_classificacao_pronta("2026", alterada, COLUNAS))
+            imagem_classificacao("2026", alterada, COLUNAS)
+            self.assertEqual(render.call_count, 2)
+
+    def test_falha_de_renderizacao_nao_fica_em_cache(self):
+        with patch.object(image_render_service, "_renderizar_tabela_png", side_effect=[RuntimeError("x"), b"png"]):
+            with self.assertRaises(RuntimeError):
+                imagem_classificacao("2026", self.tabela, COLUNAS)
+            self.assertEqual(imagem_classificacao("2026", self.tabela, COLUNAS), b"png")
+
+    def test_tabela_do_job_coincide_com_a_da_tela(self):
+        classificacao = pd.DataFrame(
+            [
+                {"ordem_prova": 2, "usuario_id": 1, "posicao": 1, "posicao_anterior": 2.0,
+                 "pontos_acumulados": 300.0, "descarte": 0.0, "bonus_campeao": 0.0, "bonus_vice": 0.0,
+                 "bonus_equipe": 0.0, "total_valido": 300.0},
+                {"ordem_prova": 2, "usuario_id": 2, "posicao": 2, "posicao_anterior": None,
+                 "pontos_acumulados": 1250.5, "descarte": 0.0, "bonus_campeao": 0.0, "bonus_vice": 0.0,
+                 "bonus_equipe": 0.0, "total_valido": 120.5},
+            ]
+        )
+        participantes = pd.DataFrame([{"id": 1, "nome": "Ana"}, {"id": 2, "nome": "Bia"}])
+
+        tabela = tabela_exibicao(classificacao_exibicao(classificacao, participantes))
+        colunas = colunas_classificacao(False)
+
+        self.assertEqual(tabela["Diferença"].tolist(), ["-", "179,50"])
+        self.assertEqual(tabela["Total Geral"].tolist(), ["300,00", "1.250,50"])
+        self.assertEqual(tabela["Movimentação"].tolist(), ["Subiu 1", "Novo"])
+        with patch.object(image_render_service, "_renderizar_tabela_png", return_value=b"png"):
+            agendar_imagem_classificacao("2026", tabela, colunas).result()
+        self.assertEqual(imagem_classificacao_pronta("2026", tabela.copy(), colunas), b"png")
+
+    def test_worker_externo_nao_pre_renderiza(self):
+        from services.standings_service import _pre_renderizar_imagem
+
+        classificacao = pd.DataFrame(
+            [{"ordem_prova": 1, "usuario_id": 1, "posicao": 1, "posicao_anterior": None,
+              "pontos_acumulados": 10.0, "descarte": 0.0, "bonus_campeao": 0.0, "bonus_vice": 0.0,
+              "bonus_equipe": 0.0, "total_valido": 10.0}]
+        )
+        participantes = pd.DataFrame([{"id": 1, "nome": "Ana"}])
+        with patch.object(image_render_service, "_pre_renderizacao", False), \
+                patch.object(image_render_service, "_agendar") as agendar:
+            _pre_renderizar_imagem("2026", classificacao, participantes, False)
+        agendar.assert_not_called()
+
+
+class PoolQuebradoTests(unittest.TestCase):
+    def setUp(self):
+        limpar_imagens()
+        self.addCleanup(limpar_imagens)
+
+    def test_pool_quebrado_e_encerrado_antes_de_ser_trocado(self):
+        quebrado = Mock()
+        quebrado.submit.side_effect = BrokenProcessPool("worker morreu")
+        novo = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(novo.shutdown)
+        with patch.object(image_render_service, "_executor", quebrado), \
+                patch.object(image_render_service, "ProcessPoolExecutor", return_value=novo), \
+                patch.object(image_render_service, "_renderizar_tabela_png", return_value=b"png"):
+            future = agendar_imagem_classificacao("2026", pd.DataFrame([{"Posição": 1}]), ["Posição"])
+            self.assertEqual(future.result(timeout=5), b"png")
+            self.assertIs(image_render_service._executor, novo)
+        quebrado.shutdown.assert_called_once_with(wait=False, cancel_futures=True)
+
+
+def _carregar_imagem_sob_demanda(st):
+    source = (Path(__file__).resolve().parents[1] / "ui" / "classificacao.py").read_text(encoding="utf-8")
+    funcoes = [
+        node for node in ast.parse(source).body
+        if isinstance(node, ast.FunctionDef) and node.name == "_imagem_sob_demanda"
+    ]
+    namespace = {"st": st, "_IMAGEM_INTERVALO_SEGUNDOS": 2}
+    exec(compile(ast.Module(body=funcoes, type_ignores=[]), "ui/classificacao.py", "exec"), namespace)
+    return namespace["_imagem_sob_demanda"]
+
+
+class ImagemSobDemandaTests(unittest.TestCase):
+    def setUp(self):
+        self.st = types.SimpleNamespace(
+            session_state={},
+            button=Mock(return_value=True),
+            fragment=lambda **kwargs: (lambda funcao: funcao),
+            info=Mock(),
+            error=Mock(),
+            rerun=Mock(),
+        )
+        self.imagem_sob_demanda = _carregar_imagem_sob_demanda(self.st)
+
+    def _pedir(self, agendar, marcador="2026"):
+        return self.imagem_sob_demanda("pedido", marcador, agendar, "Preparar", "preparar")
+
+    def test_clique_agenda_sem_esperar_a_renderizacao(self):
+        future = Future()
+        agendar = Mock(return_value=future)
+
+        self.assertIsNone(self._pedir(agendar))
+        self.st.info.assert_called_once()
+
+        # Reexecuções enquanto renderiza não agendam de novo nem bloqueiam.
+        self.st.button.return_value = False
+        self.assertIsNone(self._pedir(agendar))
+        future.set_result(b"png")
+        self.assertEqual(self._pedir(agendar), b"png")
+        agendar.assert_called_once()
+
+    def test_falha_da_renderizacao_vira_mensagem_e_libera_novo_pedido(self):
+        future = Future()
+        future.set_exception(TimeoutError())
+
+        self.assertIsNone(self._pedir(Mock(return_value=future)))
+        self.st.error.assert_called_once()
+        self.assertNotIn("pedido", self.st.session_state)
+
+    def test_conteudo_diferente_descarta_pedido_antigo(self):
+        antigo = Future()
+        antigo.set_result(b"antigo")
+        self._pedir(Mock(return_value=antigo), marcador="prova A")
+
+        self.st.button.return_value = False
+        self.assertIsNone(self._pedir(Mock(), marcador="prova B"))
+        self.assertNotIn("pedido", self.st.session_state)
+
+
+if __name__ == "__main__":
+    unittest.main()
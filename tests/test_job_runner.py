@@ -0,0 +1,215 @@
+import sys
+import types
+import unittest
+from contextlib import contextmanager
+from unittest.mock import patch
+
+from tests._db_driver_stub import install_if_needed
+
+install_if_needed()
+
+from db import repo_jobs
+from services import access_control, job_runner
+from services.access_control import job_identity, resolve_authenticated_context
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self._ultimo = None
+
+    def execute(self, query, params=None):
+        sql = " ".join(query.split())
+        self.conn.sql.append((sql, params))
+        self._ultimo = sql
+
+    def fetchone(self):
+        if "pg_try_advisory_lock" in self._ultimo:
+            return {"ok": self.conn.locks.pop(0)}
+        if self._ultimo.startswith("SELECT id FROM jobs"):
+            # Só devolve o job existente se a busca aceita o status dele.
+            casa = f"'{self.conn.status_existente}'" in self._ultimo
+            return {"id": self.conn.existente} if self.conn.existente and casa else None
+        if self._ultimo.startswith("INSERT INTO jobs"):
+            return {"id": 99}
+        return None
+
+    def fetchall(self):
+        return self.conn.candidatos
+
+    def close(self):
+        pass
+
+
+class _Connection:
+    def __init__(self, *, existente=None, status_existente="pendente", candidatos=(), locks=()):
+        self.existente = existente
+        self.status_existente = status_existente
+        self.candidatos = list(candidatos)
+        self.locks = list(locks)
+        self.sql = []
+        self.commits = 0
+
+    def cursor(self):
+        return _Cursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+
+def _job(job_id, temporada, status="pendente", tentativas=0):
+    return {
+        "id": job_id, "tipo": "reclassificar", "chave": f"reclassificar:{temporada}",
+        "temporada": temporada, "parametros": {}, "status": status, "tentativas": tentativas,
+        "solicitado_por": 1,
+    }
+
+
+class RepoJobsTests(unittest.TestCase):
+    def _connect(self, conn):
+        @contextmanager
+        def fake_connect(*args, **kwargs):
+            yield conn
+
+        return patch.object(repo_jobs, "db_connect", fake_connect)
+
+    def test_pedido_repetido_reaproveita_job_ativo(self):
+        conn = _Connection(existente=5)
+        with self._connect(conn):
+            self.assertEqual(repo_jobs.enfileirar_job("reclassificar", "reclassificar:2026", "2026", {}, 1), (5, False))
+
+        self.assertIn("pg_advisory_xact_lock", conn.sql[0][0])
+        self.assertEqual(conn.sql[0][1], ("bf1_job_fila:reclassificar:2026",))
+        self.assertFalse(any(sql.startswith("INSERT") for sql, _ in conn.sql))
+
+    def test_job_em_execucao_nao_absorve_novo_pedido(self):
+        # Mesma chave executando (ex.: já enviando e-mails): o resultado
+        # corrigido precisa de um recálculo novo.
+        conn = _Connection(existente=5, status_existente="executando")
+        with self._connect(conn):
+            self.assertEqual(repo_jobs.enfileirar_job("publicar_resultado", "publicar_resultado:2026:3", "2026", {}, 1), (99, True))
+        self.assertTrue(any(sql.startswith("INSERT INTO jobs") for sql, _ in conn.sql))
+
+    def test_enfileira_quando_nao_ha_job_ativo(self):
+        conn = _Connection()
+        with self._connect(conn):
+            self.assertEqual(repo_jobs.enfileirar_job("reclassificar", "reclassificar:2026", "2026", {}, 1), (99, True))
+        self.assertEqual(conn.commits, 1)
+
+    def test_reserva_pula_temporada_travada_por_outro_worker(self):
+        conn = _Connection(candidatos=[_job(1, "2025"), _job(2, "2026")], locks=[False, True])
+
+        job = repo_jobs.reservar_job(conn, max_tentativas=3)
+
+        self.assertEqual(job["id"], 2)
+        locks = [p for sql, p in conn.sql if "pg_try_advisory_lock" in sql]
+        self.assertEqual(locks, [("bf1_job_temporada:2025",), ("bf1_job_temporada:2026",)])
+        updates = [p for sql, p in conn.sql if sql.startswith("UPDATE jobs SET status = 'executando'")]
+        self.assertEqual(updates, [(2,)])
+
+    def test_job_orfao_sem_tentativas_restantes_falha(self):
+        conn = _Connection(candidatos=[_job(1, "2026", status="executando", tentativas=3)], locks=[True])
+
+        self.assertIsNone(repo_jobs.reservar_job(conn, max_tentativas=3))
+
+        self.assertTrue(any(sql.startswith("UPDATE jobs SET status = 'falhou'") for sql, _ in conn.sql))
+        self.assertTrue(any("pg_advisory_unlock" in sql for sql, _ in conn.sql))
+
+
+class JobRunnerTests(unittest.TestCase):
+    def test_executa_em_nome_de_quem_pediu_e_libera_a_temporada(self):
+        fila = [_job(1, "2026"), None]
+        vistos = []
+
+        @contextmanager
+        def fake_connection(*args, **kwargs):
+            yield "conn-worker"
+
+        def handler(job, progresso):
+            vistos.append(access_control._job_user.get())
+            progresso(0.5, "meio")
+            return {"ok": True}
+
+        pool = types.SimpleNamespace(get_connection=fake_connection)
+        with patch.object(job_runner, "get_pool", return_value=pool), \
+                patch.object(job_runner, "reservar_job", side_effect=lambda *a: fila.pop(0)), \
+                patch.object(job_runner, "liberar_temporada") as liberar, \
+                patch.object(job_runner, "finalizar_job") as finalizar, \
+                patch.object(job_runner, "atualizar_progresso") as progresso, \
+                patch.dict(job_runner._HANDLERS, {"reclassificar": handler}):
+            self.assertEqual(job_runner.executar_pendentes(), 1)
+
+        self.assertEqual(vistos, [1])
+        progresso.assert_called_once_with(1, 0.5, "meio")
+        finalizar.assert_called_once_with(1, resultado={"ok": True})
+        liberar.assert_called_once_with("conn-worker", "2026")
+
+    def test_falha_do_handler_fica_registrada_no_job(self):
+        fila = [_job(1, "2026"), None]
+
+        @contextmanager
+        def fake_connection(*args, **kwargs):
+            yield "conn-worker"
+
+        def handler(job, progresso):
+            raise ValueError("sem resultados")
+
+        pool = types.SimpleNamespace(get_connection=fake_connection)
+        with patch.object(job_runner, "get_pool", return_value=pool), \
+                patch.object(job_runner, "reservar_job", side_effect=lambda *a: fila.pop(0)), \
+                patch.object(job_runner, "liberar_temporada") as liberar, \
+                patch.object(job_runner, "finalizar_job") as finalizar, \
+                patch.dict(job_runner._HANDLERS, {"reclassificar": handler}):
+            job_runner.executar_pendentes()
+
+        finalizar.assert_called_once_with(1, erro="sem resultados")
+        liberar.assert_called_once()
+
+    def test_publicacao_retomada_nao_reenvia_emails(self):
+        from services import bets_scoring, result_notification_service
+
+        job = {
+            **_job(7, "2026", status="executando", tentativas=1),
+            "tipo": "publicar_resultado",
+            "parametros": {"prova_id": 3},
+            "resultado": {"notificados": [10]},
+        }
+        participantes = [{"id": 10, "email": "a@x"}, {"id": 20, "email": "b@x"}]
+        chamadas = []
+
+        def enviar(prova_id, temporada, *, ja_notificados, ao_notificar):
+            stats = result_notification_service.ResultadoEmailStats()
+            for p in participantes:
+                if p["id"] in ja_notificados:
+                    stats.ja_notificados += 1
+                    continue
+                chamadas.append(p["id"])
+                stats.enviados += 1
+                ao_notificar(p["id"])
+            return stats
+
+        with patch.object(bets_scoring, "atualizar_classificacoes_todas_as_provas"), \
+                patch.object(result_notification_service, "enviar_emails_resultado_prova", enviar), \
+                patch.object(job_runner, "registrar_resultado_parcial") as parcial:
+            resultado = job_runner._publicar_resultado(job, lambda *a: None)
+
+        self.assertEqual(chamadas, [20])
+        parcial.assert_called_once_with(7, {"notificados": [10, 20]})
+        self.assertEqual((resultado["enviados"], resultado["ja_notificados"]), (2, 1))
+
+    def test_identidade_do_job_dispensa_token_mas_revalida_usuario(self):
+        fake_repo = types.SimpleNamespace(
+            get_user_by_id=lambda user_id: {"id": user_id, "nome": "Admin", "perfil": "admin", "status": "ativo"},
+            get_usuario_temporadas_ativas=lambda user_id: [],
+        )
+        fake_auth = types.SimpleNamespace(decode_token=lambda token: self.fail("token não deveria ser lido"))
+        with patch("app_runtime.get_session", return_value={}), patch.dict(
+            sys.modules, {"db.repo_users": fake_repo, "services.auth_service": fake_auth}
+        ):
+            with job_identity(4):
+                context = resolve_authenticated_context()
+        self.assertEqual((context.user_id, context.perfil), (4, "admin"))
+
+
+if __name__ == "__main__":
+    unittest.main()
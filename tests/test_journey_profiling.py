@@ -0,0 +1,62 @@
+import json
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from tests._db_driver_stub import install_if_needed
+
+install_if_needed()
+
+from utils import performance, profiling
+
+
+def _trabalho_lento(segundos):
+    fim = time.perf_counter() + segundos
+    while time.perf_counter() < fim:
+        sum(range(200))
+
+
+class JourneyProfilingTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _config(self, limite_ms, taxa=0.0):
+        return patch.multiple(
+            profiling,
+            PROFILE_THRESHOLD_MS=limite_ms,
+            PROFILE_SAMPLE_RATE=taxa,
+            PROFILE_INTERVAL_MS=1.0,
+            PROFILE_DIR=Path(self.tmp.name),
+        )
+
+    def test_jornada_lenta_grava_pilhas_colapsadas_ligadas_ao_evento(self):
+        with self._config(limite_ms=20), self.assertLogs("bf1.performance", level="INFO") as logs:
+            with performance.journey("classificacao"):
+                _trabalho_lento(0.15)
+
+        evento = next(json.loads(l.split(":", 2)[2]) for l in logs.output if "journey_performance" in l)
+        perfil = Path(evento["profile"])
+        self.assertEqual(perfil.parent, Path(self.tmp.name))
+        conteudo = perfil.read_text(encoding="utf-8")
+        self.assertIn("test_journey_profiling:_trabalho_lento", conteudo)
+        pilha, contagem = conteudo.splitlines()[0].rsplit(" ", 1)
+        self.assertGreater(int(contagem), 0)
+
+    def test_jornada_rapida_nao_grava_perfil(self):
+        with self._config(limite_ms=10_000), self.assertLogs("bf1.performance", level="INFO") as logs:
+            with performance.journey("painel"):
+                _trabalho_lento(0.02)
+
+        self.assertNotIn('"profile"', "".join(logs.output))
+        self.assertEqual(list(Path(self.tmp.name).iterdir()), [])
+
+    def test_desativado_por_padrao(self):
+        with patch.multiple(profiling, PROFILE_THRESHOLD_MS=0, PROFILE_SAMPLE_RATE=0):
+            self.assertIsNone(profiling.start_profile("x"))
+
+
+if __name__ == "__main__":
+    unittest.main()
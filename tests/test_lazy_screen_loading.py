@@ -34,7 +34,8 @@ class LazyScreenLoadingTests(unittest.TestCase):
         self.assertNotIn("abas = st.tabs(nomes_abas)", source)
 
     def test_matplotlib_e_carregado_somente_na_geracao_de_imagem(self):
-        source = (ROOT / "ui" / "classificacao.py").read_text(encoding="utf-8")
+        self.assertNotIn("matplotlib", (ROOT / "ui" / "classificacao.py").read_text(encoding="utf-8"))
+        source = (ROOT / "services" / "image_render_service.py").read_text(encoding="utf-8")
         tree = ast.parse(source)
         top_level_modules = {
             node.module
@@ -1,7 +1,13 @@
 import unittest
+from datetime import date, datetime
 from unittest.mock import patch
 
-from utils.pagination import paginate
+from tests._db_driver_stub import install_if_needed
+
+install_if_needed()
+
+from utils.pagination import decode_cursor, encode_cursor, paginate
+from utils.ttl_cache import clear_all_caches
 
 
 class _Cursor:
@@ -36,6 +42,9 @@ class _Connection:
 
 
 class PaginationIntegrationTests(unittest.TestCase):
+    def setUp(self):
+        clear_all_caches("log_apostas", "access_logs")
+
     def test_page_is_clamped_after_last_item_is_removed(self):
         page = paginate(page=9, page_size=50, total_items=51)
         self.assertEqual(page.page, 2)
@@ -46,37 +55,53 @@ class PaginationIntegrationTests(unittest.TestCase):
         from ui import log_acessos
 
         cursor = _Cursor([
+            [{"id": 9, "created_at": datetime(2026, 1, 20, 10), "evento": "login", "sucesso": True},
+             {"id": 8, "created_at": datetime(2026, 1, 20, 9), "evento": "login", "sucesso": True}],
             {"total": 101, "successes": 80, "failures": 21},
-            [{"id": 1, "created_at": None, "evento": "login", "sucesso": True}],
         ])
+        pagina = encode_cursor(datetime(2026, 1, 21, 8, 30), 12)
         with patch.object(log_acessos, "db_connect", return_value=_Connection(cursor)):
             result = log_acessos._load_access_logs(
-                __import__("datetime").date(2026, 1, 1),
-                __import__("datetime").date(2026, 1, 31),
+                date(2026, 1, 1), date(2026, 1, 31),
                 "admin", "login", "Sucesso", "10.", "ana",
-                limit=50, offset=50,
+                limit=1, cursor=pagina,
             )
 
         self.assertEqual(result.total, 101)
         self.assertEqual(result.successes, 80)
         self.assertEqual(len(result.rows), 1)
-        self.assertIn("COUNT(*) FILTER", cursor.executions[0][0])
-        self.assertEqual(cursor.executions[1][1][-2:], (50, 50))
-        self.assertEqual(cursor.executions[0][1], cursor.executions[1][1][:-2])
+        page_sql, page_params = cursor.executions[0]
+        count_sql, count_params = cursor.executions[1]
+        self.assertIn("(created_at, id) < (%s, %s)", page_sql)
+        self.assertNotIn("OFFSET", page_sql)
+        self.assertEqual(page_params[-3:], (datetime(2026, 1, 21, 8, 30), 12, 2))
+        self.assertIn("COUNT(*) FILTER", count_sql)
+        self.assertEqual(count_params, page_params[:-3])
+        self.assertEqual(decode_cursor(result.next_cursor), ["2026-01-20T10:00:00", 9])
+
+    def test_access_log_totals_are_cached_per_filter_signature(self):
+        from ui import log_acessos
+
+        cursor = _Cursor([[], {"total": 3, "successes": 3, "failures": 0}, []])
+        with patch.object(log_acessos, "db_connect", return_value=_Connection(cursor)):
+            args = (date(2026, 2, 1), date(2026, 2, 2), "Todos", "Todos", "Todos", "", "")
+            log_acessos._load_access_logs(*args)
+            result = log_acessos._load_access_logs(*args, cursor=encode_cursor(datetime(2026, 2, 1, 12), 4))
+
+        self.assertEqual(result.total, 3)
+        self.assertEqual(sum("COUNT(*)" in sql for sql, _ in cursor.executions), 1)
 
     def test_betting_filters_are_applied_before_limit(self):
         from ui import log_apostas
 
-        cursor = _Cursor([
-            {"total": 1},
-            [{
-                "id": 7, "usuario_id": 4, "data": "2026-07-01",
-                "horario": None, "apostador": "Ana", "nome_prova": "Áustria",
-                "pilotos": "", "aposta": "", "piloto_11": "",
-                "tipo_aposta": 1, "automatica": 1, "ip_address": None,
-                "temporada": "2026", "status": "Registrada",
-            }],
-        ])
+        linha = {
+            "id": 7, "usuario_id": 4, "data": "2026-07-01",
+            "horario": None, "apostador": "Ana", "nome_prova": "Áustria",
+            "pilotos": "", "aposta": "", "piloto_11": "",
+            "tipo_aposta": 1, "automatica": 1, "ip_address": None,
+            "temporada": "2026", "status": "Registrada",
+        }
+        cursor = _Cursor([[linha], {"total": 1}])
         with (
             patch.object(log_apostas, "db_connect", return_value=_Connection(cursor)),
             patch.object(
@@ -91,15 +116,39 @@ class PaginationIntegrationTests(unittest.TestCase):
             result = log_apostas.carregar_logs(
                 "2026", usuario_id=4, is_admin=True, apostador="ana",
                 tipo_aposta=1, data="2026-07-01", status="Registrada",
-                apenas_automaticas=True, limit=25, offset=25,
+                apenas_automaticas=True, limit=25, cursor=encode_cursor(30),
             )
 
-        count_sql, count_params = cursor.executions[0]
+        page_sql, page_params = cursor.executions[0]
+        count_sql, count_params = cursor.executions[1]
         self.assertEqual(result.total, 1)
-        self.assertIn("LOWER(COALESCE(apostador, '')) LIKE %s", count_sql)
-        self.assertIn("COALESCE(automatica, 0) > 0", count_sql)
-        self.assertEqual(count_params, cursor.executions[1][1][:-2])
-        self.assertEqual(cursor.executions[1][1][-2:], (25, 25))
+        self.assertIsNone(result.next_cursor)
+        self.assertIn("apostador ILIKE %s", count_sql)
+        self.assertIn("automatica > 0", count_sql)
+        self.assertIn("id < %s ORDER BY id DESC LIMIT %s", page_sql)
+        self.assertEqual(count_params, page_params[:-2])
+        self.assertEqual(page_params[-2:], (30, 26))
+
+
+    def test_betting_filters_use_generated_columns_when_available(self):
+        from ui import log_apostas
+
+        cursor = _Cursor([[], {"total": 0}])
+        with (
+            patch.object(log_apostas, "db_connect", return_value=_Connection(cursor)),
+            patch.object(
+                log_apostas,
+                "get_table_columns",
+                return_value={"usuario_id", "temporada", "data", "data_criacao", "temporada_ref", "data_ref"},
+            ),
+        ):
+            log_apostas.carregar_logs("2026", is_admin=True, apostador="50%_a", data="2026-07-01")
+
+        page_sql, page_params = cursor.executions[0]
+        self.assertIn("temporada_ref = %s", page_sql)
+        self.assertIn("data_ref = %s", page_sql)
+        self.assertNotIn("SUBSTR", page_sql)
+        self.assertEqual(page_params[:3], ("2026", "%50\\%\\_a%", "2026-07-01"))
 
 
 if __name__ == "__main__":
@@ -7,8 +7,8 @@ from tests._db_driver_stub import install_if_needed
 install_if_needed()
 
 from db import db_schema
-from db.repo_bets import get_participantes_temporada_df
-from utils.ttl_cache import clear_all_caches, ttl_cache
+from db.repo_bets import get_distribuicao_pilotos_df, get_participantes_temporada_df
+from utils.ttl_cache import cache_stats, clear_all_caches, ttl_cache
 
 
 class _Cursor:
@@ -19,6 +19,8 @@ class _Cursor:
 
     def execute(self, query, params=()):
         self.execute_count += 1
+        self.last_query = query
+        self.last_params = params
 
     def fetchall(self):
         return self.rows
@@ -72,6 +74,171 @@ class PerformanceOptimizationTests(unittest.TestCase):
         clear_all_caches("apostas")
         self.assertEqual((apostas(), provas()), (2, 1))
 
+    def test_cache_limitado_descarta_entrada_menos_recente(self):
+        calls = []
+
+        @ttl_cache(ttl=60, maxsize=2, name="teste.lru")
+        def por_usuario(usuario_id):
+            calls.append(usuario_id)
+            return usuario_id
+
+        por_usuario(1)
+        por_usuario(2)
+        por_usuario(1)
+        por_usuario(3)
+        por_usuario(1)
+        por_usuario(2)
+
+        self.assertEqual(calls, [1, 2, 3, 2])
+        stats = cache_stats()["teste.lru"]
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 4))
+        self.assertEqual(stats["entries"], 2)
+        self.assertEqual(stats["evictions"], 2)
+        self.assertNotIn("bytes", stats)
+
+    def test_estatisticas_de_cache_saem_periodicamente(self):
+        from utils import performance
+
+        with (
+            patch.object(performance, "CACHE_STATS_INTERVAL", 0.0),
+            patch.object(performance, "log_cache_stats") as log,
+        ):
+            performance.record_cache(hit=True)
+        log.assert_called_once_with()
+        with (
+            patch.object(performance, "CACHE_STATS_INTERVAL", 3600.0),
+            patch.object(performance, "log_cache_stats") as log,
+        ):
+            performance.record_cache(hit=False)
+        log.assert_not_called()
+
+    def test_orcamento_de_bytes_usa_memoria_do_dataframe(self):
+        import pandas as pd
+
+        @ttl_cache(ttl=60, max_bytes=1, name="teste.bytes")
+        def frame(n):
+            return pd.DataFrame({"valor": range(n)})
+
+        frame(10)
+        frame(20)
+
+        stats = frame.stats()
+        self.assertEqual(stats.entries, 1)
+        self.assertEqual(stats.evictions, 1)
+        self.assertEqual(stats.bytes, int(frame(20).memory_usage(deep=True).sum()))
+
+    def test_entradas_expiradas_sao_purgadas_periodicamente(self):
+        clock = [100.0]
+
+        @ttl_cache(ttl=5, name="teste.purga")
+        def valor(chave):
+            return chave
+
+        with patch("utils.ttl_cache.time.monotonic", side_effect=lambda: clock[0]):
+            valor("a")
+            valor("b")
+            clock[0] += 10
+            valor("c")
+
+        stats = valor.stats()
+        self.assertEqual(stats.entries, 1)
+        self.assertEqual(stats.expirations, 2)
+
+    def test_misses_concorrentes_executam_uma_unica_consulta(self):
+        import threading
+
+        calls = []
+        started = threading.Event()
+        release = threading.Event()
+
+        @ttl_cache(ttl=60, name="teste.single_flight")
+        def apostas(temporada):
+            calls.append(temporada)
+            started.set()
+            release.wait(timeout=5)
+            return f"apostas-{temporada}"
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(apostas("2026")))
+            for _ in range(5)
+        ]
+        threads[0].start()
+        started.wait(timeout=5)
+        for thread in threads[1:]:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join(timeout=5)
+
+        self.assertEqual(calls, ["2026"])
+        self.assertEqual(results, ["apostas-2026"] * 5)
+        self.assertEqual(apostas.stats().misses, 1)
+
+    def test_valor_vencido_e_servido_enquanto_revalida(self):
+        clock = [100.0]
+        calls = []
+
+        @ttl_cache(ttl=10, stale_while_revalidate=30, name="teste.swr")
+        def provas(temporada):
+            calls.append(temporada)
+            return len(calls)
+
+        with patch("utils.ttl_cache.time.monotonic", side_effect=lambda: clock[0]), patch(
+            "utils.ttl_cache.threading.Thread"
+        ) as thread_cls:
+            self.assertEqual(provas("2026"), 1)
+            clock[0] += 15
+            self.assertEqual(provas("2026"), 1)
+            self.assertEqual(provas("2026"), 1)
+
+        thread_cls.assert_called_once()
+        thread_cls.return_value.start.assert_called_once()
+        self.assertEqual(provas.stats().stale_hits, 2)
+
+    def test_invalidacao_durante_miss_nao_armazena_valor_antigo(self):
+        calls = []
+
+        @ttl_cache(ttl=60, name="teste.geracao")
+        def regras():
+            calls.append(1)
+            if len(calls) == 1:
+                regras.clear()
+            return len(calls)
+
+        self.assertEqual(regras(), 1)
+        self.assertEqual(regras(), 2)
+
+    def test_chamada_apos_invalidacao_nao_aproveita_miss_em_andamento(self):
+        import threading
+
+        versao = ["antiga"]
+        iniciou = threading.Event()
+        liberar = threading.Event()
+
+        @ttl_cache(ttl=60, name="teste.leitura_apos_escrita")
+        def aposta():
+            valor = versao[0]
+            if valor == "antiga":
+                iniciou.set()
+                liberar.wait(5)
+            return valor
+
+        resultados = {}
+        antes = threading.Thread(target=lambda: resultados.setdefault("antes", aposta()))
+        antes.start()
+        self.assertTrue(iniciou.wait(5))
+        versao[0] = "nova"
+        aposta.clear()
+        depois = threading.Thread(target=lambda: resultados.setdefault("depois", aposta()))
+        depois.start()
+        depois.join(5)
+        liberar.set()
+        antes.join(5)
+
+        self.assertEqual(resultados, {"antes": "antiga", "depois": "nova"})
+        self.assertEqual(aposta(), "nova")
+
     def test_participantes_com_historico_usam_uma_consulta_de_dados(self):
         cursor = _Cursor([{"id": 7, "nome": "Ana", "status": "inativo"}])
         conn = _Connection(cursor)
@@ -88,6 +255,28 @@ class PerformanceOptimizationTests(unittest.TestCase):
         self.assertEqual(cursor.execute_count, 1)
         self.assertEqual(result["id"].tolist(), [7])
 
+    def test_distribuicao_de_pilotos_e_agregada_no_banco(self):
+        cursor = _Cursor([
+            {"user_id": 7, "participante": "Ana", "piloto": "Max", "total_apostas": 3, "total_fichas": 12},
+        ])
+        conn = _Connection(cursor)
+
+        @contextmanager
+        def connection():
+            yield conn
+
+        with patch("db.repo_bets.db_connect", connection), patch(
+            "db.repo_bets.get_table_columns",
+            return_value={"temporada", "pilotos", "fichas", "pilotos_arr", "fichas_arr"},
+        ):
+            result = get_distribuicao_pilotos_df("2026", [7, 8], ["Ana"])
+
+        self.assertEqual(cursor.execute_count, 1)
+        self.assertIn("GROUP BY", cursor.last_query)
+        self.assertIn("COALESCE(a.pilotos_arr", cursor.last_query)
+        self.assertEqual(cursor.last_params, ([7, 8], "2026"))
+        self.assertEqual(result["total_apostas"].tolist(), [3])
+
     def test_envio_normal_nao_forca_segundo_rerun(self):
         from pathlib import Path
 
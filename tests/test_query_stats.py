@@ -0,0 +1,54 @@
+import unittest
+
+from tests._db_driver_stub import install_if_needed
+
+install_if_needed()
+
+from db.connection_pool import InstrumentedCursor
+from utils import performance
+
+
+class _Cursor:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def execute(self, query, params=None, **kwargs):
+        pass
+
+    def fetchall(self):
+        return list(self.rows)
+
+
+class QueryStatsTests(unittest.TestCase):
+    def setUp(self):
+        performance.reset_query_stats()
+
+    def test_fingerprint_memoizado_por_texto(self):
+        sql = "SELECT *  FROM provas\n WHERE id = 12 AND nome = 'x'"
+        antes = performance._fingerprint.cache_info()
+        self.assertEqual(performance._fingerprint(sql), "SELECT * FROM provas WHERE id = ? AND nome = ?")
+        performance._fingerprint(sql)
+        depois = performance._fingerprint.cache_info()
+        self.assertEqual(depois.hits - antes.hits, 1)
+
+    def test_percentis_e_linhas_agregados_entre_jornadas(self):
+        for _ in range(2):
+            with performance.journey("teste_consultas"):
+                cursor = InstrumentedCursor(_Cursor([{"id": 1}, {"id": 2}]))
+                cursor.execute("SELECT id FROM provas WHERE temporada = %s", ("2026",))
+                cursor.fetchall()
+        for elapsed in [0.001] * 97 + [0.5] * 3:
+            performance.record_query("SELECT 1", elapsed)
+
+        por_sql = {item["fingerprint"]: item for item in performance.query_stats()}
+        provas = por_sql["SELECT id FROM provas WHERE temporada = %s"]
+        self.assertEqual((provas["calls"], provas["rows"], provas["rows_per_call"]), (2, 4, 2.0))
+        lenta = por_sql["SELECT ?"]
+        self.assertEqual(lenta["calls"], 100)
+        self.assertLessEqual(lenta["p50_ms"], 1.6)
+        self.assertGreater(lenta["p99_ms"], 400)
+        self.assertEqual(performance.query_stats(top=1)[0]["fingerprint"], "SELECT ?")
+
+
+if __name__ == "__main__":
+    unittest.main()
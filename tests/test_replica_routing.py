@@ -0,0 +1,134 @@
+import os
+import unittest
+from contextlib import contextmanager
+from unittest.mock import patch
+
+from tests._db_driver_stub import install_if_needed
+
+install_if_needed()
+
+import app_runtime
+from db import connection_pool, db_schema
+from db.connection_pool import mark_write, replica_pool_for_read, replica_read
+from utils.performance import instrumented_cache_data
+
+
+class _Pool:
+    def __init__(self, nome, falha=None):
+        self.nome = nome
+        self.falha = falha
+
+    @contextmanager
+    def get_connection(self, papel="web"):
+        if self.falha:
+            raise self.falha
+        yield self.nome
+
+
+class ReplicaRoutingTests(unittest.TestCase):
+    def setUp(self):
+        self.replica = _Pool("replica")
+        self.primario = _Pool("primario")
+        for alvo, valor in (
+            ("DATABASE_REPLICA_URL", "postgresql://replica/bf1"),
+            ("_ultima_escrita_processo", 0.0),
+        ):
+            patcher = patch.object(connection_pool, alvo, valor)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        for patcher in (
+            patch.object(connection_pool, "get_replica_pool", return_value=self.replica),
+            patch.object(db_schema, "get_pool", return_value=self.primario),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self._sessao({})
+
+    def _sessao(self, sessao):
+        token = app_runtime._session.set(sessao)
+        self.addCleanup(app_runtime._session.reset, token)
+        return sessao
+
+    def test_somente_leitura_declarada_vai_para_a_replica(self):
+        self.assertIsNone(replica_pool_for_read())
+        self.assertIs(replica_pool_for_read(replica=True), self.replica)
+        with replica_read():
+            self.assertIs(replica_pool_for_read(), self.replica)
+            with db_schema.db_connect() as conn:
+                self.assertEqual(conn, "replica")
+        with db_schema.db_connect() as conn:
+            self.assertEqual(conn, "primario")
+
+    def test_read_your_writes_da_sessao_e_de_caches_compartilhados(self):
+        mark_write()
+        self.assertIsNone(replica_pool_for_read(replica=True))
+
+        self._sessao({})  # outra sessão não escreveu
+        self.assertIs(replica_pool_for_read(replica=True), self.replica)
+        with replica_read(shared=True):
+            self.assertIsNone(replica_pool_for_read())
+
+        with patch.object(connection_pool, "DB_REPLICA_RYW_SECONDS", 0):
+            with replica_read(shared=True):
+                self.assertIs(replica_pool_for_read(), self.replica)
+
+    def test_replica_indisponivel_cai_para_o_primario(self):
+        self.replica.falha = OSError("replica fora")
+        with self.assertLogs("db.db_schema", level="WARNING"):
+            with db_schema.db_connect(replica=True) as conn:
+                self.assertEqual(conn, "primario")
+
+    def test_cache_declarado_le_da_replica_no_miss(self):
+        destinos = []
+
+        @instrumented_cache_data(ttl=60, replica=True)
+        def leitura(chave):
+            with db_schema.db_connect() as conn:
+                destinos.append(conn)
+            return chave
+
+        leitura.clear()
+        leitura(1)
+        leitura(1)
+        self.assertEqual(destinos, ["replica"])
+
+
+@unittest.skipUnless(
+    os.environ.get("BF1_TEST_PRIMARY_URL") and os.environ.get("BF1_TEST_REPLICA_URL"),
+    "defina BF1_TEST_PRIMARY_URL e BF1_TEST_REPLICA_URL (duas instâncias PostgreSQL locais)",
+)
+class ReplicaRoutingIntegrationTests(unittest.TestCase):
+    def setUp(self):
+        primario = connection_pool.ConnectionPool(2, 5, conninfo=os.environ["BF1_TEST_PRIMARY_URL"])
+        replica = connection_pool.ConnectionPool(
+            2, 5, conninfo=os.environ["BF1_TEST_REPLICA_URL"], replica=True
+        )
+        self.addCleanup(primario.close_all)
+        self.addCleanup(replica.close_all)
+        for patcher in (
+            patch.object(connection_pool, "DATABASE_REPLICA_URL", os.environ["BF1_TEST_REPLICA_URL"]),
+            patch.object(connection_pool, "_ultima_escrita_processo", 0.0),
+            patch.object(connection_pool, "get_replica_pool", return_value=replica),
+            patch.object(db_schema, "get_pool", return_value=primario),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        token = app_runtime._session.set({})
+        self.addCleanup(app_runtime._session.reset, token)
+
+    def _porta(self, **kwargs):
+        with db_schema.db_connect(**kwargs) as conn:
+            return conn.execute("SELECT current_setting('port') AS porta").fetchone()["porta"]
+
+    def test_leitura_declarada_usa_a_outra_instancia_ate_a_sessao_escrever(self):
+        porta_primario = self._porta()
+        self.assertNotEqual(self._porta(replica=True), porta_primario)
+
+        with db_schema.db_connect() as conn:
+            conn.execute("SELECT 1")
+            conn.commit()
+        self.assertEqual(self._porta(replica=True), porta_primario)
+
+
+if __name__ == "__main__":
+    unittest.main()
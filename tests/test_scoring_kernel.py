@@ -0,0 +1,80 @@
+import unittest
+
+import pandas as pd
+
+from tests._db_driver_stub import install_if_needed
+
+install_if_needed()
+
+from services import scoring_kernel
+from services.scoring_kernel import detalhar_aposta, detalhar_apostas_lote
+from utils.ttl_cache import clear_all_caches
+
+REGRAS = {
+    "pontos_posicoes": [25, 18, 15],
+    "pontos_11_colocado": 10,
+    "penalidade_abandono": True,
+    "pontos_penalidade": 4,
+}
+
+
+def _regras(_temporada, _tipo):
+    return REGRAS
+
+
+class ScoringKernelTests(unittest.TestCase):
+    def setUp(self):
+        clear_all_caches()
+        self.aposta = {
+            "prova_id": 1, "pilotos": "A,B,C", "fichas": "2,1,3", "piloto_11": "D",
+            "automatica": 0, "temporada": "2026", "nome_prova": "Austrália",
+        }
+        self.resultado = {"prova_id": 1, "posicoes": "{1: 'A', 2: 'B', 11: 'D'}", "abandono_pilotos": "B,C"}
+        self.prova = {"id": 1, "nome": "Austrália", "tipo": "Normal", "temporada": "2026"}
+
+    def test_detalhamento_por_piloto_e_penalidades(self):
+        detalhe = detalhar_aposta(self.aposta, self.prova, self.resultado, "2026", regras_loader=_regras)
+
+        self.assertEqual([linha.pontos for linha in detalhe.pilotos], [50.0, 18.0, 0.0])
+        self.assertEqual([linha.dnf for linha in detalhe.pilotos], [False, True, True])
+        self.assertEqual(detalhe.pilotos[2].posicao_real, None)
+        self.assertTrue(detalhe.acertou_11)
+        self.assertEqual(detalhe.pontos_11, 10.0)
+        self.assertEqual(detalhe.pilotos_abandonados, ("B", "C"))
+        self.assertEqual(detalhe.penalidade_abandono, 8.0)
+        self.assertEqual(detalhe.total, 70)
+
+    def test_lote_reaproveita_detalhamento_por_prova_regra_e_aposta(self):
+        apostas = pd.DataFrame([self.aposta, self.aposta, {**self.aposta, "prova_id": 2}])
+        resultados = pd.DataFrame([self.resultado])
+        provas = pd.DataFrame([self.prova])
+
+        antes = scoring_kernel._detalhar.stats()
+        detalhes = detalhar_apostas_lote(apostas, resultados, provas, regras_loader=_regras)
+        depois = scoring_kernel._detalhar.stats()
+
+        self.assertIs(detalhes[0], detalhes[1])
+        self.assertIsNone(detalhes[2])
+        self.assertEqual((depois.misses - antes.misses, depois.hits - antes.hits), (1, 1))
+
+    def test_mudanca_de_regra_gera_novo_detalhamento(self):
+        apostas = pd.DataFrame([self.aposta])
+        resultados = pd.DataFrame([self.resultado])
+        provas = pd.DataFrame([self.prova])
+
+        antes = detalhar_apostas_lote(apostas, resultados, provas, regras_loader=_regras)[0]
+        depois = detalhar_apostas_lote(
+            apostas, resultados, provas,
+            regras_loader=lambda *_: {**REGRAS, "pontos_11_colocado": 30},
+        )[0]
+
+        self.assertEqual((antes.total, depois.total), (70, 90))
+
+    def test_versoes_de_regras_decodificadas_sao_limitadas(self):
+        for bonus in range(200):
+            scoring_kernel._regras_da_versao(scoring_kernel.versao_regras({**REGRAS, "pontos_11_colocado": bonus}))
+        self.assertLessEqual(scoring_kernel._regras_da_versao.cache_info().currsize, 64)
+
+
+if __name__ == "__main__":
+    unittest.main()
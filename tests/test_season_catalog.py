@@ -0,0 +1,92 @@
+import unittest
+from contextlib import contextmanager
+from unittest.mock import patch
+
+from tests._db_driver_stub import install_if_needed
+
+install_if_needed()
+
+from db import repo_seasons
+from services import season_catalog
+from utils.ttl_cache import clear_all_caches
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, query, params=None):
+        self.conn.sql.append(" ".join(query.split()))
+
+    def fetchall(self):
+        return [{"temporada": t} for t in self.conn.temporadas]
+
+    def close(self):
+        pass
+
+
+class _Connection:
+    def __init__(self, temporadas):
+        self.temporadas = temporadas
+        self.sql = []
+        self.commits = 0
+
+    def cursor(self):
+        return _Cursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+
+class SeasonCatalogTests(unittest.TestCase):
+    def setUp(self):
+        clear_all_caches()
+        self.addCleanup(clear_all_caches)
+        self.conn = _Connection(["2025", "2026"])
+
+        @contextmanager
+        def fake_connect(*args, **kwargs):
+            yield self.conn
+
+        patchers = [
+            patch.object(repo_seasons, "db_connect", fake_connect),
+            patch.object(repo_seasons, "table_exists", return_value=True),
+        ]
+        for p in patchers:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_leitura_do_catalogo_nao_faz_ddl_nem_commit_e_fica_em_cache(self):
+        self.assertEqual(season_catalog.list_temporadas(), ["2025", "2026"])
+        self.assertEqual(season_catalog.list_temporadas(), ["2025", "2026"])
+
+        self.assertEqual(self.conn.sql, ["SELECT temporada FROM temporadas ORDER BY temporada"])
+        self.assertEqual(self.conn.commits, 0)
+
+    def test_nova_temporada_invalida_o_catalogo(self):
+        season_catalog.list_temporadas()
+        self.assertEqual(season_catalog.create_next_temporada(), "2027")
+        self.conn.temporadas.append("2027")
+
+        self.assertEqual(season_catalog.list_temporadas(), ["2025", "2026", "2027"])
+        self.assertEqual(self.conn.commits, 1)
+
+    def test_temporadas_do_usuario_em_cache_por_usuario(self):
+        chamadas = []
+
+        def repo(user_id):
+            chamadas.append(user_id)
+            return ["2024"] if user_id == 7 else []
+
+        with patch.object(season_catalog, "_repo_get_usuario_temporadas_ativas", repo):
+            self.assertEqual(season_catalog.get_usuario_temporadas_ativas(7), ["2024"])
+            self.assertEqual(season_catalog.get_usuario_temporadas_ativas("7"), ["2024"])
+            self.assertEqual(season_catalog.get_usuario_temporadas_ativas(8), [])
+            clear_all_caches("usuarios")
+            season_catalog.get_usuario_temporadas_ativas(7)
+
+        self.assertEqual(chamadas, [7, 8, 7])
+
+
+if __name__ == "__main__":
+    unittest.main()
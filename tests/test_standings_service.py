@@ -0,0 +1,118 @@
+import unittest
+
+import pandas as pd
+
+from tests._db_driver_stub import install_if_needed
+
+install_if_needed()
+
+from services.standings_service import calcular_classificacao_temporada
+
+
+class ClassificacaoTemporadaTests(unittest.TestCase):
+    def setUp(self):
+        self.provas = pd.DataFrame(
+            [
+                {"id": 20, "nome": "China", "data": "2026-03-15", "horario_prova": "04:00"},
+                {"id": 10, "nome": "Austrália", "data": "2026-03-01", "horario_prova": "01:00"},
+                {"id": 30, "nome": "Japão", "data": "2026-04-05", "horario_prova": "02:00"},
+            ]
+        )
+        self.resultados = pd.DataFrame(
+            [
+                {"prova_id": 10, "posicoes": "{1: 'A', 11: 'K'}"},
+                {"prova_id": 20, "posicoes": "{1: 'B', 11: 'L'}"},
+            ]
+        )
+        self.apostas = pd.DataFrame(
+            [
+                {"usuario_id": 1, "prova_id": 10, "data_envio": "2026-02-28 10:00:00", "piloto_11": "K", "__pontos_calculados": 100.0},
+                {"usuario_id": 2, "prova_id": 10, "data_envio": "2026-02-28 11:00:00", "piloto_11": "X", "__pontos_calculados": 80.0},
+                {"usuario_id": 1, "prova_id": 20, "data_envio": "2026-03-14 10:00:00", "piloto_11": "X", "__pontos_calculados": 10.0},
+                {"usuario_id": 2, "prova_id": 20, "data_envio": "2026-03-14 11:00:00", "piloto_11": "L", "__pontos_calculados": 90.0},
+            ]
+        )
+
+    def _calcular(self, regras=None, resultado=None, apostas_campeonato=None):
+        return calcular_classificacao_temporada(
+            "2026",
+            [1, 2],
+            self.provas,
+            self.apostas,
+            self.resultados,
+            regras or {},
+            resultado,
+            apostas_campeonato,
+        )
+
+    def test_acumula_pontos_em_ordem_cronologica_e_registra_movimentacao(self):
+        tabela = self._calcular()
+
+        self.assertEqual(sorted(tabela["prova_id"].unique().tolist()), [10, 20])
+        primeira = tabela[tabela["ordem_prova"] == 1].set_index("usuario_id")
+        ultima = tabela[tabela["ordem_prova"] == 2].set_index("usuario_id")
+        self.assertEqual(primeira["prova_id"].unique().tolist(), [10])
+        self.assertEqual(primeira.loc[1, "posicao"], 1)
+        self.assertEqual(ultima.loc[2, "posicao"], 1)
+        self.assertEqual(ultima.loc[2, "pontos_acumulados"], 170.0)
+        self.assertEqual(ultima.loc[2, "variacao_posicao"], 1)
+        self.assertEqual(ultima.loc[1, "variacao_posicao"], -1)
+        self.assertEqual(ultima.loc[1, "diferenca_anterior"], 60.0)
+        self.assertEqual(ultima.loc[1, "acertos_11"], 1)
+
+    def test_descarte_remove_pior_prova_ja_realizada(self):
+        tabela = self._calcular(regras={"descarte": True})
+
+        ultima = tabela[tabela["ordem_prova"] == 2].set_index("usuario_id")
+        self.assertEqual(ultima.loc[1, "descarte"], 10.0)
+        self.assertEqual(ultima.loc[1, "pontos_apos_descarte"], 100.0)
+        self.assertEqual(ultima.loc[2, "pontos_apos_descarte"], 90.0)
+        self.assertEqual(ultima.loc[1, "posicao"], 1)
+
+    def test_prova_sem_aposta_mantem_o_descarte_da_pior_prova(self):
+        self.resultados = pd.concat(
+            [self.resultados, pd.DataFrame([{"prova_id": 30, "posicoes": "{1: 'C', 11: 'M'}"}])],
+            ignore_index=True,
+        )
+        self.apostas = pd.DataFrame(
+            [
+                {"usuario_id": 1, "prova_id": 10, "data_envio": "2026-02-28 10:00:00", "piloto_11": "", "__pontos_calculados": 10.0},
+                {"usuario_id": 1, "prova_id": 20, "data_envio": "2026-03-14 10:00:00", "piloto_11": "", "__pontos_calculados": 5.0},
+                {"usuario_id": 2, "prova_id": 10, "data_envio": "2026-02-28 11:00:00", "piloto_11": "", "__pontos_calculados": 6.0},
+                {"usuario_id": 2, "prova_id": 20, "data_envio": "2026-03-14 11:00:00", "piloto_11": "", "__pontos_calculados": 6.0},
+                {"usuario_id": 2, "prova_id": 30, "data_envio": "2026-04-04 11:00:00", "piloto_11": "", "__pontos_calculados": 1.0},
+            ]
+        )
+
+        tabela = self._calcular(regras={"descarte": True})
+
+        # Participante 1 não apostou no Japão: o descarte segue sendo os 5 da China.
+        ultima = tabela[tabela["ordem_prova"] == 3].set_index("usuario_id")
+        self.assertEqual(ultima.loc[1, "descarte"], 5.0)
+        self.assertEqual(ultima.loc[1, "total_valido"], 10.0)
+        self.assertEqual(ultima.loc[2, "total_valido"], 12.0)
+        self.assertEqual(ultima.loc[2, "posicao"], 1)
+
+    def test_bonus_de_campeonato_entra_somente_na_ultima_prova(self):
+        tabela = self._calcular(
+            regras={"pontos_campeao": 150, "pontos_vice": 100, "pontos_equipe": 80},
+            resultado={"champion": "A", "vice": "B", "team": "T"},
+            apostas_campeonato={1: {"champion": "A", "vice": "Z", "team": "T"}},
+        )
+
+        primeira = tabela[tabela["ordem_prova"] == 1].set_index("usuario_id")
+        ultima = tabela[tabela["ordem_prova"] == 2].set_index("usuario_id")
+        self.assertEqual(primeira.loc[1, "bonus_campeonato"], 0.0)
+        self.assertEqual(ultima.loc[1, "bonus_campeonato"], 230.0)
+        self.assertEqual(ultima.loc[1, "total_valido"], 340.0)
+        self.assertEqual(ultima.loc[1, "posicao"], 1)
+
+    def test_sem_resultados_retorna_tabela_vazia(self):
+        tabela = calcular_classificacao_temporada(
+            "2026", [1, 2], self.provas, self.apostas, self.resultados.iloc[0:0], {}
+        )
+        self.assertTrue(tabela.empty)
+
+
+if __name__ == "__main__":
+    unittest.main()
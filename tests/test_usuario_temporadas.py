@@ -0,0 +1,115 @@
+import unittest
+from contextlib import contextmanager
+from unittest.mock import patch
+
+from tests._db_driver_stub import install_if_needed
+
+install_if_needed()
+
+from db import repo_user_seasons, repo_users
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, query, params=None):
+        self.conn.sql.append((" ".join(query.split()), params))
+
+    def fetchone(self):
+        return {"?column?": 1} if self.conn.par_existe else None
+
+    def fetchall(self):
+        return [{"temporada": t} for t in self.conn.temporadas]
+
+    def close(self):
+        pass
+
+
+class _Connection:
+    def __init__(self, temporadas=(), par_existe=False):
+        self.temporadas = list(temporadas)
+        self.par_existe = par_existe
+        self.sql = []
+
+    def cursor(self):
+        return _Cursor(self)
+
+
+class UsuarioTemporadasTests(unittest.TestCase):
+    def setUp(self):
+        self.tabelas = {"usuario_temporadas", "usuarios_status_historico", "log_apostas", "posicoes_participantes"}
+        patchers = [
+            patch.object(repo_user_seasons, "table_exists", side_effect=lambda _c, t: t in self.tabelas),
+            patch.object(repo_user_seasons, "get_table_columns", return_value=["usuario_id", "temporada", "data"]),
+        ]
+        for p in patchers:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_leitura_e_uma_busca_pela_chave(self):
+        conn = _Connection(["2025", "2026"])
+
+        @contextmanager
+        def fake_connect(*args, **kwargs):
+            yield conn
+
+        with patch.object(repo_user_seasons, "db_connect", fake_connect), \
+                patch.object(repo_users, "_inferir_usuario_temporadas") as inferir:
+            self.assertEqual(repo_users.get_usuario_temporadas_ativas(7), ["2025", "2026"])
+
+        inferir.assert_not_called()
+        self.assertEqual(len(conn.sql), 1)
+        sql, params = conn.sql[0]
+        self.assertIn("FROM usuario_temporadas WHERE usuario_id = %s", sql)
+        self.assertEqual(params, (7,))
+
+    def test_sem_tabela_usa_inferencia_legada(self):
+        self.tabelas.discard("usuario_temporadas")
+
+        @contextmanager
+        def fake_connect(*args, **kwargs):
+            yield _Connection()
+
+        with patch.object(repo_user_seasons, "db_connect", fake_connect), \
+                patch.object(repo_users, "_inferir_usuario_temporadas", return_value=["2024"]) as inferir:
+            self.assertEqual(repo_users.get_usuario_temporadas_ativas(7), ["2024"])
+        inferir.assert_called_once_with(7)
+
+    def test_recalculo_de_um_participante_filtra_todas_as_origens(self):
+        conn = _Connection()
+        repo_user_seasons.atualizar_usuario_temporadas(conn, 7)
+
+        (delete, p1), (insert, p2) = conn.sql
+        self.assertIn("DELETE FROM usuario_temporadas WHERE TRUE AND usuario_id = %(usuario_id)s", delete)
+        self.assertEqual(p1, p2)
+        self.assertEqual(p1, {"usuario_id": 7})
+        self.assertIn("usuarios_status_historico", insert)
+        for origem in ("FROM apostas", "FROM log_apostas", "FROM posicoes_participantes"):
+            self.assertIn(origem, insert)
+        # apostas, log_apostas, posicoes_participantes e histórico filtram o participante
+        self.assertEqual(insert.count("%(usuario_id)s"), 4)
+
+    def test_recalculo_geral_sem_historico_usa_status_atual(self):
+        self.tabelas.discard("usuarios_status_historico")
+        conn = _Connection()
+        repo_user_seasons.atualizar_usuario_temporadas(conn)
+
+        (delete, params), (insert, _) = conn.sql
+        self.assertEqual(params, {})
+        self.assertNotIn("%(usuario_id)s", delete + insert)
+        self.assertIn("lower(trim(coalesce(u.status,''))) = 'ativo'", insert)
+
+    def test_aposta_so_recalcula_quando_o_par_nao_existe(self):
+        conn = _Connection(par_existe=True)
+        repo_user_seasons.garantir_usuario_temporada(conn, 7, " 2026 ")
+        self.assertEqual(len(conn.sql), 1)
+        self.assertEqual(conn.sql[0][1], (7, "2026"))
+
+        conn = _Connection(par_existe=False)
+        repo_user_seasons.garantir_usuario_temporada(conn, 7, "2026")
+        self.assertEqual(len(conn.sql), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
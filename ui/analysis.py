@@ -2,12 +2,10 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 from typing import Optional
-from services.data_access_core import (
-    db_connect,
-    get_table_columns,
-)
 from services.data_access_apostas import (
     get_apostas_df,
+    get_distribuicao_piloto_11_df,
+    get_distribuicao_pilotos_df,
     get_participantes_temporada_df,
 )
 from services.data_access_provas import (
@@ -139,113 +137,32 @@ def _get_participantes_temporada(temporada: Optional[str] = None) -> pd.DataFram
     return participantes_df
 
 
-def _get_log_apostas_df(
-    conn,
-    temporada: Optional[str],
-    participantes_ids: list[int],
-    participantes_nomes: list[str],
-    campos: list[str]
-) -> pd.DataFrame:
-    """Busca log_apostas via cursor psycopg3 (compatível com dict_row)."""
-    cols = get_table_columns(conn, 'log_apostas')
-    if not cols:
-        return pd.DataFrame()
-
-    conditions = ["tipo_aposta = 0"]
-    params: list = []
-
-    if temporada and 'temporada' in cols:
-        conditions.append("temporada = %s")
-        params.append(temporada)
-
-    id_placeholders = ','.join(['%s'] * len(participantes_ids)) if participantes_ids else ''
-    nome_placeholders = ','.join(['%s'] * len(participantes_nomes)) if participantes_nomes else ''
-
-    if participantes_ids and 'usuario_id' in cols and participantes_nomes and 'apostador' in cols:
-        conditions.append(f"(usuario_id IN ({id_placeholders}) OR apostador IN ({nome_placeholders}))")
-        params.extend(participantes_ids)
-        params.extend(participantes_nomes)
-    elif participantes_ids and 'usuario_id' in cols:
-        conditions.append(f"usuario_id IN ({id_placeholders})")
-        params.extend(participantes_ids)
-    elif participantes_nomes and 'apostador' in cols:
-        conditions.append(f"apostador IN ({nome_placeholders})")
-        params.extend(participantes_nomes)
-
-    if not conditions:
-        return pd.DataFrame()
-
-    # Mapeia alias de campos para nomes reais (ex: 'apostador AS participante')
-    select_cols = ', '.join(campos)
-    where_sql = ' AND '.join(conditions)
-    query = f"SELECT {select_cols} FROM log_apostas WHERE {where_sql}"
-
-    cur = conn.cursor()
-    cur.execute(query, tuple(params))
-    rows = cur.fetchall() or []
-    cur.close()
-    if not rows:
-        return pd.DataFrame()
-    return pd.DataFrame([dict(r) for r in rows])
+def _ids_e_nomes_participantes(
+    temporada: Optional[str], participantes_df: Optional[pd.DataFrame]
+) -> tuple[tuple[int, ...], tuple[str, ...]]:
+    if participantes_df is None:
+        participantes_df = _get_participantes_temporada(temporada)
+    if participantes_df.empty:
+        return (), ()
+    participantes_df = _normalizar_ids(participantes_df, "id")
+    if participantes_df.empty:
+        return (), ()
+    ids = tuple(_extrair_ids_validos(participantes_df, "id"))
+    nomes = tuple(participantes_df['nome'].astype(str).tolist())
+    return ids, nomes
 
 
 def get_apostas_por_piloto(temporada: Optional[str] = None, participantes_df: Optional[pd.DataFrame] = None):
     """
     Agrupa apostas por participante e piloto para análise da distribuição de apostas.
-    Retorna DataFrame: participante | piloto | total_apostas
+    Retorna DataFrame: user_id | participante | piloto | total_apostas | total_fichas
+    A agregação (unnest + GROUP BY) é feita no PostgreSQL.
     """
     try:
-        if participantes_df is None:
-            participantes_df = _get_participantes_temporada(temporada)
-        if participantes_df.empty:
-            return pd.DataFrame()
-        participantes_df = _normalizar_ids(participantes_df, "id")
-        if participantes_df.empty:
-            return pd.DataFrame()
-
-        participantes_ids = _extrair_ids_validos(participantes_df, "id")
-        participantes_nomes = participantes_df['nome'].astype(str).tolist()
+        participantes_ids, participantes_nomes = _ids_e_nomes_participantes(temporada, participantes_df)
         if not participantes_ids:
             return pd.DataFrame()
-
-        with db_connect() as conn:
-            cols = get_table_columns(conn, 'apostas')
-            placeholders = ','.join(['%s'] * len(participantes_ids))
-            if temporada and 'temporada' in cols:
-                query = (
-                    "SELECT a.usuario_id AS user_id, u.nome AS participante, a.pilotos "
-                    "FROM apostas a "
-                    "JOIN usuarios u ON a.usuario_id = u.id "
-                    f"WHERE a.usuario_id IN ({placeholders}) AND a.temporada = %s"
-                )
-                params = (*participantes_ids, temporada)
-            else:
-                query = (
-                    "SELECT a.usuario_id AS user_id, u.nome AS participante, a.pilotos "
-                    "FROM apostas a "
-                    "JOIN usuarios u ON a.usuario_id = u.id "
-                    f"WHERE a.usuario_id IN ({placeholders})"
-                )
-                params = tuple(participantes_ids)
-            cur = conn.cursor()
-            cur.execute(query, params)
-            rows = cur.fetchall() or []
-            cur.close()
-            df = pd.DataFrame([dict(r) for r in rows]) if rows else pd.DataFrame()
-            if df.empty:
-                df = _get_log_apostas_df(
-                    conn,
-                    temporada,
-                    participantes_ids,
-                    participantes_nomes,
-                    ['usuario_id AS user_id', 'apostador AS participante', 'pilotos']
-                )
-            if not df.empty and 'pilotos' in df.columns:
-                df['piloto'] = df['pilotos'].str.split(',')
-                df = df.explode('piloto')
-                df = df.groupby(['user_id', 'participante', 'piloto'], dropna=False).size().reset_index(name='total_apostas')
-            else:
-                df = pd.DataFrame()
+        df = get_distribuicao_pilotos_df(temporada, participantes_ids, participantes_nomes)
     except Exception as e:
         st.error(f"Erro ao buscar apostas por piloto: {str(e)}")
         df = pd.DataFrame()
@@ -254,56 +171,13 @@ def get_apostas_por_piloto(temporada: Optional[str] = None, participantes_df: Op
 def get_distribuicao_piloto_11(temporada: Optional[str] = None, participantes_df: Optional[pd.DataFrame] = None):
     """
     Distribuição de apostas para o 11º colocado por participante.
-    Retorna DataFrame: participante | piloto_11
+    Retorna DataFrame já agregado: user_id | participante | piloto_11 | total
     """
     try:
-        if participantes_df is None:
-            participantes_df = _get_participantes_temporada(temporada)
-        if participantes_df.empty:
-            return pd.DataFrame()
-        participantes_df = _normalizar_ids(participantes_df, "id")
-        if participantes_df.empty:
-            return pd.DataFrame()
-
-        participantes_ids = _extrair_ids_validos(participantes_df, "id")
-        participantes_nomes = participantes_df['nome'].astype(str).tolist()
+        participantes_ids, participantes_nomes = _ids_e_nomes_participantes(temporada, participantes_df)
         if not participantes_ids:
             return pd.DataFrame()
-
-        with db_connect() as conn:
-            cols = get_table_columns(conn, 'apostas')
-            placeholders = ','.join(['%s'] * len(participantes_ids))
-            if temporada and 'temporada' in cols:
-                query = (
-                    "SELECT a.usuario_id AS user_id, u.nome AS participante, a.piloto_11 AS piloto_11 "
-                    "FROM apostas a "
-                    "JOIN usuarios u ON a.usuario_id = u.id "
-                    f"WHERE a.usuario_id IN ({placeholders}) AND a.temporada = %s "
-                    "AND a.piloto_11 IS NOT NULL AND a.piloto_11 != ''"
-                )
-                params = (*participantes_ids, temporada)
-            else:
-                query = (
-                    "SELECT a.usuario_id AS user_id, u.nome AS participante, a.piloto_11 AS piloto_11 "
-                    "FROM apostas a "
-                    "JOIN usuarios u ON a.usuario_id = u.id "
-                    f"WHERE a.usuario_id IN ({placeholders}) "
-                    "AND a.piloto_11 IS NOT NULL AND a.piloto_11 != ''"
-                )
-                params = tuple(participantes_ids)
-            cur = conn.cursor()
-            cur.execute(query, params)
-            rows = cur.fetchall() or []
-            cur.close()
-            df = pd.DataFrame([dict(r) for r in rows]) if rows else pd.DataFrame()
-            if df.empty:
-                df = _get_log_apostas_df(
-                    conn,
-                    temporada,
-                    participantes_ids,
-                    participantes_nomes,
-                    ['usuario_id AS user_id', 'apostador AS participante', 'piloto_11']
-                )
+        df = get_distribuicao_piloto_11_df(temporada, participantes_ids, participantes_nomes)
     except Exception as e:
         st.error(f"Erro ao buscar distribuição do 11º colocado: {str(e)}")
         df = pd.DataFrame()
@@ -406,7 +280,10 @@ def main():
                     key=f"analysis_11_participante_{season}"
                 )
             df_part = df_11[df_11['participante'] == participante_11_sel]
-            contagem = df_part['piloto_11'].value_counts().reset_index()
+            contagem = (
+                df_part.groupby('piloto_11')['total'].sum()
+                .sort_values(ascending=False).reset_index()
+            )
             contagem.columns = ['Piloto', 'Total']
             _plot_colunas(
                 contagem,
@@ -453,7 +330,10 @@ def main():
     with tab4:
         st.subheader("Consolidado do 11º Colocado")
         if not df_11.empty:
-            consolidado_11 = df_11['piloto_11'].value_counts().reset_index()
+            consolidado_11 = (
+                df_11.groupby('piloto_11')['total'].sum()
+                .sort_values(ascending=False).reset_index()
+            )
             consolidado_11.columns = ['Piloto', 'Total']
             _plot_colunas(
                 consolidado_11,
@@ -9,6 +9,7 @@ from services.data_access_backup import (
     reauthorize_restore,
     upload_db,
 )
+from services.data_access_core import get_pool_stats, get_query_stats
 from utils.helpers import render_page_header
 from utils.backup_security import RestoreReauthenticationFailed, restore_authorization_error
 
@@ -106,5 +107,29 @@ def main():
         else:
             st.info("Nenhuma temporada cadastrada. Botão acima cria a próxima temporada.")
 
+    st.divider()
+    with st.expander("Pool de conexões"):
+        st.caption(
+            "Contadores desde o início do processo: use espera média/máxima, "
+            "pico de conexões em uso e timeouts para dimensionar DB_MAX_CONN."
+        )
+        snapshots = get_pool_stats()
+        if snapshots:
+            for snapshot in snapshots:
+                st.json(snapshot)
+        else:
+            st.info("Nenhum pool aberto neste processo.")
+
+    with st.expander("Consultas mais custosas"):
+        st.caption(
+            "Agregado por fingerprint desde o início do processo, ordenado pelo "
+            "tempo total; percentis pelo limite do balde de latência."
+        )
+        consultas = get_query_stats()
+        if consultas:
+            st.dataframe(consultas, hide_index=True, width="stretch")
+        else:
+            st.info("Nenhuma consulta registrada neste processo.")
+
 if __name__ == "__main__":
     main()
@@ -2,7 +2,6 @@ import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 import numpy as np
-from io import BytesIO
 import datetime as dt
 import ast
 from zoneinfo import ZoneInfo
@@ -11,6 +10,7 @@ from services.data_access_core import (
 )
 from services.data_access_apostas import (
     get_apostas_df,
+    get_classificacao_temporada_df,
     get_participantes_temporada_df,
     get_posicoes_participantes_df,
 )
@@ -21,14 +21,25 @@ from services.data_access_provas import (
 from services.data_access_auth import (
     usuarios_status_historico_disponivel,
 )
+from services.championship_odds import calcular_chances_campeonato
 from services.championship_service import get_championship_bets_df, get_final_results
 from services.rules_service import get_regras_aplicaveis
 from services.bets_scoring import _parse_datetime_sp, calcular_pontuacao_lote
+from services.image_render_service import agendar_imagem_classificacao, agendar_imagem_prova, imagem_classificacao_pronta
+from services.scoring_kernel import detalhar_apostas_lote
+from services.standings_service import (
+    classificacao_exibicao,
+    colunas_classificacao,
+    descrever_movimentacao,
+    formatar_brasileiro,
+    tabela_exibicao,
+)
 from utils.helpers import render_page_header
 from utils.season_utils import get_default_season_index, get_season_options
 from utils.dataframe_contracts import (
     APOSTAS_COLUMNS,
     CHAMPIONSHIP_BETS_COLUMNS,
+    CLASSIFICACAO_TEMPORADA_COLUMNS,
     POSICOES_COLUMNS,
     PROVAS_COLUMNS,
     RESULTADOS_COLUMNS,
@@ -138,13 +149,6 @@ def _calcular_descartes_atuais(
     }
 
 
-def formatar_brasileiro(valor):
-    try:
-        return f"{valor:,.2f}".replace(",", "v").replace(".", ",").replace("v", ".")
-    except:
-        return valor
-
-
 def _calcular_totais_classificacao(
     total_provas: float,
     bonus_campeao: float,
@@ -164,80 +168,50 @@ def _calcular_totais_classificacao(
     }
 
 
-def _colunas_classificacao(descarte_ativo: bool) -> list[str]:
-    colunas = [
-        "Posição",
-        "Participante",
-        "Total Geral",
-        "Bônus Campeão",
-        "Bônus Vice",
-        "Bônus Equipe",
-    ]
-    if descarte_ativo:
-        colunas.append("Descarte")
-    return [*colunas, "Total Válido", "Diferença", "Movimentação"]
-
-def gerar_imagem_tabela_ajustada(df, colunas):
-    import matplotlib.image as mpimg
-    import matplotlib.pyplot as plt
-    from matplotlib.offsetbox import AnnotationBbox, OffsetImage
-
-    df_exibicao = df[colunas].astype(str).copy()
+_IMAGEM_INTERVALO_SEGUNDOS = 2
 
-    max_larguras = []
-    for col in colunas:
-        max_len = df_exibicao[col].map(len).max()
-        max_len = max(max_len, len(col))
-        max_larguras.append(max_len)
 
-    total_chars = sum(max_larguras) if sum(max_larguras) > 0 else 1
-    col_widths = [max_len / total_chars for max_len in max_larguras]
-
-    largura_figura = max(16.0, total_chars * 0.14)
-    altura_figura = max(4.8, len(df_exibicao) * 0.62 + 2.2)
-    fig, ax = plt.subplots(figsize=(largura_figura, altura_figura), dpi=200)
-    ax.axis('off')
-
-    fonte_tabela = 13 if len(df_exibicao) <= 20 else 11
-    try:
-        logo = mpimg.imread("BF1.jpg")
-        logo_img = OffsetImage(logo, zoom=0.18)
-        ab = AnnotationBbox(logo_img, (0, 1), xycoords='axes fraction', frameon=False, box_alignment=(0, 1), pad=0.03)
-        ax.add_artist(ab)
-    except Exception:
-        pass
-
-    tabela = ax.table(
-        cellText=df_exibicao.values.tolist(),
-        colLabels=colunas,
-        cellLoc='center',
-        loc='center',
-        colWidths=col_widths
-    )
-    tabela.auto_set_font_size(False)
-    tabela.set_fontsize(fonte_tabela)
-    tabela.scale(1.15, 1.55)
-
-    for (row, col), cell in tabela.get_celld().items():
-        if row == 0:
-            cell.set_text_props(weight='bold', color='white')
-            cell.set_facecolor('#1f4e79')
-        else:
-            cell.set_facecolor('#f6f9fc' if row % 2 == 0 else 'white')
-        cell.set_edgecolor('#b8c4d0')
-        cell.set_linewidth(0.7)
-
-    buffer = BytesIO()
-    plt.savefig(buffer, format='png', bbox_inches='tight', dpi=320)
-    plt.close(fig)
-    buffer.seek(0)
-    return buffer
-
-def gerar_imagem_prova(df_cruzada, prova_selecionada, apostas_df=None, resultados_df=None, provas_df=None, df_class=None):
-    import matplotlib.image as mpimg
-    import matplotlib.pyplot as plt
-    from matplotlib.offsetbox import AnnotationBbox, OffsetImage
+def _imagem_sob_demanda(chave_sessao, marcador, agendar, rotulo_botao, key_botao):
+    """Bytes da imagem pedida nesta sessão, ou ``None`` enquanto não há imagem.
 
+    O clique só agenda a renderização e guarda o ``Future`` junto com o
+    ``marcador`` do conteúdo; um fragmento confere o pedido a cada poucos
+    segundos e recarrega a página quando ele termina, em vez de prender a
+    sessão esperando o pool de processos. Um marcador diferente (outra prova,
+    classificação recalculada) descarta o pedido antigo.
+    """
+    pedido = st.session_state.get(chave_sessao)
+    if pedido is not None and pedido[0] != marcador:
+        st.session_state.pop(chave_sessao, None)
+        pedido = None
+    if pedido is None:
+        if not st.button(rotulo_botao, key=key_botao):
+            return None
+        future = agendar()
+        if future is None:
+            return None
+        pedido = (marcador, future)
+        st.session_state[chave_sessao] = pedido
+
+    future = pedido[1]
+    if future.done():
+        if future.cancelled() or future.exception() is not None:
+            st.session_state.pop(chave_sessao, None)
+            st.error("Não foi possível gerar a imagem. Tente novamente.")
+            return None
+        return future.result()
+
+    @st.fragment(run_every=_IMAGEM_INTERVALO_SEGUNDOS)
+    def _aguardar() -> None:
+        if st.session_state.get(chave_sessao) is not pedido or future.done():
+            st.rerun(scope="app")
+        st.info("Preparando imagem... o download aparece assim que ela ficar pronta.")
+
+    _aguardar()
+    return None
+
+
+def agendar_imagem_prova_selecionada(df_cruzada, prova_selecionada, apostas_df=None, resultados_df=None, provas_df=None, df_class=None, temporada=""):
     if prova_selecionada not in df_cruzada.index:
         return None
 
@@ -281,15 +255,20 @@ def gerar_imagem_prova(df_cruzada, prova_selecionada, apostas_df=None, resultado
             except Exception:
                 prova_id = None
 
-    piloto_11_real = None
-    if resultados_df is not None and prova_id is not None and 'prova_id' in resultados_df.columns:
+    # Acerto do 11º vem do mesmo detalhamento usado na pontuação da prova
+    acertos_11: dict = {}
+    if (
+        apostas_df is not None and resultados_df is not None and prova_id is not None
+        and {'prova_id', 'usuario_id'}.issubset(apostas_df.columns) and 'prova_id' in resultados_df.columns
+    ):
+        ap_prova = apostas_df[apostas_df['prova_id'] == prova_id]
         rr = resultados_df[resultados_df['prova_id'] == prova_id]
-        if not rr.empty:
-            try:
-                pos = ast.literal_eval(rr.iloc[0]['posicoes'])
-                piloto_11_real = str(pos.get(11, '')).strip()
-            except Exception:
-                piloto_11_real = None
+        if not ap_prova.empty and not rr.empty:
+            if 'data_envio' in ap_prova.columns:
+                ap_prova = ap_prova.assign(__dt=pd.to_datetime(ap_prova['data_envio'], errors='coerce')).sort_values('__dt')
+            detalhes = detalhar_apostas_lote(ap_prova, rr, provas_df)
+            for uid, detalhe in zip(ap_prova['usuario_id'], detalhes):
+                acertos_11.setdefault(uid, 1 if detalhe is not None and detalhe.acertou_11 else 0)
 
     rows = []
     for participante in dados_prova.index.tolist():
@@ -308,11 +287,7 @@ def gerar_imagem_prova(df_cruzada, prova_selecionada, apostas_df=None, resultado
                     ap_sorted = ap_sorted.sort_values('__dt')
                 ap_row = ap_sorted.iloc[0]
                 data_envio = ap_row.get('data_envio')
-                try:
-                    if piloto_11_real is not None:
-                        acerto_11 = 1 if str(ap_row.get('piloto_11', '')).strip() == piloto_11_real else 0
-                except Exception:
-                    acerto_11 = 0
+                acerto_11 = acertos_11.get(uid, 0)
 
         overall_total = 0.0
         if df_class is not None and 'Participante' in df_class.columns and 'Total Válido' in df_class.columns:
@@ -339,57 +314,13 @@ def gerar_imagem_prova(df_cruzada, prova_selecionada, apostas_df=None, resultado
     df_p = df_p.sort_values(by=['pontos', 'data_envio_sort', 'acerto_11', 'overall_total'], ascending=[False, True, False, False]).reset_index(drop=True)
     df_p['pontos_fmt'] = df_p['pontos'].apply(lambda x: formatar_brasileiro(float(x)))
 
-    df_prova = pd.DataFrame({prova_selecionada: df_p['pontos_fmt'].values}, index=df_p['Participante'].tolist())
-
-    linhas = len(df_prova)
-    max_nome = max(df_prova.index.astype(str).map(len).max(), len("Participante")) if linhas > 0 else len("Participante")
-    max_valor = max(df_prova[prova_selecionada].astype(str).map(len).max(), len(prova_selecionada)) if linhas > 0 else len(prova_selecionada)
-    total_chars = max_nome + max_valor
-    largura_figura = max(8.8, total_chars * 0.2)
-    altura_figura = max(4.6, linhas * 0.62 + 2.2)
-    fig, ax = plt.subplots(figsize=(largura_figura, altura_figura), dpi=200)
-    ax.axis('off')
-
-    fonte_tabela = 13 if linhas <= 20 else 11
-    try:
-        logo = mpimg.imread("BF1.jpg")
-        logo_img = OffsetImage(logo, zoom=0.16)
-        ab = AnnotationBbox(logo_img, (0, 1), xycoords='axes fraction', frameon=False, box_alignment=(0, 1), pad=0.03)
-        ax.add_artist(ab)
-    except Exception:
-        pass
-
-    table = ax.table(
-        cellText=df_prova.astype(str).values.tolist(),
-        rowLabels=df_prova.index.astype(str).tolist(),
-        colLabels=[prova_selecionada],
-        cellLoc='center',
-        loc='center',
-        colWidths=[0.54]
+    return agendar_imagem_prova(
+        temporada,
+        prova_selecionada,
+        df_p['Participante'].astype(str).tolist(),
+        df_p['pontos_fmt'].astype(str).tolist(),
     )
 
-    table.auto_set_font_size(False)
-    table.set_fontsize(fonte_tabela)
-    table.scale(1.2, 1.55)
-
-    for (row, col), cell in table.get_celld().items():
-        if row == 0:
-            cell.set_text_props(weight='bold', color='white')
-            cell.set_facecolor('#1f4e79')
-        elif col == -1:
-            cell.set_text_props(weight='bold')
-            cell.set_facecolor('#eef3f8')
-        else:
-            cell.set_facecolor('#f6f9fc' if row % 2 == 0 else 'white')
-        cell.set_edgecolor('#b8c4d0')
-        cell.set_linewidth(0.7)
-
-    buffer = BytesIO()
-    plt.savefig(buffer, format='png', bbox_inches='tight', dpi=320)
-    plt.close(fig)
-    buffer.seek(0)
-    return buffer
-
 
 def destacar_heatmap(df: pd.DataFrame, resultados_df: pd.DataFrame, provas_ids_ordenados: list[int]):
     """Aplica escala vermelho→verde dentro de cada prova já realizada."""
@@ -426,53 +357,37 @@ def destacar_heatmap(df: pd.DataFrame, resultados_df: pd.DataFrame, provas_ids_o
 
     return df.style.apply(colorir_prova, axis=1)
 
-def main():
-    render_page_header(st, "Classificação Geral do Bolão")
-
-    current_year = dt.datetime.now().year
-    season_options = get_season_options(fallback_years=["2025", "2026"])
-    if not season_options:
-        st.info("Não há temporadas disponíveis para consulta no seu histórico de status.")
-        return
-    # spec: temporada-global v1.0 — critério 2 (fonte única: seletor da sidebar)
-    temporada_global = st.session_state.get("temporada_global", "")
-    season = (
-        temporada_global if temporada_global in season_options
-        else season_options[get_default_season_index(season_options, current_year=str(current_year))]
+def _classificacao_persistida_atual(
+    classificacao_df: pd.DataFrame,
+    provas_df: pd.DataFrame,
+    resultados_df: pd.DataFrame,
+) -> bool:
+    """Indica se a tabela derivada cobre todas as provas com resultado."""
+    if classificacao_df.empty:
+        return False
+    provas_realizadas = set(provas_df["id"].astype(int)) & set(resultados_df["prova_id"].astype(int))
+    persistidas = set(pd.to_numeric(classificacao_df["prova_id"], errors="coerce").dropna().astype(int))
+    return bool(provas_realizadas) and provas_realizadas == persistidas
+
+
+def _pontos_por_prova_de_persistida(classificacao_df: pd.DataFrame) -> pd.DataFrame:
+    pontos = classificacao_df[["usuario_id", "prova_id", "pontos_prova"]].rename(
+        columns={"pontos_prova": "__pontos_calculados"}
     )
-    st.session_state['temporada'] = season
+    return _normalizar_ids_numericos(pontos, "usuario_id", "prova_id")
 
-    if not usuarios_status_historico_disponivel():
-        st.warning(
-            "⚠️ Aviso técnico: histórico de status de usuários indisponível. "
-            "Para temporadas anteriores, os participantes podem refletir o status atual."
-        )
-
-    try:
-        season_int = int(season)
-    except (TypeError, ValueError):
-        season_int = current_year
-
-    usuarios_df = with_required_columns(get_participantes_temporada_df(season), USUARIOS_COLUMNS)
-    provas_df = with_required_columns(get_provas_df(season), PROVAS_COLUMNS)
-    apostas_df = with_required_columns(get_apostas_df(season), APOSTAS_COLUMNS)
-    resultados_df = with_required_columns(get_resultados_df(season), RESULTADOS_COLUMNS)
-
-    usuarios_df = _normalizar_ids_numericos(usuarios_df, "id")
-    provas_df = _normalizar_ids_numericos(provas_df, "id")
-    apostas_df = _normalizar_ids_numericos(apostas_df, "usuario_id", "prova_id")
-    resultados_df = _normalizar_ids_numericos(resultados_df, "prova_id")
-
-    # Garante IDs únicos em provas_df (evita ValueError no set_index/to_dict)
-    if not provas_df.empty and provas_df['id'].duplicated().any():
-        provas_df = provas_df.drop_duplicates(subset='id', keep='first')
-
-    participantes = usuarios_df[
-        usuarios_df["nome"].notna() & (usuarios_df['nome'].astype(str) != 'Master')
-    ]
-    provas_df = provas_df.sort_values('data')
-    perfil_usuario = st.session_state.get("user_role", "usuario").strip().lower()
 
+def _calcular_classificacao_ao_vivo(
+    participantes: pd.DataFrame,
+    provas_df: pd.DataFrame,
+    apostas_df: pd.DataFrame,
+    resultados_df: pd.DataFrame,
+    season: str,
+    season_int: int,
+    regras_temporada: dict,
+    descarte_ativo: bool,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Recalcula a classificação a partir das apostas (fallback sem tabela derivada)."""
     apostas_pontos_df = apostas_df.copy()
     if not apostas_pontos_df.empty:
         pontos_calculados = calcular_pontuacao_lote(
@@ -519,8 +434,6 @@ def main():
 
     tabela_classificacao = []
 
-    regras_temporada = get_regras_aplicaveis(str(season), "Normal")
-    descarte_ativo = bool(regras_temporada.get("descarte", False))
     descartes_atuais = (
         _calcular_descartes_atuais(apostas_pontos_df, resultados_df, provas_df)
         if descarte_ativo else {}
@@ -635,8 +548,7 @@ def main():
 
     df_class = pd.DataFrame(tabela_classificacao)
     if df_class.empty:
-        st.info("Nenhuma pontuação disponível para a temporada selecionada.")
-        return
+        return df_class, apostas_pontos_df
 
     df_class = df_class.sort_values(
         ["Total Válido", "Acertos 11", "Acertou Campeao", "Acertou Equipe", "Acertou Vice", "Apostas no Prazo"],
@@ -680,35 +592,89 @@ def main():
             on='usuario_id',
             how='left'
         )
-        def movimento(row):
-            if pd.isnull(row['Posição Anterior']):
-                return "Novo"
-            diff = int(row['Posição Anterior']) - int(row['Posição'])
-            if diff > 0:
-                return f"Subiu {diff}"
-            elif diff < 0:
-                return f"Caiu {abs(diff)}"
-            else:
-                return "Permaneceu"
-        df_class['Movimentação'] = df_class.apply(movimento, axis=1)
+        df_class['Movimentação'] = [
+            descrever_movimentacao(anterior, atual)
+            for anterior, atual in zip(df_class['Posição Anterior'], df_class['Posição'])
+        ]
     else:
         df_class['Movimentação'] = "Novo"
 
-    diferencas = [0]
-    totals = df_class["Total Válido"].tolist()
-    for i in range(1, len(totals)):
-        diferencas.append(totals[i-1] - totals[i])
-    df_class["Diferença"] = ["-" if i == 0 else formatar_brasileiro(d) for i, d in enumerate(diferencas)]
+    return df_class, apostas_pontos_df
+
+
+def main():
+    render_page_header(st, "Classificação Geral do Bolão")
+
+    current_year = dt.datetime.now().year
+    season_options = get_season_options(fallback_years=["2025", "2026"])
+    if not season_options:
+        st.info("Não há temporadas disponíveis para consulta no seu histórico de status.")
+        return
+    # spec: temporada-global v1.0 — critério 2 (fonte única: seletor da sidebar)
+    temporada_global = st.session_state.get("temporada_global", "")
+    season = (
+        temporada_global if temporada_global in season_options
+        else season_options[get_default_season_index(season_options, current_year=str(current_year))]
+    )
+    st.session_state['temporada'] = season
+
+    if not usuarios_status_historico_disponivel():
+        st.warning(
+            "⚠️ Aviso técnico: histórico de status de usuários indisponível. "
+            "Para temporadas anteriores, os participantes podem refletir o status atual."
+        )
+
+    try:
+        season_int = int(season)
+    except (TypeError, ValueError):
+        season_int = current_year
+
+    usuarios_df = with_required_columns(get_participantes_temporada_df(season), USUARIOS_COLUMNS)
+    provas_df = with_required_columns(get_provas_df(season), PROVAS_COLUMNS)
+    apostas_df = with_required_columns(get_apostas_df(season), APOSTAS_COLUMNS)
+    resultados_df = with_required_columns(get_resultados_df(season), RESULTADOS_COLUMNS)
+
+    usuarios_df = _normalizar_ids_numericos(usuarios_df, "id")
+    provas_df = _normalizar_ids_numericos(provas_df, "id")
+    apostas_df = _normalizar_ids_numericos(apostas_df, "usuario_id", "prova_id")
+    resultados_df = _normalizar_ids_numericos(resultados_df, "prova_id")
+
+    # Garante IDs únicos em provas_df (evita ValueError no set_index/to_dict)
+    if not provas_df.empty and provas_df['id'].duplicated().any():
+        provas_df = provas_df.drop_duplicates(subset='id', keep='first')
 
-    df_display = df_class.copy()
-    colunas_pontos = [
-        "Total Geral", "Bônus Campeão", "Bônus Vice", "Bônus Equipe",
-        "Descarte", "Total Válido",
+    participantes = usuarios_df[
+        usuarios_df["nome"].notna() & (usuarios_df['nome'].astype(str) != 'Master')
     ]
-    for col in colunas_pontos:
-        df_display[col] = df_display[col].apply(lambda x: formatar_brasileiro(float(x)))
+    provas_df = provas_df.sort_values('data')
+    perfil_usuario = st.session_state.get("user_role", "usuario").strip().lower()
 
-    colunas_ordem = _colunas_classificacao(descarte_ativo)
+    regras_temporada = get_regras_aplicaveis(str(season), "Normal")
+    descarte_ativo = bool(regras_temporada.get("descarte", False))
+    classificacao_persistida = with_required_columns(
+        get_classificacao_temporada_df(season), CLASSIFICACAO_TEMPORADA_COLUMNS
+    )
+    if _classificacao_persistida_atual(classificacao_persistida, provas_df, resultados_df):
+        df_class = classificacao_exibicao(classificacao_persistida, participantes)
+        apostas_pontos_df = _pontos_por_prova_de_persistida(classificacao_persistida)
+    else:
+        df_class, apostas_pontos_df = _calcular_classificacao_ao_vivo(
+            participantes,
+            provas_df,
+            apostas_df,
+            resultados_df,
+            season,
+            season_int,
+            regras_temporada,
+            descarte_ativo,
+        )
+    if df_class.empty:
+        st.info("Nenhuma pontuação disponível para a temporada selecionada.")
+        return
+
+    df_display = tabela_exibicao(df_class)
+
+    colunas_ordem = colunas_classificacao(descarte_ativo)
     st.subheader("Classificação Geral (Provas + Campeonato)")
     if descarte_ativo:
         st.caption(
@@ -748,22 +714,44 @@ def main():
     )
 
     if perfil_usuario in ['admin', 'master']:
-        if st.button("Preparar imagem da tabela", key="preparar_imagem_classificacao"):
-            with st.spinner("Gerando imagem da classificação..."):
-                st.session_state["imagem_classificacao_geral"] = (
-                    season,
-                    gerar_imagem_tabela_ajustada(df_display, colunas_ordem).getvalue(),
-                )
-        imagem_gerada = st.session_state.get("imagem_classificacao_geral")
-        if imagem_gerada and imagem_gerada[0] == season:
+        # O job de classificação já deixa a imagem pronta; o botão só cobre o
+        # cálculo ao vivo ou um cache recém-reiniciado.
+        imagem_tabela = imagem_classificacao_pronta(season, df_display, colunas_ordem)
+        if imagem_tabela is None:
+            imagem_tabela = _imagem_sob_demanda(
+                "imagem_classificacao_pedido",
+                (str(season), tuple(map(tuple, df_display[colunas_ordem].astype(str).values.tolist()))),
+                lambda: agendar_imagem_classificacao(season, df_display, colunas_ordem),
+                "Preparar imagem da tabela",
+                "preparar_imagem_classificacao",
+            )
+        if imagem_tabela:
             st.download_button(
                 label='Baixar imagem da tabela',
-                data=imagem_gerada[1],
+                data=imagem_tabela,
                 file_name='classificacao_geral.png',
                 mime='image/png',
                 on_click="ignore",
             )
 
+    with st.expander("Chances de título e pódio (simulação)"):
+        st.caption(
+            "10.000 simulações das provas restantes com o modelo da estimativa de pontos. "
+            "Cada participante repete a última aposta; o bônus de campeonato não entra."
+        )
+        if st.button("Simular restante da temporada", key="simular_chances_campeonato"):
+            with st.spinner("Simulando provas restantes..."):
+                chances = calcular_chances_campeonato(str(season))
+            nomes = dict(zip(participantes["id"], participantes["nome"]))
+            chances_display = pd.DataFrame({
+                "Participante": chances["usuario_id"].map(nomes),
+                "Título": (chances["chance_titulo"] * 100).map(lambda v: f"{formatar_brasileiro(v)}%"),
+                "Pódio": (chances["chance_podio"] * 100).map(lambda v: f"{formatar_brasileiro(v)}%"),
+                "Pontos esperados": chances["pontos_esperados"].map(formatar_brasileiro),
+                "Posição média": chances["posicao_media"].map(lambda v: f"{v:.1f}".replace(".", ",")),
+            })
+            st.dataframe(chances_display, hide_index=True, width="stretch")
+
     st.subheader("Pontuação por Prova")
     provas_df_ord = provas_df.sort_values('id')
     provas_ids_ordenados = provas_df_ord["id"].tolist()
@@ -791,25 +779,44 @@ def main():
         options=df_cruzada.index.tolist()
     )
     if perfil_usuario in ['admin', 'master']:
-        if st.button("Gerar imagem da prova selecionada"):
-            imagem_buffer_prova = gerar_imagem_prova(
+        marcador_prova = (
+            str(season),
+            prova_selecionada,
+            tuple(df_cruzada.loc[prova_selecionada].tolist()) if prova_selecionada in df_cruzada.index else (),
+        )
+        sem_dados = []
+
+        def _agendar_prova():
+            future = agendar_imagem_prova_selecionada(
                 df_cruzada,
                 prova_selecionada,
                 apostas_df=apostas_df,
                 resultados_df=resultados_df,
                 provas_df=provas_df,
                 df_class=df_class,
+                temporada=season,
             )
-            if imagem_buffer_prova:
-                st.download_button(
-                    label=f"Baixar imagem da classificação da prova {prova_selecionada}",
-                    data=imagem_buffer_prova,
-                    file_name=f'classificacao_{prova_selecionada}.png',
-                    mime='image/png',
-                    on_click="ignore",
-                )
-            else:
-                st.warning("Prova selecionada não contém dados para gerar imagem.")
+            if future is None:
+                sem_dados.append(prova_selecionada)
+            return future
+
+        imagem_prova_bytes = _imagem_sob_demanda(
+            "imagem_prova_pedido",
+            marcador_prova,
+            _agendar_prova,
+            "Gerar imagem da prova selecionada",
+            "gerar_imagem_prova_selecionada",
+        )
+        if imagem_prova_bytes:
+            st.download_button(
+                label=f"Baixar imagem da classificação da prova {prova_selecionada}",
+                data=imagem_prova_bytes,
+                file_name=f'classificacao_{prova_selecionada}.png',
+                mime='image/png',
+                on_click="ignore",
+            )
+        elif sem_dados:
+            st.warning("Prova selecionada não contém dados para gerar imagem.")
 
     st.subheader("Evolução da Pontuação Acumulada")
     provas_com_resultado_ids = resultados_df['prova_id'].unique()
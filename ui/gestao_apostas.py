@@ -13,6 +13,7 @@ from services.data_access_auth import (
 )
 from services.bets_write import gerar_aposta_automatica
 from services.email_service import enviar_email
+from services.expected_points import comparar_apostas_prova
 from utils.helpers import get_bf1_logo_data_uri
 from utils.helpers import render_page_header
 from utils.season_utils import get_default_season_index, get_season_options
@@ -294,6 +295,38 @@ def main():
                         else:
                             st.error("Falha ao enviar e-mail de lembrete.")
 
+            with st.expander("Comparar apostas (pontos esperados)"):
+                st.caption(
+                    "Estimativa de cada aposta com o modelo por piloto (contexto Ergast da temporada). "
+                    "Desvio considera pilotos independentes."
+                )
+                if apostas_prova.empty:
+                    st.info("Nenhuma aposta registrada nesta prova.")
+                elif st.button("Calcular pontos esperados", key=f"comparar_apostas_{prova_id}"):
+                    tipo_sel = str(prova_row.get("tipo", "") or "")
+                    if "sprint" in str(prova_sel).lower():
+                        tipo_sel = "Sprint"
+                    with st.spinner("Avaliando apostas..."):
+                        comparacao = comparar_apostas_prova(apostas_prova, prova_sel, tipo_sel, season)
+                    nomes = dict(zip(participantes["id"].astype(int), participantes["nome"])) if not participantes.empty else {}
+                    comparacao["Participante"] = comparacao["usuario_id"].astype(int).map(nomes).fillna("-")
+                    st.dataframe(
+                        comparacao.rename(
+                            columns={
+                                "pilotos": "Pilotos",
+                                "fichas": "Fichas",
+                                "piloto_11": "11º",
+                                "pontos_esperados": "Pontos esperados",
+                                "desvio_padrao": "Desvio",
+                                "chance_11": "Chance 11º",
+                            }
+                        )[["Participante", "Pilotos", "Fichas", "11º", "Pontos esperados", "Desvio", "Chance 11º"]].round(
+                            {"Pontos esperados": 1, "Desvio": 1, "Chance 11º": 3}
+                        ),
+                        width="stretch",
+                        hide_index=True,
+                    )
+
             for idx, part in enumerate(participantes.itertuples()):
                 aposta = apostas_prova[apostas_prova["usuario_id"] == part.id]
                 existe_aposta_manual = (
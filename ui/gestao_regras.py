@@ -17,7 +17,8 @@ from services.data_access_regras import (
     listar_temporadas_por_regra,
     clonar_regra
 )
-from services.bets_scoring import atualizar_classificacoes_todas_as_provas
+from services.job_runner import solicitar_reclassificacao
+from ui.job_status import render_job_status
 from utils.helpers import render_page_header
 from utils.season_utils import get_current_year_str, get_season_options
 
@@ -95,15 +96,10 @@ def main():
             temporada_recalc = st.selectbox("Temporada para recalcular", temporadas_recalc, key="temp_recalcular")
             if st.button("Recalcular pontuação desta temporada", key="btn_recalcular_pontuacao_temp"):
                 try:
-                    # Limpar caches para garantir dados atualizados
-                    try:
-                        st.cache_data.clear()
-                    except Exception:
-                        pass
-                    atualizar_classificacoes_todas_as_provas(temporada=temporada_recalc)
-                    st.success(f"Pontuação recalculada para todas as provas da temporada {temporada_recalc}!")
+                    st.session_state["job_recalculo_temporada"] = solicitar_reclassificacao(temporada_recalc)
                 except Exception as e:
-                    st.error(f"Falha ao recalcular: {e}")
+                    st.error(f"Falha ao agendar o recálculo: {e}")
+            render_job_status("job_recalculo_temporada")
                 
     # ========== ABA: Criar/Editar Regras ==========
     with tabs[1]:
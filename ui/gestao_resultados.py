@@ -4,9 +4,9 @@ import ast
 
 from services.admin_operations import admin_save_resultado
 from services.data_access_provas import get_pilotos_df, get_provas_df, get_resultados_df
-from services.bets_scoring import atualizar_classificacoes_todas_as_provas
-from services.result_notification_service import enviar_emails_resultado_prova
+from services.job_runner import solicitar_publicacao_resultado
 from services.painel_controller import get_prova_atual_sem_resultado_id
+from ui.job_status import render_job_status
 from utils.helpers import render_page_header
 from utils.season_utils import get_current_year_str, get_default_season_index, get_season_options
 from utils.dataframe_contracts import (
@@ -172,21 +172,16 @@ def resultados_view():
             st.error(erro)
         else:
             admin_save_resultado(int(prova_id), str(temporada_selecionada), posicoes, abandono_pilotos)
-            st.success("Resultado salvo!")
             st.cache_data.clear()
-            # Atualiza todas as classificações após editar resultados
-            atualizar_classificacoes_todas_as_provas(temporada_selecionada)
-            try:
-                stats_email = enviar_emails_resultado_prova(int(prova_id), str(temporada_selecionada))
-                if stats_email.enviados:
-                    st.success(f"E-mails de resultado enviados: {stats_email.enviados}.")
-                if stats_email.falhas:
-                    st.warning(f"Resultado salvo, mas houve falha em {stats_email.falhas} envio(s) de e-mail.")
-            except Exception as email_error:
-                st.warning(f"Resultado salvo, mas não foi possível enviar os e-mails: {email_error}")
+            # Classificações e e-mails rodam em job; a tela acompanha o progresso.
+            st.session_state["job_publicacao_resultado"] = solicitar_publicacao_resultado(
+                int(prova_id), str(temporada_selecionada)
+            )
             st.session_state["resultados_reselecionar"] = True
             st.rerun()
 
+    render_job_status("job_publicacao_resultado")
+
     st.markdown("---")
     st.subheader(f"Resultados cadastrados - Temporada {temporada_selecionada}")
     resultados_df = with_required_columns(
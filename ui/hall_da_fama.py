@@ -20,6 +20,7 @@ from services.data_access_auth import (
 )
 from services.hall_da_fama_controller import (
     hall_queries as _controller_hall_queries,
+    load_hall_summary as _controller_load_hall_summary,
     resolve_hall_source as _controller_resolve_hall_source,
     table_height as _controller_table_height,
 )
@@ -42,6 +43,35 @@ def _hall_queries(source_table: str) -> dict[str, str]:
     return _controller_hall_queries(source_table)
 
 
+def _montar_tabela_historica(resumo: pd.DataFrame, usuarios: pd.DataFrame, seasons: list) -> pd.DataFrame:
+    """Tabela Participante x temporada a partir do resumo já ordenado.
+
+    O nome vem do cadastro atual (``usuarios``) pelo ``usuario_id``. Usuários
+    criados depois da última escrita no Hall entram ao final, sem
+    participações.
+    """
+    colunas = ['Participante', *seasons]
+    ids_usuarios = pd.to_numeric(usuarios['id'], errors='coerce')
+    nomes = dict(zip(ids_usuarios, usuarios['nome']))
+    if not resumo.empty:
+        ids_resumo = pd.to_numeric(resumo['usuario_id'], errors='coerce')
+        resumo = resumo[ids_resumo.isin(nomes.keys())]
+    if resumo.empty:
+        celulas = pd.DataFrame(columns=colunas)
+        ids_no_resumo: set[int] = set()
+    else:
+        ids_resumo = pd.to_numeric(resumo['usuario_id'], errors='coerce')
+        celulas = pd.DataFrame(list(resumo['temporadas']), index=resumo.index)
+        celulas.insert(0, 'Participante', ids_resumo.map(nomes))
+        celulas = celulas.reindex(columns=colunas)
+        ids_no_resumo = set(ids_resumo.astype(int))
+    novos = usuarios[~ids_usuarios.isin(ids_no_resumo)]
+    if not novos.empty:
+        extra = pd.DataFrame({'Participante': novos['nome'].tolist()}).reindex(columns=colunas)
+        celulas = pd.concat([celulas, extra], ignore_index=True)
+    return celulas.fillna("-").reset_index(drop=True)
+
+
 def hall_da_fama():
     """Exibe hall da fama com histórico plurianual."""
     render_page_header(st, "Hall da Fama")
@@ -79,61 +109,9 @@ def hall_da_fama():
         
         st.write(f"**Temporadas disponíveis:** {', '.join(seasons)}")
 
-        c.execute(queries["all_user_positions"])
-        pos_rows = c.fetchall() or []
-        pos_lookup: dict[tuple[int, str], dict[str, object]] = {
-            (int(r["usuario_id"]), str(r["temporada"])): dict(r)
-            for r in pos_rows
-            if r.get("usuario_id") is not None and r.get("temporada") is not None
-        }
-        
-        # Build the hall of fame table
-        hall_data = []
-        
-        for _, user in usuarios.iterrows():
-            user_id = user['id']
-            user_name = user['nome']
-            row = {'Participante': user_name}
-            
-            for season in seasons:
-                result = pos_lookup.get((int(user_id), str(season)))
-
-                if result and result.get('posicao') is not None:
-                    pos_val = result['posicao']
-                    pts_val = result.get('pontos') if result.get('pontos') is not None else 0
-                    # Format points nicely (avoid .0 when integer)
-                    try:
-                        if float(pts_val).is_integer():
-                            pts_display = str(int(pts_val))
-                        else:
-                            pts_display = f"{pts_val:.1f}"
-                    except Exception:
-                        pts_display = str(pts_val)
-                    row[season] = f"{pos_val}º ({pts_display} pts)"
-                else:
-                    row[season] = "-"
-            
-            hall_data.append(row)
-        
-        # Sort by overall best position
-        def score_user(row):
-            # Filtra apenas valores que são números (posições), ignorando 'Participante' e outros campos
-            positions = []
-            for k, v in row.items():
-                if k != 'Participante' and v != "-":
-                    try:
-                        positions.append(int(v.replace("º", "")))
-                    except (ValueError, AttributeError):
-                        pass  # Ignora valores que não são números
-            
-            participated = len(positions)
-            best_pos = min(positions) if positions else 9999
-            return (-participated, best_pos)
-        
-        hall_data.sort(key=score_user)
-        
-        # Create DataFrame and display
-        df_hall = pd.DataFrame(hall_data)
+        # Ranking pré-ordenado no banco (mais temporadas, depois melhor posição)
+        resumo = _controller_load_hall_summary(conn)
+        df_hall = _montar_tabela_historica(resumo, usuarios, seasons)
         
         st.markdown("---")
         st.subheader("📅 Classificações Históricas")
@@ -0,0 +1,53 @@
+"""Acompanhamento de jobs em background nas telas administrativas."""
+
+import streamlit as st
+
+from services.job_runner import consultar_job
+from utils.cache_utils import clear_data_cache
+
+_INTERVALO_SEGUNDOS = 2
+
+
+def _mensagem_final(job) -> tuple[str, str]:
+    if job.status == "falhou":
+        return "error", f"Falha no processamento da temporada {job.temporada}: {job.erro or 'erro desconhecido'}"
+    resultado = job.resultado or {}
+    texto = f"Classificações da temporada {job.temporada} atualizadas."
+    if job.tipo == "publicar_resultado":
+        texto = "Resultado salvo. " + texto
+        texto += f" E-mails de resultado enviados: {resultado.get('enviados', 0)}."
+        if resultado.get("falhas"):
+            return "warning", texto + f" Falha em {resultado['falhas']} envio(s) de e-mail."
+    return "success", texto
+
+
+def render_job_status(session_key: str) -> None:
+    """Mostra o progresso do job guardado em ``st.session_state[session_key]``.
+
+    O fragmento consulta o job a cada poucos segundos sem rerodar a página;
+    quando ele termina, os caches desta sessão são limpos (o job pode ter
+    rodado em outro processo) e a página é recarregada uma vez.
+    """
+    final = st.session_state.pop(f"{session_key}_final", None)
+    if final:
+        getattr(st, final[0])(final[1])
+    if session_key not in st.session_state:
+        return
+
+    @st.fragment(run_every=_INTERVALO_SEGUNDOS)
+    def _acompanhar() -> None:
+        job_id = st.session_state.get(session_key)
+        job = consultar_job(int(job_id)) if job_id is not None else None
+        if job is None:
+            st.session_state.pop(session_key, None)
+            return
+        if job.encerrado:
+            st.session_state.pop(session_key, None)
+            st.session_state[f"{session_key}_final"] = _mensagem_final(job)
+            clear_data_cache()
+            st.cache_data.clear()
+            st.rerun(scope="app")
+        rotulo = "Aguardando na fila..." if job.status == "pendente" else (job.mensagem or "Processando...")
+        st.progress(job.progresso, text=f"Job #{job.id} — {rotulo}")
+
+    _acompanhar()
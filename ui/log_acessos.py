@@ -1,12 +1,14 @@
 import datetime
 from dataclasses import dataclass
+from typing import Optional
 import pandas as pd
 import streamlit as st
 
 from services.data_access_core import db_connect
 from utils.helpers import render_page_header
 from utils.timezone_utils import convert_utc_to_client_tz
-from utils.pagination import paginate
+from utils.pagination import contains_pattern, decode_cursor, encode_cursor, paginate
+from utils.ttl_cache import ttl_cache
 
 
 @dataclass(frozen=True)
@@ -15,12 +17,42 @@ class AccessLogResult:
     total: int
     successes: int
     failures: int
+    next_cursor: Optional[str] = None
 
 
 def _table_height(total_rows: int, row_height: int = 36, max_height: int = 620) -> int:
     return min(max_height, 42 + (max(total_rows, 1) * row_height))
 
 
+@ttl_cache(ttl=60, stale_while_revalidate=60, maxsize=128, tags=("access_logs",))
+def _resumo_access_logs(where_sql: str, params: tuple) -> dict:
+    """Totais por assinatura de filtro; vencidos, são servidos enquanto recalculam em segundo plano."""
+    with db_connect(replica=True) as conn:
+        cur = conn.cursor()
+        cur.execute(
+            f"""
+            SELECT
+                COUNT(*) AS total,
+                COUNT(*) FILTER (WHERE sucesso IS TRUE) AS successes,
+                COUNT(*) FILTER (WHERE sucesso IS NOT TRUE) AS failures
+            FROM access_logs
+            WHERE {where_sql}
+            """,
+            params,
+        )
+        return dict(cur.fetchone() or {})
+
+
+def _cursor_access_logs(cursor: Optional[str]) -> Optional[tuple[datetime.datetime, int]]:
+    chave = decode_cursor(cursor)
+    if not chave or len(chave) != 2 or not isinstance(chave[1], int):
+        return None
+    try:
+        return datetime.datetime.fromisoformat(str(chave[0])), chave[1]
+    except ValueError:
+        return None
+
+
 def _load_access_logs(
     data_inicial: datetime.date,
     data_final: datetime.date,
@@ -30,8 +62,9 @@ def _load_access_logs(
     ip_contains: str,
     usuario_contains: str,
     limit: int = 100,
-    offset: int = 0,
+    cursor: Optional[str] = None,
 ) -> AccessLogResult:
+    """Uma página do log de acessos, paginada por ``(created_at, id)``."""
     start_ts = datetime.datetime.combine(data_inicial, datetime.time.min)
     end_ts_exclusive = datetime.datetime.combine(
         data_final + datetime.timedelta(days=1),
@@ -42,7 +75,7 @@ def _load_access_logs(
     params: list[object] = [start_ts, end_ts_exclusive]
 
     if perfil_sel != "Todos":
-        where.append("LOWER(COALESCE(perfil, '')) = %s")
+        where.append("lower(btrim(perfil)) = %s")
         params.append(perfil_sel.lower())
 
     if evento_sel != "Todos":
@@ -57,24 +90,24 @@ def _load_access_logs(
         params.append(False)
 
     if ip_contains:
-        where.append("LOWER(COALESCE(ip_address, '')) LIKE %s")
-        params.append(f"%{ip_contains.lower()}%")
+        where.append("ip_address ILIKE %s")
+        params.append(contains_pattern(ip_contains))
 
     if usuario_contains:
-        where.append("(LOWER(COALESCE(email, '')) LIKE %s OR LOWER(COALESCE(nome, '')) LIKE %s)")
-        token = f"%{usuario_contains.lower()}%"
+        where.append("(email ILIKE %s OR nome ILIKE %s)")
+        token = contains_pattern(usuario_contains)
         params.extend([token, token])
 
     where_sql = " AND ".join(where)
+    page_where = list(where)
+    page_params = list(params)
+    chave = _cursor_access_logs(cursor)
+    if chave:
+        # Comparação de linha: usa idx_access_logs_created_at_id_desc.
+        page_where.append("(created_at, id) < (%s, %s)")
+        page_params.extend(chave)
+    page_size = max(1, min(int(limit), 500))
 
-    summary_query = f"""
-        SELECT
-            COUNT(*) AS total,
-            COUNT(*) FILTER (WHERE sucesso IS TRUE) AS successes,
-            COUNT(*) FILTER (WHERE sucesso IS NOT TRUE) AS failures
-        FROM access_logs
-        WHERE {where_sql}
-    """
     query = f"""
         SELECT
             id,
@@ -88,21 +121,24 @@ def _load_access_logs(
             ip_address,
             detalhes
         FROM access_logs
-        WHERE {where_sql}
+        WHERE {" AND ".join(page_where)}
         ORDER BY created_at DESC, id DESC
-        LIMIT %s OFFSET %s
+        LIMIT %s
     """
-    page_params = [*params, max(1, min(int(limit), 500)), max(0, int(offset))]
 
     # pd.read_sql_query nao e compativel com psycopg3 (dict_row);
     # usamos cursor manual e construimos o DataFrame a partir da lista de dicts.
-    with db_connect() as conn:
+    with db_connect(replica=True) as conn:
         cur = conn.cursor()
-        cur.execute(summary_query, params)
-        summary = cur.fetchone() or {}
-        cur.execute(query, page_params)
+        cur.execute(query, [*page_params, page_size + 1])
         rows = cur.fetchall() or []
+    summary = _resumo_access_logs(where_sql, tuple(params))
 
+    next_cursor = None
+    if len(rows) > page_size:
+        ultima = rows[page_size - 1]
+        next_cursor = encode_cursor(ultima["created_at"], ultima["id"])
+        rows = rows[:page_size]
     if rows:
         frame = pd.DataFrame([dict(r) for r in rows])
     else:
@@ -115,11 +151,12 @@ def _load_access_logs(
         total=int(summary.get("total") or 0),
         successes=int(summary.get("successes") or 0),
         failures=int(summary.get("failures") or 0),
+        next_cursor=next_cursor,
     )
 
 
 def _get_filter_options() -> tuple[list[str], list[str]]:
-    with db_connect() as conn:
+    with db_connect(replica=True) as conn:
         cur = conn.cursor()
 
         cur.execute(
@@ -182,16 +219,16 @@ def main() -> None:
     with col_usuario:
         usuario_contains = st.text_input("Usuário/Email contém", value="").strip()
 
+    page_size = st.selectbox("Registros por página", [50, 100, 200], index=1, key="access_logs_page_size")
     filter_signature = (
         data_inicial, data_final, perfil_sel, evento_sel, sucesso_sel,
-        ip_contains, usuario_contains,
+        ip_contains, usuario_contains, page_size,
     )
     if st.session_state.get("_access_logs_filter_signature") != filter_signature:
         st.session_state["_access_logs_filter_signature"] = filter_signature
-        st.session_state["access_logs_page"] = 1
-
-    page_size = st.selectbox("Registros por página", [50, 100, 200], index=1, key="access_logs_page_size")
-    requested_page = int(st.session_state.get("access_logs_page", 1))
+        st.session_state["access_logs_cursors"] = [None]
+    # cursors[i] abre a página i + 1; "Anterior" só descarta o último.
+    cursors = st.session_state.setdefault("access_logs_cursors", [None])
     result = _load_access_logs(
         data_inicial=data_inicial,
         data_final=data_final,
@@ -201,18 +238,16 @@ def main() -> None:
         ip_contains=ip_contains,
         usuario_contains=usuario_contains,
         limit=page_size,
-        offset=(requested_page - 1) * page_size,
+        cursor=cursors[-1],
     )
-    pagination = paginate(requested_page, page_size, result.total)
-    if pagination.page != requested_page:
-        st.session_state["access_logs_page"] = pagination.page
-        result = _load_access_logs(
-            data_inicial, data_final, perfil_sel, evento_sel, sucesso_sel,
-            ip_contains, usuario_contains, pagination.page_size, pagination.offset,
-        )
+    page = len(cursors)
+    pagination = paginate(page, page_size, result.total)
     df = result.rows
 
     if df.empty:
+        if page > 1:
+            st.session_state["access_logs_cursors"] = [None]
+            st.rerun()
         st.info("Nenhum acesso encontrado com os filtros selecionados.")
         return
 
@@ -222,19 +257,19 @@ def main() -> None:
     m3.metric("Falhas", result.failures)
 
     nav_prev, nav_text, nav_next = st.columns([1, 2, 1])
-    if nav_prev.button("← Anterior", disabled=pagination.page <= 1, key="access_logs_prev"):
-        st.session_state["access_logs_page"] = pagination.page - 1
+    if nav_prev.button("← Anterior", disabled=page <= 1, key="access_logs_prev"):
+        cursors.pop()
         st.rerun()
     nav_text.caption(
-        f"Página {pagination.page} de {pagination.total_pages} · "
+        f"Página {page} de {max(page, pagination.total_pages)} · "
         f"{len(df)} registros exibidos"
     )
     if nav_next.button(
         "Próxima →",
-        disabled=pagination.page >= pagination.total_pages,
+        disabled=result.next_cursor is None,
         key="access_logs_next",
     ):
-        st.session_state["access_logs_page"] = pagination.page + 1
+        cursors.append(result.next_cursor)
         st.rerun()
 
     df_show = df.copy()
@@ -2,11 +2,13 @@ import streamlit as st
 import pandas as pd
 import logging
 from dataclasses import dataclass
+from typing import Optional
 from services.data_access_core import db_connect, get_table_columns
 from utils.helpers import render_page_header
 from utils.season_utils import get_default_season_index, get_season_options
 from utils.timezone_utils import convert_utc_to_client_tz
-from utils.pagination import paginate
+from utils.pagination import contains_pattern, decode_cursor, encode_cursor, paginate
+from utils.ttl_cache import ttl_cache
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +17,7 @@ logger = logging.getLogger(__name__)
 class BettingLogResult:
     rows: pd.DataFrame
     total: int
+    next_cursor: Optional[str] = None
 
 
 def _table_height(total_rows: int, row_height: int = 36, max_height: int = 620) -> int:
@@ -92,6 +95,16 @@ def _normalize_date_for_filter(value: object) -> str:
     return dt.strftime("%Y-%m-%d")
 
 
+@ttl_cache(ttl=60, stale_while_revalidate=60, maxsize=256, tags=("log_apostas",))
+def _contar_logs(where_sql: str, params: tuple) -> int:
+    """Total por assinatura de filtro; vencido, é servido enquanto recalcula em segundo plano."""
+    with db_connect(replica=True) as conn:
+        cur = conn.cursor()
+        cur.execute(f"SELECT COUNT(*) AS total FROM log_apostas{where_sql}", params)
+        row = cur.fetchone() or {}
+    return int(row.get("total") or 0)
+
+
 def carregar_logs(
     temporada=None,
     usuario_id=None,
@@ -104,10 +117,14 @@ def carregar_logs(
     status=None,
     apenas_automaticas=False,
     limit=100,
-    offset=0,
+    cursor=None,
 ) -> BettingLogResult:
-    """Carrega logs de apostas, opcionalmente filtrando por temporada."""
-    with db_connect() as conn:
+    """Carrega uma página de logs de apostas, opcionalmente filtrando por temporada.
+
+    A paginação é por chave (``id < cursor``), então qualquer página custa o
+    mesmo que a primeira; ``next_cursor`` abre a página seguinte.
+    """
+    with db_connect(replica=True) as conn:
         cols = [str(c) for c in get_table_columns(conn, "log_apostas")]
         has_status = "status" in cols
         has_ip_address = "ip_address" in cols
@@ -125,18 +142,23 @@ def carregar_logs(
         params: list[object] = []
 
         if temporada:
-            season_sources = []
-            if has_temporada:
-                season_sources.append("NULLIF(TRIM(CAST(temporada AS TEXT)), '')")
-            if has_data:
-                season_sources.append("NULLIF(SUBSTR(CAST(data AS TEXT), 1, 4), '')")
-            if has_data_criacao:
-                season_sources.append("NULLIF(SUBSTR(CAST(data_criacao AS TEXT), 1, 4), '')")
-
-            if season_sources:
-                season_expr = f"COALESCE({', '.join(season_sources)})"
-                where_clauses.append(f"{season_expr} = %s")
+            if "temporada_ref" in cols:
+                where_clauses.append("temporada_ref = %s")
                 params.append(str(temporada).strip())
+            else:
+                # Banco sem a migration das colunas geradas: expressão equivalente.
+                season_sources = []
+                if has_temporada:
+                    season_sources.append("NULLIF(TRIM(CAST(temporada AS TEXT)), '')")
+                if has_data:
+                    season_sources.append("NULLIF(SUBSTR(CAST(data AS TEXT), 1, 4), '')")
+                if has_data_criacao:
+                    season_sources.append("NULLIF(SUBSTR(CAST(data_criacao AS TEXT), 1, 4), '')")
+
+                if season_sources:
+                    season_expr = f"COALESCE({', '.join(season_sources)})"
+                    where_clauses.append(f"{season_expr} = %s")
+                    params.append(str(temporada).strip())
 
         if not is_admin:
             if not user_col or usuario_id is None:
@@ -145,21 +167,29 @@ def carregar_logs(
             params.append(int(usuario_id))
 
         if is_admin and apostador:
-            where_clauses.append("LOWER(COALESCE(apostador, '')) LIKE %s")
-            params.append(f"%{str(apostador).strip().lower()}%")
+            where_clauses.append("apostador ILIKE %s")
+            params.append(contains_pattern(apostador))
         if tipo_aposta is not None:
             where_clauses.append("tipo_aposta = %s")
             params.append(int(tipo_aposta))
         if data:
-            where_clauses.append("SUBSTR(CAST(data AS TEXT), 1, 10) = %s")
+            where_clauses.append("data_ref = %s" if "data_ref" in cols else "SUBSTR(CAST(data AS TEXT), 1, 10) = %s")
             params.append(str(data).strip())
         if status:
             where_clauses.append(f"{status_expr} = %s")
             params.append(str(status).strip())
         if apenas_automaticas:
-            where_clauses.append("COALESCE(automatica, 0) > 0")
+            where_clauses.append("automatica > 0")
 
         where_sql = (" WHERE " + " AND ".join(where_clauses)) if where_clauses else ""
+        page_clauses = list(where_clauses)
+        page_params = list(params)
+        chave = decode_cursor(cursor)
+        if chave and isinstance(chave[0], int):
+            page_clauses.append("id < %s")
+            page_params.append(chave[0])
+        page_where = (" WHERE " + " AND ".join(page_clauses)) if page_clauses else ""
+        page_size = max(1, min(int(limit), 500))
 
         query = (
             "SELECT id, "
@@ -169,20 +199,20 @@ def carregar_logs(
             f"{ip_expr} AS ip_address, "
             "temporada, "
             f"{status_expr} AS status "
-            f"FROM log_apostas{where_sql} ORDER BY id DESC LIMIT %s OFFSET %s"
+            f"FROM log_apostas{page_where} ORDER BY id DESC LIMIT %s"
         )
-        page_params = [*params, max(1, min(int(limit), 500)), max(0, int(offset))]
 
         # Usa cursor manual — pd.read_sql é incompatível com psycopg3 (dict_row)
         cur = conn.cursor()
-        cur.execute(f"SELECT COUNT(*) AS total FROM log_apostas{where_sql}", tuple(params))
-        count_row = cur.fetchone() or {}
-        cur.execute(query, tuple(page_params))
+        cur.execute(query, (*page_params, page_size + 1))
         rows = cur.fetchall() or []
 
+    total = _contar_logs(where_sql, tuple(params))
     if not rows:
-        return BettingLogResult(pd.DataFrame(), int(count_row.get("total") or 0))
+        return BettingLogResult(pd.DataFrame(), total)
 
+    next_cursor = encode_cursor(rows[page_size - 1]["id"]) if len(rows) > page_size else None
+    rows = rows[:page_size]
     df = pd.DataFrame([dict(r) for r in rows])
 
     # Garante tipos numéricos para colunas usadas em comparações
@@ -190,7 +220,7 @@ def carregar_logs(
         if col in df.columns:
             df[col] = df[col].apply(_to_int_safe)
 
-    return BettingLogResult(df, int(count_row.get("total") or 0))
+    return BettingLogResult(df, total, next_cursor)
 
 
 def main():
@@ -241,48 +271,48 @@ def main():
 
     inv_tipos_map = {v: k for k, v in tipos_map.items()}
     tipo_value = None if tipo_filtro == "Todas" else inv_tipos_map[tipo_filtro]
+    page_size = st.selectbox("Registros por página", [50, 100, 200], index=1, key="log_apostas_page_size")
     filter_signature = (
         season, apostador_sel, tipo_value, data_sel, status_sel,
-        mostrar_automaticas, user_id, is_admin,
+        mostrar_automaticas, user_id, is_admin, page_size,
     )
     if st.session_state.get("_log_apostas_filter_signature") != filter_signature:
         st.session_state["_log_apostas_filter_signature"] = filter_signature
-        st.session_state["log_apostas_page"] = 1
-
-    page_size = st.selectbox("Registros por página", [50, 100, 200], index=1, key="log_apostas_page_size")
-    requested_page = int(st.session_state.get("log_apostas_page", 1))
-    query_args = dict(
+        st.session_state["log_apostas_cursors"] = [None]
+    # cursors[i] abre a página i + 1; "Anterior" só descarta o último.
+    cursors = st.session_state.setdefault("log_apostas_cursors", [None])
+    result = carregar_logs(
         temporada=season, usuario_id=user_id, usuario_nome=user_nome, is_admin=is_admin,
         apostador=apostador_sel, tipo_aposta=tipo_value, data=data_sel,
         status=status_sel, apenas_automaticas=mostrar_automaticas,
-        limit=page_size, offset=(requested_page - 1) * page_size,
+        limit=page_size, cursor=cursors[-1],
     )
-    result = carregar_logs(**query_args)
-    pagination = paginate(requested_page, page_size, result.total)
-    if pagination.page != requested_page:
-        query_args["offset"] = pagination.offset
-        result = carregar_logs(**query_args)
-        st.session_state["log_apostas_page"] = pagination.page
+    page = len(cursors)
+    pagination = paginate(page, page_size, result.total)
     filtro = result.rows
 
     if filtro.empty:
+        if page > 1:
+            # A página guardada deixou de existir (filtro ou dados mudaram).
+            st.session_state["log_apostas_cursors"] = [None]
+            st.rerun()
         st.info("Nenhum registro encontrado com os filtros selecionados.")
         return
 
     nav_prev, nav_text, nav_next = st.columns([1, 2, 1])
-    if nav_prev.button("← Anterior", disabled=pagination.page <= 1, key="log_apostas_prev"):
-        st.session_state["log_apostas_page"] = pagination.page - 1
+    if nav_prev.button("← Anterior", disabled=page <= 1, key="log_apostas_prev"):
+        cursors.pop()
         st.rerun()
     nav_text.caption(
-        f"Página {pagination.page} de {pagination.total_pages} · "
+        f"Página {page} de {max(page, pagination.total_pages)} · "
         f"{result.total} registros encontrados"
     )
     if nav_next.button(
         "Próxima →",
-        disabled=pagination.page >= pagination.total_pages,
+        disabled=result.next_cursor is None,
         key="log_apostas_next",
     ):
-        st.session_state["log_apostas_page"] = pagination.page + 1
+        cursors.append(result.next_cursor)
         st.rerun()
 
     filtro_show = filtro.copy()
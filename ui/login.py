@@ -22,6 +22,9 @@ from utils.helpers import get_bf1_logo_data_uri
 from utils.html_utils import render_trusted_html
 from services.data_access_core import (
     db_connect,
+    eventos_pendentes,
+    manter_particoes_periodicamente,
+    registrar_evento,
 )
 from services.data_access_auth import (
     check_password,
@@ -48,13 +51,10 @@ def registrar_tentativa_login(email: str, sucesso: bool, ip_address: str = "LOCA
         ip_address: IP da requisição (para análise de segurança)
     """
     email = normalize_email_identifier(email)
-    with db_connect() as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO login_attempts (email, sucesso, ip_address, action)
-            VALUES (%s, %s, %s, %s)
-        ''', (email, sucesso, ip_address, action))
-        conn.commit()
+    registrar_evento(
+        "login_attempts",
+        {"email": email, "sucesso": sucesso, "ip_address": ip_address, "action": action},
+    )
 
 
 def registrar_evento_acesso(
@@ -70,27 +70,19 @@ def registrar_evento_acesso(
 ) -> None:
     """Registra evento de auditoria de acesso com dados completos para o Master."""
     try:
-        with db_connect() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                '''
-                INSERT INTO access_logs (
-                    evento, sucesso, user_id, email, nome, perfil, ip_address, detalhes
-                )
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                ''',
-                (
-                    evento,
-                    bool(sucesso),
-                    user_id,
-                    email,
-                    nome,
-                    perfil,
-                    ip_address,
-                    detalhes,
-                ),
-            )
-            conn.commit()
+        registrar_evento(
+            "access_logs",
+            {
+                "evento": evento,
+                "sucesso": bool(sucesso),
+                "user_id": user_id,
+                "email": email,
+                "nome": nome,
+                "perfil": perfil,
+                "ip_address": ip_address,
+                "detalhes": detalhes,
+            },
+        )
     except Exception as exc:
         logger.warning("Falha ao registrar access_logs: %s", exc)
 
@@ -134,6 +126,13 @@ def obter_tentativas_recentes(
         resultado_ip = cursor.fetchone()
         falhas_ip = resultado_ip['falhas_ip'] if resultado_ip and resultado_ip['falhas_ip'] else 0
         
+        # Tentativas ainda na fila de auditoria (eventos_pendentes) também contam.
+        for tentativa in eventos_pendentes("login_attempts"):
+            if tentativa.get("action") != action or tentativa.get("sucesso") is True:
+                continue
+            falhas += int(tentativa.get("email") == email)
+            falhas_ip += int(tentativa.get("ip_address") == ip_address)
+
         # Bloqueado se tiver mais que MAX_LOGIN_ATTEMPTS falhas
         # Limite por IP mais permissivo para reduzir falso positivo em redes compartilhadas.
         bloqueado = falhas >= max_attempts or falhas_ip >= (max_attempts * 3)
@@ -159,17 +158,15 @@ def _classificar_motivo_bloqueio(
 
 
 def limpar_tentativas_antigas():
-    """Remove registros de tentativas mais antigos que 24h"""
-    with db_connect() as conn:
-        cursor = conn.cursor()
-        tempo_limite = datetime.now() - timedelta(hours=24)
-        
-        cursor.execute('''
-            DELETE FROM login_attempts
-            WHERE tentativa_em < %s
-        ''', (tempo_limite,))
-        
-        conn.commit()
+    """Aplica a retenção de ``login_attempts`` (descarte de partições mensais).
+
+    Roda no máximo uma vez por hora por processo; o rate limit só olha os
+    últimos minutos, então o histórico mais antigo não interfere nele.
+    """
+    try:
+        manter_particoes_periodicamente(("login_attempts",))
+    except Exception as exc:
+        logger.warning("Falha na retenção de login_attempts: %s", exc)
 
 
 # ============ UI DE LOGIN ============
@@ -1,7 +1,6 @@
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
-import ast
 
 from services.data_access_core import (
     db_connect,
@@ -22,6 +21,7 @@ from services.data_access_auth import (
     update_user_password,
 )
 from services.bets_scoring import calcular_pontuacao_lote
+from services.scoring_kernel import detalhar_aposta, tipo_prova as tipo_prova_de
 from services.bets_write import gerar_aposta_sem_ideias, salvar_aposta
 from services.auth_service import check_password, hash_password
 from services.painel_controller import (
@@ -503,9 +503,6 @@ def participante_view():
                 apostas_part = apostas_part[apostas_part['prova_id'].isin(provas_df['id'])]
             if isinstance(apostas_part, pd.DataFrame) and 'prova_id' in apostas_part.columns:
                 apostas_part = apostas_part.sort_values(by='prova_id')
-            pontos_f1 = [25, 18, 15, 12, 10, 8, 6, 4, 2, 1]
-            pontos_sprint = [8, 7, 6, 5, 4, 3, 2, 1]
-
             if not apostas_part.empty:
                 nomes_abas = [f"{ap['nome_prova']} ({ap['prova_id']})" for _, ap in apostas_part.iterrows()]
                 aposta_detalhe = st.selectbox(
@@ -518,78 +515,28 @@ def participante_view():
                     with st.container():
                         prova_id = aposta['prova_id']
                         prova_nome = aposta['nome_prova']
-                        fichas = list(map(int, aposta['fichas'].split(',')))
-                        pilotos_apostados = aposta['pilotos'].split(',')
-                        piloto_11_apostado = aposta['piloto_11']
-                        automatica = aposta.get('automatica', 0)
-                        tipo_raw = provas_df[provas_df['id'] == prova_id]['tipo'].values[0] if not provas_df[provas_df['id'] == prova_id].empty else 'Normal'
-                        tipo_prova = 'Sprint' if str(tipo_raw).strip().lower() == 'sprint' or 'sprint' in str(prova_nome).lower() else 'Normal'
-                        regras = get_regras_aplicaveis(temporada, tipo_prova)
+                        prova_row = provas_df[provas_df['id'] == prova_id] if 'id' in provas_df.columns else pd.DataFrame()
                         resultado_row = resultados_df[resultados_df['prova_id'] == prova_id]
-                        if not resultado_row.empty:
-                            try:
-                                posicoes_dict = ast.literal_eval(resultado_row.iloc[0]['posicoes'])
-                            except Exception:
-                                posicoes_dict = {}
-                        else:
-                            posicoes_dict = {}
-                        # Extrair dados de abandono antes de montar a tabela
-                        abandonos = set()
-                        if regras.get('penalidade_abandono') and not resultado_row.empty and 'abandono_pilotos' in resultado_row.columns:
-                            raw_aband = resultado_row.iloc[0].get('abandono_pilotos', '')
-                            if raw_aband is None:
-                                raw_aband = ''
-                            abandonos = {p.strip() for p in str(raw_aband).split(',') if p and p.strip()}
-                        
-                        dados = []
-                        total_pontos = 0
-                        if tipo_prova == 'Sprint':
-                            pontos_lista = regras.get('pontos_sprint_posicoes') or regras.get('pontos_posicoes') or []
-                            if not pontos_lista:
-                                pontos_lista = pontos_sprint
-                        else:
-                            pontos_lista = regras.get('pontos_posicoes') or []
-                            if not pontos_lista:
-                                pontos_lista = pontos_f1
-                        n_pos = len(pontos_lista)
-                        piloto_para_pos = {str(v).strip(): int(k) for k, v in posicoes_dict.items()}
-                        for i in range(n_pos):
-                            aposta_piloto = pilotos_apostados[i] if i < len(pilotos_apostados) else ""
-                            ficha = fichas[i] if i < len(fichas) else 0
-                            pos_real = piloto_para_pos.get(str(aposta_piloto).strip(), None)
-                            pontos = 0
-                            if pos_real is not None and 1 <= pos_real <= n_pos:
-                                pontos = ficha * pontos_lista[pos_real - 1]
-                                total_pontos += pontos
-                            dnf_status = "DNF" if str(aposta_piloto).strip() in abandonos else "-"
-                            dados.append({
-                                "Piloto Apostado": aposta_piloto,
-                                "Fichas": ficha,
-                                "Posição Real": str(pos_real) if pos_real is not None else "-",
-                                "DNF": dnf_status,
-                                "Pontos": f"{pontos:.2f}"
-                            })
-                        piloto_11_real = str(posicoes_dict.get(11, "")).strip()
-                        bonus_11 = regras.get('pontos_11_colocado', 25)
-                        pontos_11_col = bonus_11 if str(piloto_11_apostado).strip() == piloto_11_real else 0
-                        total_pontos += pontos_11_col
-                        penalidade_abandono = 0
-                        pilotos_abandonados = []
-                        if abandonos:
-                            pilotos_abandonados = [p for p in pilotos_apostados if p.strip() in abandonos]
-                            num_aband = len(pilotos_abandonados)
-                            penalidade_abandono = int(regras.get('pontos_penalidade', 0)) * num_aband
-                            if penalidade_abandono:
-                                total_pontos -= penalidade_abandono
-                        if tipo_prova == 'Sprint' and regras.get('pontos_dobrada'):
-                            total_pontos = total_pontos * 2
-                        penalidade_auto = 0
-                        if automatica and int(automatica) >= 2:
-                            penalidade_auto_percent = regras.get('penalidade_auto_percent', 20)
-                            fator = max(0, 1 - (float(penalidade_auto_percent) / 100))
-                            desconto = round(total_pontos * fator, 2)
-                            penalidade_auto = round(total_pontos - desconto, 2)
-                            total_pontos = desconto
+                        detalhe = detalhar_aposta(
+                            aposta,
+                            prova_row.iloc[0] if not prova_row.empty else None,
+                            resultado_row.iloc[0] if not resultado_row.empty else {"prova_id": prova_id},
+                            temporada,
+                        )
+                        tipo_prova = detalhe.tipo_prova if detalhe else tipo_prova_de(
+                            prova_nome, prova_row.iloc[0].get('tipo') if not prova_row.empty else 'Normal'
+                        )
+                        regras = get_regras_aplicaveis(temporada, tipo_prova)
+                        dados = [
+                            {
+                                "Piloto Apostado": linha.piloto,
+                                "Fichas": linha.fichas,
+                                "Posição Real": str(linha.posicao_real) if linha.posicao_real is not None else "-",
+                                "DNF": "DNF" if linha.dnf else "-",
+                                "Pontos": f"{linha.pontos:.2f}",
+                            }
+                            for linha in (detalhe.pilotos if detalhe else ())
+                        ]
                         st.markdown(f"#### {prova_nome} ({tipo_prova})")
                         if tipo_prova == 'Sprint':
                             if regras.get('pontos_dobrada'):
@@ -597,12 +544,15 @@ def participante_view():
                             else:
                                 st.write("**Sprint com pontuação dobrada:** Não")
                         st.dataframe(pd.DataFrame(dados), hide_index=True)
-                        st.write(f"**11º Apostado:** {piloto_11_apostado} | **11º Real:** {piloto_11_real} | **Pontos 11º:** {pontos_11_col}")
-                        if penalidade_abandono:
-                            pilotos_str = ", ".join(pilotos_abandonados)
-                            st.write(f"**Penalidade por abandono (DNF):** {pilotos_str} → -{penalidade_abandono} pontos")
-                        if penalidade_auto:
-                            st.write(f"**Penalidade aposta automática:** -{penalidade_auto:.2f}")
+                        piloto_11_real = detalhe.piloto_11_real if detalhe else ""
+                        pontos_11_col = detalhe.pontos_11 if detalhe else 0
+                        st.write(f"**11º Apostado:** {aposta['piloto_11']} | **11º Real:** {piloto_11_real} | **Pontos 11º:** {pontos_11_col:g}")
+                        if detalhe and detalhe.penalidade_abandono:
+                            pilotos_str = ", ".join(detalhe.pilotos_abandonados)
+                            st.write(f"**Penalidade por abandono (DNF):** {pilotos_str} → -{detalhe.penalidade_abandono:g} pontos")
+                        if detalhe and detalhe.penalidade_auto:
+                            st.write(f"**Penalidade aposta automática:** -{detalhe.penalidade_auto:.2f}")
+                        total_pontos = detalhe.total if detalhe else 0
                         st.write(f"**Total de Pontos na Prova:** {total_pontos:.2f}")
                         st.markdown("---")
             else:
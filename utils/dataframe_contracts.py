@@ -24,6 +24,19 @@ USUARIOS_COLUMNS = (
 
 POSICOES_COLUMNS = ("id", "prova_id", "usuario_id", "posicao", "pontos", "temporada")
 
+CLASSIFICACAO_TEMPORADA_COLUMNS = (
+    "temporada", "prova_id", "ordem_prova", "usuario_id", "posicao",
+    "posicao_anterior", "variacao_posicao", "pontos_prova", "pontos_acumulados",
+    "descarte", "pontos_apos_descarte", "bonus_campeao", "bonus_vice",
+    "bonus_equipe", "bonus_campeonato", "total_valido", "diferenca_anterior",
+    "acertos_11",
+)
+
+CARREIRA_TEMPORADA_COLUMNS = (
+    "usuario_id", "temporada", "posicao_final", "pontos_total", "acertos_11",
+    "total_apostas", "fichas_por_piloto",
+)
+
 CHAMPIONSHIP_BETS_COLUMNS = (
     "user_id", "user_nome", "champion", "vice", "team", "season", "bet_time",
 )
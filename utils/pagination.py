@@ -1,9 +1,13 @@
-"""Primitivas neutras para paginação consistente."""
+"""Primitivas neutras para listagens paginadas: páginas, cursores e filtros "contém"."""
 
 from __future__ import annotations
 
+import base64
+import json
 from dataclasses import dataclass
+from datetime import date, datetime
 import math
+from typing import Optional
 
 
 @dataclass(frozen=True)
@@ -28,3 +32,27 @@ def paginate(page: int, page_size: int, total_items: int) -> Pagination:
     total_pages = max(1, math.ceil(safe_total / safe_size))
     safe_page = max(1, min(int(page), total_pages))
     return Pagination(safe_page, safe_size, safe_total)
+
+
+def contains_pattern(texto: str) -> str:
+    """Padrão ``ILIKE`` "contém" com ``%``, ``_`` e ``\\`` do usuário tratados como literais."""
+    escapado = str(texto).strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escapado}%"
+
+
+def encode_cursor(*values: object) -> str:
+    """Cursor opaco de paginação por chave (keyset) a partir da última linha exibida."""
+    payload = json.dumps([v.isoformat() if isinstance(v, (datetime, date)) else v for v in values])
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: Optional[str]) -> Optional[list]:
+    """Valores da chave codificados em ``encode_cursor``; ``None`` se ausente ou inválido."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw.decode("utf-8"))
+    except (ValueError, UnicodeDecodeError):
+        return None
+    return values if isinstance(values, list) else None
@@ -12,7 +12,9 @@ import json
 import logging
 import os
 import re
+import threading
 import time
+from contextlib import nullcontext
 from dataclasses import dataclass, field
 from typing import Any, Callable, Iterator, ParamSpec, TypeVar
 
@@ -31,6 +33,12 @@ class JourneyMetrics:
     cache_hits: int = 0
     cache_misses: int = 0
     query_fingerprints: dict[str, int] = field(default_factory=dict)
+    pool_checkouts: int = 0
+    pool_wait_seconds: float = 0.0
+    pool_max_wait_seconds: float = 0.0
+    pool_hold_seconds: float = 0.0
+    pool_max_in_use: int = 0
+    pool_timeouts: int = 0
 
 
 _current: contextvars.ContextVar[JourneyMetrics | None] = contextvars.ContextVar(
@@ -41,29 +49,149 @@ _cache_miss_serial: contextvars.ContextVar[int] = contextvars.ContextVar(
 )
 
 
+# Intervalo mínimo entre eventos "query_stats" no logger bf1.performance.
+QUERY_STATS_INTERVAL = float(os.environ.get("PERFORMANCE_QUERY_STATS_INTERVAL", "300"))
+# Intervalo mínimo entre eventos "cache_stats" no logger bf1.performance.
+CACHE_STATS_INTERVAL = float(os.environ.get("PERFORMANCE_CACHE_STATS_INTERVAL", "300"))
+# Limites superiores (ms) dos baldes de latência: 0,1 ms a ~100 s, em dobras.
+_LATENCY_BUCKETS_MS = tuple(0.1 * 2**i for i in range(21))
+_MAX_FINGERPRINTS = 500
+
+
+@functools.lru_cache(maxsize=1024)
 def _fingerprint(sql: str) -> str:
+    # O mesmo punhado de textos SQL se repete: normaliza cada um uma vez só.
     normalized = re.sub(r"\s+", " ", sql).strip()
     normalized = re.sub(r"'(?:''|[^'])*'|\b\d+\b", "?", normalized)
     return normalized[:240]
 
 
+@dataclass
+class QueryStats:
+    """Latências e linhas de um fingerprint, somadas entre jornadas do processo."""
+
+    calls: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    rows: int = 0
+    buckets: list[int] = field(default_factory=lambda: [0] * (len(_LATENCY_BUCKETS_MS) + 1))
+
+    def percentile_ms(self, fraction: float) -> float:
+        """Limite superior do balde que contém o percentil pedido."""
+        if not self.calls:
+            return 0.0
+        alvo = fraction * self.calls
+        acumulado = 0
+        for indice, quantidade in enumerate(self.buckets):
+            acumulado += quantidade
+            if acumulado >= alvo:
+                if indice < len(_LATENCY_BUCKETS_MS):
+                    return round(min(_LATENCY_BUCKETS_MS[indice], self.max_seconds * 1000), 3)
+                break
+        return round(self.max_seconds * 1000, 3)
+
+
+_query_stats: dict[str, QueryStats] = {}
+_query_stats_lock = threading.Lock()
+_query_stats_last_log = time.monotonic()
+_cache_stats_lock = threading.Lock()
+_cache_stats_last_log = time.monotonic()
+
+
+def _latency_bucket(elapsed: float) -> int:
+    elapsed_ms = elapsed * 1000
+    for indice, limite in enumerate(_LATENCY_BUCKETS_MS):
+        if elapsed_ms <= limite:
+            return indice
+    return len(_LATENCY_BUCKETS_MS)
+
+
+def _stats_for(key: str) -> QueryStats | None:
+    stats = _query_stats.get(key)
+    if stats is None and len(_query_stats) < _MAX_FINGERPRINTS:
+        stats = _query_stats[key] = QueryStats()
+    return stats
+
+
 def record_query(sql: str, elapsed: float) -> None:
+    global _query_stats_last_log
+    key = _fingerprint(sql)
+    agora = time.monotonic()
+    with _query_stats_lock:
+        stats = _stats_for(key)
+        if stats is not None:
+            stats.calls += 1
+            stats.total_seconds += elapsed
+            stats.max_seconds = max(stats.max_seconds, elapsed)
+            stats.buckets[_latency_bucket(elapsed)] += 1
+        emitir = agora - _query_stats_last_log >= QUERY_STATS_INTERVAL
+        if emitir:
+            _query_stats_last_log = agora
+    if emitir:
+        log_query_stats()
     metrics = _current.get()
     if metrics is None:
         return
     metrics.queries += 1
     metrics.db_seconds += elapsed
-    key = _fingerprint(sql)
     metrics.query_fingerprints[key] = metrics.query_fingerprints.get(key, 0) + 1
 
 
-def record_rows(count: int) -> None:
+def record_rows(count: int, sql: str | None = None) -> None:
+    count = max(0, int(count))
+    if sql is not None:
+        with _query_stats_lock:
+            stats = _query_stats.get(_fingerprint(sql))
+            if stats is not None:
+                stats.rows += count
     metrics = _current.get()
     if metrics is not None:
-        metrics.rows += max(0, int(count))
+        metrics.rows += count
+
+
+def query_stats(top: int = 20) -> list[dict[str, Any]]:
+    """Fingerprints de maior tempo total, com p50/p95/p99 e linhas retornadas."""
+    with _query_stats_lock:
+        itens = [(key, QueryStats(s.calls, s.total_seconds, s.max_seconds, s.rows, list(s.buckets)))
+                 for key, s in _query_stats.items()]
+    itens.sort(key=lambda item: item[1].total_seconds, reverse=True)
+    return [
+        {
+            "fingerprint": key,
+            "calls": s.calls,
+            "total_ms": round(s.total_seconds * 1000, 2),
+            "avg_ms": round(s.total_seconds * 1000 / s.calls, 3) if s.calls else 0.0,
+            "p50_ms": s.percentile_ms(0.50),
+            "p95_ms": s.percentile_ms(0.95),
+            "p99_ms": s.percentile_ms(0.99),
+            "max_ms": round(s.max_seconds * 1000, 3),
+            "rows": s.rows,
+            "rows_per_call": round(s.rows / s.calls, 2) if s.calls else 0.0,
+        }
+        for key, s in itens[:top]
+    ]
+
+
+def reset_query_stats() -> None:
+    with _query_stats_lock:
+        _query_stats.clear()
+
+
+def log_query_stats(top: int = 20) -> None:
+    """Emite as consultas de maior tempo total no logger ``bf1.performance``."""
+    payload = {"event": "query_stats", "queries": query_stats(top)}
+    logger.info(json.dumps(payload, ensure_ascii=False, sort_keys=True))
 
 
 def record_cache(hit: bool) -> None:
+    global _cache_stats_last_log
+    agora = time.monotonic()
+    with _cache_stats_lock:
+        emitir = agora - _cache_stats_last_log >= CACHE_STATS_INTERVAL
+        if emitir:
+            _cache_stats_last_log = agora
+    if emitir:
+        log_cache_stats()
     metrics = _current.get()
     if metrics is not None:
         if hit:
@@ -72,6 +200,29 @@ def record_cache(hit: bool) -> None:
             metrics.cache_misses += 1
 
 
+def record_pool_checkout(wait_seconds: float, in_use: int) -> None:
+    """Espera para obter conexão do pool e conexões em uso após a retirada."""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.pool_checkouts += 1
+        metrics.pool_wait_seconds += wait_seconds
+        metrics.pool_max_wait_seconds = max(metrics.pool_max_wait_seconds, wait_seconds)
+        metrics.pool_max_in_use = max(metrics.pool_max_in_use, in_use)
+
+
+def record_pool_release(hold_seconds: float) -> None:
+    """Tempo em que a jornada manteve a conexão fora do pool."""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.pool_hold_seconds += hold_seconds
+
+
+def record_pool_timeout() -> None:
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.pool_timeouts += 1
+
+
 class journey:
     """Context manager que mede uma jornada completa (suporta aninhamento)."""
 
@@ -81,6 +232,8 @@ class journey:
         self.metrics: JourneyMetrics | None = None
         self.token = None
         self.owner = False
+        self.unit = None
+        self.profile = None
 
     def __enter__(self) -> JourneyMetrics:
         existing = _current.get()
@@ -89,12 +242,25 @@ class journey:
         self.owner = True
         self.metrics = JourneyMetrics(self.name)
         self.token = _current.set(self.metrics)
+        # Leituras declaradas da jornada compartilham uma conexão e um snapshot.
+        from db.connection_pool import unit_of_work
+
+        self.unit = unit_of_work()
+        self.unit.__enter__()
+        from utils.profiling import start_profile
+
+        self.profile = start_profile(self.name)
         return self.metrics
 
     def __exit__(self, exc_type, exc, traceback) -> None:
         if not self.owner or self.metrics is None:
             return
+        if self.unit is not None:
+            self.unit.__exit__(None, None, None)
+            self.unit = None
         elapsed = time.perf_counter() - self.metrics.started
+        profile_path = self.profile.stop(elapsed) if self.profile is not None else None
+        self.profile = None
         control_flow = exc_type is not None and exc_type.__name__ in {"RerunException", "StopException"}
         payload = {
             "event": "journey_performance",
@@ -107,8 +273,16 @@ class journey:
             "cache_misses": self.metrics.cache_misses,
             "success": exc_type is None or control_flow,
             "query_fingerprints": self.metrics.query_fingerprints,
+            "pool_checkouts": self.metrics.pool_checkouts,
+            "pool_wait_ms": round(self.metrics.pool_wait_seconds * 1000, 2),
+            "pool_max_wait_ms": round(self.metrics.pool_max_wait_seconds * 1000, 2),
+            "pool_hold_ms": round(self.metrics.pool_hold_seconds * 1000, 2),
+            "pool_max_in_use": self.metrics.pool_max_in_use,
+            "pool_timeouts": self.metrics.pool_timeouts,
             **self.dimensions,
         }
+        if profile_path:
+            payload["profile"] = profile_path
         logger.info(json.dumps(payload, ensure_ascii=False, sort_keys=True))
         if self.token is not None:
             _current.reset(self.token)
@@ -124,10 +298,23 @@ def measured(name: str) -> Callable[[Callable[P, R]], Callable[P, R]]:
     return decorator
 
 
-def instrumented_cache_data(*, ttl: int, tags: tuple[str, ...] = ()):
+def instrumented_cache_data(
+    *,
+    ttl: int,
+    tags: tuple[str, ...] = (),
+    maxsize: int | None = None,
+    max_bytes: int | None = None,
+    stale_while_revalidate: float = 0,
+    replica: bool = False,
+):
     """Cache TTL observável e independente do framework web.
 
     O corpo interno roda somente no miss; a chamada externa registra o hit.
+    ``maxsize`` e ``max_bytes`` limitam o cache com descarte LRU e
+    ``stale_while_revalidate`` serve o valor vencido durante a atualização.
+    Todo miss é uma leitura declarada (reutiliza a conexão da jornada);
+    ``replica=True`` ainda permite que ele seja atendido pela réplica de
+    leitura (ver ``db.connection_pool.replica_read``).
     """
     from utils.ttl_cache import ttl_cache
 
@@ -137,11 +324,21 @@ def instrumented_cache_data(*, ttl: int, tags: tuple[str, ...] = ()):
         # função em outra quando ambas recebem argumentos iguais (ex.: temporada).
         cache_namespace = f"{func.__module__}.{func.__qualname__}"
 
-        @ttl_cache(ttl=ttl, tags=tags)
+        @ttl_cache(
+            ttl=ttl,
+            tags=tags,
+            maxsize=maxsize,
+            max_bytes=max_bytes,
+            name=cache_namespace,
+            stale_while_revalidate=stale_while_revalidate,
+        )
         def cached(namespace: str, *args: P.args, **kwargs: P.kwargs) -> R:
             record_cache(hit=False)
             _cache_miss_serial.set(_cache_miss_serial.get() + 1)
-            return func(*args, **kwargs)
+            from db.connection_pool import declared_read, replica_read
+
+            with declared_read(), (replica_read(shared=True) if replica else nullcontext()):
+                return func(*args, **kwargs)
 
         @functools.wraps(func)
         def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
@@ -152,9 +349,29 @@ def instrumented_cache_data(*, ttl: int, tags: tuple[str, ...] = ()):
             return value
 
         wrapper.clear = cached.clear  # type: ignore[attr-defined]
+        wrapper.stats = cached.stats  # type: ignore[attr-defined]
         return wrapper
     return decorator
 
 
+def cache_stats() -> dict[str, dict[str, Any]]:
+    """Hits, misses, descartes e bytes estimados de cada cache de leitura."""
+    from utils.ttl_cache import cache_stats as _cache_stats
+
+    return _cache_stats()
+
+
+def log_cache_stats() -> None:
+    """Emite um snapshot dos caches no logger ``bf1.performance``."""
+    payload = {"event": "cache_stats", "caches": cache_stats()}
+    logger.info(json.dumps(payload, ensure_ascii=False, sort_keys=True))
+
+
+def log_pool_stats(snapshot: dict[str, Any]) -> None:
+    """Emite um snapshot do pool de conexões no logger ``bf1.performance``."""
+    payload = {"event": "pool_stats", **snapshot}
+    logger.info(json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str))
+
+
 def performance_enabled() -> bool:
     return os.environ.get("PERFORMANCE_METRICS_ENABLED", "1").lower() not in {"0", "false", "no"}
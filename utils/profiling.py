@@ -0,0 +1,147 @@
+"""Amostragem de pilhas para jornadas lentas (opt-in).
+
+Uma única thread daemon lê, a cada ``PERFORMANCE_PROFILE_INTERVAL_MS``, o
+frame atual das threads registradas (``sys._current_frames``) e conta as
+pilhas no formato "collapsed" (``modulo:funcao;modulo:funcao N``), que
+ferramentas de flame graph leem diretamente. Sem jornadas registradas a
+thread para; o custo por amostra é proporcional à profundidade da pilha.
+
+Ativação (variáveis de ambiente):
+
+- ``PERFORMANCE_PROFILE_THRESHOLD_MS``: amostra toda jornada e grava o perfil
+  das que passarem do limite;
+- ``PERFORMANCE_PROFILE_SAMPLE_RATE``: fração (0-1) de jornadas gravadas
+  independentemente da duração.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger("bf1.performance")
+
+PROFILE_THRESHOLD_MS = float(os.environ.get("PERFORMANCE_PROFILE_THRESHOLD_MS", "0"))
+PROFILE_SAMPLE_RATE = float(os.environ.get("PERFORMANCE_PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = max(1.0, float(os.environ.get("PERFORMANCE_PROFILE_INTERVAL_MS", "10")))
+PROFILE_DIR = Path(os.environ.get("PERFORMANCE_PROFILE_DIR") or Path(tempfile.gettempdir()) / "bf1_profiles")
+PROFILE_KEEP = max(1, int(os.environ.get("PERFORMANCE_PROFILE_KEEP", "50")))
+_MAX_DEPTH = 128
+
+
+class _Sampler:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._alvos: dict[int, list[Counter]] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    def registrar(self, thread_id: int, pilhas: Counter) -> None:
+        with self._lock:
+            self._alvos.setdefault(thread_id, []).append(pilhas)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._rodar, name="bf1-profiler", daemon=True)
+                self._thread.start()
+
+    def remover(self, thread_id: int, pilhas: Counter) -> None:
+        with self._lock:
+            registros = [r for r in self._alvos.get(thread_id, []) if r is not pilhas]
+            if registros:
+                self._alvos[thread_id] = registros
+            else:
+                self._alvos.pop(thread_id, None)
+
+    def _rodar(self) -> None:
+        intervalo = PROFILE_INTERVAL_MS / 1000
+        while True:
+            time.sleep(intervalo)
+            frames = sys._current_frames()
+            # Contagem sob o lock: uma jornada removida não recebe mais amostras.
+            with self._lock:
+                if not self._alvos:
+                    self._thread = None
+                    return
+                for tid, registros in self._alvos.items():
+                    frame = frames.get(tid)
+                    if frame is None:
+                        continue
+                    pilha = _colapsar(frame)
+                    for pilhas in registros:
+                        pilhas[pilha] += 1
+            del frames
+
+
+_sampler = _Sampler()
+
+
+def _colapsar(frame) -> str:
+    partes = []
+    while frame is not None and len(partes) < _MAX_DEPTH:
+        code = frame.f_code
+        partes.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(partes))
+
+
+def profiling_enabled() -> bool:
+    return PROFILE_THRESHOLD_MS > 0 or PROFILE_SAMPLE_RATE > 0
+
+
+class JourneyProfile:
+    """Amostras de pilha da thread que executa uma jornada."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.sampled = random.random() < PROFILE_SAMPLE_RATE
+        self.stacks: Counter = Counter()
+        self._thread_id = threading.get_ident()
+        _sampler.registrar(self._thread_id, self.stacks)
+
+    def stop(self, elapsed: float) -> Optional[str]:
+        """Encerra a amostragem; grava o perfil se a jornada foi lenta ou sorteada."""
+        _sampler.remover(self._thread_id, self.stacks)
+        lenta = PROFILE_THRESHOLD_MS > 0 and elapsed * 1000 >= PROFILE_THRESHOLD_MS
+        if not (lenta or self.sampled) or not self.stacks:
+            return None
+        try:
+            return str(_gravar(self.name, self.stacks))
+        except OSError:
+            logger.warning("Falha ao gravar perfil da jornada %s", self.name, exc_info=True)
+            return None
+
+
+def _gravar(name: str, stacks: Counter) -> Path:
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    seguro = re.sub(r"[^A-Za-z0-9_.-]+", "_", name)[:60] or "jornada"
+    caminho = PROFILE_DIR / (
+        f"{seguro}-{time.strftime('%Y%m%dT%H%M%S')}-{time.time_ns() % 10**9:09d}-{os.getpid()}.folded"
+    )
+    caminho.write_text(
+        "".join(f"{pilha} {quantidade}\n" for pilha, quantidade in stacks.most_common()),
+        encoding="utf-8",
+    )
+    antigos = sorted(PROFILE_DIR.glob("*.folded"), key=lambda p: p.stat().st_mtime)
+    for antigo in antigos[:-PROFILE_KEEP]:
+        try:
+            antigo.unlink()
+        except OSError:
+            pass
+    return caminho
+
+
+def start_profile(name: str) -> Optional[JourneyProfile]:
+    """Inicia a amostragem da jornada corrente quando o profiling está ativo."""
+    if not profiling_enabled():
+        return None
+    return JourneyProfile(name)
+
+
+__all__ = ["JourneyProfile", "profiling_enabled", "start_profile"]
@@ -1,22 +1,118 @@
-"""Small framework-neutral TTL cache used by read services."""
+"""Small framework-neutral TTL cache used by read services.
+
+Each decorated function owns an LRU store that can be bounded by number of
+entries (``maxsize``) and by an estimated memory budget (``max_bytes``).
+Expired entries are purged periodically instead of lingering until the same
+key misses again. Per-cache counters are available through ``cache_stats``.
+
+Misses are single-flight: concurrent callers of the same key wait for one
+computation instead of each running the query. With
+``stale_while_revalidate`` an expired value keeps being served for that many
+seconds while a single background thread refreshes it.
+"""
 
 from __future__ import annotations
 
 import functools
+import itertools
+import logging
+import sys
 import threading
 import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
 from typing import Any, Callable, ParamSpec, TypeVar
 
+logger = logging.getLogger(__name__)
 P = ParamSpec("P")
 R = TypeVar("R")
 _clearers: list[tuple[frozenset[str], Callable[[], None]]] = []
+_stats: dict[str, Callable[[], "CacheStats"]] = {}
 _registry_lock = threading.RLock()
+# Contador de invalidações do processo (qualquer clear()); snapshots de leitura
+# abertos antes de uma invalidação não devem alimentar caches compartilhados.
+_invalidacoes = itertools.count(1)
+_ultima_invalidacao = 0
+
+
+@dataclass
+class CacheStats:
+    name: str
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    coalesced: int = 0
+    stale_hits: int = 0
+    entries: int = 0
+    # None quando o cache não tem ``max_bytes`` (tamanho não é estimado).
+    bytes: int | None = 0
+    maxsize: int | None = None
+    max_bytes: int | None = None
+
+
+def estimate_size(value: Any) -> int:
+    """Estimativa barata do peso de um valor em memória.
+
+    DataFrames/Series usam ``memory_usage(deep=True)``; coleções simples somam
+    o tamanho raso de seus itens e os demais objetos usam ``sys.getsizeof``.
+    """
+    memory_usage = getattr(value, "memory_usage", None)
+    if callable(memory_usage):
+        try:
+            usage = memory_usage(deep=True)
+            total = usage.sum() if hasattr(usage, "sum") else usage
+            return int(total)
+        except Exception:
+            pass
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(sys.getsizeof(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            sys.getsizeof(key) + sys.getsizeof(item) for key, item in value.items()
+        )
+    return sys.getsizeof(value)
+
+
+class _Flight:
+    """Computação em andamento de uma chave, compartilhada pelos chamadores."""
 
+    __slots__ = ("done", "owner", "result", "error")
 
-def ttl_cache(*, ttl: int, tags: tuple[str, ...] = ()) -> Callable[[Callable[P, R]], Callable[P, R]]:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.owner = threading.get_ident()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+def ttl_cache(
+    *,
+    ttl: int,
+    tags: tuple[str, ...] = (),
+    maxsize: int | None = None,
+    max_bytes: int | None = None,
+    name: str | None = None,
+    stale_while_revalidate: float = 0,
+) -> Callable[[Callable[P, R]], Callable[P, R]]:
     def decorate(func: Callable[P, R]) -> Callable[P, R]:
-        values: dict[object, tuple[float, R]] = {}
+        # key -> (expires_at, value, estimated_bytes); ordem = recência de uso.
+        values: OrderedDict[object, tuple[float, R, int]] = OrderedDict()
         lock = threading.RLock()
+        stats = CacheStats(
+            name=name or f"{func.__module__}.{func.__qualname__}",
+            maxsize=maxsize,
+            max_bytes=max_bytes,
+        )
+        purge_interval = max(1.0, float(ttl))
+        next_purge = [0.0]
+        grace = max(0.0, float(stale_while_revalidate))
+        inflight: dict[object, _Flight] = {}
+        # Incrementada a cada clear(): computações iniciadas antes de uma
+        # invalidação entregam o valor a quem já esperava, mas não o armazenam;
+        # clear() também as tira de ``inflight``, então quem chega depois da
+        # invalidação inicia uma computação nova.
+        generation = [0]
 
         def make_key(args: tuple[Any, ...], kwargs: dict[str, Any]) -> object:
             try:
@@ -25,6 +121,58 @@ def ttl_cache(*, ttl: int, tags: tuple[str, ...] = ()) -> Callable[[Callable[P,
             except TypeError:
                 return repr(args), repr(sorted(kwargs.items()))
 
+        def drop(key: object) -> None:
+            entry = values.pop(key, None)
+            if entry is not None:
+                stats.bytes -= entry[2]
+
+        def purge_expired(now: float) -> None:
+            expired = [key for key, entry in values.items() if entry[0] + grace <= now]
+            for key in expired:
+                drop(key)
+            stats.expirations += len(expired)
+            next_purge[0] = now + purge_interval
+
+        def enforce_bounds() -> None:
+            # Sempre preserva a entrada mais recente, mesmo acima do orçamento.
+            while len(values) > 1 and (
+                (maxsize is not None and len(values) > maxsize)
+                or (max_bytes is not None and stats.bytes > max_bytes)
+            ):
+                oldest = next(iter(values))
+                drop(oldest)
+                stats.evictions += 1
+
+        def store(key: object, result: R, now: float) -> None:
+            size = estimate_size(result) if max_bytes is not None else 0
+            drop(key)
+            values[key] = (now + ttl, result, size)
+            stats.bytes += size
+            if now >= next_purge[0]:
+                purge_expired(now)
+            enforce_bounds()
+            stats.entries = len(values)
+
+        def compute(key: object, flight: _Flight, args: tuple[Any, ...], kwargs: dict[str, Any]) -> None:
+            with lock:
+                started_generation = generation[0]
+            now = time.monotonic()
+            try:
+                flight.result = func(*args, **kwargs)
+            except BaseException as exc:
+                flight.error = exc
+            with lock:
+                if flight.error is None and generation[0] == started_generation:
+                    store(key, flight.result, now)
+                if inflight.get(key) is flight:
+                    del inflight[key]
+            flight.done.set()
+
+        def refresh_in_background(key: object, flight: _Flight, args: tuple[Any, ...], kwargs: dict[str, Any]) -> None:
+            compute(key, flight, args, kwargs)
+            if flight.error is not None:
+                logger.warning("Falha ao revalidar cache %s: %s", stats.name, flight.error)
+
         @functools.wraps(func)
         def wrapped(*args: P.args, **kwargs: P.kwargs) -> R:
             key = make_key(args, kwargs)
@@ -32,29 +180,97 @@ def ttl_cache(*, ttl: int, tags: tuple[str, ...] = ()) -> Callable[[Callable[P,
             with lock:
                 cached = values.get(key)
                 if cached and cached[0] > now:
+                    values.move_to_end(key)
+                    stats.hits += 1
                     return cached[1]
-            result = func(*args, **kwargs)
-            with lock:
-                values[key] = (now + ttl, result)
-            return result
+                flight = inflight.get(key)
+                if cached and cached[0] + grace > now:
+                    # Valor vencido dentro da janela de revalidação: serve o
+                    # antigo e dispara no máximo uma atualização em segundo plano.
+                    values.move_to_end(key)
+                    stats.stale_hits += 1
+                    if flight is None:
+                        flight = inflight[key] = _Flight()
+                        threading.Thread(
+                            target=refresh_in_background,
+                            args=(key, flight, args, kwargs),
+                            name=f"ttl-cache-refresh:{stats.name}",
+                            daemon=True,
+                        ).start()
+                    return cached[1]
+                leader = flight is None or flight.owner == threading.get_ident()
+                if leader:
+                    stats.misses += 1
+                    flight = inflight[key] = _Flight()
+                else:
+                    stats.coalesced += 1
+            if leader:
+                compute(key, flight, args, kwargs)
+            else:
+                flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
 
         def clear() -> None:
+            _registrar_invalidacao()
             with lock:
                 values.clear()
+                inflight.clear()
+                generation[0] += 1
+                stats.bytes = 0
+                stats.entries = 0
+
+        def snapshot() -> CacheStats:
+            with lock:
+                copia = CacheStats(**asdict(stats))
+            if max_bytes is None:
+                copia.bytes = None
+            return copia
 
         wrapped.clear = clear  # type: ignore[attr-defined]
+        wrapped.stats = snapshot  # type: ignore[attr-defined]
         cache_tags = frozenset({func.__module__, func.__qualname__, *tags})
         wrapped.cache_tags = cache_tags  # type: ignore[attr-defined]
         with _registry_lock:
             _clearers.append((cache_tags, clear))
+            _stats[stats.name] = snapshot
         return wrapped
     return decorate
 
 
+def _registrar_invalidacao() -> None:
+    global _ultima_invalidacao
+    _ultima_invalidacao = next(_invalidacoes)
+
+
+def invalidation_counter() -> int:
+    """Muda a cada invalidação de cache no processo (valor opaco, só comparar)."""
+    return _ultima_invalidacao
+
+
 def clear_all_caches(*tags: str) -> None:
+    _registrar_invalidacao()
     with _registry_lock:
         clearers = tuple(_clearers)
     requested = frozenset(str(tag) for tag in tags if str(tag))
     for cache_tags, clear in clearers:
         if not requested or cache_tags.intersection(requested):
             clear()
+
+
+def cache_stats() -> dict[str, dict[str, Any]]:
+    """Retorna uma cópia dos contadores de todos os caches registrados.
+
+    Cada cópia é lida sob a trava do próprio cache; ``bytes`` só aparece nos
+    caches com ``max_bytes``.
+    """
+    with _registry_lock:
+        snapshots = tuple(_stats.items())
+    resultado: dict[str, dict[str, Any]] = {}
+    for name, snapshot in snapshots:
+        dados = asdict(snapshot())
+        if dados["bytes"] is None:
+            del dados["bytes"]
+        resultado[name] = dados
+    return resultado